@@ -0,0 +1,37 @@
+"""embedding_cache — content-addressed кэш embeddings отзывов
+
+Revision ID: 057
+Revises: 056
+Create Date: 2026-10-17
+
+Один и тот же текст отзыва приходит из 2gis и yandex_maps копий компании и
+повторно после dedup-merge; раньше compute_embeddings каждый раз гонял его
+в OpenAI. Таблица хранит embedding по ключу (model, text_hash), где
+text_hash — sha256 нормализованного текста (maps.utils.hash_review_text).
+
+Только INSERT … ON CONFLICT DO NOTHING и точечные чтения по PK — вторичные
+индексы не нужны.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "057"
+down_revision = "056"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "embedding_cache",
+        sa.Column("model", sa.String(100), primary_key=True),
+        sa.Column("text_hash", sa.String(64), primary_key=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    # VECTOR(1536) — через raw SQL, как в reviews.embedding
+    op.execute("ALTER TABLE embedding_cache ADD COLUMN embedding vector(1536) NOT NULL")
+
+
+def downgrade() -> None:
+    op.drop_table("embedding_cache")
@@ -0,0 +1,34 @@
+"""pgvector HNSW-индекс на pain_tags.centroid
+
+Revision ID: 058
+Revises: 057
+Create Date: 2026-10-17
+
+match_reviews_to_pain_tags в режиме 'sql' ищет top-k ближайших центроидов
+прямо в Postgres (оператор <=>, cosine distance) вместо выгрузки всех
+embeddings в NumPy. Индекс — HNSW с vector_cosine_ops (pgvector >= 0.5, в
+образе pgvector/pgvector:pg16 есть), параметры m/ef_construction — дефолты.
+
+reviews.embedding намеренно БЕЗ ANN-индекса: match выбирает отзывы по id,
+индекс там не участвует, а HNSW превращает каждый не-HOT UPDATE reviews
+(sentiment, ai_processed_at) во вставку в граф — на бенчмарке UPDATE
+ai_processed_at 3к отзывов замедлился в ~40 раз (0.06с → 2.6с).
+"""
+
+from alembic import op
+
+revision = "058"
+down_revision = "057"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_pain_tags_centroid_hnsw "
+        "ON pain_tags USING hnsw (centroid vector_cosine_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_pain_tags_centroid_hnsw")
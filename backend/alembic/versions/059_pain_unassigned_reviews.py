@@ -0,0 +1,46 @@
+"""pain_unassigned_reviews — пул отзывов без тега для инкрементального назначения
+
+Revision ID: 059
+Revises: 058
+Create Date: 2026-10-17
+
+После каждого поиска вместо полного recluster ниши (HDBSCAN по всей нише +
+LLM-naming каждого кластера + пересборка review_pain_tags/company_pain_scores)
+новые отзывы матчатся к существующим центроидам. Не подошедшие ни к одному
+копятся здесь; полный recluster — только когда pending-пул ниши превышает
+REVIEWS_AI_UNASSIGNED_POOL_THRESHOLD.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "059"
+down_revision = "058"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pain_unassigned_reviews",
+        sa.Column(
+            "review_id", sa.BigInteger(),
+            sa.ForeignKey("reviews.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("sentiment", sa.String(10), primary_key=True),
+        sa.Column("niche", sa.String(100), nullable=False),
+        sa.Column("city", sa.String(100), nullable=True),
+        sa.Column("pending", sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    op.create_index(
+        "ix_pain_unassigned_reviews_bucket",
+        "pain_unassigned_reviews",
+        ["niche", "city", "sentiment", "pending"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_pain_unassigned_reviews_bucket", table_name="pain_unassigned_reviews")
+    op.drop_table("pain_unassigned_reviews")
@@ -0,0 +1,173 @@
+"""crawled_pages + search_result_crawled_pages instead of search_result_pages
+
+Revision ID: 060
+Revises: 059
+Create Date: 2026-10-17
+
+Краулер ходит по домену один раз, а search_result_pages хранила полную копию
+каждой страницы (с text_content ~10 КБ и STORED tsvector) на каждый
+search_result этого домена: 5 результатов × 10 страниц = 50 строк и 50
+вычислений tsvector. Теперь страница хранится один раз в crawled_pages по
+ключу (domain, url, content_hash), результаты ссылаются на неё через тонкую
+search_result_crawled_pages. Старые данные переносятся с дедупликацией,
+search_result_pages удаляется.
+
+content_hash = md5(title␟meta_description␟h1_text␟text_content) —
+так же считает searches.crawled_pages.content_hash.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision = "060"
+down_revision = "059"
+branch_labels = None
+depends_on = None
+
+_SEARCH_VECTOR = (
+    "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(meta_description, '')), 'B') || "
+    "setweight(to_tsvector('russian', coalesce(h1_text, '')), 'B') || "
+    "setweight(to_tsvector('russian', coalesce(text_content, '')), 'C')"
+)
+
+_CONTENT_HASH = (
+    "md5(coalesce(p.title, '') || chr(31) || coalesce(p.meta_description, '') || chr(31) || "
+    "coalesce(p.h1_text, '') || chr(31) || coalesce(p.text_content, ''))"
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "crawled_pages",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("domain", sa.String(255), nullable=False),
+        sa.Column("url", sa.Text(), nullable=False),
+        sa.Column("content_hash", sa.String(32), nullable=False),
+        sa.Column("status_code", sa.Integer(), nullable=True),
+        sa.Column("title", sa.Text(), nullable=True),
+        sa.Column("meta_description", sa.Text(), nullable=True),
+        sa.Column("h1_text", sa.Text(), nullable=True),
+        sa.Column("text_content", sa.Text(), nullable=True),
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(_SEARCH_VECTOR, persisted=True),
+            nullable=True,
+        ),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.UniqueConstraint("domain", "url", "content_hash", name="uq_crawled_pages_domain_url_hash"),
+    )
+    op.create_index(
+        "ix_crawled_pages_search_vector", "crawled_pages", ["search_vector"], postgresql_using="gin",
+    )
+
+    op.create_table(
+        "search_result_crawled_pages",
+        sa.Column(
+            "search_result_id", sa.Integer(),
+            sa.ForeignKey("search_results.id", ondelete="CASCADE"), primary_key=True,
+        ),
+        sa.Column(
+            "crawled_page_id", sa.Integer(),
+            sa.ForeignKey("crawled_pages.id", ondelete="CASCADE"), primary_key=True,
+        ),
+        sa.Column(
+            "search_id", sa.Integer(),
+            sa.ForeignKey("searches.id", ondelete="CASCADE"), nullable=False,
+        ),
+        sa.Column("position", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_index(
+        "ix_search_result_crawled_pages_search_page",
+        "search_result_crawled_pages",
+        ["search_id", "crawled_page_id"],
+    )
+    op.create_index(
+        "ix_search_result_crawled_pages_crawled_page_id",
+        "search_result_crawled_pages",
+        ["crawled_page_id"],
+    )
+
+    # Перенос: одна строка на (domain, url, content_hash), ссылки — на каждую
+    # бывшую строку search_result_pages.
+    op.execute(
+        f"""
+        INSERT INTO crawled_pages
+            (domain, url, content_hash, status_code, title, meta_description, h1_text, text_content, created_at)
+        SELECT DISTINCT ON (coalesce(sr.domain, ''), p.url, {_CONTENT_HASH})
+            coalesce(sr.domain, ''), p.url, {_CONTENT_HASH},
+            p.status_code, p.title, p.meta_description, p.h1_text, p.text_content, p.created_at
+        FROM search_result_pages p
+        JOIN search_results sr ON sr.id = p.search_result_id
+        ORDER BY coalesce(sr.domain, ''), p.url, {_CONTENT_HASH}, p.id
+        """
+    )
+    op.execute(
+        f"""
+        INSERT INTO search_result_crawled_pages (search_result_id, crawled_page_id, search_id, position)
+        SELECT p.search_result_id, c.id, p.search_id,
+               row_number() OVER (PARTITION BY p.search_result_id ORDER BY p.id) - 1
+        FROM search_result_pages p
+        JOIN search_results sr ON sr.id = p.search_result_id
+        JOIN crawled_pages c
+          ON c.domain = coalesce(sr.domain, '') AND c.url = p.url AND c.content_hash = {_CONTENT_HASH}
+        ON CONFLICT DO NOTHING
+        """
+    )
+
+    op.drop_index("ix_search_result_pages_search_vector", table_name="search_result_pages")
+    op.drop_index("ix_search_result_pages_search_id", table_name="search_result_pages")
+    op.drop_index("ix_search_result_pages_search_result_id", table_name="search_result_pages")
+    op.drop_table("search_result_pages")
+
+
+def downgrade() -> None:
+    op.create_table(
+        "search_result_pages",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "search_result_id", sa.Integer(),
+            sa.ForeignKey("search_results.id", ondelete="CASCADE"), nullable=False,
+        ),
+        sa.Column(
+            "search_id", sa.Integer(),
+            sa.ForeignKey("searches.id", ondelete="CASCADE"), nullable=False,
+        ),
+        sa.Column("url", sa.Text(), nullable=False),
+        sa.Column("status_code", sa.Integer(), nullable=True),
+        sa.Column("title", sa.Text(), nullable=True),
+        sa.Column("meta_description", sa.Text(), nullable=True),
+        sa.Column("h1_text", sa.Text(), nullable=True),
+        sa.Column("text_content", sa.Text(), nullable=True),
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(_SEARCH_VECTOR, persisted=True),
+            nullable=True,
+        ),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+    )
+    op.create_index("ix_search_result_pages_search_result_id", "search_result_pages", ["search_result_id"])
+    op.create_index("ix_search_result_pages_search_id", "search_result_pages", ["search_id"])
+    op.create_index(
+        "ix_search_result_pages_search_vector", "search_result_pages", ["search_vector"], postgresql_using="gin",
+    )
+    op.execute(
+        """
+        INSERT INTO search_result_pages
+            (search_result_id, search_id, url, status_code, title, meta_description, h1_text, text_content, created_at)
+        SELECT m.search_result_id, m.search_id, c.url, c.status_code, c.title, c.meta_description,
+               c.h1_text, c.text_content, c.created_at
+        FROM search_result_crawled_pages m
+        JOIN crawled_pages c ON c.id = m.crawled_page_id
+        ORDER BY m.search_result_id, m.position
+        """
+    )
+
+    op.drop_index("ix_search_result_crawled_pages_crawled_page_id", table_name="search_result_crawled_pages")
+    op.drop_index("ix_search_result_crawled_pages_search_page", table_name="search_result_crawled_pages")
+    op.drop_table("search_result_crawled_pages")
+    op.drop_index("ix_crawled_pages_search_vector", table_name="crawled_pages")
+    op.drop_table("crawled_pages")
@@ -0,0 +1,28 @@
+"""map_provider_config.rate_limits — квоты распределённого лимитера провайдеров
+
+Revision ID: 061
+Revises: 060
+Create Date: 2026-10-17
+
+Вежливость к провайдерам карт держалась на sleep'ах и rate_limit Celery-
+тасков — в пределах одного процесса. core.provider_limiter делит лимит
+между всеми воркерами через Redis; квоты по областям ("api", "card")
+задаются здесь, NULL — дефолты из Settings.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = "061"
+down_revision = "060"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("map_provider_config", sa.Column("rate_limits", JSONB, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("map_provider_config", "rate_limits")
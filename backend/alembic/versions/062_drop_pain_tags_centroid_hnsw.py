@@ -0,0 +1,32 @@
+"""Удалить HNSW-индекс pain_tags.centroid (миграция 058)
+
+Revision ID: 062
+Revises: 061
+Create Date: 2026-10-17
+
+match в режиме 'sql' ищет ближайшие центроиды только среди тегов ниши
+(pt.id = ANY(:tag_ids)), а при top_k=0 — вообще без LIMIT. Такой запрос
+HNSW-индекс обслужить не может: планировщик берёт pain_tags_pkey по id и
+точную сортировку по <=>. И не должен — ANN с пост-фильтром по id терял бы
+совпадения (ef_search кандидатов из всей таблицы, из них ниша — единицы).
+Тегов в нише десятки, точный перебор — миллисекунды, а индекс только
+замедлял запись центроидов при recluster'е.
+"""
+
+from alembic import op
+
+revision = "062"
+down_revision = "061"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_pain_tags_centroid_hnsw")
+
+
+def downgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_pain_tags_centroid_hnsw "
+        "ON pain_tags USING hnsw (centroid vector_cosine_ops)"
+    )
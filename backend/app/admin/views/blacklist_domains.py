@@ -4,6 +4,7 @@ Blacklist domain admin view for SQLAdmin.
 
 from sqladmin import ModelView
 from app.models.filter import BlacklistDomain
+from app.modules.filters.blacklist import invalidate_user_blacklist
 
 
 def _format_user(model, prop):
@@ -60,3 +61,16 @@ class BlacklistDomainAdmin(ModelView, model=BlacklistDomain):
         BlacklistDomain.domain: "Domain",
         BlacklistDomain.user: "Added By",
     }
+
+    # Compiled per-user blacklists are cached by workers — drop them on change.
+    async def on_model_change(self, data, model, is_created, request):
+        # Called before the form is applied: on edit this is still the old
+        # owner (the row may move to another user).
+        if not is_created and model.user_id is not None:
+            await invalidate_user_blacklist(model.user_id)
+
+    async def after_model_change(self, data, model, is_created, request):
+        await invalidate_user_blacklist(model.user_id)
+
+    async def after_model_delete(self, model, request):
+        await invalidate_user_blacklist(model.user_id)
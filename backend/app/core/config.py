@@ -124,6 +124,46 @@ class Settings(BaseSettings):
     SERPAPI_KEY: str = Field(default="", description="SerpAPI key (optional, deprecated)")
     YANDEX_XML_FOLDER_ID: str = Field(default="", description="Yandex Cloud: идентификатор каталога (yandex.cloud)")
     YANDEX_XML_KEY: str = Field(default="", description="Yandex Cloud: API-ключ сервисного аккаунта")
+    YANDEX_XML_CONCURRENCY_INITIAL: int = Field(
+        default=4, description="Стартовый параллелизм страниц Yandex XML (дальше AIMD по латентности и 429)"
+    )
+    YANDEX_XML_CONCURRENCY_MAX: int = Field(
+        default=10, description="Потолок параллелизма страниц Yandex XML"
+    )
+
+    # Запись выдачи в execute_search_task (searches.result_writer)
+    SEARCH_RESULTS_FLUSH_ROWS: int = Field(
+        default=20, description="Сколько результатов копится до одного INSERT + commit"
+    )
+    SEARCH_RESULTS_FLUSH_MS: int = Field(
+        default=500, description="Максимум мс между записями буфера, даже если он не заполнен"
+    )
+
+    # Общие исходящие HTTP-клиенты (app.core.http_clients)
+    HTTP_CLIENT_HTTP2: bool = Field(
+        default=True, description="HTTP/2 для общих клиентов (действует, только если установлен пакет h2)"
+    )
+    HTTP_DNS_CACHE_TTL: float = Field(
+        default=300.0, description="TTL in-process DNS-кэша общих клиентов, секунды; 0 — без кэша"
+    )
+
+    # Мини-краулер доменов поисковой выдачи (filters.crawler.crawl_domain)
+    CRAWL_CONCURRENCY_PER_HOST: int = Field(
+        default=4, description="Сколько запросов к одному хосту краулер держит в полёте"
+    )
+    CRAWL_DEADLINE_SECONDS: float = Field(
+        default=60.0, description="Общий дедлайн обхода домена; по истечении — частичный результат"
+    )
+    CRAWL_CACHE_FRESH_SECONDS: int = Field(
+        default=86400, description="Сколько кэш обхода отдаётся без запросов к сайту"
+    )
+    CRAWL_CACHE_MAX_AGE_SECONDS: int = Field(
+        default=30 * 86400,
+        description="Сколько кэш обхода живёт в Redis; после FRESH — ревалидация через ETag/Last-Modified",
+    )
+    CRAWL_CACHE_LRU_SIZE: int = Field(
+        default=256, description="Доменов в in-process LRU перед Redis; 0 = без LRU"
+    )
 
     # YooKassa payment gateway
     YOOKASSA_SHOP_ID: str = Field(default="", description="ЮКасса: идентификатор магазина (ShopId)")
@@ -238,7 +278,13 @@ class Settings(BaseSettings):
     TWOGIS_API_KEY: str = Field(default="", description="2GIS Catalog API key (dev.2gis.com, free 1000 req/day)")
     TWOGIS_RATE_LIMIT_DELAY: float = Field(
         default=0.4,
-        description="Delay (sec) between 2GIS requests, anti-throttle. На free-плане лимит 1000 req/day, поэтому 0.4с между запросами безопасно (≤150 req/min).",
+        description="Delay (sec) between 2GIS requests, anti-throttle. На free-плане лимит 1000 req/day, поэтому 0.4с между запросами безопасно (≤150 req/min). Задаёт темп token bucket'а ключа.",
+    )
+    TWOGIS_RATE_LIMIT_BURST: int = Field(
+        default=3, description="Сколько запросов к 2GIS по одному ключу можно отправить разом до выхода на темп RATE_LIMIT_DELAY"
+    )
+    TWOGIS_BACKOFF_MAX_SECONDS: float = Field(
+        default=30.0, description="Потолок паузы после 429/5xx 2GIS (Retry-After или jitter-экспонента)"
     )
     TWOGIS_REVIEWS_PUBLIC_API_ENABLED: bool = Field(
         default=True,
@@ -248,8 +294,27 @@ class Settings(BaseSettings):
         default="",
         description="Optional widget key для public-api.reviews.2gis.com. Пусто = пробуем без ключа (часто достаточно).",
     )
+    TWOGIS_CARD_API_ENABLED: bool = Field(
+        default=True,
+        description="Контакты карточки 2GIS сначала через items/byid по httpx (как XHR SPA), Chromium — только fallback.",
+    )
+    TWOGIS_WEB_API_KEY: str = Field(
+        default="",
+        description="Ключ, с которым SPA 2gis.ru ходит в catalog.api.2gis.com. Пусто = берём из перехваченного XHR первой Chromium-карточки.",
+    )
     YANDEX_MAPS_RATE_LIMIT_DELAY: float = Field(
-        default=3.5, description="Base delay (sec) between Yandex Maps requests; jittered ±1s in code"
+        default=3.5, description="Base delay (sec) between Yandex Maps searches per proxy — дефолт квоты yandex_maps/api лимитера"
+    )
+    # Дефолтные квоты core.provider_limiter (суммарно по всем воркерам на
+    # ключ/прокси). Переопределяются в map_provider_config.rate_limits.
+    TWOGIS_CARD_RATE_PER_MINUTE: float = Field(
+        default=20.0, description="Карточек 2gis.ru/firm в минуту (items/byid или Chromium), все воркеры вместе"
+    )
+    YANDEX_MAPS_CARD_RATE_PER_MINUTE: float = Field(
+        default=60.0, description="Карточек Я.Карт в минуту на прокси, все воркеры вместе"
+    )
+    OUTREACH_SENDS_PER_MINUTE: float = Field(
+        default=150.0, description="Отправок КП в минуту на аккаунт отправителя (почтовый провайдер, GreenAPI-инстанс, SMS.ru api_id, бот), все воркеры вместе"
     )
     MAPS_CACHE_TTL_DAYS: int = Field(
         default=14, description="TTL (days) for map_search_cache per (niche, city, source)"
@@ -257,9 +322,46 @@ class Settings(BaseSettings):
     MAPS_MAX_COMPANIES_PER_SEARCH: int = Field(default=200, description="Hard cap on companies parsed per search")
     MAPS_MAX_REVIEWS_PER_COMPANY: int = Field(default=100, description="Hard cap on reviews fetched per company")
 
+    # Пул headless Chromium на процесс воркера (maps.browser_pool): все
+    # Playwright-парсеры карточек/сайтов берут контекст в аренду, а не
+    # запускают браузер на таску.
+    BROWSER_POOL_SIZE: int = Field(default=1, description="Chromium-процессов на процесс воркера")
+    BROWSER_POOL_CONTEXTS_PER_BROWSER: int = Field(
+        default=2, description="Одновременных контекстов (аренд) на один Chromium"
+    )
+    BROWSER_POOL_MAX_PAGES: int = Field(
+        default=200, description="После стольких аренд Chromium перезапускается (утечки памяти/процессов)"
+    )
+    BROWSER_POOL_MAX_RENDERERS: int = Field(
+        default=12, description="Watchdog: больше renderer-процессов у Chromium — перезапуск"
+    )
+    BROWSER_POOL_MAX_RSS_MB: int = Field(
+        default=1200, description="Watchdog: суммарный RSS дерева процессов Chromium, МБ — выше перезапуск"
+    )
+    BROWSER_POOL_WATCHDOG_INTERVAL_S: float = Field(
+        default=10.0, description="Watchdog: период проверки дерева Chromium во время аренд, с (0 — только на границах аренд)"
+    )
+    BROWSER_POOL_EXECUTABLE: str = Field(
+        default="", description="Путь к chromium/headless_shell; пусто — из кэша браузеров Playwright"
+    )
+
     # === Reviews AI ===
     # NOTE: REVIEWS_AI_EMBEDDING_PROVIDER удалён — поддерживается только OpenAI.
     REVIEWS_AI_EMBEDDING_MODEL: str = Field(default="text-embedding-3-small", description="OpenAI model name")
+    # Бюджет embeddings на процесс воркера (reviews_ai/embeddings.py). Дефолты
+    # ниже tier-1 лимитов text-embedding-3-small, чтобы не упираться в 429.
+    REVIEWS_AI_EMBEDDING_CONCURRENCY: int = Field(
+        default=4, description="Максимум параллельных запросов к OpenAI /embeddings"
+    )
+    REVIEWS_AI_EMBEDDING_RPM: int = Field(
+        default=3000, description="Лимит запросов /embeddings в минуту; 0 = без лимита"
+    )
+    REVIEWS_AI_EMBEDDING_TPM: int = Field(
+        default=1_000_000, description="Лимит токенов /embeddings в минуту; 0 = без лимита"
+    )
+    REVIEWS_AI_EMBEDDING_CACHE_LRU_SIZE: int = Field(
+        default=5000, description="Векторов в in-process LRU перед таблицей embedding_cache; 0 = без LRU"
+    )
     REVIEWS_AI_SENTIMENT_ASSISTANT_NAME: str = Field(
         default="", description="ai_assistant.name для sentiment; пусто = auto-pick по подсказке 'haiku'"
     )
@@ -282,7 +384,36 @@ class Settings(BaseSettings):
     REVIEWS_AI_PAIN_MATCH_THRESHOLD: float = Field(
         default=0.55, description="Cosine similarity threshold для матчинга review→pain_tag"
     )
+    # Где считать match review→pain_tag: 'sql' — точный top-k через pgvector
+    # `<=>` среди тегов ниши, 'numpy' — матрица R×T в памяти воркера.
+    REVIEWS_AI_PAIN_MATCH_MODE: str = Field(default="sql", description="Режим матчинга review→pain_tag: sql | numpy")
+    REVIEWS_AI_PAIN_MATCH_TOP_K: int = Field(
+        default=0, description="Максимум pain_tags на отзыв при матчинге; 0 = все выше порога"
+    )
     REVIEWS_AI_MIN_CLUSTER_SIZE: int = Field(default=8, description="HDBSCAN min_cluster_size")
+    # Бэкенд кластеризации recluster'а: hdbscan | minibatch | auto. auto —
+    # minibatch (float32 + PCA + MiniBatchKMeans) для ниш от
+    # REVIEWS_AI_CLUSTER_AUTO_MIN_N отзывов, иначе hdbscan.
+    REVIEWS_AI_CLUSTER_BACKEND: str = Field(default="auto", description="hdbscan | minibatch | auto")
+    REVIEWS_AI_CLUSTER_AUTO_MIN_N: int = Field(
+        default=5000, description="С какого числа отзывов auto выбирает minibatch"
+    )
+    REVIEWS_AI_CLUSTER_REDUCE_DIMS: int = Field(
+        default=128, description="Размерность после PCA для minibatch; 0 = без понижения"
+    )
+    # LLM-naming кластеров при recluster'е: сколько вызовов параллельно и
+    # порог переиспользования label'а (1 − cosine между новым центроидом и
+    # активным тегом той же ниши); 0 — label-кэш выключен.
+    REVIEWS_AI_NAMING_CONCURRENCY: int = Field(default=4, description="Параллельных LLM-naming при recluster")
+    REVIEWS_AI_LABEL_REUSE_EPSILON: float = Field(
+        default=0.05, description="1 − cosine, при котором кластер наследует label активного тега"
+    )
+    # Инкрементальное назначение тегов после поиска: новые отзывы матчатся к
+    # существующим центроидам, «ничейные» копятся в pain_unassigned_reviews;
+    # полный recluster ниши — только когда пул дорос до порога.
+    REVIEWS_AI_UNASSIGNED_POOL_THRESHOLD: int = Field(
+        default=50, description="Сколько ничейных отзывов в нише запускают полный recluster; 0 — никогда"
+    )
 
     # DaData (блок 2 ТЗ 2026-06-02). Бесплатный тариф 10k запросов/день.
     # Получить ключи: https://dadata.ru/ → личный кабинет → API.
@@ -0,0 +1,237 @@
+"""Общие httpx-клиенты для исходящих запросов (краулер, enrich, API, embeddings).
+
+Раньше каждый модуль открывал `httpx.AsyncClient` на вызов: на каждую
+компанию — новый TLS-handshake и DNS-lookup к тем же api.hh.ru,
+suggestions.dadata.ru, catalog.api.2gis.com. На коротких запросах это
+заметная доля латентности. Здесь — реестр клиентов:
+
+- один клиент на (event loop, назначение). Celery-таски живут в своём
+  `asyncio.run`, а соединения httpx к чужому loop'у не переживают, поэтому
+  ключ — loop. В FastAPI loop один на процесс — клиент общий на процесс;
+- у назначения (PURPOSES) свои таймауты, лимиты пула и keep-alive:
+  краулеру нужно много соединений к разным хостам, API — долгий keep-alive
+  к нескольким;
+- HTTP/2, если установлен пакет `h2` и HTTP_CLIENT_HTTP2 включён
+  (мультиплексирование к одному API-хосту). Без `h2` — HTTP/1.1 keep-alive;
+- под транспортом — DNS-кэш на процесс (HTTP_DNS_CACHE_TTL): переживает и
+  смену loop'а между тасками. SNI/Host при этом остаются исходными —
+  подменяется только адрес, к которому открывается TCP.
+
+Клиент общий: закрывать его нельзя. `shared_client(purpose)` — замена
+`async with httpx.AsyncClient(...) as client:`, которая клиент не закрывает.
+Таймаут/заголовки, отличные от профиля, передаются в сам запрос
+(`client.get(url, timeout=..., headers=...)`).
+
+Клиенты с прокси сюда не идут: прокси у httpx задаётся на транспорт, такие
+клиенты по-прежнему создаются на вызов.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import ipaddress
+import logging
+import socket
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Iterable
+
+import httpcore
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BROWSER_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+# Назначение → параметры клиента. Лимиты — на весь процесс/loop, а не на
+# вызов: per-host ограничения (краулер) держат сами модули.
+PURPOSES: dict[str, dict[str, Any]] = {
+    # filters.crawler: много разных хостов, страницы по 30с.
+    "crawler": {
+        "timeout": httpx.Timeout(30.0, connect=5.0),
+        "limits": httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        "follow_redirects": True,
+        "headers": {"User-Agent": BROWSER_USER_AGENT},
+    },
+    # Сайты компаний: maps.enrich, website_discovery. Короткие таймауты,
+    # не больше 3 редиректов (http→https→www).
+    "sites": {
+        "timeout": httpx.Timeout(8.0, connect=5.0),
+        "limits": httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        "follow_redirects": True,
+        "max_redirects": 3,
+        "headers": {"User-Agent": BROWSER_USER_AGENT},
+    },
+    # JSON API: 2GIS, DaData, hh.ru, VK. Несколько хостов, долгий keep-alive.
+    "api": {
+        "timeout": httpx.Timeout(15.0, connect=10.0),
+        "limits": httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30.0),
+    },
+    # OpenAI /embeddings: пул по REVIEWS_AI_EMBEDDING_CONCURRENCY (см. _client_kwargs).
+    "embeddings": {
+        "timeout": httpx.Timeout(60.0, connect=10.0),
+    },
+}
+
+_H2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+# (host, port) -> (expires_at monotonic, [ip, ...]). Общий на процесс.
+_dns_cache: dict[tuple[str, int], tuple[float, list[str]]] = {}
+dns_stats: dict[str, int] = {"hits": 0, "misses": 0}
+
+
+def http2_enabled() -> bool:
+    return bool(settings.HTTP_CLIENT_HTTP2) and _H2_AVAILABLE
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+async def _getaddrinfo(host: str, port: int) -> list[str]:
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    addrs: list[str] = []
+    for _family, _type, _proto, _canon, sockaddr in infos:
+        if sockaddr[0] not in addrs:
+            addrs.append(sockaddr[0])
+    return addrs
+
+
+async def resolve(host: str, port: int) -> list[str]:
+    """IP-адреса хоста из кэша или через getaddrinfo (кладёт в кэш на TTL)."""
+    key = (host.lower(), port)
+    cached = _dns_cache.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        dns_stats["hits"] += 1
+        return cached[1]
+    dns_stats["misses"] += 1
+    addrs = await _getaddrinfo(host, port)
+    if addrs:
+        _dns_cache[key] = (time.monotonic() + settings.HTTP_DNS_CACHE_TTL, addrs)
+    return addrs
+
+
+def clear_dns_cache() -> None:
+    _dns_cache.clear()
+
+
+class _CachingResolverBackend(httpcore.AsyncNetworkBackend):
+    """Network backend httpcore: резолвит через DNS-кэш и открывает TCP к IP.
+
+    TLS (start_tls) httpcore делает отдельно с server_hostname = исходный
+    хост, так что сертификат и SNI проверяются как обычно.
+    """
+
+    def __init__(self, backend: httpcore.AsyncNetworkBackend | None = None) -> None:
+        self._backend = backend or httpcore.AnyIOBackend()
+
+    async def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: float | None = None,
+        local_address: str | None = None,
+        socket_options: Iterable[Any] | None = None,
+    ) -> httpcore.AsyncNetworkStream:
+        if _is_ip(host):
+            return await self._backend.connect_tcp(host, port, timeout, local_address, socket_options)
+        try:
+            addrs = await resolve(host, port)
+        except OSError as e:
+            raise httpcore.ConnectError(str(e)) from e
+        if not addrs:
+            raise httpcore.ConnectError(f"no addresses for {host}")
+        last_exc: Exception | None = None
+        for addr in addrs:
+            try:
+                return await self._backend.connect_tcp(addr, port, timeout, local_address, socket_options)
+            except httpcore.ConnectTimeout:
+                raise
+            except (httpcore.ConnectError, OSError) as e:
+                last_exc = e
+        # Ни один адрес не ответил — запись могла устареть, перерезолвим в следующий раз.
+        _dns_cache.pop((host.lower(), port), None)
+        assert last_exc is not None
+        raise last_exc
+
+    async def connect_unix_socket(
+        self, path: str, timeout: float | None = None, socket_options: Iterable[Any] | None = None,
+    ) -> httpcore.AsyncNetworkStream:
+        return await self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+def _client_kwargs(purpose: str) -> dict[str, Any]:
+    try:
+        kwargs = dict(PURPOSES[purpose])
+    except KeyError:
+        raise ValueError(f"Unknown HTTP client purpose: {purpose!r}") from None
+    if purpose == "embeddings":
+        concurrency = max(1, settings.REVIEWS_AI_EMBEDDING_CONCURRENCY)
+        kwargs["limits"] = httpx.Limits(
+            max_connections=concurrency, max_keepalive_connections=concurrency, keepalive_expiry=30.0,
+        )
+    return kwargs
+
+
+def _build_transport(limits: httpx.Limits) -> httpx.AsyncHTTPTransport:
+    transport = httpx.AsyncHTTPTransport(http2=http2_enabled(), limits=limits)
+    # httpx 0.27 не пробрасывает network_backend в AsyncHTTPTransport —
+    # ставим его пулу httpcore напрямую.
+    pool = getattr(transport, "_pool", None)
+    if settings.HTTP_DNS_CACHE_TTL > 0 and hasattr(pool, "_network_backend"):
+        pool._network_backend = _CachingResolverBackend()
+    return transport
+
+
+def _build_client(purpose: str) -> httpx.AsyncClient:
+    """Новый клиент по профилю назначения. Отдельная функция — тесты подменяют транспорт."""
+    kwargs = _client_kwargs(purpose)
+    limits = kwargs.pop("limits", httpx.Limits())
+    return httpx.AsyncClient(transport=_build_transport(limits), **kwargs)
+
+
+def get_client(purpose: str) -> httpx.AsyncClient:
+    """Общий клиент назначения `purpose` для текущего event loop. Не закрывать."""
+    loop = asyncio.get_running_loop()
+    per_loop = _clients.get(loop)
+    if per_loop is None:
+        per_loop = _clients[loop] = {}
+    client = per_loop.get(purpose)
+    if client is None or client.is_closed:
+        client = per_loop[purpose] = _build_client(purpose)
+    return client
+
+
+@asynccontextmanager
+async def shared_client(purpose: str) -> AsyncIterator[httpx.AsyncClient]:
+    """`async with shared_client("api") as client:` — как httpx.AsyncClient, но
+    клиент общий и на выходе не закрывается."""
+    yield get_client(purpose)
+
+
+async def aclose_clients() -> None:
+    """Закрыть клиенты текущего event loop (shutdown приложения, тесты)."""
+    per_loop = _clients.pop(asyncio.get_running_loop(), None) or {}
+    for client in per_loop.values():
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.debug("http_clients.aclose_clients: %s", e)
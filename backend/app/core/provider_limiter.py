@@ -0,0 +1,279 @@
+"""Распределённый rate limiter внешних провайдеров (GCRA в Redis).
+
+Вежливость к 2GIS / Я.Картам / каналам рассылки раньше держалась внутри
+процесса: sleep между запросами, rate_limit у Celery-таска, concurrency=1.
+При росте числа воркеров лимит источника либо пробивался, либо простаивал.
+Теперь все воркеры делят один лимит на пару (provider, key), где key —
+API-ключ или прокси:
+
+    async with provider_limiter.limit("twogis", api_key, quota):
+        resp = await client.get(...)
+
+Алгоритм — GCRA (generic cell rate algorithm): в Redis лежит только TAT
+(theoretical arrival time) одного лимита. Lua-скрипт атомарно резервирует
+слот и возвращает, сколько ждать; ожидание — на стороне вызывающего, без
+опроса Redis. Часы — redis TIME, а не локальные: у воркеров они расходятся.
+
+`penalize()` после 429 сдвигает TAT — тормозят все воркеры, а не только
+поймавший 429. Если ожидание в `acquire()` отменили (вызывающий бросил
+запрос), слот возвращается — иначе остальные воркеры ждали бы запросы,
+которых не было.
+
+Redis недоступен → тот же GCRA в памяти процесса (вежливость как раньше,
+только без координации), ошибка не пробрасывается.
+
+Счётчики (acquired / delayed / waited_ms / rejected / throttled) и текущая
+квота копятся в Redis-хэше на лимит; их отдаёт GET /monitor/rate-limits.
+Хэш живёт STATS_TTL_SECONDS с последнего обращения, индекс лимитов — ZSET по
+времени последнего обращения, старше TTL вычищается: ключи и прокси, которые
+больше не используются, из мониторинга уходят сами.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator
+
+import redis.asyncio as aioredis
+
+from app.core import redis_clients
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = "ratelimit"
+INDEX_KEY = f"{_PREFIX}:seen"  # ZSET member → last seen, ms
+STATS_TTL_SECONDS = 7 * 24 * 3600
+_INDEX_MAX = 500  # потолок строк в /monitor/rate-limits
+
+# KEYS: tat, stats, index. ARGV: interval_ms, burst, max_wait_ms (<0 — без
+# потолка), member, per_minute, stats_ttl_ms. Возвращает {reserved 0|1, wait_ms}.
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local max_wait = tonumber(ARGV[3])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+local new_tat = tat + interval
+local wait = new_tat - interval * burst - now
+if wait < 0 then wait = 0 end
+local ttl = tonumber(ARGV[6])
+redis.call('HSET', KEYS[2], 'per_minute', ARGV[5], 'burst', ARGV[2])
+redis.call('PEXPIRE', KEYS[2], ttl)
+redis.call('ZADD', KEYS[3], now, ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now - ttl)
+if max_wait >= 0 and wait > max_wait then
+  redis.call('HINCRBY', KEYS[2], 'rejected', 1)
+  return {0, wait}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', new_tat - now + 1000)
+redis.call('HINCRBY', KEYS[2], 'acquired', 1)
+if wait > 0 then
+  redis.call('HINCRBY', KEYS[2], 'delayed', 1)
+  redis.call('HINCRBY', KEYS[2], 'waited_ms', wait)
+end
+return {1, wait}
+"""
+
+# KEYS: tat, stats, index. ARGV: pause_ms, member, stats_ttl_ms.
+_PENALIZE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local until_ms = now + tonumber(ARGV[1])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < until_ms then
+  redis.call('SET', KEYS[1], until_ms, 'PX', until_ms - now + 1000)
+end
+redis.call('HINCRBY', KEYS[2], 'throttled', 1)
+redis.call('PEXPIRE', KEYS[2], tonumber(ARGV[3]))
+redis.call('ZADD', KEYS[3], now, ARGV[2])
+return 1
+"""
+
+# KEYS: tat, stats. ARGV: interval_ms, wait_ms. Возвращает занятый слот.
+_REFUND_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+local new_tat = tat - tonumber(ARGV[1])
+if new_tat > now then
+  redis.call('SET', KEYS[1], new_tat, 'PX', new_tat - now + 1000)
+else
+  redis.call('DEL', KEYS[1])
+end
+redis.call('HINCRBY', KEYS[2], 'acquired', -1)
+redis.call('HINCRBY', KEYS[2], 'delayed', -1)
+redis.call('HINCRBY', KEYS[2], 'waited_ms', -tonumber(ARGV[2]))
+return 1
+"""
+
+_STAT_FIELDS = ("acquired", "delayed", "waited_ms", "rejected", "throttled")
+
+
+@dataclass(frozen=True)
+class Quota:
+    """Лимит одной пары (provider, key): темп и сколько запросов можно разом."""
+
+    per_minute: float  # <= 0 — без темпа, действуют только паузы penalize()
+    burst: int = 1
+
+    @property
+    def interval_ms(self) -> int:
+        return max(1, int(60_000 / self.per_minute)) if self.per_minute > 0 else 0
+
+
+class ProviderRateLimited(RuntimeError):
+    """Очередь к провайдеру длиннее max_wait — слот не занят."""
+
+    def __init__(self, provider: str, wait: float):
+        super().__init__(f"{provider}: лимит запросов, ближайший слот через {wait:.1f}s")
+        self.provider = provider
+        self.wait = wait
+
+
+def key_id(key: str | None) -> str:
+    """Короткий отпечаток ключа/прокси — сами секреты в Redis не пишем."""
+    if not key:
+        return "-"
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def _member(provider: str, key: str | None) -> str:
+    return f"{provider}:{key_id(key)}"
+
+
+# Fallback без Redis: member → TAT (секунды time.monotonic()).
+_local_tat: dict[str, float] = {}
+
+
+def _redis() -> aioredis.Redis:
+    return redis_clients.get_client(decode_responses=True)
+
+
+def _local_reserve(member: str, quota: Quota, max_wait: float | None) -> float:
+    now = time.monotonic()
+    interval = quota.interval_ms / 1000
+    new_tat = max(_local_tat.get(member, 0.0), now) + interval
+    wait = max(0.0, new_tat - interval * quota.burst - now)
+    if max_wait is not None and wait > max_wait:
+        raise ProviderRateLimited(member.rpartition(":")[0], wait)
+    _local_tat[member] = new_tat
+    return wait
+
+
+async def reserve(provider: str, key: str | None, quota: Quota, *, max_wait: float | None = None) -> float:
+    """Занимает слот; возвращает, сколько секунд ждать до запроса.
+
+    ProviderRateLimited — если ждать дольше max_wait (слот не занимается).
+    """
+    member = _member(provider, key)
+    try:
+        reserved, wait_ms = await _redis().eval(
+            _ACQUIRE_SCRIPT, 3,
+            f"{_PREFIX}:tat:{member}", f"{_PREFIX}:stats:{member}", INDEX_KEY,
+            quota.interval_ms, max(1, quota.burst),
+            -1 if max_wait is None else int(max_wait * 1000),
+            member, quota.per_minute, STATS_TTL_SECONDS * 1000,
+        )
+    except Exception as e:
+        logger.debug("provider_limiter %s: Redis недоступен, локальный лимит: %s", member, e)
+        return _local_reserve(member, quota, max_wait)
+    wait = int(wait_ms) / 1000
+    if not int(reserved):
+        raise ProviderRateLimited(provider, wait)
+    return wait
+
+
+async def _refund(provider: str, key: str | None, quota: Quota, wait: float) -> None:
+    """Вернуть слот, занятый reserve() и так и не использованный."""
+    member = _member(provider, key)
+    try:
+        await _redis().eval(
+            _REFUND_SCRIPT, 2, f"{_PREFIX}:tat:{member}", f"{_PREFIX}:stats:{member}",
+            quota.interval_ms, int(wait * 1000),
+        )
+    except Exception as e:
+        logger.debug("provider_limiter.refund %s: %s", member, e)
+        if member in _local_tat:
+            _local_tat[member] -= quota.interval_ms / 1000
+
+
+async def acquire(provider: str, key: str | None, quota: Quota, *, max_wait: float | None = None) -> float:
+    """reserve() + ожидание своего слота. Возвращает фактическое ожидание.
+
+    Отмена во время ожидания возвращает слот (refund) и пробрасывается дальше.
+    """
+    wait = await reserve(provider, key, quota, max_wait=max_wait)
+    if wait > 0:
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            await asyncio.shield(_refund(provider, key, quota, wait))
+            raise
+    return wait
+
+
+@asynccontextmanager
+async def limit(
+    provider: str, key: str | None, quota: Quota, *, max_wait: float | None = None,
+) -> AsyncIterator[float]:
+    """`async with limit(...)`: тело выполняется в своём слоте лимита."""
+    yield await acquire(provider, key, quota, max_wait=max_wait)
+
+
+async def penalize(provider: str, key: str | None, seconds: float) -> None:
+    """Провайдер ответил 429: ни один воркер не идёт к нему раньше чем через `seconds`."""
+    if seconds <= 0:
+        return
+    member = _member(provider, key)
+    try:
+        await _redis().eval(
+            _PENALIZE_SCRIPT, 3, f"{_PREFIX}:tat:{member}", f"{_PREFIX}:stats:{member}", INDEX_KEY,
+            int(seconds * 1000), member, STATS_TTL_SECONDS * 1000,
+        )
+    except Exception as e:
+        logger.debug("provider_limiter.penalize %s: %s", member, e)
+        _local_tat[member] = max(_local_tat.get(member, 0.0), time.monotonic() + seconds)
+
+
+async def get_stats() -> list[dict[str, Any]]:
+    """Живая картина по всем лимитам: квота, счётчики, очередь (backlog_seconds)."""
+    try:
+        client = _redis()
+        seconds, micros = await client.time()
+        now_ms = int(seconds) * 1000 + int(micros) // 1000
+        pipe = client.pipeline(transaction=False)
+        pipe.zremrangebyscore(INDEX_KEY, "-inf", now_ms - STATS_TTL_SECONDS * 1000)
+        pipe.zremrangebyrank(INDEX_KEY, 0, -_INDEX_MAX - 1)  # самые давние сверх потолка
+        pipe.zrange(INDEX_KEY, 0, -1)
+        members = sorted((await pipe.execute())[-1])
+        if not members:
+            return []
+        pipe = client.pipeline(transaction=False)
+        for member in members:
+            pipe.hgetall(f"{_PREFIX}:stats:{member}")
+            pipe.get(f"{_PREFIX}:tat:{member}")
+        replies = await pipe.execute()
+    except Exception as e:
+        logger.warning("provider_limiter.get_stats: %s", e)
+        return []
+
+    out = []
+    for i, member in enumerate(members):
+        raw, tat = replies[2 * i], replies[2 * i + 1]
+        if not raw:
+            continue  # хэш истёк раньше, чем индекс вычистил запись
+        provider, _, kid = member.rpartition(":")
+        row: dict[str, Any] = {"provider": provider, "key_id": kid}
+        row.update({f: int(raw.get(f) or 0) for f in _STAT_FIELDS})
+        row["per_minute"] = float(raw.get("per_minute") or 0)
+        row["burst"] = int(raw.get("burst") or 0)
+        row["backlog_seconds"] = round(max(0, int(float(tat or 0)) - now_ms) / 1000, 3)
+        out.append(row)
+    return out
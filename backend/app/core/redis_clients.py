@@ -0,0 +1,72 @@
+"""Общие async-клиенты Redis на event loop (кэш краулера, блэклисты, лимиты провайдеров).
+
+Клиент redis.asyncio со своим пулом соединений привязан к loop'у, в котором
+создан. Celery-таски живут каждая в своём `asyncio.run`, поэтому клиент один
+на (event loop, decode_responses) — как httpx-клиенты в core.http_clients.
+В FastAPI loop один на процесс — клиент общий на процесс.
+
+    client = redis_clients.get_client()                      # bytes (сжатые payload'ы)
+    client = redis_clients.get_client(decode_responses=True)  # str
+
+Клиент общий: закрывать его нельзя. В конце жизни loop'а —
+`await aclose_clients()`: lifespan приложения, browser_pool.run, а Celery-таски
+запускают корутину через `redis_clients.run(coro)` вместо asyncio.run.
+
+Для pub/sub (SSE) — отдельные клиенты из core.redis_pubsub: подписка держит
+соединение на всё время стрима.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import weakref
+from typing import Awaitable, TypeVar
+
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[bool, aioredis.Redis]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_client(*, decode_responses: bool = False) -> aioredis.Redis:
+    """Общий клиент Redis для текущего event loop. Не закрывать."""
+    loop = asyncio.get_running_loop()
+    per_loop = _clients.get(loop)
+    if per_loop is None:
+        per_loop = _clients[loop] = {}
+    client = per_loop.get(decode_responses)
+    if client is None:
+        client = per_loop[decode_responses] = aioredis.from_url(
+            settings.REDIS_URL, decode_responses=decode_responses,
+        )
+    return client
+
+
+async def aclose_clients() -> None:
+    """Закрыть клиенты текущего event loop (shutdown приложения, конец Celery-таски, тесты)."""
+    per_loop = _clients.pop(asyncio.get_running_loop(), None) or {}
+    for client in per_loop.values():
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.debug("redis_clients.aclose_clients: %s", e)
+
+
+def run(coro: Awaitable[T]) -> T:
+    """asyncio.run для Celery-тасок: в конце закрывает Redis-клиенты loop'а."""
+
+    async def _main() -> T:
+        try:
+            return await coro
+        finally:
+            await aclose_clients()
+
+    return asyncio.run(_main())
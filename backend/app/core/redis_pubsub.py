@@ -1,9 +1,10 @@
-"""Простая обёртка над Redis pub/sub для модуля maps SSE.
+"""Простая обёртка над Redis pub/sub для SSE-прогресса (maps, поиск по выдаче).
 
 publish_event(channel, type, data) — публикация одного события (JSON-сообщение).
 subscribe_events(channel) — async-генератор по сообщениям канала.
+Subscription(channel) — подписка, открытая заранее, с ожиданием по таймауту.
 
-Канал для maps: 'maps_stream:{search_id}'.
+Каналы: 'maps_stream:{search_id}' (maps), 'search_stream:{search_id}' (searches).
 
 NB: модуль аккуратен к недоступному Redis. publish_event при ошибке логирует
 и идёт дальше — это не критическая операция (SSE-клиент просто не увидит
@@ -12,6 +13,7 @@ NB: модуль аккуратен к недоступному Redis. publish_e
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from typing import Any, AsyncIterator
@@ -82,6 +84,61 @@ async def subscribe_events(channel: str) -> AsyncIterator[dict[str, Any]]:
             pass
 
 
+class Subscription:
+    """Подписка на канал с явным open()/aclose() и ожиданием по таймауту.
+
+    subscribe_events подписывается только на первом __anext__, а wait_for
+    поверх него при таймауте закрывает генератор. Здесь подписка активна
+    сразу после open() (события до первого чтения не теряются), а
+    get_event(timeout) просто возвращает None, если за timeout ничего не
+    пришло, — подписка при этом живёт дальше.
+
+        sub = Subscription(channel)
+        await sub.open()
+        try:
+            event = await sub.get_event(timeout=15)  # dict {type, data} или None
+        finally:
+            await sub.aclose()
+    """
+
+    def __init__(self, channel: str) -> None:
+        self.channel = channel
+        self._redis = get_redis()
+        self._pubsub = self._redis.pubsub()
+
+    async def open(self) -> None:
+        await self._pubsub.subscribe(self.channel)
+
+    async def get_event(self, timeout: float) -> dict[str, Any] | None:
+        """Следующее событие канала или None, если за timeout секунд его не было."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            left = deadline - loop.time()
+            if left <= 0:
+                return None
+            # Подтверждение подписки тоже даёт None — ждём до дедлайна дальше.
+            msg = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=left)
+            if msg is None or msg.get("type") != "message" or msg.get("data") is None:
+                continue
+            try:
+                return json.loads(msg["data"])
+            except (ValueError, TypeError) as e:
+                logger.warning("redis_pubsub.Subscription: bad JSON in %s: %s", self.channel, e)
+
+    async def aclose(self) -> None:
+        for close in (lambda: self._pubsub.unsubscribe(self.channel), self._pubsub.aclose, self._redis.aclose):
+            try:
+                await close()
+            except Exception:
+                pass
+
+
 def maps_stream_channel(search_id: int) -> str:
     """Канонический канал для прогресса поиска."""
     return f"maps_stream:{search_id}"
+
+
+def search_stream_channel(search_id: int) -> str:
+    """Канал прогресса поиска по выдаче (searches)."""
+    return f"search_stream:{search_id}"
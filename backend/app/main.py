@@ -57,8 +57,10 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
 
     yield
 
-    # Shutdown: Очистка ресурсов (если нужно)
-    pass
+    # Shutdown: закрываем общие HTTP- и Redis-клиенты (keep-alive соединения)
+    from app.core import http_clients, redis_clients
+    await http_clients.aclose_clients()
+    await redis_clients.aclose_clients()
 
 
 # Создание FastAPI приложения
@@ -33,6 +33,7 @@ from app.models.pain_tag import (
     PainTag,
     ReviewPainTag,
     CompanyPainScore,
+    PainUnassignedReview,
 )
 from app.models.lead_list import LeadList, LeadListItem
 from app.models.user_filter_preset import UserFilterPreset
@@ -51,6 +52,7 @@ from app.models.kp_generation_job import KpGenerationJob
 from app.models.kp_send import KpSend
 from app.models.site_lead import SiteLead
 from app.models.website_lead import WebsiteLead
+from app.models.embedding_cache import EmbeddingCache
 
 __all__ = [
     "User",
@@ -88,6 +90,7 @@ __all__ = [
     "PainTag",
     "ReviewPainTag",
     "CompanyPainScore",
+    "PainUnassignedReview",
     "LeadList",
     "LeadListItem",
     "UserFilterPreset",
@@ -106,4 +109,5 @@ __all__ = [
     "KpSend",
     "SiteLead",
     "WebsiteLead",
+    "EmbeddingCache",
 ]
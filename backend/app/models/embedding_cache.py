@@ -0,0 +1,32 @@
+"""ORM-модель content-addressed кэша embeddings (миграция 057).
+
+Стиль — классический Column(), как у остальных моделей.
+"""
+
+from datetime import datetime
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Column, DateTime, String
+
+from app.core.database import Base
+
+
+class EmbeddingCache(Base):
+    """Embedding нормализованного текста отзыва под конкретной моделью.
+
+    Ключ (model, text_hash), text_hash = maps.utils.hash_review_text от
+    того текста, что уходил в OpenAI. Один и тот же отзыв у 2gis- и
+    yandex_maps-копий компании (и после dedup-merge) считается один раз.
+    Заполняется reviews_ai.embedding_cache; строки не устаревают —
+    embedding фиксированной модели детерминирован.
+    """
+
+    __tablename__ = "embedding_cache"
+
+    model = Column(String(100), primary_key=True)
+    text_hash = Column(String(64), primary_key=True)
+    embedding = Column(Vector(1536), nullable=False)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<EmbeddingCache {self.model} {self.text_hash[:12]}>"
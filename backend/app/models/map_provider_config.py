@@ -11,6 +11,7 @@
 from datetime import datetime
 
 from sqlalchemy import Column, DateTime, Boolean, Text, String, Integer
+from sqlalchemy.dialects.postgresql import JSONB
 
 from app.core.database import Base
 
@@ -27,6 +28,11 @@ class MapProviderConfig(Base):
                       secondary_key = опц. коммерческий Yandex Maps API ключ
     - google_maps:    api_key = SerpAPI ключ (https://serpapi.com)
                       secondary_key не используется
+
+    rate_limits — квоты распределённого лимитера (core.provider_limiter) по
+    областям: {"api": {"per_minute": 150, "burst": 3}, "card": {...}}.
+    Квота действует на пару (провайдер, ключ/прокси) суммарно по всем
+    воркерам. Не заданная область → дефолт из Settings.
     """
 
     __tablename__ = "map_provider_config"
@@ -50,6 +56,8 @@ class MapProviderConfig(Base):
 
     notes = Column(Text, nullable=True)
 
+    rate_limits = Column(JSONB, nullable=True)
+
     updated_at = Column(
         DateTime,
         default=datetime.utcnow,
@@ -1,6 +1,6 @@
 """ORM-модели для AI-таблиц модуля reviews_ai.
 
-Соответствует миграции 016. Стиль — классический Column(), как у остальных моделей.
+Соответствует миграциям 016 (+035, 059, 062). Стиль — классический Column(), как у остальных моделей.
 """
 
 from datetime import datetime
@@ -8,14 +8,17 @@ from datetime import datetime
 from pgvector.sqlalchemy import Vector
 from sqlalchemy import (
     BigInteger,
+    Boolean,
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
     Text,
     UniqueConstraint,
+    text,
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
@@ -38,6 +41,11 @@ class PainTag(Base):
             "niche", "city", "label", "sentiment",
             name="uq_pain_tags_niche_city_label_sentiment",
         ),
+        # Глобальные теги (city IS NULL) основной UNIQUE не ловит — NULL != NULL.
+        Index(
+            "ux_pain_tags_global", "niche", "label", "sentiment",
+            unique=True, postgresql_where=text("city IS NULL"),
+        ),
     )
 
     id = Column(Integer, primary_key=True)
@@ -103,3 +111,31 @@ class CompanyPainScore(Base):
 
     def __repr__(self) -> str:
         return f"<CompanyPainScore company={self.company_id} tag={self.pain_tag_id} count={self.mention_count}>"
+
+
+class PainUnassignedReview(Base):
+    """«Пул неприсвоенных»: отзывы ниши, не попавшие ни в один центроид.
+
+    Ведётся инкрементальным назначением тегов (миграция 059):
+    - pending=True — новый отзыв, сматченный с текущими тегами и не
+      подошедший ни к одному. Когда таких в (niche, city, sentiment)
+      набирается REVIEWS_AI_UNASSIGNED_POOL_THRESHOLD — полный recluster;
+    - pending=False — «шум» после последнего полного recluster'а: отзыв
+      уже был в кластеризации и остался без тега, повторно не считается.
+    Полный recluster пересобирает пул своей (niche, city, sentiment) целиком.
+    """
+
+    __tablename__ = "pain_unassigned_reviews"
+    __table_args__ = (
+        Index("ix_pain_unassigned_reviews_bucket", "niche", "city", "sentiment", "pending"),
+    )
+
+    review_id = Column(BigInteger, ForeignKey("reviews.id", ondelete="CASCADE"), primary_key=True)
+    sentiment = Column(String(10), primary_key=True)
+    niche = Column(String(100), nullable=False)
+    city = Column(String(100), nullable=True)
+    pending = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<PainUnassignedReview review={self.review_id} {self.niche!r}/{self.city!r} [{self.sentiment}]>"
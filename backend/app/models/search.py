@@ -3,7 +3,7 @@ Search models.
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, JSON, ForeignKey, DateTime, Computed
+from sqlalchemy import Column, Integer, String, Text, JSON, ForeignKey, DateTime, Computed, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 
@@ -65,9 +65,10 @@ class SearchResult(Base):
     # Relationships
     search = relationship("Search", back_populates="results")
     pages = relationship(
-        "SearchResultPage",
-        back_populates="search_result",
-        cascade="all, delete-orphan",
+        "CrawledPage",
+        secondary="search_result_crawled_pages",
+        order_by="SearchResultCrawledPage.position",
+        viewonly=True,
     )
 
     def __str__(self):
@@ -78,27 +79,27 @@ class SearchResult(Base):
         return self.__str__()
 
 
-class SearchResultPage(Base):
-    """One crawled page of a search result. Holds the raw text needed for
-    full-text keyword filtering ("show only sites that mention 'протезирование'").
-    Kept in its own table so search_results stays small."""
+class CrawledPage(Base):
+    """One crawled page of a domain, stored once per distinct content.
 
-    __tablename__ = "search_result_pages"
+    Holds the raw text needed for full-text keyword filtering ("show only
+    sites that mention 'протезирование'"). The crawl is per domain, so every
+    search result of that domain links to the same rows through
+    search_result_crawled_pages instead of carrying its own copy of the text
+    and tsvector. A re-crawl with unchanged content reuses the row; changed
+    content gets a new row (new content_hash)."""
 
-    id = Column(Integer, primary_key=True, index=True)
-    search_result_id = Column(
-        Integer,
-        ForeignKey("search_results.id", ondelete="CASCADE"),
-        nullable=False,
-        index=True,
-    )
-    search_id = Column(
-        Integer,
-        ForeignKey("searches.id", ondelete="CASCADE"),
-        nullable=False,
-        index=True,
+    __tablename__ = "crawled_pages"
+    __table_args__ = (
+        UniqueConstraint("domain", "url", "content_hash", name="uq_crawled_pages_domain_url_hash"),
+        Index("ix_crawled_pages_search_vector", "search_vector", postgresql_using="gin"),
     )
+
+    id = Column(Integer, primary_key=True)
+    domain = Column(String(255), nullable=False)
     url = Column(Text, nullable=False)
+    # md5 of title/meta/h1/text, see searches.crawled_pages.content_hash.
+    content_hash = Column(String(32), nullable=False)
     status_code = Column(Integer)
     title = Column(Text)
     meta_description = Column(Text)
@@ -117,4 +118,25 @@ class SearchResultPage(Base):
     )
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
-    search_result = relationship("SearchResult", back_populates="pages")
+
+class SearchResultCrawledPage(Base):
+    """Thin link search_result → crawled_page. search_id is denormalised so
+    keyword filtering doesn't need to join search_results."""
+
+    __tablename__ = "search_result_crawled_pages"
+    __table_args__ = (
+        Index("ix_search_result_crawled_pages_search_page", "search_id", "crawled_page_id"),
+        Index("ix_search_result_crawled_pages_crawled_page_id", "crawled_page_id"),
+    )
+
+    search_result_id = Column(
+        Integer, ForeignKey("search_results.id", ondelete="CASCADE"), primary_key=True,
+    )
+    crawled_page_id = Column(
+        Integer, ForeignKey("crawled_pages.id", ondelete="CASCADE"), primary_key=True,
+    )
+    search_id = Column(
+        Integer, ForeignKey("searches.id", ondelete="CASCADE"), nullable=False,
+    )
+    # Position of the page in the crawl (home page first).
+    position = Column(Integer, nullable=False, default=0)
@@ -131,6 +131,34 @@ class EmailService:
             "Content-Type": "application/json",
         }
 
+    async def sender_account(self, db: AsyncSession) -> str:
+        """Учётка, с которой уйдёт письмо send_email(db=db): голова fallback-цепочки,
+        иначе Hyvor-ключ / SMTP-логин из EmailConfig. Ключ лимитера отправок
+        (core.provider_limiter хранит только его отпечаток)."""
+        try:
+            from app.modules.email import providers_service
+
+            chain = await providers_service.get_active_chain(db)
+        except Exception as e:
+            logger.warning("sender_account: get_active_chain failed: %s", e)
+            chain = []
+        if chain:
+            return chain[0].provider_id
+
+        row = await self._get_config_row(db)
+        provider = "hyvor"
+        if row and row.provider_type:
+            provider = row.provider_type
+        elif not (self.enabled and self.api_key):
+            provider = "smtp"
+        if provider == "hyvor":
+            _url, api_key, _use_db = self._resolve_hyvor(row)
+            return f"hyvor:{api_key}"
+        if provider == "smtp":
+            host, port, user, _password, _use_ssl = self._resolve_smtp(row)
+            return f"smtp:{user}@{host}:{port}"
+        return f"{provider}:email_config:{row.id if row else '-'}"
+
     async def send_email(
         self,
         to_email: str,
@@ -1,8 +1,31 @@
 """
 Blacklist domain checking utilities.
+
+`DomainMatcher` is a compiled blacklist: entries are normalised once into a
+hashed set, and a lookup walks the label suffixes of the domain
+(shop.clinic.example.ru → clinic.example.ru → example.ru → ru), i.e.
+O(labels) instead of O(entries). `get_user_blacklist` caches the matcher of
+SEED_BLACKLIST + the user's BlacklistDomain rows per process; writers call
+`invalidate_user_blacklist`, which bumps a per-user version in Redis so
+every worker rebuilds on its next lookup.
 """
 
-from typing import List
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import redis_clients
+from app.models.filter import BlacklistDomain
+
+logger = logging.getLogger(__name__)
+
+# Safety net for writers that bypass invalidate_user_blacklist (raw SQL):
+# a cached matcher is rebuilt at least this often.
+USER_MATCHER_TTL = 600.0
+_VERSION_KEY = "filters:blacklist:version:{user_id}"
 
 
 def normalize_domain(domain: str) -> str:
@@ -13,30 +36,97 @@ def normalize_domain(domain: str) -> str:
     return domain
 
 
-def is_blacklisted(domain: str, blacklist: List[str]) -> bool:
+def _parent_suffixes(domain: str) -> Iterable[str]:
+    """a.b.c → b.c, c (proper label suffixes)."""
+    i = domain.find(".")
+    while i != -1:
+        yield domain[i + 1:]
+        i = domain.find(".", i + 1)
+
+
+class DomainMatcher:
     """
-    Check if domain is in blacklist.
-    
-    Supports exact match and subdomain matching.
+    Compiled domain blacklist.
+
+    `domain in matcher` is True when the domain equals an entry or is its
+    subdomain; with match_parents (the is_blacklisted semantics) also when
+    the domain is a parent of an entry (entry m.vk.com blocks vk.com).
     """
-    normalized_domain = normalize_domain(domain)
-    
-    for blacklisted in blacklist:
-        blacklisted_normalized = normalize_domain(blacklisted)
-        
-        # Exact match
-        if normalized_domain == blacklisted_normalized:
-            return True
-        
-        # Subdomain check: domain ends with .blacklisted
-        if normalized_domain.endswith(f".{blacklisted_normalized}"):
+
+    __slots__ = ("_entries", "_parents")
+
+    def __init__(self, domains: Iterable[str], *, match_parents: bool = True):
+        self._entries = frozenset(normalize_domain(d) for d in domains)
+        self._parents: Optional[frozenset] = (
+            frozenset(p for e in self._entries for p in _parent_suffixes(e)) if match_parents else None
+        )
+
+    def __contains__(self, domain: str) -> bool:
+        normalized = normalize_domain(domain)
+        if normalized in self._entries:
             return True
-        
-        # Subdomain check: blacklisted ends with .domain
-        if blacklisted_normalized.endswith(f".{normalized_domain}"):
+        if self._parents is not None and normalized in self._parents:
             return True
-    
-    return False
+        return any(suffix in self._entries for suffix in _parent_suffixes(normalized))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def is_blacklisted(domain: str, blacklist: Union[DomainMatcher, List[str]]) -> bool:
+    """
+    Check if domain is in blacklist.
+
+    Supports exact match and subdomain matching. Pass a DomainMatcher when
+    checking many domains; a plain list is compiled on every call.
+    """
+    if not isinstance(blacklist, DomainMatcher):
+        blacklist = DomainMatcher(blacklist)
+    return domain in blacklist
+
+
+# --- per-user cache ----------------------------------------------------------
+
+# user_id -> (version, built_at monotonic, matcher)
+_user_matchers: Dict[int, Tuple[Optional[int], float, DomainMatcher]] = {}
+
+
+async def _get_version(user_id: int) -> Optional[int]:
+    """Current blacklist version of the user; None when Redis is unavailable."""
+    try:
+        client = redis_clients.get_client()
+        return int(await client.get(_VERSION_KEY.format(user_id=user_id)) or 0)
+    except Exception as e:
+        logger.warning("Failed to read blacklist version for user %s: %s", user_id, e)
+        return None
+
+
+async def get_user_blacklist(db: AsyncSession, user_id: int) -> DomainMatcher:
+    """SEED_BLACKLIST + the user's BlacklistDomain rows, compiled and cached."""
+    version = await _get_version(user_id)
+    cached = _user_matchers.get(user_id)
+    if (
+        cached is not None
+        and version is not None
+        and cached[0] == version
+        and time.monotonic() - cached[1] < USER_MATCHER_TTL
+    ):
+        return cached[2]
+
+    rows = await db.execute(select(BlacklistDomain.domain).where(BlacklistDomain.user_id == user_id))
+    matcher = DomainMatcher([*SEED_BLACKLIST, *rows.scalars().all()])
+    _user_matchers[user_id] = (version, time.monotonic(), matcher)
+    return matcher
+
+
+async def invalidate_user_blacklist(user_id: int) -> None:
+    """Call after BlacklistDomain rows of the user change."""
+    _user_matchers.pop(user_id, None)
+    try:
+        client = redis_clients.get_client()
+        await client.incr(_VERSION_KEY.format(user_id=user_id))
+    except Exception as e:
+        logger.warning("Failed to bump blacklist version for user %s: %s", user_id, e)
 
 
 # Pre-seeded blacklist domains: соцсети, маркетплейсы, поисковики, агрегаторы и т.п.
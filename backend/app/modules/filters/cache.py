@@ -1,41 +1,63 @@
 """
 Caching utilities for crawler results.
+
+Two tiers: a small in-process LRU in front of Redis. A cached crawl is
+"fresh" for CRAWL_CACHE_FRESH_SECONDS (24h, the old flat TTL) and is served
+without any network. After that it stays in Redis up to
+CRAWL_CACHE_MAX_AGE_SECONDS together with per-page ETag / Last-Modified
+validators, and crawl_domain revalidates it with conditional GETs: if every
+page answers 304 the entry is refreshed and reused instead of re-crawling.
+
+Payloads are serialized with msgpack and compressed with zstd when those
+packages are installed, otherwise JSON + zlib. The codec is recorded in a
+2-byte header, so entries written by either setup (and legacy plain-JSON
+entries) stay readable.
+
+Hit / miss / revalidation counters (and crawls shared through
+filters.crawl_flight) are summed across workers in a Redis hash and served
+by GET /monitor/crawl-cache. LRU hits never touch Redis, so they are
+counted in process and flushed together with the next counter update (or
+every _LRU_HITS_FLUSH_EVERY hits / _LRU_HITS_FLUSH_SECONDS).
 """
 
 import json
 import hashlib
 import logging
-import asyncio
-from typing import Dict, Any, Optional
-import redis.asyncio as redis
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+from app.core import redis_clients
 from app.core.config import settings
 
-logger = logging.getLogger(__name__)
+try:  # optional, faster/smaller codecs
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
 
-# Redis connection pool (will be initialized on first use)
-_redis_client: Optional[redis.Redis] = None
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
 
+logger = logging.getLogger(__name__)
 
-async def get_redis_client() -> redis.Redis:
-    """Get or create Redis client."""
-    global _redis_client
-    if _redis_client is None:
-        _redis_client = redis.from_url(
-            settings.REDIS_URL,
-            encoding="utf-8",
-            decode_responses=True  # Decode to strings for easier JSON handling
-        )
-    return _redis_client
+STATS_KEY = "crawler:cache:stats"
+_STAT_FIELDS = ("lru_hits", "redis_hits", "misses", "revalidated", "changed", "stores", "shared")
+_LRU_HITS_FLUSH_EVERY = 100
+_LRU_HITS_FLUSH_SECONDS = 10.0
 
 
 def get_cache_key(domain: str, cache_type: str = "crawl") -> str:
     """
     Generate cache key for domain.
-    
+
     Args:
         domain: Domain name
         cache_type: Type of cache (crawl, audit, etc.)
-    
+
     Returns:
         Cache key string
     """
@@ -45,58 +67,233 @@ def get_cache_key(domain: str, cache_type: str = "crawl") -> str:
     return f"crawler:{cache_type}:{key_hash}"
 
 
+@dataclass
+class CrawlCacheEntry:
+    """Cached crawl result plus what is needed to revalidate it."""
+
+    data: Dict[str, Any]
+    # url -> [etag, last_modified]; pages without validators are not listed.
+    validators: Dict[str, List[Optional[str]]] = field(default_factory=dict)
+    checked_at: float = 0.0  # unix time of the crawl or last revalidation
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() - self.checked_at < settings.CRAWL_CACHE_FRESH_SECONDS
+
+    def revalidatable(self) -> bool:
+        """True if every cached page has a validator to send."""
+        pages = self.data.get("pages") or []
+        return bool(pages) and all(p.get("url") in self.validators for p in pages)
+
+
+# --- serialization ---------------------------------------------------------
+
+def encode_entry(entry: CrawlCacheEntry) -> bytes:
+    obj = {"data": entry.data, "validators": entry.validators, "checked_at": entry.checked_at}
+    if msgpack is not None:
+        fmt, raw = b"m", msgpack.packb(obj, use_bin_type=True)
+    else:
+        fmt, raw = b"j", json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+    if zstandard is not None:
+        return fmt + b"s" + zstandard.ZstdCompressor(level=3).compress(raw)
+    return fmt + b"z" + zlib.compress(raw, 6)
+
+
+def decode_entry(blob: bytes) -> CrawlCacheEntry:
+    if blob[:1] == b"{":
+        # Legacy entry: bare JSON crawl result with a flat 24h TTL, no
+        # validators. Treat as fresh — Redis expires it on the old schedule.
+        return CrawlCacheEntry(data=json.loads(blob), checked_at=time.time())
+    fmt, comp, body = blob[:1], blob[1:2], blob[2:]
+    if comp == b"s":
+        if zstandard is None:
+            raise ValueError("zstd-compressed crawl cache entry, zstandard is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(body)
+    elif comp == b"z":
+        raw = zlib.decompress(body)
+    else:
+        raw = body
+    if fmt == b"m":
+        if msgpack is None:
+            raise ValueError("msgpack crawl cache entry, msgpack is not installed")
+        obj = msgpack.unpackb(raw, raw=False)
+    else:
+        obj = json.loads(raw)
+    return CrawlCacheEntry(
+        data=obj["data"], validators=obj.get("validators") or {}, checked_at=float(obj.get("checked_at") or 0),
+    )
+
+
+# --- in-process LRU --------------------------------------------------------
+
+class _LRU:
+    """OrderedDict LRU of decoded entries keyed by cache key."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, CrawlCacheEntry]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[CrawlCacheEntry]:
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CrawlCacheEntry) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+_lru = _LRU(settings.CRAWL_CACHE_LRU_SIZE)
+
+
+def clear_lru() -> None:
+    """Drop the in-process tier (tests)."""
+    _lru.clear()
+
+
+# --- counters --------------------------------------------------------------
+
+_pending_lru_hits = 0
+_lru_hits_flushed_at = time.monotonic()
+
+
+def _count_lru_hit() -> bool:
+    """Count an LRU hit locally; True when it is time to flush them to Redis."""
+    global _pending_lru_hits
+    _pending_lru_hits += 1
+    return (
+        _pending_lru_hits >= _LRU_HITS_FLUSH_EVERY
+        or time.monotonic() - _lru_hits_flushed_at >= _LRU_HITS_FLUSH_SECONDS
+    )
+
+
+async def record_stats(**delta: int) -> None:
+    """
+    HINCRBY counters in Redis, plus LRU hits counted in process since the
+    last flush. Errors are swallowed: stats are best-effort.
+    """
+    global _pending_lru_hits, _lru_hits_flushed_at
+    if _pending_lru_hits:
+        delta["lru_hits"] = delta.get("lru_hits", 0) + _pending_lru_hits
+        _pending_lru_hits = 0
+        _lru_hits_flushed_at = time.monotonic()
+    delta = {k: v for k, v in delta.items() if v}
+    if not delta:
+        return
+    try:
+        client = redis_clients.get_client()
+        pipe = client.pipeline(transaction=False)
+        for name, value in delta.items():
+            pipe.hincrby(STATS_KEY, name, value)
+        await pipe.execute()
+    except Exception as e:
+        logger.warning("Failed to update crawl cache stats: %s", e)
+
+
+async def get_stats() -> Dict[str, int]:
+    """Counters summed over all workers. Zeros without Redis."""
+    await record_stats()  # this process's pending LRU hits
+    raw: Dict[bytes, bytes] = {}
+    try:
+        client = redis_clients.get_client()
+        raw = await client.hgetall(STATS_KEY) or {}
+    except Exception as e:
+        logger.warning("Failed to read crawl cache stats: %s", e)
+    values = {k.decode() if isinstance(k, bytes) else k: int(v) for k, v in raw.items()}
+    return {f: values.get(f, 0) for f in _STAT_FIELDS}
+
+
+# --- public API ------------------------------------------------------------
+
+async def get_crawl_entry(domain: str) -> Optional[CrawlCacheEntry]:
+    """
+    Cached crawl entry for domain, fresh or stale (caller checks `.fresh`).
+    Counts an LRU hit (in process, flushed in batches), a Redis hit or a miss.
+    """
+    key = get_cache_key(domain, "crawl")
+    entry = _lru.get(key)
+    if entry is not None:
+        if _count_lru_hit():
+            await record_stats()
+        return entry
+    try:
+        client = redis_clients.get_client()
+        blob = await client.get(key)
+        if blob:
+            entry = decode_entry(blob)
+            _lru.put(key, entry)
+            await record_stats(redis_hits=1)
+            return entry
+    except Exception as e:
+        logger.warning("Failed to get cached crawl for %s: %s", domain, e)
+    await record_stats(misses=1)
+    return None
+
+
 async def get_cached_crawl(domain: str) -> Optional[Dict[str, Any]]:
     """
-    Get cached crawl results for domain.
-    
+    Get cached crawl results for domain (fresh entries only).
+
     Args:
         domain: Domain name
-    
+
     Returns:
         Cached crawl data or None
     """
-    try:
-        client = await get_redis_client()
-        key = get_cache_key(domain, "crawl")
-        cached_data = await client.get(key)
-        
-        if cached_data:
-            return json.loads(cached_data)
-    except Exception as e:
-        logger.warning("Failed to get cached crawl for %s: %s", domain, e)
-    
+    entry = await get_crawl_entry(domain)
+    if entry is not None and entry.fresh:
+        return entry.data
     return None
 
 
-async def set_cached_crawl(domain: str, crawl_data: Dict[str, Any], ttl: int = 3600 * 24):
+async def set_cached_crawl(
+    domain: str,
+    crawl_data: Dict[str, Any],
+    ttl: Optional[int] = None,
+    validators: Optional[Dict[str, List[Optional[str]]]] = None,
+    checked_at: Optional[float] = None,
+):
     """
     Cache crawl results for domain.
-    
+
     Args:
         domain: Domain name
         crawl_data: Crawl results data
-        ttl: Time to live in seconds (default: 24 hours)
+        ttl: How long the entry is kept in Redis, seconds
+            (default: CRAWL_CACHE_MAX_AGE_SECONDS; freshness is separate)
+        validators: url -> [etag, last_modified] for conditional revalidation
+        checked_at: When the data was last confirmed (default: now)
     """
+    # Remove errors from cached data (they're transient)
+    cache_data = {k: v for k, v in crawl_data.items() if k != "errors"}
+    entry = CrawlCacheEntry(
+        data=cache_data,
+        validators=validators or {},
+        checked_at=checked_at if checked_at is not None else time.time(),
+    )
+    key = get_cache_key(domain, "crawl")
+    _lru.put(key, entry)
+    ttl = ttl or max(settings.CRAWL_CACHE_MAX_AGE_SECONDS, settings.CRAWL_CACHE_FRESH_SECONDS)
     try:
-        client = await get_redis_client()
-        key = get_cache_key(domain, "crawl")
-        # Remove errors from cached data (they're transient)
-        cache_data = {k: v for k, v in crawl_data.items() if k != "errors"}
-        await client.setex(key, ttl, json.dumps(cache_data, ensure_ascii=False))
+        client = redis_clients.get_client()
+        await client.setex(key, ttl, encode_entry(entry))
+        await record_stats(stores=1)
     except Exception as e:
         logger.warning("Failed to cache crawl for %s: %s", domain, e)
 
 
-async def invalidate_crawl_cache(domain: str):
-    """
-    Invalidate cached crawl for domain.
-    
-    Args:
-        domain: Domain name
-    """
-    try:
-        client = await get_redis_client()
-        key = get_cache_key(domain, "crawl")
-        await client.delete(key)
-    except Exception as e:
-        logger.warning("Failed to invalidate cache for %s: %s", domain, e)
+async def touch_cached_crawl(domain: str, entry: CrawlCacheEntry) -> None:
+    """Mark a stale entry as confirmed by revalidation (all pages 304)."""
+    await set_cached_crawl(domain, entry.data, validators=entry.validators)
+
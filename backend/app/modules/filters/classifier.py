@@ -20,9 +20,11 @@ Output classes (kept short — they end up as bilingual badges on the frontend):
 from __future__ import annotations
 
 import re
-from typing import Iterable, Optional
+from typing import Optional
 from urllib.parse import urlparse
 
+from app.modules.filters.blacklist import DomainMatcher
+
 
 # --- Domain blocklists ------------------------------------------------------
 
@@ -83,14 +85,18 @@ _BROKEN_URL_HINTS: tuple[str, ...] = (
 )
 
 
-def _suffix_match(host: str, blocklist: Iterable[str]) -> bool:
+# Compiled once: lookups walk the host's label suffixes instead of scanning
+# every entry.
+_GOV_MATCHER = DomainMatcher(_GOV_DOMAINS, match_parents=False)
+_SOCIAL_MATCHER = DomainMatcher(_SOCIAL_DOMAINS, match_parents=False)
+_MARKETPLACE_MATCHER = DomainMatcher(_MARKETPLACE_DOMAINS, match_parents=False)
+_CATALOG_MATCHER = DomainMatcher(_CATALOG_DOMAINS, match_parents=False)
+_NEWS_MATCHER = DomainMatcher(_NEWS_DOMAINS, match_parents=False)
+
+
+def _suffix_match(host: str, blocklist: DomainMatcher) -> bool:
     """True when host equals or ends with `.{entry}` for any entry."""
-    h = host.lower().lstrip(".")
-    for entry in blocklist:
-        e = entry.lower()
-        if h == e or h.endswith("." + e):
-            return True
-    return False
+    return host.lstrip(".") in blocklist
 
 
 # --- Description cleaner ----------------------------------------------------
@@ -157,15 +163,15 @@ def classify_site(
         host = host[4:]
 
     if host:
-        if _suffix_match(host, _GOV_DOMAINS):
+        if _suffix_match(host, _GOV_MATCHER):
             return "gov"
-        if _suffix_match(host, _SOCIAL_DOMAINS):
+        if _suffix_match(host, _SOCIAL_MATCHER):
             return "social"
-        if _suffix_match(host, _MARKETPLACE_DOMAINS):
+        if _suffix_match(host, _MARKETPLACE_MATCHER):
             return "market"
-        if _suffix_match(host, _CATALOG_DOMAINS):
+        if _suffix_match(host, _CATALOG_MATCHER):
             return "catalog"
-        if _suffix_match(host, _NEWS_DOMAINS):
+        if _suffix_match(host, _NEWS_MATCHER):
             return "news"
 
     lurl = (url or "").lower()
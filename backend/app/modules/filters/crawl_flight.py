@@ -0,0 +1,112 @@
+"""
+Single-flight for domain crawls across workers.
+
+Overlapping searches enqueue process_domain_task for the same domain many
+times in parallel; the crawl cache only helps once a crawl has finished, so
+every copy used to crawl the site on its own. Here the first task for a
+normalised domain (same normalisation as the crawl cache key) takes a Redis
+lock and crawls; tasks arriving while the lock is held push their
+(search_id, domain) onto the flight's waiter list and return at once. When
+the crawl completes the leader drains the list and the lock in one script
+and fans the crawl out to every waiting search's result rows.
+
+Joining and draining are atomic Lua scripts, so a waiter is either queued
+while the lock is held (and drained by that leader) or becomes the leader
+itself — nobody falls between the two. If a leader dies, the lock expires
+after lock_ttl(); waiters re-check their rows after that (see
+process_domain_task) and crawl themselves if nobody filled them.
+
+Without Redis every task is its own leader, i.e. the old behaviour.
+"""
+
+import json
+import logging
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core import redis_clients
+from app.modules.filters.cache import get_cache_key, record_stats
+
+logger = logging.getLogger(__name__)
+
+# KEYS: lock, waiters. ARGV: token, ttl ms, waiter json.
+# 1 = lock taken (leader), 0 = queued behind the current leader.
+_JOIN_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    return 1
+end
+redis.call('RPUSH', KEYS[2], ARGV[3])
+redis.call('PEXPIRE', KEYS[2], ARGV[2] * 2)
+return 0
+"""
+
+# KEYS: lock, waiters. ARGV: token. Returns the drained waiters. The lock
+# is only deleted if it is still ours (it may have expired and been taken
+# by another leader); waiters are drained either way — our crawl is fresh.
+_RELEASE_SCRIPT = """
+local waiters = redis.call('LRANGE', KEYS[2], 0, -1)
+redis.call('DEL', KEYS[2])
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+end
+return waiters
+"""
+
+
+def lock_ttl() -> float:
+    """Seconds a flight may last: the crawl hard limit in tasks.py plus slack."""
+    return settings.CRAWL_DEADLINE_SECONDS * 2 + 90
+
+
+def _keys(domain: str) -> List[str]:
+    lock = get_cache_key(domain, "flight")
+    return [lock, f"{lock}:waiters"]
+
+
+class CrawlFlight:
+    """The lock held by the leader of a domain crawl."""
+
+    def __init__(self, domain: str, token: Optional[str]) -> None:
+        self.domain = domain
+        self.token = token  # None: Redis unavailable, nothing to release
+
+    async def release(self) -> List[Dict[str, Any]]:
+        """Drop the lock and return the waiters queued while it was held."""
+        if self.token is None:
+            return []
+        try:
+            client = redis_clients.get_client()
+            raw = await client.eval(_RELEASE_SCRIPT, 2, *_keys(self.domain), self.token)
+        except Exception as e:
+            logger.warning("Failed to release crawl flight for %s: %s", self.domain, e)
+            return []
+        waiters = []
+        for item in raw or []:
+            try:
+                waiters.append(json.loads(item))
+            except ValueError:
+                continue
+        return waiters
+
+
+async def join_flight(domain: str, waiter: Dict[str, Any]) -> Optional[CrawlFlight]:
+    """Become the leader of the domain's crawl or queue `waiter` behind it.
+
+    Returns a CrawlFlight if the caller should crawl (and must release it),
+    None if another worker is already crawling the domain and will fan the
+    result out to `waiter`.
+    """
+    token = uuid.uuid4().hex
+    try:
+        client = redis_clients.get_client()
+        leader = await client.eval(
+            _JOIN_SCRIPT, 2, *_keys(domain), token, int(lock_ttl() * 1000), json.dumps(waiter),
+        )
+    except Exception as e:
+        logger.warning("Crawl single-flight unavailable for %s: %s", domain, e)
+        return CrawlFlight(domain, None)
+    if int(leader):
+        return CrawlFlight(domain, token)
+    await record_stats(shared=1)
+    return None
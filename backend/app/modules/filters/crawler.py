@@ -2,14 +2,24 @@
 Mini-crawler for SEO audit (up to 20 pages).
 """
 
-import re
 import asyncio
 import logging
+from collections import deque
 from typing import List, Dict, Any, Set, Optional
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
 import httpx
 from bs4 import BeautifulSoup
 
+from app.core.http_clients import shared_client
+from app.modules.filters.html_extract import (  # noqa: F401 - re-exported for existing imports
+    EMAIL_PATTERN,
+    PHONE_PATTERNS,
+    extract_email,
+    extract_page,
+    extract_phone,
+    filter_internal_links,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -22,13 +32,6 @@ CONTACT_URL_PATTERNS = [
     "/contact-us",
 ]
 
-PHONE_PATTERNS = [
-    re.compile(r"\+7\s*\(?\d{3}\)?\s*[\s\-]?\d{3}[-\s]?\d{2}[-\s]?\d{2}"),
-    re.compile(r"8\s*\(?\d{3}\)?\s*[\s\-]?\d{3}[-\s]?\d{2}[-\s]?\d{2}"),
-]
-
-EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
-
 
 async def check_robots_txt(client: httpx.AsyncClient, base_url: str) -> Dict[str, Any]:
     """
@@ -183,6 +186,7 @@ async def fetch_page_with_retry(
     url: str,
     max_retries: int = 3,
     base_delay: float = 1.0,
+    timeout: Optional[httpx.Timeout] = None,
 ) -> Optional[httpx.Response]:
     """
     Fetch page with exponential backoff retry.
@@ -192,6 +196,7 @@ async def fetch_page_with_retry(
         url: URL to fetch
         max_retries: Maximum number of retry attempts
         base_delay: Base delay in seconds for exponential backoff
+        timeout: Per-request timeout (client default if None)
     
     Returns:
         Response object or None if all retries failed
@@ -200,7 +205,7 @@ async def fetch_page_with_retry(
     
     for attempt in range(max_retries):
         try:
-            response = await client.get(url)
+            response = await client.get(url, timeout=timeout or httpx.USE_CLIENT_DEFAULT)
             
             # Handle different status codes
             if response.status_code == 200:
@@ -357,135 +362,235 @@ async def crawl_domain_with_fallback(
     }
 
 
+async def revalidate_pages(
+    client: httpx.AsyncClient,
+    validators: Dict[str, List[Optional[str]]],
+    urls: List[str],
+    concurrency: int = 4,
+    timeout: Optional[httpx.Timeout] = None,
+) -> bool:
+    """
+    Conditional GET (If-None-Match / If-Modified-Since) for every url.
+
+    Returns True only if all of them answered 304 Not Modified; stops at the
+    first page that changed, failed or has no validators.
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def check(url: str) -> bool:
+        etag, last_modified = (validators.get(url) or [None, None])[:2]
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        if not headers:
+            return False
+        async with sem:
+            try:
+                response = await client.get(url, headers=headers, timeout=timeout or httpx.USE_CLIENT_DEFAULT)
+            except httpx.HTTPError as e:
+                logger.debug(f"Revalidation of {url} failed: {e}")
+                return False
+        return response.status_code == 304
+
+    tasks = [asyncio.create_task(check(url)) for url in urls]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            if not await next_done:
+                return False
+        return bool(tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
 async def crawl_domain(
     base_url: str,
     max_pages: int = 20,
     timeout: int = 30,
     max_retries: int = 3,
     use_cache: bool = True,
+    concurrency: Optional[int] = None,
+    deadline: Optional[float] = None,
 ) -> Dict[str, Any]:
     """
     Crawl domain up to max_pages using BFS with retry logic and error handling.
     Also collects SEO data for automatic audit.
 
+    Pages are fetched concurrently: up to `concurrency` requests per host are
+    in flight (default settings.CRAWL_CONCURRENCY_PER_HOST), robots.txt is
+    fetched in parallel with the home page. The frontier is a deque plus a
+    `seen` set, so enqueueing a link is O(1). When `deadline` seconds pass
+    (default settings.CRAWL_DEADLINE_SECONDS) in-flight requests are
+    cancelled and whatever was crawled so far is returned with
+    `deadline_exceeded: True`.
+
+    A fresh cached result is returned without requests; a stale one is
+    revalidated page by page with ETag / Last-Modified and reused if nothing
+    changed (see filters.cache).
+
+    Requests go through the shared "crawler" client (app.core.http_clients),
+    so connections and DNS lookups are reused across crawls in the same
+    event loop; `timeout` is applied per request.
+
+    `pages` keep BFS discovery order (home page first), contacts are taken
+    from the first page in that order that has them — same as the old
+    sequential crawl, regardless of which response arrives first.
+
     Args:
         base_url: Starting URL to crawl
         max_pages: Maximum number of pages to crawl
         timeout: Request timeout in seconds
         max_retries: Maximum retry attempts per page
         use_cache: Whether to use cached results if available
+        concurrency: In-flight requests per host
+        deadline: Global crawl deadline in seconds
 
     Returns:
         Dict with pages data, contacts, SEO data, and metadata
     """
+    from app.core.config import settings
+
     base_domain = urlparse(base_url).netloc
+    concurrency = max(1, concurrency or settings.CRAWL_CONCURRENCY_PER_HOST)
+    deadline = deadline if deadline is not None else settings.CRAWL_DEADLINE_SECONDS
 
-    # Try to get from cache first
+    # Try to get from cache first: fresh entries are returned as is, stale
+    # ones are revalidated with conditional GETs before a full re-crawl.
     if use_cache:
         try:
-            from app.modules.filters.cache import get_cached_crawl
-            cached_data = await get_cached_crawl(base_domain)
-            if cached_data:
+            from app.modules.filters import cache as crawl_cache
+            entry = await crawl_cache.get_crawl_entry(base_domain)
+            if entry is not None and entry.fresh:
                 logger.info(f"Using cached crawl data for {base_domain}")
-                return cached_data
+                return entry.data
+            if entry is not None and entry.revalidatable():
+                async with shared_client("crawler") as client:
+                    unchanged = await revalidate_pages(
+                        client, entry.validators, [p["url"] for p in entry.data["pages"]],
+                        concurrency=concurrency, timeout=httpx.Timeout(timeout, connect=5.0),
+                    )
+                if unchanged:
+                    logger.info(f"Cached crawl for {base_domain} revalidated (all pages 304)")
+                    await crawl_cache.touch_cached_crawl(base_domain, entry)
+                    await crawl_cache.record_stats(revalidated=1)
+                    return entry.data
+                await crawl_cache.record_stats(changed=1)
         except Exception as e:
             logger.warning(f"Failed to check cache for {base_domain}: {e}")
 
-    visited: Set[str] = set()
-    to_visit: List[str] = [base_url]
-    pages_data: List[Dict[str, Any]] = []
-    contacts: Dict[str, Any] = {"phone": None, "email": None}
-    errors: List[Dict[str, Any]] = []
-    seo_data: Dict[str, Any] = {}
-
-    # Configure httpx client with better defaults
-    limits = httpx.Limits(max_keepalive_connections=10, max_connections=20)
-    timeout_config = httpx.Timeout(timeout, connect=5.0)
-
-    async with httpx.AsyncClient(
-        timeout=timeout_config,
-        follow_redirects=True,
-        limits=limits,
-        headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-    ) as client:
-        # Check robots.txt for SEO audit (only once at the start)
-        seo_data = await check_robots_txt(client, base_url)
-
-        while to_visit and len(visited) < max_pages:
-            url = to_visit.pop(0)
-
-            if url in visited:
-                continue
-
-            # Fetch page with retry
-            response = await fetch_page_with_retry(client, url, max_retries=max_retries)
-
-            if response is None:
-                errors.append({
-                    "url": url,
-                    "error": "Failed to fetch after retries"
-                })
-                continue
+    loop = asyncio.get_running_loop()
+    deadline_at = loop.time() + deadline if deadline and deadline > 0 else None
 
-            try:
-                visited.add(url)
-                content = response.text
-                soup = BeautifulSoup(content, 'html.parser')
-
-                # Extract meta tags
-                title = soup.find('title')
-                meta_desc = soup.find('meta', attrs={'name': 'description'})
-                h1_tags = soup.find_all('h1')
-
-                # Visible text for keyword filtering. Strip scripts/styles/svg/nav/etc
-                # before extracting — the body text is what users actually read,
-                # navigation chrome only adds noise to the FTS index.
-                text_soup = BeautifulSoup(content, 'html.parser')
-                for tag in text_soup(['script', 'style', 'noscript', 'svg', 'iframe', 'template']):
-                    tag.decompose()
-                raw_text = text_soup.get_text(separator=' ', strip=True)
-                # Collapse whitespace and cap at 10 KB — Postgres tsvector handles
-                # this fine, and it keeps the row small enough not to bloat the heap.
-                cleaned_text = ' '.join(raw_text.split())[:10000] if raw_text else None
-
-                page_data = {
+    # BFS frontier: deque of (order, url); `seen` = enqueued or fetched.
+    frontier: deque = deque([(0, base_url)])
+    seen: Set[str] = {base_url}
+    next_order = 1
+    fetched: Dict[int, tuple] = {}  # order -> (page_data, phone, email)
+    validators: Dict[str, List[Optional[str]]] = {}  # url -> [etag, last_modified]
+    errors: List[Dict[str, Any]] = []
+    host_slots: Dict[str, asyncio.Semaphore] = {}
+    request_timeout = httpx.Timeout(timeout, connect=5.0)
+    deadline_exceeded = False
+
+    async def fetch(url: str) -> Optional[httpx.Response]:
+        host = urlparse(url).netloc
+        sem = host_slots.setdefault(host, asyncio.Semaphore(concurrency))
+        async with sem:
+            return await fetch_page_with_retry(client, url, max_retries=max_retries, timeout=request_timeout)
+
+    async with shared_client("crawler") as client:
+        # robots.txt goes out together with the home page, not before it.
+        robots_task = asyncio.create_task(check_robots_txt(client, base_url))
+        in_flight: Dict[asyncio.Task, tuple] = {}
+
+        while frontier or in_flight:
+            # Pages that failed don't count towards max_pages (as before), so
+            # only successes + in-flight requests are budgeted.
+            while frontier and len(fetched) + len(in_flight) < max_pages:
+                order, url = frontier.popleft()
+                in_flight[asyncio.create_task(fetch(url))] = (order, url)
+            if not in_flight:
+                break
+
+            remaining = None if deadline_at is None else deadline_at - loop.time()
+            if remaining is not None and remaining <= 0:
+                deadline_exceeded = True
+                break
+            done, _ = await asyncio.wait(in_flight, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                deadline_exceeded = True
+                break
+
+            for task in done:
+                order, url = in_flight.pop(task)
+                response = task.result() if not task.cancelled() and task.exception() is None else None
+                if response is None:
+                    errors.append({
+                        "url": url,
+                        "error": "Failed to fetch after retries"
+                    })
+                    continue
+                try:
+                    page = extract_page(response.text, base_url, base_domain)
+                except Exception as e:
+                    logger.error(f"Error processing page {url}: {e}")
+                    errors.append({
+                        "url": url,
+                        "error": str(e)
+                    })
+                    continue
+                etag = response.headers.get('etag')
+                last_modified = response.headers.get('last-modified')
+                if etag or last_modified:
+                    validators[url] = [etag, last_modified]
+                fetched[order] = ({
                     "url": url,
                     "status_code": response.status_code,
-                    "title": title.get_text().strip() if title else None,
-                    "meta_description": meta_desc.get('content').strip() if meta_desc and meta_desc.get('content') else None,
-                    "h1_count": len(h1_tags),
-                    "h1_text": h1_tags[0].get_text().strip() if h1_tags else None,
-                    "text_content": cleaned_text,
-                }
-                pages_data.append(page_data)
-
-                # Extract contacts (priority: phone > email)
-                if not contacts["phone"]:
-                    phone = extract_phone(content)
-                    if phone:
-                        contacts["phone"] = phone
-
-                if not contacts["email"]:
-                    email = extract_email(content)
-                    if email:
-                        contacts["email"] = email
+                    "title": page.title,
+                    "meta_description": page.meta_description,
+                    "h1_count": page.h1_count,
+                    "h1_text": page.h1_text,
+                    "text_content": page.text_content,
+                }, page.phone, page.email)
 
                 # Find internal links
-                if len(visited) < max_pages:
-                    links = extract_internal_links(soup, base_url, base_domain)
-                    for link in links:
-                        if link not in visited and link not in to_visit:
-                            to_visit.append(link)
-
-            except Exception as e:
-                logger.error(f"Error processing page {url}: {e}")
-                errors.append({
-                    "url": url,
-                    "error": str(e)
-                })
-                continue
+                if len(fetched) < max_pages:
+                    for link in page.links:
+                        if link not in seen:
+                            seen.add(link)
+                            frontier.append((next_order, link))
+                            next_order += 1
+
+        if deadline_exceeded:
+            logger.warning(
+                f"Crawl deadline {deadline}s exceeded for {base_domain}: "
+                f"{len(fetched)} pages done, {len(in_flight)} in flight cancelled"
+            )
+            for task, (_, url) in in_flight.items():
+                task.cancel()
+                errors.append({"url": url, "error": "Crawl deadline exceeded"})
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+        if robots_task.done() or not deadline_exceeded:
+            seo_data = await robots_task
+        else:
+            robots_task.cancel()
+            await asyncio.gather(robots_task, return_exceptions=True)
+            seo_data = {"robots_txt": "missing", "sitemap_in_robots": False, "disallow_all": False}
+
+    pages_data: List[Dict[str, Any]] = []
+    contacts: Dict[str, Any] = {"phone": None, "email": None}
+    for order in sorted(fetched):
+        page_data, phone, email = fetched[order]
+        pages_data.append(page_data)
+        # Extract contacts (priority: phone > email)
+        if not contacts["phone"] and phone:
+            contacts["phone"] = phone
+        if not contacts["email"] and email:
+            contacts["email"] = email
 
     # Calculate SEO score from collected data
     seo_score, seo_issues, seo_details = calculate_seo_score(seo_data, pages_data)
@@ -506,59 +611,21 @@ async def crawl_domain(
             "disallow_all": seo_data.get("disallow_all"),
         },
     }
+    if deadline_exceeded:
+        result["deadline_exceeded"] = True
 
-    # Cache successful results (if we got at least some pages)
-    if use_cache and len(pages_data) > 0:
+    # Cache successful results (if we got at least some pages). Partial
+    # results after a deadline are not cached — next run may get them all.
+    if use_cache and len(pages_data) > 0 and not deadline_exceeded:
         try:
             from app.modules.filters.cache import set_cached_crawl
-            await set_cached_crawl(base_domain, result)
+            await set_cached_crawl(base_domain, result, validators=validators)
         except Exception as e:
             logger.warning(f"Failed to cache crawl results for {base_domain}: {e}")
 
     return result
 
 
-def extract_phone(text: str) -> str | None:
-    """Extract phone number from text."""
-    for pattern in PHONE_PATTERNS:
-        match = pattern.search(text)
-        if match:
-            return match.group(0)
-    return None
-
-
-def extract_email(text: str) -> str | None:
-    """Extract email from text."""
-    match = EMAIL_PATTERN.search(text)
-    if match:
-        return match.group(0)
-    return None
-
-
 def extract_internal_links(soup: BeautifulSoup, base_url: str, base_domain: str) -> List[str]:
     """Extract internal links from page."""
-    links = []
-    
-    for a_tag in soup.find_all('a', href=True):
-        href = a_tag['href']
-        
-        # Skip non-HTML files
-        if re.search(r'\.(pdf|doc|docx|xls|xlsx|zip|rar|jpg|png|gif)$', href, re.I):
-            continue
-        
-        # Skip special links
-        if href.startswith(('mailto:', 'tel:', 'javascript:', '#')):
-            continue
-        
-        # Convert relative to absolute
-        full_url = urljoin(base_url, href)
-        parsed = urlparse(full_url)
-        
-        # Only internal links
-        if parsed.netloc == base_domain or parsed.netloc == '':
-            # Remove query strings and fragments
-            clean_url = f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
-            if clean_url not in links:
-                links.append(clean_url)
-    
-    return links
+    return filter_internal_links((a['href'] for a in soup.find_all('a', href=True)), base_url, base_domain)
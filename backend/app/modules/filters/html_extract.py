@@ -0,0 +1,167 @@
+"""
+Single-pass HTML extraction for the crawler.
+
+`extract_page` parses a page once and returns everything crawl_domain needs:
+title, meta description, h1, internal links, visible text and contacts.
+Before this, every page was parsed into two full BeautifulSoup trees (one
+for meta/links, one to decompose scripts for text) plus regexes over raw
+HTML.
+
+Parser backend is picked once at import:
+- selectolax (Lexbor, C) if installed — fastest;
+- BeautifulSoup on lxml if lxml is installed;
+- BeautifulSoup on the stdlib html.parser otherwise.
+Results are the same across backends up to whitespace inside text.
+scripts/bench_html_extract.py compares them with the old double parse.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+try:  # optional fast path; Lexbor backend since selectolax 1.0
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:  # pragma: no cover - depends on the environment
+    try:
+        from selectolax.parser import HTMLParser
+    except ImportError:
+        HTMLParser = None
+
+try:
+    import lxml  # noqa: F401
+    _BS4_PARSER = "lxml"
+except ImportError:  # pragma: no cover - depends on the environment
+    _BS4_PARSER = "html.parser"
+
+BACKENDS = ("selectolax", "bs4")
+DEFAULT_BACKEND = "selectolax" if HTMLParser is not None else "bs4"
+
+# Tags whose content is not visible text.
+_INVISIBLE_TAGS = ['script', 'style', 'noscript', 'svg', 'iframe', 'template']
+# Cap for text_content: Postgres tsvector handles it fine, and it keeps the
+# row small enough not to bloat the heap.
+TEXT_LIMIT = 10000
+
+PHONE_PATTERNS = [
+    re.compile(r"\+7\s*\(?\d{3}\)?\s*[\s\-]?\d{3}[-\s]?\d{2}[-\s]?\d{2}"),
+    re.compile(r"8\s*\(?\d{3}\)?\s*[\s\-]?\d{3}[-\s]?\d{2}[-\s]?\d{2}"),
+]
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+_SKIP_FILES = re.compile(r'\.(pdf|doc|docx|xls|xlsx|zip|rar|jpg|png|gif)$', re.I)
+
+
+@dataclass
+class PageExtract:
+    title: Optional[str] = None
+    meta_description: Optional[str] = None
+    h1_count: int = 0
+    h1_text: Optional[str] = None
+    links: List[str] = field(default_factory=list)
+    text_content: Optional[str] = None
+    phone: Optional[str] = None
+    email: Optional[str] = None
+
+
+def extract_phone(text: str) -> Optional[str]:
+    """Extract phone number from text."""
+    for pattern in PHONE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group(0)
+    return None
+
+
+def extract_email(text: str) -> Optional[str]:
+    """Extract email from text."""
+    match = EMAIL_PATTERN.search(text)
+    if match:
+        return match.group(0)
+    return None
+
+
+def filter_internal_links(hrefs: Iterable[str], base_url: str, base_domain: str) -> List[str]:
+    """Absolute internal page URLs from raw hrefs, without query/fragment, in
+    first-seen order."""
+    links: dict = {}
+    for href in hrefs:
+        # Skip non-HTML files
+        if _SKIP_FILES.search(href):
+            continue
+        # Skip special links
+        if href.startswith(('mailto:', 'tel:', 'javascript:', '#')):
+            continue
+        # Convert relative to absolute
+        parsed = urlparse(urljoin(base_url, href))
+        # Only internal links
+        if parsed.netloc == base_domain or parsed.netloc == '':
+            # Remove query strings and fragments
+            links.setdefault(f"{parsed.scheme}://{parsed.netloc}{parsed.path}", None)
+    return list(links)
+
+
+def _clean_text(raw: Optional[str]) -> Optional[str]:
+    # Collapse whitespace and cap the size.
+    return ' '.join(raw.split())[:TEXT_LIMIT] if raw else None
+
+
+def _extract_bs4(html: str, base_url: str, base_domain: str) -> PageExtract:
+    soup = BeautifulSoup(html, _BS4_PARSER)
+    title = soup.find('title')
+    meta_desc = soup.find('meta', attrs={'name': 'description'})
+    h1_tags = soup.find_all('h1')
+    out = PageExtract(
+        title=title.get_text().strip() if title else None,
+        meta_description=meta_desc.get('content').strip() if meta_desc and meta_desc.get('content') else None,
+        h1_count=len(h1_tags),
+        h1_text=h1_tags[0].get_text().strip() if h1_tags else None,
+        links=filter_internal_links((a['href'] for a in soup.find_all('a', href=True)), base_url, base_domain),
+    )
+    # Same tree: meta/links are read, now drop invisible parts for the text.
+    for tag in soup(_INVISIBLE_TAGS):
+        tag.decompose()
+    out.text_content = _clean_text(soup.get_text(separator=' ', strip=True))
+    return out
+
+
+def _extract_selectolax(html: str, base_url: str, base_domain: str) -> PageExtract:
+    tree = HTMLParser(html)
+    title = tree.css_first('title')
+    meta_desc = tree.css_first('meta[name="description"]')
+    h1_tags = tree.css('h1')
+    content = (meta_desc.attributes.get('content') if meta_desc else None) or ''
+    out = PageExtract(
+        title=title.text().strip() if title else None,
+        meta_description=content.strip() or None,
+        h1_count=len(h1_tags),
+        h1_text=h1_tags[0].text().strip() if h1_tags else None,
+        links=filter_internal_links(
+            (a.attributes.get('href') or '' for a in tree.css('a[href]')), base_url, base_domain,
+        ),
+    )
+    tree.strip_tags(_INVISIBLE_TAGS)
+    root = tree.root
+    out.text_content = _clean_text(root.text(separator=' ', strip=True) if root else None)
+    return out
+
+
+def extract_page(html: str, base_url: str, base_domain: str, backend: Optional[str] = None) -> PageExtract:
+    """Parse a page once: meta, h1, internal links, visible text, contacts.
+
+    Contacts are searched in raw HTML (tel:/mailto: hrefs and JSON-LD count),
+    links are resolved against base_url as crawl_domain always did.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend == "selectolax":
+        if HTMLParser is None:
+            raise ValueError("selectolax is not installed")
+        out = _extract_selectolax(html, base_url, base_domain)
+    elif backend == "bs4":
+        out = _extract_bs4(html, base_url, base_domain)
+    else:
+        raise ValueError(f"Unknown HTML backend: {backend!r}")
+    out.phone = extract_phone(html)
+    out.email = extract_email(html)
+    return out
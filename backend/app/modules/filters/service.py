@@ -8,6 +8,7 @@ from sqlalchemy import select
 
 from app.models.filter import Filter, BlacklistDomain
 from app.modules.filters import schemas
+from app.modules.filters.blacklist import invalidate_user_blacklist
 
 
 async def create_seo_filter(
@@ -41,6 +42,7 @@ async def create_blacklist_domain(
     db.add(domain)
     await db.commit()
     await db.refresh(domain)
+    await invalidate_user_blacklist(user_id)
     return schemas.BlacklistDomainResponse.model_validate(domain)
 
 
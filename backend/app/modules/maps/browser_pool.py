@@ -0,0 +1,469 @@
+"""Пул headless Chromium на время жизни воркера + аренда контекстов.
+
+Раньше каждый Playwright-парсер (карточки 2GIS и Я.Карт, выдача Я.Карт,
+email с сайта) делал `async_playwright()` + `chromium.launch()` на таску:
+≈5с старта и 200-400MB на каждый запуск, батч Я.Карт — браузер на 10
+компаний. Здесь браузеры живут столько же, сколько процесс воркера, а
+парсер берёт в аренду свежий BrowserContext:
+
+    async with browser_pool.lease(user_agent=..., proxy=...) as ctx:
+        page = await ctx.new_page()
+
+Устройство:
+- BROWSER_POOL_SIZE процессов Chromium на процесс воркера. Запускаем их
+  сами (не через Playwright) с `--remote-debugging-port`, поэтому они
+  переживают event loop: Celery-таски идут каждая в своём asyncio.run,
+  а объекты Playwright к чужому loop'у не переносятся. В loop'е таски —
+  один драйвер Playwright и CDP-подключение к браузерам (~50мс);
+- контекст на аренду, после аренды закрывается: куки/кэш/прокси не
+  переходят между компаниями. Прокси задаётся на контекст;
+- на браузер не больше BROWSER_POOL_CONTEXTS_PER_BROWSER аренд разом,
+  остальные ждут;
+- после BROWSER_POOL_MAX_PAGES аренд браузер перезапускается, как только
+  освободится;
+- watchdog (форк-бомба 15.08: 5759 chrome-процессов, load 109, OOM): при
+  каждой аренде/возврате и раз в BROWSER_POOL_WATCHDOG_INTERVAL_S, пока
+  есть аренды, считаем renderer-процессы и RSS дерева браузера по
+  /proc/<pid>/task/*/children (только своё дерево, в потоке — не в loop'е);
+  превышение BROWSER_POOL_MAX_RENDERERS / BROWSER_POOL_MAX_RSS_MB —
+  перезапуск, посреди аренды тоже. Chromium стартует в своей process group и убивается
+  целиком (killpg), плюс `--renderer-process-limit` и PDEATHSIG: если
+  воркер умер, браузер умирает вместе с ним, а не копится сиротой.
+
+Celery-таски с Playwright запускаются через `browser_pool.run(coro)` вместо
+asyncio.run — в конце закрывается драйвер loop'а (браузеры остаются).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import atexit
+import ctypes
+import glob
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, TypeVar
+
+from app.core import redis_clients
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_LAUNCH_TIMEOUT_S = 15.0
+_CONNECT_TIMEOUT_MS = 15_000
+_CONTEXT_CLOSE_TIMEOUT_S = 10.0
+
+# Флаги — те же, что были у chromium.launch в парсерах, плюс CDP-порт.
+_CHROMIUM_ARGS = (
+    "--headless",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-blink-features=AutomationControlled",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-background-networking",
+    "--remote-debugging-address=127.0.0.1",
+    "--remote-debugging-port=0",
+)
+
+# Где Playwright держит браузеры (`playwright install chromium-headless-shell`).
+# Headless shell — первым: его и запускал chromium.launch(headless=True).
+_EXECUTABLE_PATTERNS = (
+    "chromium_headless_shell-*/*/chrome-headless-shell",
+    "chromium_headless_shell-*/*/headless_shell",
+    "chromium-*/chrome-linux*/chrome",
+)
+
+
+class BrowserPoolError(RuntimeError):
+    """Chromium не найден / не стартовал."""
+
+
+def _die_with_parent() -> None:  # pragma: no cover - выполняется в дочернем процессе
+    """preexec_fn: SIGKILL браузеру, если умер процесс воркера (PR_SET_PDEATHSIG)."""
+    try:
+        ctypes.CDLL("libc.so.6", use_errno=True).prctl(1, signal.SIGKILL)
+    except (OSError, AttributeError):
+        pass
+
+
+def find_executable() -> str | None:
+    """BROWSER_POOL_EXECUTABLE или свежий Chromium из кэша браузеров Playwright."""
+    if settings.BROWSER_POOL_EXECUTABLE:
+        return settings.BROWSER_POOL_EXECUTABLE
+    root = os.environ.get("PLAYWRIGHT_BROWSERS_PATH") or os.path.expanduser("~/.cache/ms-playwright")
+    for pattern in _EXECUTABLE_PATTERNS:
+        found = sorted(glob.glob(os.path.join(root, pattern)))
+        if found:
+            return found[-1]
+    return None
+
+
+def _children(pid: int) -> list[int]:
+    """Прямые потомки pid из /proc/<pid>/task/*/children (без обхода всего /proc)."""
+    try:
+        tids = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return []
+    out: list[int] = []
+    for tid in tids:
+        try:
+            with open(f"/proc/{pid}/task/{tid}/children", "rb") as f:
+                out.extend(int(c) for c in f.read().split())
+        except OSError:
+            continue
+    return out
+
+
+def process_tree_usage(pid: int) -> tuple[int, int, int]:
+    """(процессов, renderer-процессов, RSS в байтах) дерева процесса pid по /proc.
+
+    Читает только само дерево. Блокирующий — из loop'а звать через
+    asyncio.to_thread. Не Linux / нет /proc — нули (watchdog просто не срабатывает).
+    """
+    procs = renderers = rss_pages = 0
+    stack = [pid]
+    while stack:
+        p = stack.pop()
+        try:
+            with open(f"/proc/{p}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # comm в скобках может содержать пробелы — режем по последней ')'.
+        fields = stat.rsplit(b")", 1)[-1].split()
+        if len(fields) < 22:
+            continue
+        procs += 1
+        rss_pages += int(fields[21])
+        try:
+            with open(f"/proc/{p}/cmdline", "rb") as f:
+                if b"--type=renderer" in f.read():
+                    renderers += 1
+        except OSError:
+            pass
+        stack.extend(_children(p))
+    if not procs:
+        return 0, 0, 0
+    return procs, renderers, rss_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class _PooledBrowser:
+    """Один процесс Chromium пула. Общий на процесс воркера (не на loop)."""
+
+    def __init__(self, slot: int) -> None:
+        self.slot = slot
+        self.proc: subprocess.Popen | None = None
+        self.user_data_dir: str | None = None
+        self.endpoint: str | None = None
+        self.generation = 0  # растёт с каждым запуском — CDP-подключения старых поколений невалидны
+        self.active = 0
+        self.leases = 0  # аренд с последнего запуска
+        self.started_at = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    async def recycle_reason(self) -> str | None:
+        """Почему браузер пора перезапустить (None — здоров)."""
+        if not self.alive:
+            return "dead" if self.proc is not None else None
+        if self.leases >= settings.BROWSER_POOL_MAX_PAGES:
+            return "max_pages"
+        return await self.usage_reason()
+
+    async def usage_reason(self) -> str | None:
+        """Превышение лимитов watchdog'а по дереву процессов (None — в норме)."""
+        proc = self.proc
+        if proc is None:
+            return None
+        _procs, renderers, rss = await asyncio.to_thread(process_tree_usage, proc.pid)
+        if renderers > settings.BROWSER_POOL_MAX_RENDERERS:
+            return f"renderers={renderers}"
+        if rss > settings.BROWSER_POOL_MAX_RSS_MB * 1024 * 1024:
+            return f"rss={rss // (1024 * 1024)}MB"
+        return None
+
+    async def start(self) -> None:
+        executable = find_executable()
+        if not executable:
+            raise BrowserPoolError("chromium executable not found (playwright install chromium-headless-shell)")
+        self.user_data_dir = tempfile.mkdtemp(prefix=f"browser-pool-{self.slot}-")
+        args = [
+            executable,
+            *_CHROMIUM_ARGS,
+            f"--renderer-process-limit={max(1, settings.BROWSER_POOL_MAX_RENDERERS)}",
+            f"--user-data-dir={self.user_data_dir}",
+            "about:blank",
+        ]
+        self.proc = subprocess.Popen(
+            args,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,  # своя process group — killpg убивает всё дерево
+            preexec_fn=_die_with_parent if sys.platform.startswith("linux") else None,
+        )
+        # Chromium пишет выбранный порт в <user-data-dir>/DevToolsActivePort.
+        port_file = os.path.join(self.user_data_dir, "DevToolsActivePort")
+        deadline = time.monotonic() + _LAUNCH_TIMEOUT_S
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                code = self.proc.returncode
+                self.kill("launch failed")
+                raise BrowserPoolError(f"chromium exited on start with code {code}")
+            try:
+                with open(port_file) as f:
+                    port = f.readline().strip()
+            except OSError:
+                port = ""
+            if port.isdigit():
+                self.endpoint = f"http://127.0.0.1:{port}"
+                self.generation += 1
+                self.leases = 0
+                self.started_at = time.monotonic()
+                logger.info("browser_pool: chromium #%d started pid=%d %s", self.slot, self.proc.pid, self.endpoint)
+                return
+            await asyncio.sleep(0.05)
+        self.kill("launch timeout")
+        raise BrowserPoolError(f"chromium did not open a DevTools port in {_LAUNCH_TIMEOUT_S:.0f}s")
+
+    def kill(self, reason: str) -> None:
+        """Убить браузер со всеми renderer'ами и удалить профиль."""
+        proc, self.proc, self.endpoint = self.proc, None, None
+        if proc is not None:
+            if proc.poll() is None:
+                logger.info("browser_pool: recycling chromium #%d pid=%d (%s)", self.slot, proc.pid, reason)
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError, AttributeError):
+                proc.kill()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                logger.warning("browser_pool: chromium #%d pid=%d did not exit after SIGKILL", self.slot, proc.pid)
+        if self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+            self.user_data_dir = None
+
+
+_browsers: list[_PooledBrowser] = []
+
+
+def _pool() -> list[_PooledBrowser]:
+    size = max(1, settings.BROWSER_POOL_SIZE)
+    while len(_browsers) < size:
+        _browsers.append(_PooledBrowser(len(_browsers)))
+    return _browsers[:size]
+
+
+class _LoopState:
+    """Драйвер Playwright и CDP-подключения к браузерам пула в одном event loop."""
+
+    def __init__(self) -> None:
+        self.playwright: Any = None
+        self.connections: dict[int, tuple[int, Any]] = {}  # slot -> (generation, Browser)
+        self.available = asyncio.Condition()
+        self.start_lock = asyncio.Lock()
+        self.watchdog: asyncio.Task | None = None
+
+
+_states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+
+
+async def _loop_state() -> _LoopState:
+    loop = asyncio.get_running_loop()
+    state = _states.get(loop)
+    if state is None:
+        state = _states[loop] = _LoopState()
+    if state.playwright is None:
+        from playwright.async_api import async_playwright
+
+        state.playwright = await async_playwright().start()
+    return state
+
+
+async def _watchdog() -> None:
+    """Пока есть аренды — раз в BROWSER_POOL_WATCHDOG_INTERVAL_S проверяет
+    деревья занятых браузеров: разогнавшийся Chromium убиваем, не дожидаясь
+    конца аренды (её контекст получит ошибку, следующая — новый браузер)."""
+    interval = settings.BROWSER_POOL_WATCHDOG_INTERVAL_S
+    while any(pb.active for pb in _pool()):
+        await asyncio.sleep(interval)
+        for pb in _pool():
+            if not pb.active or not pb.alive:
+                continue
+            proc = pb.proc
+            reason = await pb.usage_reason()
+            if reason and pb.proc is proc:
+                pb.kill(f"watchdog: {reason}")
+
+
+def _ensure_watchdog(state: _LoopState) -> None:
+    if settings.BROWSER_POOL_WATCHDOG_INTERVAL_S <= 0:
+        return
+    if state.watchdog is None or state.watchdog.done():
+        state.watchdog = asyncio.get_running_loop().create_task(_watchdog())
+
+
+def _pick() -> _PooledBrowser | None:
+    """Наименее занятый браузер со свободным местом. Браузер, который пора
+    перезапустить, новых аренд не получает, пока не освободится."""
+    best = None
+    for pb in _pool():
+        if pb.active >= max(1, settings.BROWSER_POOL_CONTEXTS_PER_BROWSER):
+            continue
+        if pb.active and pb.leases >= settings.BROWSER_POOL_MAX_PAGES:
+            continue
+        if best is None or pb.active < best.active:
+            best = pb
+    return best
+
+
+async def _connect(state: _LoopState, pb: _PooledBrowser) -> Any:
+    async with state.start_lock:
+        if pb.active == 1:
+            # Никто больше не держит этот браузер — можно перезапустить.
+            reason = await pb.recycle_reason()
+            if reason and pb.active == 1:
+                pb.kill(reason)
+        if not pb.alive:
+            await pb.start()
+    cached = state.connections.get(pb.slot)
+    if cached is not None and cached[0] == pb.generation and cached[1].is_connected():
+        return cached[1]
+    browser = await state.playwright.chromium.connect_over_cdp(pb.endpoint, timeout=_CONNECT_TIMEOUT_MS)
+    state.connections[pb.slot] = (pb.generation, browser)
+    return browser
+
+
+@asynccontextmanager
+async def lease(*, proxy: dict[str, str] | None = None, **context_options: Any) -> AsyncIterator[Any]:
+    """Свежий BrowserContext на браузере пула; закрывается на выходе.
+
+    `context_options` — как у browser.new_context (user_agent, locale,
+    viewport, extra_http_headers...), `proxy` — {server, username, password}.
+    ImportError, если Playwright не установлен; BrowserPoolError, если
+    Chromium не найден или не стартовал.
+    """
+    state = await _loop_state()
+    async with state.available:
+        pb = _pick()
+        while pb is None:
+            await state.available.wait()
+            pb = _pick()
+        pb.active += 1
+    _ensure_watchdog(state)
+    try:
+        try:
+            browser = await _connect(state, pb)
+            context = await browser.new_context(proxy=proxy, **context_options)
+        except Exception:
+            # Браузер мог упасть между проверкой и подключением — следующая
+            # аренда запустит новый.
+            if pb.active == 1:
+                pb.kill("connect failed")
+            raise
+        try:
+            yield context
+        finally:
+            try:
+                await asyncio.wait_for(context.close(), timeout=_CONTEXT_CLOSE_TIMEOUT_S)
+            except Exception as e:
+                logger.warning("browser_pool: context close failed on chromium #%d: %s", pb.slot, e)
+                if pb.active == 1:
+                    pb.kill("context close failed")
+    finally:
+        pb.active -= 1
+        pb.leases += 1
+        if pb.active == 0:
+            reason = await pb.recycle_reason()
+            # пока считали дерево, браузер могли снова взять в аренду
+            if reason and pb.active == 0:
+                pb.kill(reason)
+        async with state.available:
+            state.available.notify_all()
+
+
+async def release_loop() -> None:
+    """Отключиться от браузеров и остановить драйвер Playwright текущего loop'а.
+    Сами браузеры продолжают жить."""
+    state = _states.pop(asyncio.get_running_loop(), None)
+    if state is None:
+        return
+    if state.watchdog is not None and not state.watchdog.done():
+        state.watchdog.cancel()
+        await asyncio.gather(state.watchdog, return_exceptions=True)
+    for _generation, browser in state.connections.values():
+        try:
+            # Для connect_over_cdp close() только отключается от браузера.
+            await browser.close()
+        except Exception as e:
+            logger.debug("browser_pool.release_loop: %s", e)
+    if state.playwright is not None:
+        try:
+            await state.playwright.stop()
+        except Exception as e:
+            logger.debug("browser_pool.release_loop: %s", e)
+
+
+def run(coro: Awaitable[T]) -> T:
+    """asyncio.run для Celery-тасок с Playwright: в конце закрывает драйвер
+    loop'а и его общие Redis-клиенты."""
+
+    async def _main() -> T:
+        try:
+            return await coro
+        finally:
+            await release_loop()
+            await redis_clients.aclose_clients()
+
+    return asyncio.run(_main())
+
+
+def shutdown() -> None:
+    """Убить все браузеры пула (выход процесса воркера)."""
+    for pb in _browsers:
+        pb.kill("shutdown")
+
+
+def stats() -> list[dict[str, Any]]:
+    """Состояние браузеров пула в этом процессе (логи, отладка)."""
+    out = []
+    for pb in _browsers:
+        procs, renderers, rss = process_tree_usage(pb.proc.pid) if pb.alive else (0, 0, 0)
+        out.append({
+            "slot": pb.slot,
+            "alive": pb.alive,
+            "pid": pb.proc.pid if pb.alive else None,
+            "active": pb.active,
+            "leases": pb.leases,
+            "generation": pb.generation,
+            "processes": procs,
+            "renderers": renderers,
+            "rss_mb": rss // (1024 * 1024),
+            "uptime_s": round(time.monotonic() - pb.started_at, 1) if pb.alive else 0.0,
+        })
+    return out
+
+
+atexit.register(shutdown)
+
+try:
+    from celery.signals import worker_process_shutdown
+
+    worker_process_shutdown.connect(lambda **_: shutdown(), weak=False)
+except ImportError:  # pragma: no cover - celery есть везде, где есть воркер
+    pass
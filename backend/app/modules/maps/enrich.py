@@ -24,6 +24,8 @@ from urllib.parse import urljoin, urlparse
 
 import httpx
 
+from app.core.http_clients import shared_client
+
 logger = logging.getLogger(__name__)
 
 # Один email-regex. Не идеален (RFC 5322 не покрываем), но достаточно для
@@ -82,7 +84,7 @@ _EMAIL_EXACT_BLOCKLIST = {
 # Лимиты
 _DEFAULT_TIMEOUT = 8.0
 _MAX_BYTES = 1_500_000   # 1.5 МБ HTML с головой хватит
-_MAX_REDIRECTS = 3
+# Редиректов — не больше 3: так настроен общий клиент "sites" (app.core.http_clients).
 _UA = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
     "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
@@ -231,10 +233,18 @@ def _extract_from_html(html: str) -> ContactEnrichResult:
     return result
 
 
-async def _fetch_html(client: httpx.AsyncClient, url: str) -> tuple[str | None, str | None, str | None]:
+async def _fetch_html(
+    client: httpx.AsyncClient,
+    url: str,
+    *,
+    headers: dict[str, str] | None = None,
+    timeout: float | None = None,
+) -> tuple[str | None, str | None, str | None]:
     """Один GET с фильтром по content-type. Возвращает (html, final_url, error)."""
     try:
-        resp = await client.get(url)
+        resp = await client.get(
+            url, headers=headers, timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+        )
     except httpx.TimeoutException:
         return None, None, "timeout"
     except httpx.HTTPError as e:
@@ -290,14 +300,11 @@ async def fetch_and_extract(website: str, *, timeout: float = _DEFAULT_TIMEOUT)
     homepage_error: str | None = None
 
     try:
-        async with httpx.AsyncClient(
-            timeout=timeout,
-            follow_redirects=True,
-            max_redirects=_MAX_REDIRECTS,
-            headers=headers,
-        ) as client:
+        # Общий keep-alive клиент: повторные заходы на тот же сайт (и DNS) —
+        # без нового handshake.
+        async with shared_client("sites") as client:
             # Homepage — обязательный шаг.
-            html, final_url, err = await _fetch_html(client, url)
+            html, final_url, err = await _fetch_html(client, url, headers=headers, timeout=timeout)
             if err is not None:
                 # Сайт совсем не отдаёт ничего — возвращаем error, не лезем
                 # на /contacts (всё равно 404/timeout)
@@ -319,7 +326,7 @@ async def fetch_and_extract(website: str, *, timeout: float = _DEFAULT_TIMEOUT)
                         break
                     extra_url = urljoin(base_url, path)
                     await asyncio.sleep(0.5)
-                    sub_html, _, sub_err = await _fetch_html(client, extra_url)
+                    sub_html, _, sub_err = await _fetch_html(client, extra_url, headers=headers, timeout=timeout)
                     if sub_err is not None or not sub_html:
                         continue
                     pages_tried += 1
@@ -1,25 +1,38 @@
-"""HTML-парсер карточки 2GIS через headless Chromium (Playwright).
+"""Контакты карточки 2GIS: JSON API напрямую, headless Chromium — fallback.
 
 2gis.ru/firm/{id} — это SPA (Single-Page Application). Прямой `httpx.get`
 возвращает 11kB HTML-shell без контента — все данные грузятся JavaScript-ом
-на клиенте. Поэтому контакты можно вытащить ТОЛЬКО через настоящий браузер.
-
-Стратегия:
-  1) Запускаем headless Chromium через Playwright, открываем страницу.
+на клиенте: SPA шлёт XHR `catalog.api.2gis.com/3.0/items/byid` и получает
+`contact_groups`.
+
+Быстрый путь (TWOGIS_CARD_API_ENABLED): тот же `items/byid` одним httpx-
+запросом (~300мс вместо 10-25с браузера). Ключ и набор параметров — из
+TWOGIS_WEB_API_KEY или подсмотренные в XHR последней Chromium-карточки
+(`_learned_card_params`). Если API отказал (нет ключа, 4xx/5xx, meta.code,
+нет items/contact_groups) — идём в браузер. Темп — распределённый лимитер
+(core.provider_limiter): items/byid идёт в квоту twogis/api на свой ключ,
+как и запросы провайдера, слот twogis/card берёт только Chromium-карточка.
+
+Стратегия браузера:
+  1) Берём контекст headless Chromium из пула воркера (maps.browser_pool),
+     вешаем профиль перехвата TWOGIS_CARD (maps.interception): картинки,
+     шрифты, тайлы, статистика и чужие хосты не грузятся. Открываем страницу.
   2) Перехватываем XHR-ответы от `catalog.api.2gis.com` и `webapi.2gis.com` —
      именно туда SPA шлёт запрос за `contact_groups` с phone/email/мессенджерами.
-     Эти ответы — структурный JSON, парсим точечно.
-  3) Кликаем по кнопке «Показать телефон» если она есть — открывает скрытые
-     номера. Молча игнорируем если не найдена.
+     Эти ответы — структурный JSON, парсим точечно. Пришёл такой XHR —
+     дальше не ждём (вместо networkidle + фиксированных пауз).
+  3) Если телефона в XHR не было — кликаем по кнопке «Показать телефон»
+     и ждём XHR с номером. Молча игнорируем если кнопки нет.
   4) После рендера берём `document.body.innerText` и `page.content()` —
      гоним regex (tel:, mailto:, t.me, vk.com, wa.me, instagram, facebook,
      ok.ru, youtube) поверх. Это второй слой защиты на случай если XHR
      ответы перехватили не полностью.
 
 Ограничения:
-- Один таск ≈ 5-10 секунд (старт браузера + загрузка + ожидание сети).
-- Один Chromium-процесс ≈ 200-400MB RAM. Запускается per-task, после
-  закрытия память отдаётся ОС. На VPS 3.8GB при concurrency=1 безопасно.
+- Один таск ≈ время до XHR карточки: Chromium уже запущен пулом, на
+  таску создаётся только контекст, лишние ресурсы не качаются.
+- Один Chromium-процесс ≈ 200-400MB RAM, живёт весь процесс воркера
+  (BROWSER_POOL_SIZE на процесс) и перезапускается пулом по лимитам.
 - Никогда не бросает исключений: при любой ошибке (timeout, OOM, отсутствие
   Chromium в системе) возвращает ContactEnrichResult с error.
 """
@@ -30,23 +43,39 @@ import asyncio
 import logging
 import re
 from typing import Any
-from urllib.parse import parse_qs, unquote, urlparse
+from urllib.parse import parse_qs, parse_qsl, unquote, urlparse
+
+import httpx
 
+from app.core import provider_limiter
+from app.core.config import settings
+from app.core.http_clients import shared_client
+from app.modules.maps import browser_pool, interception
 from app.modules.maps.enrich import (
     ContactEnrichResult,
     _extract_from_html,
     _normalize_phone,
     _accept_email,
 )
+from app.modules.maps.providers_settings_service import load_provider_quota
 
 logger = logging.getLogger(__name__)
 
 _FIRM_URL = "https://2gis.ru/firm/{external_id}"
 
 _PAGE_TIMEOUT_MS = 25_000        # навигация + первичный рендер
-_NETWORK_IDLE_TIMEOUT_MS = 12_000  # 2GIS грузит десятки JS-чанков, нужно больше времени
+_CONTACTS_XHR_TIMEOUT_MS = 10_000  # потолок ожидания XHR карточки с contact_groups
 _SHOW_PHONE_TIMEOUT_MS = 2_000    # клик по «Показать телефон» — не блокируем если нет
-_POST_RENDER_WAIT_MS = 1_500      # доп. пауза после networkidle — даём XHR контактов долететь
+_PHONE_XHR_TIMEOUT_MS = 1_500     # после клика — ждём XHR с телефоном, не дольше
+
+# Кнопка «Показать телефон» в нескольких вариантах вёрстки (текстовый узел /
+# aria-label). Одним списком селекторов — одно ожидание, а не четыре подряд.
+_SHOW_PHONE_SELECTORS = ", ".join((
+    'button:has-text("Показать телефон")',
+    'button:has-text("Показать номер")',
+    '[aria-label*="Показать телефон"]',
+    'a:has-text("Показать телефон")',
+))
 
 # UA Chrome 148 — соответствует реальной версии нашего chromium-headless-shell
 # (chromium-headless-shell v1223 = Chrome 148.0.7778). Со старым UA Chrome 124
@@ -72,6 +101,23 @@ _SEC_CH_UA_HEADERS = {
 # `webapi.2gis.com` — иногда тоже релевантен (внутренние proxy-эндпоинты).
 _API_HOSTS = ("catalog.api.2gis.com", "webapi.2gis.com")
 
+# Быстрый путь: карточка фирмы тем же запросом, что шлёт SPA.
+_BYID_URL = "https://catalog.api.2gis.com/3.0/items/byid"
+_BYID_DEFAULT_PARAMS = {"locale": "ru_RU", "fields": "items.contact_groups"}
+_BYID_TIMEOUT_S = 8.0
+_BYID_HEADERS = {
+    "User-Agent": _UA,
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "ru,en;q=0.9",
+    "Origin": "https://2gis.ru",
+    "Referer": "https://2gis.ru/",
+    **_SEC_CH_UA_HEADERS,
+}
+
+# Параметры items/byid из XHR последней успешной Chromium-карточки (без id).
+# Живут до рестарта процесса или до первого 401/403 на быстром пути.
+_learned_card_params: dict[str, str] = {}
+
 # 2GIS оборачивает внешние сайты в трекер вида
 #   https://link.2gis.ru/<id>?url=https%3A%2F%2Freal-site.ru%2F
 # (старый формат — мы его поддерживаем как fallback). В новом формате
@@ -203,7 +249,9 @@ def _walk_json_for_contacts(node: Any, result: ContactEnrichResult) -> None:
                 # Нормализуем 2GIS-редиректы вида:
                 #   https://link.2gis.ru/.../?url=https%3A//real-site.ru/
                 # — выкусываем настоящий URL из query `url=`.
-                normalized = _normalize_2gis_url(v)
+                # В items/byid value — трекер link.2gis.ru без url=, а сам
+                # домен лежит в `text` («ulybka.ru»).
+                normalized = _normalize_2gis_url(v) or _normalize_2gis_url(node.get("text") or "")
                 # Берём первый непустой website; повторно не перезаписываем.
                 if normalized and not result.website:
                     result.website = normalized
@@ -241,8 +289,88 @@ def _walk_json_for_contacts(node: Any, result: ContactEnrichResult) -> None:
             _walk_json_for_contacts(item, result)
 
 
+def _has_key(node: Any, key: str, depth: int = 8) -> bool:
+    """Есть ли в JSON непустое поле `key` (обход с ограничением глубины)."""
+    if depth <= 0:
+        return False
+    if isinstance(node, dict):
+        if node.get(key):
+            return True
+        return any(_has_key(v, key, depth - 1) for v in node.values() if isinstance(v, (dict, list)))
+    if isinstance(node, list):
+        return any(_has_key(v, key, depth - 1) for v in node)
+    return False
+
+
+async def _wait_event(event: asyncio.Event, timeout_ms: int) -> bool:
+    try:
+        await asyncio.wait_for(event.wait(), timeout=timeout_ms / 1000)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+def _learn_card_params(url: str) -> None:
+    """Запоминает параметры items/byid из перехваченного XHR карточки."""
+    parts = urlparse(url)
+    if not parts.path.rstrip("/").endswith("/items/byid"):
+        return
+    params = {k: v for k, v in parse_qsl(parts.query) if k != "id"}
+    if params.get("key"):
+        _learned_card_params.clear()
+        _learned_card_params.update(params)
+
+
+def _card_api_params(external_id: str) -> dict[str, str] | None:
+    """Параметры быстрого пути или None, если ключа нет ни в настройках, ни в XHR."""
+    params = {**_BYID_DEFAULT_PARAMS, **_learned_card_params}
+    if settings.TWOGIS_WEB_API_KEY:
+        params["key"] = settings.TWOGIS_WEB_API_KEY
+    if not params.get("key"):
+        return None
+    params["id"] = external_id
+    return params
+
+
+async def _fetch_firm_via_api(external_id: str) -> ContactEnrichResult | None:
+    """Контакты карточки одним запросом к items/byid.
+
+    None — API отказал и нужен Chromium: нет ключа, сетевая ошибка, HTTP/
+    meta.code ≥ 400, пустой items или нет contact_groups (у части ключей
+    поле не отдаётся — пустоту не отличить от «контактов нет»).
+    """
+    params = _card_api_params(external_id)
+    if params is None:
+        return None
+    # Тот же catalog.api и тот же ключ, что у TwoGisProvider — общий слот twogis/api.
+    await provider_limiter.acquire("twogis", params["key"], load_provider_quota("twogis", "api"))
+    try:
+        async with shared_client("api") as client:
+            resp = await client.get(_BYID_URL, params=params, headers=_BYID_HEADERS, timeout=_BYID_TIMEOUT_S)
+        data = resp.json() if resp.status_code == 200 else {}
+    except (httpx.HTTPError, ValueError) as e:
+        logger.debug("2gis byid %s: %s", external_id, e)
+        return None
+
+    meta_code = (data.get("meta") or {}).get("code") if isinstance(data, dict) else None
+    code = resp.status_code if resp.status_code != 200 else meta_code
+    if isinstance(code, int) and code >= 400:
+        if code in (401, 403):
+            # ключ из XHR протух/отозван — следующая Chromium-карточка подсмотрит новый
+            _learned_card_params.clear()
+        logger.debug("2gis byid %s: refused code=%s", external_id, code)
+        return None
+    items = ((data.get("result") or {}).get("items") or []) if isinstance(data, dict) else []
+    if not items or not _has_key(items, "contact_groups"):
+        return None
+
+    result = ContactEnrichResult(fetched_url=_FIRM_URL.format(external_id=external_id))
+    _walk_json_for_contacts(items, result)
+    return result
+
+
 async def fetch_and_extract_2gis_firm(external_id: str) -> ContactEnrichResult:
-    """Headless Chromium → перехват XHR + regex по rendered innerText.
+    """items/byid по httpx, при отказе — Chromium с перехватом XHR + regex.
 
     Возвращает ContactEnrichResult с найденными контактами. При любой ошибке
     (timeout, отсутствие Chromium, навигация упала) — возвращает результат
@@ -251,17 +379,25 @@ async def fetch_and_extract_2gis_firm(external_id: str) -> ContactEnrichResult:
     if not external_id:
         return ContactEnrichResult(error="empty external_id")
 
+    if settings.TWOGIS_CARD_API_ENABLED:
+        fast = await _fetch_firm_via_api(external_id)
+        if fast is not None:
+            return fast
+
     # Импорт внутри функции — если в окружении нет playwright (dev-машина без
     # установленного браузера), таск просто отдаст error="playwright missing",
     # а не упадёт при старте Celery-воркера.
     try:
-        from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+        from playwright.async_api import TimeoutError as PlaywrightTimeout
     except ImportError:
         return ContactEnrichResult(error="playwright not installed")
 
     url = _FIRM_URL.format(external_id=external_id)
     result = ContactEnrichResult()
     captured_jsons: list[Any] = []
+    # Триггеры раннего выхода: карточка (contact_groups) и телефон пришли XHR-ом.
+    firm_seen = asyncio.Event()
+    phone_seen = asyncio.Event()
 
     async def _on_response(response):
         """Перехватываем JSON-ответы от 2GIS Catalog API."""
@@ -274,110 +410,94 @@ async def fetch_and_extract_2gis_firm(external_id: str) -> ContactEnrichResult:
                 return
             data = await response.json()
             captured_jsons.append(data)
+            if _has_key(data, "contact_groups"):
+                firm_seen.set()
+                _learn_card_params(response.url)
+                probe = ContactEnrichResult()
+                _walk_json_for_contacts(data, probe)
+                if probe.phones:
+                    phone_seen.set()
         except Exception:
             # Не валим страницу из-за одного плохого ответа.
             pass
 
+    # Одна Chromium-карточка — один слот квоты twogis/card, общей для всех
+    # воркеров (раньше — rate_limit="20/m" у Celery-таска, т.е. на процесс).
+    # Быстрый путь выше этот слот не занимает.
+    await provider_limiter.acquire("twogis:card", None, load_provider_quota("twogis", "card"))
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    "--no-sandbox",
-                    "--disable-dev-shm-usage",
-                    "--disable-gpu",
-                    "--disable-blink-features=AutomationControlled",
-                ],
-            )
-            try:
-                context = await browser.new_context(
-                    user_agent=_UA,
-                    locale="ru-RU",
-                    viewport={"width": 1280, "height": 800},
-                    extra_http_headers={
-                        "Referer": "https://2gis.ru/",
-                        **_SEC_CH_UA_HEADERS,
-                    },
-                )
-                page = await context.new_page()
-                page.on("response", _on_response)
-
-                try:
-                    await page.goto(url, wait_until="domcontentloaded", timeout=_PAGE_TIMEOUT_MS)
-                except PlaywrightTimeout:
-                    result.error = "navigation timeout"
-                    return result
-
-                # Защита: если 2GIS всё-таки перенаправил на /museum (например,
-                # обновил детект headless), пробуем кликнуть «Пропустить
-                # обновление браузера и перейти в 2ГИС».
-                if "/museum" in page.url:
-                    for sel in (
-                        'a:has-text("Пропустить обновление")',
-                        'a:has-text("перейти в 2ГИС")',
-                        f'a[href*="firm/{external_id}"]',
-                    ):
-                        try:
-                            el = await page.query_selector(sel)
-                            if el:
-                                await el.click(timeout=3_000)
-                                await page.wait_for_load_state(
-                                    "domcontentloaded", timeout=_PAGE_TIMEOUT_MS,
-                                )
-                                break
-                        except Exception:
-                            continue
-
-                # Ждём пока сеть утихнет (большинство XHR долетят к этому моменту).
-                # 2GIS грузит ~90 чанков, поэтому даём больше времени.
-                try:
-                    await page.wait_for_load_state("networkidle", timeout=_NETWORK_IDLE_TIMEOUT_MS)
-                except PlaywrightTimeout:
-                    # Не критично — продолжаем с тем что успели поймать.
-                    pass
-
-                # Доп. пауза — на проде увидели что innerText заполняется после
-                # того как все основные XHR долетели; networkidle одного раза
-                # бывает мало.
-                try:
-                    await page.wait_for_timeout(_POST_RENDER_WAIT_MS)
-                except Exception:
-                    pass
+        async with browser_pool.lease(
+            user_agent=_UA,
+            locale="ru-RU",
+            viewport={"width": 1280, "height": 800},
+            extra_http_headers={
+                "Referer": "https://2gis.ru/",
+                **_SEC_CH_UA_HEADERS,
+            },
+        ) as context:
+            routed = await interception.apply_profile(context, interception.TWOGIS_CARD)
+            page = await context.new_page()
+            page.on("response", _on_response)
 
-                # Часть телефонов 2GIS прячет за кнопкой «Показать телефон» —
-                # пробуем кликнуть. Селектор пытается покрыть несколько вариантов
-                # верстки (текстовый узел / aria-label / data-attribute).
-                for selector in (
-                    'button:has-text("Показать телефон")',
-                    'button:has-text("Показать номер")',
-                    '[aria-label*="Показать телефон"]',
-                    'a:has-text("Показать телефон")',
+            try:
+                await page.goto(url, wait_until="domcontentloaded", timeout=_PAGE_TIMEOUT_MS)
+            except PlaywrightTimeout:
+                result.error = "navigation timeout"
+                return result
+
+            # Защита: если 2GIS всё-таки перенаправил на /museum (например,
+            # обновил детект headless), пробуем кликнуть «Пропустить
+            # обновление браузера и перейти в 2ГИС».
+            if "/museum" in page.url:
+                for sel in (
+                    'a:has-text("Пропустить обновление")',
+                    'a:has-text("перейти в 2ГИС")',
+                    f'a[href*="firm/{external_id}"]',
                 ):
                     try:
-                        await page.click(selector, timeout=_SHOW_PHONE_TIMEOUT_MS)
-                        # Подождём чтобы XHR за расшифровкой телефона долетел
-                        await page.wait_for_timeout(500)
-                        break
+                        el = await page.query_selector(sel)
+                        if el:
+                            await el.click(timeout=3_000)
+                            await page.wait_for_load_state(
+                                "domcontentloaded", timeout=_PAGE_TIMEOUT_MS,
+                            )
+                            break
                     except Exception:
                         continue
 
-                # Снимаем rendered text — после JS-рендера тут уже видны
-                # реальные номера, ссылки на мессенджеры, email-ы.
-                try:
-                    body_text = await page.evaluate("document.body && document.body.innerText || ''")
-                except Exception:
-                    body_text = ""
-                try:
-                    html = await page.content()
-                except Exception:
-                    html = ""
+            # Раньше здесь был networkidle (до 12с: 2GIS грузит ~90 чанков) и
+            # фиксированная пауза 1.5с. Контакты приходят одним XHR карточки —
+            # его и ждём; без него (карточка без контактов, сменился API) —
+            # не дольше _CONTACTS_XHR_TIMEOUT_MS.
+            await _wait_event(firm_seen, _CONTACTS_XHR_TIMEOUT_MS)
 
-                final_url = page.url
-            finally:
+            # Часть телефонов 2GIS прячет за кнопкой «Показать телефон». Если
+            # телефон уже пришёл в XHR — кнопка ничего не добавит.
+            if not phone_seen.is_set():
                 try:
-                    await browser.close()
+                    await page.locator(_SHOW_PHONE_SELECTORS).first.click(timeout=_SHOW_PHONE_TIMEOUT_MS)
+                    # XHR за расшифровкой телефона
+                    await _wait_event(phone_seen, _PHONE_XHR_TIMEOUT_MS)
                 except Exception:
                     pass
+
+            # Снимаем rendered text — после JS-рендера тут уже видны
+            # реальные номера, ссылки на мессенджеры, email-ы.
+            try:
+                body_text = await page.evaluate("document.body && document.body.innerText || ''")
+            except Exception:
+                body_text = ""
+            try:
+                html = await page.content()
+            except Exception:
+                html = ""
+
+            final_url = page.url
+            logger.debug(
+                "2gis card %s: firm_xhr=%s phone_xhr=%s requests allowed=%d blocked=%d %s",
+                external_id, firm_seen.is_set(), phone_seen.is_set(),
+                routed.allowed, routed.blocked, routed.blocked_by_type,
+            )
     except asyncio.CancelledError:
         raise
     except Exception as e:
@@ -4,8 +4,11 @@ yandex.ru/maps/org/<external_id>/ — SPA. Прямой httpx.get отдаёт 
 без контента (всё рендерится JS-ом). Поэтому контакты тянем через настоящий браузер.
 
 Стратегия:
-  1) Запускаем headless Chromium через Playwright, открываем карточку.
-  2) Ждём networkidle + рендер блока контактов (`.card-feature-view__content`).
+  1) Берём контекст headless Chromium из пула воркера (maps.browser_pool),
+     открываем карточку.
+  2) Режем тайлы/картинки/Метрику профилем YANDEX_MAPS (maps.interception)
+     и ждём рендер блока контактов (`.card-feature-view__content`) и блока
+     телефонов — без networkidle и фиксированных пауз.
   3) Кликаем по кнопке «Показать телефон», если есть — раскрывает дополнительные
      номера. Молча игнорируем если не найдена.
   4) После рендера берём `page.content()` и гоним regex (tel:, mailto:, t.me,
@@ -13,9 +16,11 @@ yandex.ru/maps/org/<external_id>/ — SPA. Прямой httpx.get отдаёт 
      меняются от релиза к релизу, regex по сырому HTML надёжнее.
 
 Ограничения:
-- Один таск ≈ 8-12 секунд (старт браузера + загрузка + ожидание сети + клик).
-- Один Chromium-процесс ≈ 200-400MB RAM. Per-task. На VPS 3.8GB при
-  concurrency=1 безопасно.
+- Одна карточка ≈ загрузка + ожидание сети + клик: Chromium уже запущен
+  пулом, на карточку создаётся только контекст (с прокси).
+- Один Chromium-процесс ≈ 200-400MB RAM, живёт весь процесс воркера.
+- Темп карточек на прокси — квота yandex_maps/card распределённого лимитера
+  (core.provider_limiter), общая для всех воркеров.
 - Никогда не бросает исключений: при любой ошибке возвращает ContactEnrichResult
   с error.
 """
@@ -26,11 +31,14 @@ import logging
 import re
 from urllib.parse import urlparse
 
+from app.core import provider_limiter
+from app.modules.maps import browser_pool, interception
 from app.modules.maps.enrich import (
     ContactEnrichResult,
     _accept_email,
     _normalize_phone,
 )
+from app.modules.maps.providers_settings_service import load_provider_quota
 from app.modules.searches.providers.common import get_proxy_config
 
 logger = logging.getLogger(__name__)
@@ -38,9 +46,10 @@ logger = logging.getLogger(__name__)
 _CARD_URL = "https://yandex.ru/maps/org/{external_id}/"
 
 _PAGE_TIMEOUT_MS = 25_000
-_NETWORK_IDLE_TIMEOUT_MS = 12_000
+_CARD_TIMEOUT_MS = 12_000         # блок контактов карточки
+_PHONES_TIMEOUT_MS = 3_000        # блок телефонов после карточки (у части организаций его нет)
 _SHOW_PHONE_TIMEOUT_MS = 2_000
-_POST_RENDER_WAIT_MS = 1_500
+_PHONE_REVEAL_TIMEOUT_MS = 1_500  # после «Показать телефон» — до появления tel:-ссылки
 
 _UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/148.0.0.0 Safari/537.36"
 _SEC_CH_UA_HEADERS = {
@@ -48,6 +57,19 @@ _SEC_CH_UA_HEADERS = {
     "Sec-Ch-Ua-Mobile": "?0",
     "Sec-Ch-Ua-Platform": '"Windows"',
 }
+_CONTEXT_OPTIONS = {
+    "user_agent": _UA,
+    "locale": "ru-RU",
+    "viewport": {"width": 1366, "height": 900},
+    "extra_http_headers": {"Accept-Language": "ru-RU,ru;q=0.9", **_SEC_CH_UA_HEADERS},
+}
+# Узкие DOM-блоки «Телефоны» карточки (см. _extract_phones_from_block).
+_PHONE_BLOCK_SELECTORS = (
+    "[class*='card-phones']",
+    "[class*='phones-section']",
+    "[class*='card-phone-view']",
+    "[class*='card-phone-button']",
+)
 
 # Домены, которые НЕ являются сайтом компании на Я.Картах. Сам Яндекс,
 # его собственные telegram/vk/max-шортлинки, рекламные и трекерные домены.
@@ -281,104 +303,93 @@ async def enrich_from_yandex_card(external_id: str) -> ContactEnrichResult:
     proxy_arg = _playwright_proxy_from_url(proxy_url)
 
     try:
-        from playwright.async_api import async_playwright, TimeoutError as PWTimeout
+        from playwright.async_api import TimeoutError as PWTimeout
     except ImportError as e:
         result.error = f"playwright not installed: {e}"
         return result
 
     try:
-        async with async_playwright() as pw:
-            browser = await pw.chromium.launch(
-                headless=True,
-                proxy=proxy_arg,
-                args=[
-                    "--disable-blink-features=AutomationControlled",
-                    "--no-sandbox",
-                    "--disable-dev-shm-usage",
-                ],
-            )
-            try:
-                ctx = await browser.new_context(
-                    user_agent=_UA,
-                    locale="ru-RU",
-                    viewport={"width": 1366, "height": 900},
-                    extra_http_headers={
-                        "Accept-Language": "ru-RU,ru;q=0.9",
-                        **_SEC_CH_UA_HEADERS,
-                    },
-                )
-                page = await ctx.new_page()
-                try:
-                    await page.goto(url, wait_until="domcontentloaded", timeout=_PAGE_TIMEOUT_MS)
-                except PWTimeout:
-                    result.error = "page goto timeout"
-                    return result
+        async with (
+            provider_limiter.limit("yandex_maps:card", proxy_url, load_provider_quota("yandex_maps", "card")),
+            browser_pool.lease(proxy=proxy_arg, **_CONTEXT_OPTIONS) as ctx,
+        ):
+            await _scrape_card(ctx, url, result, PWTimeout)
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {str(e)[:200]}"
 
-                # Капча на странице карточки — редко, но бывает
-                if "/showcaptcha" in page.url.lower() or "/checkcaptcha" in page.url.lower():
-                    result.error = "captcha on card page"
-                    return result
+    return result
 
-                # Ждём появления блока контактов или networkidle
-                try:
-                    await page.wait_for_selector(".card-feature-view__content", timeout=_NETWORK_IDLE_TIMEOUT_MS)
-                except PWTimeout:
-                    pass  # не критично — попробуем парсить что есть
-                try:
-                    await page.wait_for_load_state("networkidle", timeout=_NETWORK_IDLE_TIMEOUT_MS)
-                except PWTimeout:
-                    pass
 
-                # Раскрываем дополнительные телефоны (часто рядом есть кнопка
-                # «Показать телефон»). Игнорируем если не нашли.
+async def _scrape_card(ctx, url: str, result: ContactEnrichResult, timeout_error: type[Exception]) -> None:
+    """Открывает карточку в контексте `ctx` и заполняет result (или result.error).
+
+    Тайлы, картинки, шрифты, Метрика и реклама режутся профилем YANDEX_MAPS
+    (maps.interception). Вместо networkidle (до 12с) и фиксированных пауз
+    ждём конкретные события: отрисован блок контактов, блок телефонов,
+    tel:-ссылка после «Показать телефон».
+    """
+    routed = await interception.apply_profile(ctx, interception.YANDEX_MAPS)
+    page = await ctx.new_page()
+    try:
+        await page.goto(url, wait_until="domcontentloaded", timeout=_PAGE_TIMEOUT_MS)
+    except timeout_error:
+        result.error = "page goto timeout"
+        return
+
+    # Капча на странице карточки — редко, но бывает
+    if "/showcaptcha" in page.url.lower() or "/checkcaptcha" in page.url.lower():
+        result.error = "captcha on card page"
+        return
+
+    try:
+        await page.wait_for_selector(".card-feature-view__content", timeout=_CARD_TIMEOUT_MS)
+    except timeout_error:
+        pass  # не критично — попробуем парсить что есть
+    try:
+        await page.wait_for_selector(", ".join(_PHONE_BLOCK_SELECTORS), timeout=_PHONES_TIMEOUT_MS)
+    except timeout_error:
+        pass
+
+    # Раскрываем дополнительные телефоны: кликаем, только если кнопка есть,
+    # и ждём tel:-ссылку, а не фиксированную паузу.
+    try:
+        show_phone = page.get_by_text("Показать телефон", exact=False).first
+        if await show_phone.count():
+            await show_phone.click(timeout=_SHOW_PHONE_TIMEOUT_MS)
+            await page.wait_for_selector("a[href^='tel:']", timeout=_PHONE_REVEAL_TIMEOUT_MS)
+    except Exception:
+        pass
+
+    # Телефоны — строго из узких phone-блоков, чтобы не цеплять
+    # числовые токены из JS-конфигов.
+    for sel in _PHONE_BLOCK_SELECTORS:
+        try:
+            for el in await page.query_selector_all(sel):
                 try:
-                    show_phone = page.get_by_text("Показать телефон", exact=False).first
-                    await show_phone.click(timeout=_SHOW_PHONE_TIMEOUT_MS)
-                    await page.wait_for_timeout(800)
+                    inner = await el.inner_html()
+                    _extract_phones_from_block(inner, result)
                 except Exception:
                     pass
+        except Exception:
+            pass
 
-                await page.wait_for_timeout(_POST_RENDER_WAIT_MS)
-
-                # Телефоны — строго из узких phone-блоков, чтобы не цеплять
-                # числовые токены из JS-конфигов.
-                phone_selectors = [
-                    "[class*='card-phones']",
-                    "[class*='phones-section']",
-                    "[class*='card-phone-view']",
-                    "[class*='card-phone-button']",
-                ]
-                for sel in phone_selectors:
-                    try:
-                        for el in await page.query_selector_all(sel):
-                            try:
-                                inner = await el.inner_html()
-                                _extract_phones_from_block(inner, result)
-                            except Exception:
-                                pass
-                    except Exception:
-                        pass
-
-                html = await page.content()
-                _extract_from_html(html, result)
-
-            finally:
-                await browser.close()
-    except Exception as e:
-        result.error = f"{type(e).__name__}: {str(e)[:200]}"
-
-    return result
+    html = await page.content()
+    _extract_from_html(html, result)
+    logger.debug(
+        "yandex card %s: requests allowed=%d blocked=%d %s",
+        url, routed.allowed, routed.blocked, routed.blocked_by_type,
+    )
 
 
 async def enrich_companies_batch_yandex(
     external_ids: list[str],
 ) -> dict[str, ContactEnrichResult]:
-    """Пакетное обогащение: один Chromium на N компаний.
+    """Пакетное обогащение N компаний подряд на Chromium из пула.
 
     Раньше enrich_from_yandex_card запускал свой Chromium на каждую компанию
-    (5с старт + 200-400MB RAM each). При bulk-поиске в 1000 компаний это
-    = 1000 Chromium-стартов = часы. Здесь — один Chromium переиспользуется
-    для всех компаний в батче: ~5-7с на компанию вместо ~40с.
+    (5с старт + 200-400MB RAM each), потом батч — один Chromium на N
+    компаний. Теперь Chromium общий на процесс воркера (maps.browser_pool),
+    батч нужен только чтобы держать одно прокси-окно.
 
     Возвращает {external_id: ContactEnrichResult}. При ошибке одной компании
     остальные продолжают обрабатываться (try/except внутри цикла).
@@ -394,109 +405,40 @@ async def enrich_companies_batch_yandex(
     proxy_arg = _playwright_proxy_from_url(proxy_url)
 
     try:
-        from playwright.async_api import async_playwright, TimeoutError as PWTimeout
+        from playwright.async_api import TimeoutError as PWTimeout
     except ImportError:
         for r in results.values():
             r.error = "playwright not installed"
         return results
 
-    try:
-        async with async_playwright() as pw:
-            browser = await pw.chromium.launch(
-                headless=True,
-                proxy=proxy_arg,
-                args=[
-                    "--disable-blink-features=AutomationControlled",
-                    "--no-sandbox",
-                    "--disable-dev-shm-usage",
-                ],
-            )
-            try:
-                # КОНТЕКСТ+СТРАНИЦА НА КАЖДУЮ КОМПАНИЮ с обязательным закрытием.
-                # Форк-бомба 15.08: один переиспользуемый page на весь батч —
-                # Chromium накапливал renderer-процессы на тяжёлых страницах
-                # Яндекса и не отпускал их (5759 процессов, load 109, OOM).
-                # new_context дешёвый (~50мс), экономия от одного browser.launch
-                # сохраняется. Плюс жёсткий таймаут на компанию.
-                for eid in external_ids:
-                    result = results[eid]
-                    if not eid:
-                        result.error = "no_external_id"
-                        continue
-                    url = _CARD_URL.format(external_id=eid)
-                    result.fetched_url = url
-                    ctx = None
-                    try:
-                        ctx = await browser.new_context(
-                            user_agent=_UA,
-                            locale="ru-RU",
-                            viewport={"width": 1366, "height": 900},
-                            extra_http_headers={
-                                "Accept-Language": "ru-RU,ru;q=0.9",
-                                **_SEC_CH_UA_HEADERS,
-                            },
-                        )
-                        page = await ctx.new_page()
-                        try:
-                            await page.goto(url, wait_until="domcontentloaded", timeout=_PAGE_TIMEOUT_MS)
-                        except PWTimeout:
-                            result.error = "page goto timeout"
-                            continue
-                        if "/showcaptcha" in page.url.lower() or "/checkcaptcha" in page.url.lower():
-                            result.error = "captcha on card page"
-                            continue
-                        try:
-                            await page.wait_for_selector(
-                                ".card-feature-view__content", timeout=_NETWORK_IDLE_TIMEOUT_MS
-                            )
-                        except PWTimeout:
-                            pass
-                        try:
-                            await page.wait_for_load_state("networkidle", timeout=_NETWORK_IDLE_TIMEOUT_MS)
-                        except PWTimeout:
-                            pass
-                        try:
-                            show_phone = page.get_by_text("Показать телефон", exact=False).first
-                            await show_phone.click(timeout=_SHOW_PHONE_TIMEOUT_MS)
-                            await page.wait_for_timeout(800)
-                        except Exception:
-                            pass
-                        await page.wait_for_timeout(_POST_RENDER_WAIT_MS)
-                        phone_selectors = [
-                            "[class*='card-phones']",
-                            "[class*='phones-section']",
-                            "[class*='card-phone-view']",
-                            "[class*='card-phone-button']",
-                        ]
-                        for sel in phone_selectors:
-                            try:
-                                for el in await page.query_selector_all(sel):
-                                    try:
-                                        inner = await el.inner_html()
-                                        _extract_phones_from_block(inner, result)
-                                    except Exception:
-                                        pass
-                            except Exception:
-                                pass
-                        html = await page.content()
-                        _extract_from_html(html, result)
-                    except Exception as e:
-                        result.error = f"{type(e).__name__}: {str(e)[:200]}"
-                    finally:
-                        if ctx is not None:
-                            try:
-                                await ctx.close()
-                            except Exception:
-                                pass
-            finally:
-                try:
-                    await browser.close()
-                except Exception:
-                    pass
-    except Exception as e:
-        # Критическая ошибка (не смог запустить Chromium) — помечаем все
-        for r in results.values():
-            if not r.error:
-                r.error = f"{type(e).__name__}: {str(e)[:200]}"
+    quota = load_provider_quota("yandex_maps", "card")
+    # КОНТЕКСТ НА КАЖДУЮ КОМПАНИЮ с обязательным закрытием (аренда пула).
+    # Форк-бомба 15.08: один переиспользуемый page на весь батч — Chromium
+    # накапливал renderer-процессы на тяжёлых страницах Яндекса и не
+    # отпускал их (5759 процессов, load 109, OOM). Контекст дешёвый
+    # (~50мс), сам Chromium общий на воркер, за его renderer'ами следит
+    # watchdog пула.
+    for eid in external_ids:
+        result = results[eid]
+        if not eid:
+            result.error = "no_external_id"
+            continue
+        url = _CARD_URL.format(external_id=eid)
+        result.fetched_url = url
+        try:
+            # Темп карточек на прокси — общий для всех воркеров (core.provider_limiter).
+            async with (
+                provider_limiter.limit("yandex_maps:card", proxy_url, quota),
+                browser_pool.lease(proxy=proxy_arg, **_CONTEXT_OPTIONS) as ctx,
+            ):
+                await _scrape_card(ctx, url, result, PWTimeout)
+        except browser_pool.BrowserPoolError as e:
+            # Chromium не стартует — остальные компании не пробуем.
+            for r in results.values():
+                if not r.error and (r is result or not r.fetched_url):
+                    r.error = f"{type(e).__name__}: {str(e)[:200]}"
+            break
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {str(e)[:200]}"
 
     return results
@@ -47,6 +47,7 @@ from sqlalchemy import select, update
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.http_clients import shared_client
 from app.models.company_decision_maker import CompanyDecisionMaker
 from app.models.maps import Company
 from app.modules.maps.contact_validation import is_valid_email, is_valid_phone_ru
@@ -58,6 +59,13 @@ logger = logging.getLogger(__name__)
 _HH_API = "https://api.hh.ru"
 _TIMEOUT = httpx.Timeout(10.0, connect=5.0)
 _UA = "SpinLid-Colaba/1.0 (contact: moiseev1991@gmail.com)"
+# Клиент общий (app.core.http_clients, "api") — свои заголовки/таймаут
+# передаём в каждый запрос.
+_REQUEST_KW: dict[str, Any] = {
+    "headers": {"User-Agent": _UA, "Accept": "application/json"},
+    "timeout": _TIMEOUT,
+    "follow_redirects": True,
+}
 
 # Ключевые слова маркетинговых вакансий. Ищем текстом — hh делает свой
 # морфологический поиск, но добавляем варианты чтобы не пропустить SMM/PR.
@@ -172,6 +180,7 @@ async def _hh_search_employers(
         r = await client.get(
             f"{_HH_API}/employers",
             params={"text": query, "per_page": 20},
+            **_REQUEST_KW,
         )
         if r.status_code != 200:
             return []
@@ -277,6 +286,7 @@ async def _search_marketing_vacancy(
                 # only_with_salary=False — сохраняем максимум,
                 # ниша маркетинга часто без зарплаты в вакансии.
             },
+            **_REQUEST_KW,
         )
         if r.status_code != 200:
             return None
@@ -308,7 +318,7 @@ async def _fetch_vacancy_contacts(
 ) -> dict[str, Any] | None:
     """GET /vacancies/{id} → contacts. Часто contacts=None."""
     try:
-        r = await client.get(f"{_HH_API}/vacancies/{vacancy_id}")
+        r = await client.get(f"{_HH_API}/vacancies/{vacancy_id}", **_REQUEST_KW)
         if r.status_code != 200:
             return None
         data = r.json()
@@ -335,10 +345,7 @@ async def enrich_from_hh(
     if not company.name:
         return {"status": "no_name"}
 
-    headers = {"User-Agent": _UA, "Accept": "application/json"}
-    async with httpx.AsyncClient(
-        timeout=_TIMEOUT, headers=headers, follow_redirects=True
-    ) as client:
+    async with shared_client("api") as client:
         employer_id = await _search_employer(client, company.name, company.city)
         if employer_id is None:
             return {"status": "no_employer"}
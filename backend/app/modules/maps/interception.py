@@ -0,0 +1,114 @@
+"""Профили перехвата запросов для Playwright-парсеров карт.
+
+Карточка 2GIS / Я.Карт в браузере тянет всё подряд: картинки, шрифты,
+тайлы карты, метрику и рекламу — мегабайты через платный прокси, хотя
+парсеру нужны документ, JS самого приложения и XHR к API. Профиль —
+декларативное описание того, что пропускать для одного источника:
+
+- allow_hosts — хосты источника (fnmatch-шаблоны). Запросы к любым
+  другим хостам (аналитика, рекламные сети, чужие CDN) обрываются;
+- block_hosts — исключения внутри allow_hosts: тайлы, счётчики, баннеры;
+- block_resource_types — типы ресурсов Playwright, которые не грузим
+  вовсе (image, media, font).
+
+`await apply_profile(context, TWOGIS_CARD)` вешает route на весь контекст
+и возвращает счётчики пропущенных/оборванных запросов.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import logging
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+_HEAVY_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+
+
+@dataclass(frozen=True)
+class InterceptionProfile:
+    name: str
+    allow_hosts: tuple[str, ...]
+    block_hosts: tuple[str, ...] = ()
+    block_resource_types: frozenset[str] = _HEAVY_RESOURCE_TYPES
+
+    def allows(self, url: str, resource_type: str) -> bool:
+        """Пропустить ли запрос. data:/blob: не идут в сеть — пропускаем."""
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https", "ws", "wss"):
+            return True
+        if resource_type in self.block_resource_types:
+            return False
+        host = (parts.hostname or "").lower()
+        if not any(fnmatch.fnmatchcase(host, p) for p in self.allow_hosts):
+            return False
+        return not any(fnmatch.fnmatchcase(host, p) for p in self.block_hosts)
+
+
+@dataclass
+class InterceptionStats:
+    allowed: int = 0
+    blocked: int = 0
+    blocked_by_type: dict[str, int] = field(default_factory=dict)
+
+
+# Карточка 2gis.ru/firm/{id}: документ и JS с 2gis.ru, контакты — XHR к
+# catalog.api.2gis.com / webapi.2gis.com. Тайлы и статистика не нужны.
+TWOGIS_CARD = InterceptionProfile(
+    name="2gis_card",
+    allow_hosts=("2gis.ru", "*.2gis.ru", "2gis.com", "*.2gis.com"),
+    block_hosts=(
+        "tile*.maps.2gis.com",
+        "tile*.2gis.com",
+        "*.tiles.2gis.com",
+        "stat.2gis.ru",
+        "*.stat.2gis.ru",
+        "stat.api.2gis.com",
+        "link.2gis.ru",  # трекер переходов на сайты
+        "ads.2gis.com",
+        "*.ads.2gis.com",
+    ),
+)
+
+# Я.Карты (карточка организации и выдача): документ с yandex.ru/.com, JS с
+# yastatic.net, данные — XHR к yandex.ru/maps/api; виджет SmartCaptcha —
+# с yandexcloud.net (нужен солверу). Тайлы (core-*.maps.yandex.net),
+# Метрика, рекламные yabs/an — мимо.
+YANDEX_MAPS = InterceptionProfile(
+    name="yandex_maps",
+    allow_hosts=(
+        "yandex.ru", "*.yandex.ru", "yandex.com", "*.yandex.com",
+        "yastatic.net", "*.yastatic.net", "*.maps.yandex.net",
+        "smartcaptcha.yandexcloud.net",
+    ),
+    block_hosts=(
+        "core-*.maps.yandex.net",
+        "mc.yandex.ru", "mc.yandex.com",
+        "an.yandex.ru", "yabs.yandex.ru", "yabs.yandex.com",
+        "strm.yandex.ru",
+    ),
+)
+
+
+async def apply_profile(context, profile: InterceptionProfile) -> InterceptionStats:
+    """Маршрутизирует все запросы контекста через профиль."""
+    stats = InterceptionStats()
+
+    async def _route(route) -> None:
+        request = route.request
+        try:
+            if profile.allows(request.url, request.resource_type):
+                stats.allowed += 1
+                await route.continue_()
+                return
+            stats.blocked += 1
+            stats.blocked_by_type[request.resource_type] = stats.blocked_by_type.get(request.resource_type, 0) + 1
+            await route.abort("blockedbyclient")
+        except Exception as e:
+            # Страница/контекст уже закрыты — запрос никому не нужен.
+            logger.debug("interception %s: %s", profile.name, e)
+
+    await context.route("**/*", _route)
+    return stats
@@ -35,6 +35,7 @@ from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.http_clients import shared_client
 from app.models.company_legal import CompanyLegal
 from app.models.maps import Company
 
@@ -116,6 +117,7 @@ async def _suggest(client: httpx.AsyncClient, query: str, count: int = 5) -> lis
             url,
             json={"query": query, "count": count},
             headers=_build_headers(),
+            timeout=_TIMEOUT,
         )
         latency_ms = int((perf_counter() - t0) * 1000)
         if r.is_success:
@@ -315,7 +317,7 @@ async def find_legal_for_company(company: Company) -> LegalMatch | None:
         logger.info("dadata: DADATA_API_KEY пуст — обогащение пропускается")
         return None
 
-    async with httpx.AsyncClient(timeout=_TIMEOUT) as client:
+    async with shared_client("api") as client:
         # 1. По телефону (самый сильный якорь).
         phone = _normalize_phone(company.phone)
         if phone:
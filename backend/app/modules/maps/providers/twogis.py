@@ -7,21 +7,36 @@
 - город → region_id через словарь CITY_TO_REGION_ID. Города вне списка → region_id=70000001
   (вся Россия) с последующей фильтрацией по адресу на уровне БД.
 - Прокси НЕ используем — Catalog API стабильно работает с прямым IP.
-- Rate limit: settings.TWOGIS_RATE_LIMIT_DELAY (default 1.1s) между запросами.
-- 401/403 → MissingAPIKeyError. 429 → backoff 30s × 3 ретрая. 5xx → backoff 5s × 3 ретрая.
+- Rate limit: распределённый лимитер (core.provider_limiter) на API-ключ,
+  общий для всех воркеров. Квота — map_provider_config.rate_limits["api"],
+  по умолчанию темп 1/TWOGIS_RATE_LIMIT_DELAY, всплеск TWOGIS_RATE_LIMIT_BURST.
+- Выдача: страница 1 даёт total, остальные страницы качаются параллельно
+  под тем же лимитом, в полёте — не больше burst квоты.
+- 401/403 → MissingAPIKeyError. 429 → пауза лимита для всех воркеров по
+  Retry-After, иначе экспоненциальный backoff с jitter; 5xx/сеть — тот же
+  backoff; после _MAX_ATTEMPTS → RateLimitError.
 """
 
 from __future__ import annotations
 
 import asyncio
+import itertools
 import logging
+import math
+import random
+import time
+from collections import deque
 from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from typing import Any, AsyncIterator
 from urllib.parse import urlencode
 
 import httpx
 
+from app.core import provider_limiter
 from app.core.config import settings
+from app.core.http_clients import shared_client
+from app.core.provider_limiter import Quota
 from app.modules.maps.providers.base import (
     CaptchaWallError,  # noqa: F401 — для единообразия импортов, тут не используется
     MapProvider,
@@ -129,6 +144,39 @@ def resolve_region_id(city: str) -> int:
 # celery-воркера / backend'а — достаточно, перезапуски редкие.
 _DYNAMIC_REGION_CACHE: dict[str, int] = {}
 
+_MAX_ATTEMPTS = 5
+_BACKOFF_BASE_SECONDS = 1.0
+
+
+def _retry_after_seconds(headers: httpx.Headers) -> float | None:
+    """Retry-After (секунды или HTTP-date) / RateLimit-Reset (секунды)."""
+    for name in ("Retry-After", "RateLimit-Reset", "X-RateLimit-Reset"):
+        raw = (headers.get(name) or "").strip()
+        if not raw:
+            continue
+        try:
+            value = float(raw)
+        except ValueError:
+            try:
+                value = (parsedate_to_datetime(raw) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                continue
+        else:
+            # X-RateLimit-Reset бывает unix-временем, а не интервалом
+            if value > 1e9:
+                value -= time.time()
+        return max(0.0, value)
+    return None
+
+
+def _backoff_delay(attempt: int, headers: httpx.Headers | None = None) -> float:
+    """Пауза перед повтором: из заголовков ответа, иначе full-jitter экспонента."""
+    hinted = _retry_after_seconds(headers) if headers is not None else None
+    cap = settings.TWOGIS_BACKOFF_MAX_SECONDS
+    if hinted is not None:
+        return min(cap, hinted)
+    return random.uniform(0, min(cap, _BACKOFF_BASE_SECONDS * 2 ** attempt))
+
 
 async def _resolve_region_id_via_api(city: str, api_key: str) -> int | None:
     """Дёргает 2GIS /region/search для точного region_id города.
@@ -140,8 +188,8 @@ async def _resolve_region_id_via_api(city: str, api_key: str) -> int | None:
         return None
     url = f"{BASE_URL_2}/region/search"
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, params={"q": city, "key": api_key})
+        async with shared_client("api") as client:
+            resp = await client.get(url, params={"q": city, "key": api_key}, timeout=10.0)
             if resp.status_code != 200:
                 logger.warning(
                     "2gis region/search http %d for %r: %s",
@@ -403,12 +451,21 @@ class TwoGisProvider(MapProvider):
                 "TWOGIS_API_KEY не задан ни в БД-настройках, ни в Settings/env. "
                 "Получить ключ: https://dev.2gis.com или задайте через UI /app/settings/maps-providers"
             )
+        if rate_limit_delay is not None:
+            self._quota = Quota(
+                per_minute=60 / rate_limit_delay if rate_limit_delay > 0 else 0,
+                burst=settings.TWOGIS_RATE_LIMIT_BURST,
+            )
+        else:
+            from app.modules.maps.providers_settings_service import load_provider_quota
+            self._quota = load_provider_quota("twogis", "api")
 
     async def _request(self, client: httpx.AsyncClient, url: str, params: dict[str, Any]) -> dict[str, Any]:
-        """Один запрос с retry-логикой:
+        """Один запрос с retry-логикой, каждая попытка — в слоте лимита ключа:
         - 401/403 → MissingAPIKeyError (ключ битый или отозван)
-        - 429 → backoff 30s, до 3 ретраев → RateLimitError
-        - 5xx → backoff 5s, до 3 ретраев → последний raise
+        - 429 → пауза лимита у всех воркеров по Retry-After (или jitter-экспонента),
+          до _MAX_ATTEMPTS попыток → RateLimitError
+        - 5xx / сеть → jitter-экспонента, до _MAX_ATTEMPTS → последний raise
         - 2xx → возвращаем json
         """
         from time import perf_counter
@@ -416,7 +473,8 @@ class TwoGisProvider(MapProvider):
         from app.core.api_tracker import log_call
 
         last_exc: Exception | None = None
-        for attempt in range(3):
+        for attempt in range(_MAX_ATTEMPTS):
+            await provider_limiter.acquire("twogis", self._api_key, self._quota)
             t0 = perf_counter()
             try:
                 resp = await client.get(url, params=params)
@@ -427,7 +485,7 @@ class TwoGisProvider(MapProvider):
                     "2gis", url, method="GET", ok=False, error=str(e),
                     latency_ms=int((perf_counter() - t0) * 1000),
                 )
-                await asyncio.sleep(5)
+                await asyncio.sleep(_backoff_delay(attempt))
                 continue
 
             status = resp.status_code
@@ -439,20 +497,27 @@ class TwoGisProvider(MapProvider):
                 )
                 raise MissingAPIKeyError(f"2GIS ответил {status} на {url} — ключ невалиден/отозван")
             if status == 429:
-                logger.warning("2gis %s: 429 rate-limited (attempt %d), backoff 30s", url, attempt + 1)
+                # Лимит общий на ключ — притормаживаем всех, а не только эту корутину.
+                delay = _backoff_delay(attempt, resp.headers)
+                await provider_limiter.penalize("twogis", self._api_key, delay)
+                logger.warning(
+                    "2gis %s: 429 rate-limited (attempt %d), backoff %.1fs", url, attempt + 1, delay,
+                )
                 await log_call(
                     "2gis", url, method="GET", http_status=429,
                     ok=False, error="rate_limited", latency_ms=latency_ms,
                 )
-                await asyncio.sleep(30)
                 continue
             if status >= 500:
-                logger.warning("2gis %s: %d server error (attempt %d), backoff 5s", url, status, attempt + 1)
+                delay = _backoff_delay(attempt, resp.headers)
+                logger.warning(
+                    "2gis %s: %d server error (attempt %d), backoff %.1fs", url, status, attempt + 1, delay,
+                )
                 await log_call(
                     "2gis", url, method="GET", http_status=status,
                     ok=False, error="server_error", latency_ms=latency_ms,
                 )
-                await asyncio.sleep(5)
+                await asyncio.sleep(delay)
                 continue
             resp.raise_for_status()
             data = resp.json()
@@ -499,7 +564,7 @@ class TwoGisProvider(MapProvider):
 
         if last_exc:
             raise last_exc
-        raise RateLimitError(f"2GIS rate limit/server error не отпустил после 3 ретраев: {url}")
+        raise RateLimitError(f"2GIS rate limit/server error не отпустил после {_MAX_ATTEMPTS} попыток: {url}")
 
     async def _get_region_id(self, city: str) -> int:
         """Резолвит region_id для города: сначала хардкод-словарь, затем
@@ -545,8 +610,8 @@ class TwoGisProvider(MapProvider):
             "fields": "items.point,items.adm_div,items.full_address_name",
         }
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.get(url, params=params)
+            async with shared_client("api") as client:
+                resp = await client.get(url, params=params, timeout=10.0)
                 if resp.status_code != 200:
                     logger.warning("2gis geocode http %d for %r", resp.status_code, address)
                     return None
@@ -650,69 +715,101 @@ class TwoGisProvider(MapProvider):
                 is_satellite_city = True
                 common["q"] = f"{niche} {city}"
 
-        yielded = 0
-        page = 1
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            while yielded < limit:
-                params = {**common, "page": page}
-                logger.info(
-                    "2gis search: niche=%r city=%r region_id=%s point=%s radius=%s page=%d yielded=%d",
-                    niche, city, region_id,
-                    common.get("point"), common.get("radius"),
-                    page, yielded,
-                )
-                data = await self._request(client, url, params)
-
-                # Структура: {"meta": {...}, "result": {"items": [...], "total": N}}
-                result = (data.get("result") or {})
-                items = result.get("items") or []
-                total = int(result.get("total") or 0)
-                if not items:
-                    break
+        def _accept(item: dict[str, Any]) -> CompanyRaw | None:
+            # Для города-сателлита (Балашиха в region_id=32 Москвы)
+            # фильтруем: оставляем только компании, у которых реальный
+            # adm_div.type=city.name совпадает с нашим запросом. Если
+            # adm_div не пришёл — фолбэк на проверку full_address_name.
+            if is_satellite_city:
+                real_city = _extract_real_city(item)
+                full_addr = (item.get("full_address_name") or "").lower()
+                match = False
+                if real_city and real_city.lower() == city_norm:
+                    match = True
+                elif not real_city and city_norm in full_addr:
+                    match = True
+                if not match:
+                    return None
 
-                for item in items:
-                    if yielded >= limit:
-                        break
-                    # Для города-сателлита (Балашиха в region_id=32 Москвы)
-                    # фильтруем: оставляем только компании, у которых реальный
-                    # adm_div.type=city.name совпадает с нашим запросом. Если
-                    # adm_div не пришёл — фолбэк на проверку full_address_name.
-                    if is_satellite_city:
-                        real_city = _extract_real_city(item)
-                        full_addr = (item.get("full_address_name") or "").lower()
-                        match = False
-                        if real_city and real_city.lower() == city_norm:
-                            match = True
-                        elif not real_city and city_norm in full_addr:
-                            match = True
-                        if not match:
-                            continue
+            company = _map_item_to_company_raw(item)
+            if company is None:
+                return None
+            company.niche = niche
+            # city берём из реального адреса 2GIS, не из нашего запроса —
+            # иначе при region_id=32 все компании окажутся помечены как
+            # Москва (или, наоборот, как Балашиха, если юзер искал её).
+            company.city = _extract_real_city(item) or city
+            return company
+
+        async def _fetch_page(client: httpx.AsyncClient, page: int) -> list[dict[str, Any]]:
+            nonlocal total
+            logger.info(
+                "2gis search: niche=%r city=%r region_id=%s point=%s radius=%s page=%d",
+                niche, city, region_id, common.get("point"), common.get("radius"), page,
+            )
+            data = await self._request(client, url, {**common, "page": page})
+            # Структура: {"meta": {...}, "result": {"items": [...], "total": N}}
+            result = data.get("result") or {}
+            total = total or int(result.get("total") or 0)
+            return result.get("items") or []
 
-                    company = _map_item_to_company_raw(item)
-                    if company is None:
-                        continue
-                    company.niche = niche
-                    # city берём из реального адреса 2GIS, не из нашего запроса —
-                    # иначе при region_id=32 все компании окажутся помечены как
-                    # Москва (или, наоборот, как Балашиха, если юзер искал её).
-                    real_city = _extract_real_city(item)
-                    company.city = real_city or city
+        yielded = 0
+        total = 0
+        async with shared_client("api") as client:
+            # Страница 1 — последовательно: из неё узнаём total.
+            items = await _fetch_page(client, 1)
+            for item in items:
+                if yielded >= limit:
+                    return
+                company = _accept(item)
+                if company is not None:
                     yield company
                     yielded += 1
+            if yielded >= limit or yielded >= total or len(items) < PAGE_SIZE:
+                return
 
-                if yielded >= total or len(items) < PAGE_SIZE:
-                    break
-
-                if page >= MAX_PAGES:
-                    logger.info(
-                        "2gis search: достигнут потолок страниц (%d) на free-плане, "
-                        "yielded=%d (max %d на free)",
-                        MAX_PAGES, yielded, MAX_PAGES * PAGE_SIZE,
-                    )
-                    break
-
-                page += 1
-                await asyncio.sleep(self._delay)
+            # Остальные страницы — параллельно; темп задаёт лимитер ключа.
+            # Для сателлита фильтр отбрасывает часть выдачи, поэтому страниц
+            # нужно столько, сколько есть, а не сколько хватит на limit.
+            last_page = math.ceil(total / PAGE_SIZE)
+            if not is_satellite_city:
+                last_page = min(last_page, math.ceil(limit / PAGE_SIZE))
+            if last_page > MAX_PAGES:
+                logger.info(
+                    "2gis search: достигнут потолок страниц (%d) на free-плане, "
+                    "total=%d (max %d на free)",
+                    MAX_PAGES, total, MAX_PAGES * PAGE_SIZE,
+                )
+                last_page = MAX_PAGES
+            # В полёте — не больше burst квоты ключа: каждая задача сразу
+            # занимает слот лимитера, и на раннем выходе (limit набран,
+            # короткая страница) занятые наперёд слоты ждали бы все воркеры.
+            # Отменённое ожидание слот возвращает, но окно держит их мало.
+            window = max(1, self._quota.burst)
+            pages = iter(range(2, last_page + 1))
+            pending: deque[asyncio.Task] = deque(
+                asyncio.create_task(_fetch_page(client, p)) for p in itertools.islice(pages, window)
+            )
+            try:
+                # Отдаём в порядке страниц, как и раньше.
+                while pending:
+                    items = await pending.popleft()
+                    next_page = next(pages, None)
+                    if next_page is not None:
+                        pending.append(asyncio.create_task(_fetch_page(client, next_page)))
+                    for item in items:
+                        if yielded >= limit:
+                            return
+                        company = _accept(item)
+                        if company is not None:
+                            yield company
+                            yielded += 1
+                    if len(items) < PAGE_SIZE:
+                        return
+            finally:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
 
     async def fetch_reviews(
         self,
@@ -768,7 +865,7 @@ class TwoGisProvider(MapProvider):
 
         yielded = 0
         offset = 0
-        async with httpx.AsyncClient(timeout=15.0) as client:
+        async with shared_client("api") as client:
             while yielded < limit:
                 params = {**common, "offset": offset}
                 logger.debug(
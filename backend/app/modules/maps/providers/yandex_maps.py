@@ -13,9 +13,12 @@ Server-side HTML содержит только метаданные сайта (
 - Прокси обязателен в проде (USE_PROXY=true + PROXY_LIST в Settings).
   Без прокси Я.Карты быстро банят IP (особенно с серверных диапазонов).
 - При капче (SmartCaptcha) пробуем solve_yandex_smartcaptcha. Три подряд → CaptchaWallError.
+- Темп поисков на прокси — квота yandex_maps/api распределённого лимитера
+  (core.provider_limiter), по умолчанию раз в YANDEX_MAPS_RATE_LIMIT_DELAY.
 
 Зависимости:
-- playwright (chromium-headless-shell установлен в Docker-образе backend)
+- playwright (chromium-headless-shell установлен в Docker-образе backend);
+  браузер берётся в аренду из пула воркера (app/modules/maps/browser_pool.py)
 - backend/app/modules/searches/providers/common.py — get_proxy_config (для прокси), fetch_with_retry (для reviews)
 - backend/app/modules/captcha/solver.py — solve_yandex_smartcaptcha(html, url, db)
 
@@ -37,8 +40,11 @@ import httpx
 from bs4 import BeautifulSoup
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import provider_limiter
 from app.core.config import settings
 from app.modules.captcha.solver import solve_yandex_smartcaptcha
+from app.modules.maps import browser_pool, interception
+from app.modules.maps.providers_settings_service import load_provider_quota
 from app.modules.maps.providers.base import (
     CaptchaWallError,
     MapProvider,
@@ -373,134 +379,127 @@ class YandexMapsProvider(MapProvider):
         proxy_url = get_proxy_config() if self._use_proxy else None
         proxy_arg = _playwright_proxy_from_url(proxy_url)
 
-        from playwright.async_api import async_playwright, TimeoutError as PWTimeout
+        from playwright.async_api import TimeoutError as PWTimeout
 
         collected: dict[str, CompanyRaw] = {}
+        # Поиски через один прокси — в темпе квоты yandex_maps/api, общей
+        # для всех воркеров (core.provider_limiter).
+        await provider_limiter.acquire("yandex_maps", proxy_url, load_provider_quota("yandex_maps", "api"))
         try:
-            async with async_playwright() as pw:
-                browser = await pw.chromium.launch(
-                    headless=True,
-                    proxy=proxy_arg,
-                    args=[
-                        "--disable-blink-features=AutomationControlled",
-                        "--no-sandbox",
-                        "--disable-dev-shm-usage",
-                    ],
-                )
+            async with browser_pool.lease(
+                proxy=proxy_arg,
+                user_agent=_PLAYWRIGHT_UA,
+                locale="ru-RU",
+                viewport={"width": 1366, "height": 900},
+                extra_http_headers=_PLAYWRIGHT_HEADERS,
+            ) as ctx:
+                # Выдачу парсим из DOM сниппетов — тайлы, картинки и Метрика не нужны.
+                await interception.apply_profile(ctx, interception.YANDEX_MAPS)
+                page = await ctx.new_page()
                 try:
-                    ctx = await browser.new_context(
-                        user_agent=_PLAYWRIGHT_UA,
-                        locale="ru-RU",
-                        viewport={"width": 1366, "height": 900},
-                        extra_http_headers=_PLAYWRIGHT_HEADERS,
+                    await page.goto(url, wait_until="domcontentloaded", timeout=_PAGE_TIMEOUT_MS)
+                except PWTimeout:
+                    logger.warning(
+                        "yandex_maps: page.goto timeout url=%s proxy=%s",
+                        url, bool(proxy_arg),
                     )
-                    page = await ctx.new_page()
-                    try:
-                        await page.goto(url, wait_until="domcontentloaded", timeout=_PAGE_TIMEOUT_MS)
-                    except PWTimeout:
-                        logger.warning(
-                            "yandex_maps: page.goto timeout url=%s proxy=%s",
-                            url, bool(proxy_arg),
-                        )
-                        return
+                    return
+
+                # Если редирект на /showcaptcha — это капча. SmartCaptcha solver работает
+                # с HTML (через data-sitekey), нам нужен HTML страницы капчи.
+                if "/showcaptcha" in page.url.lower() or "/checkcaptcha" in page.url.lower():
+                    logger.warning(
+                        "yandex_maps: captcha redirect landed=%s query=%r proxy=%s",
+                        page.url, query, bool(proxy_arg),
+                    )
+                    captcha_html = await page.content()
+                    await self._solve_captcha_or_raise(captcha_html, page.url, 1)
+                    # token получили, но в Playwright его не применить простым cookie —
+                    # это требует отдельной формы submit. Пока — отступаем.
+                    raise CaptchaWallError("Yandex Maps: капча, solver-flow в Playwright не реализован")
 
-                    # Если редирект на /showcaptcha — это капча. SmartCaptcha solver работает
-                    # с HTML (через data-sitekey), нам нужен HTML страницы капчи.
-                    if "/showcaptcha" in page.url.lower() or "/checkcaptcha" in page.url.lower():
-                        logger.warning(
-                            "yandex_maps: captcha redirect landed=%s query=%r proxy=%s",
-                            page.url, query, bool(proxy_arg),
-                        )
-                        captcha_html = await page.content()
-                        await self._solve_captcha_or_raise(captcha_html, page.url, 1)
-                        # token получили, но в Playwright его не применить простым cookie —
-                        # это требует отдельной формы submit. Пока — отступаем.
-                        raise CaptchaWallError("Yandex Maps: капча, solver-flow в Playwright не реализован")
-
-                    try:
-                        await page.wait_for_selector(".search-business-snippet-view", timeout=_LIST_TIMEOUT_MS)
-                    except PWTimeout:
-                        # Карточек не появилось — либо пустая выдача, либо капча, либо изменилась вёрстка.
-                        # 2026-07-14: подробное логирование, чтобы отличить причины в проде
-                        # (за сутки yandex может изменить класс карточки — тогда селектор просто
-                        # не появится, а мы молча возвращали 0 без сигнала).
-                        html_check = await page.content()
-                        low = html_check.lower()
-                        if any(k in low for k in ("showcaptcha", "smartcaptcha", "checkcaptcha")):
-                            logger.warning(
-                                "yandex_maps: SmartCaptcha wall on results page url=%s query=%r",
-                                page.url, query,
-                            )
-                            raise CaptchaWallError("Yandex Maps: SmartCaptcha на странице выдачи")
-                        # Собираем диагностику: URL, длина HTML, наличие типовых классов.
-                        markers = {
-                            "search_business_snippet_view": ".search-business-snippet-view" in html_check,
-                            "search_list_view": "search-list-view" in low,
-                            "business_segments_list_view": "business-segments-list-view" in low,
-                            "nothing_found": ("ничего не найдено" in low) or ("nothing found" in low),
-                            "generic_maps_home": "search-form-view__input" in html_check and ".search-business-snippet-view" not in html_check,
-                        }
+                try:
+                    await page.wait_for_selector(".search-business-snippet-view", timeout=_LIST_TIMEOUT_MS)
+                except PWTimeout:
+                    # Карточек не появилось — либо пустая выдача, либо капча, либо изменилась вёрстка.
+                    # 2026-07-14: подробное логирование, чтобы отличить причины в проде
+                    # (за сутки yandex может изменить класс карточки — тогда селектор просто
+                    # не появится, а мы молча возвращали 0 без сигнала).
+                    html_check = await page.content()
+                    low = html_check.lower()
+                    if any(k in low for k in ("showcaptcha", "smartcaptcha", "checkcaptcha")):
                         logger.warning(
-                            "yandex_maps: selector .search-business-snippet-view не появился за %dмс. "
-                            "url=%s final_url=%s query=%r html_len=%d markers=%s html_head=%r",
-                            _LIST_TIMEOUT_MS, url, page.url, query, len(html_check), markers,
-                            html_check[:400],
+                            "yandex_maps: SmartCaptcha wall on results page url=%s query=%r",
+                            page.url, query,
                         )
-                        return
-
-                    # Я.Карты используют ВИРТУАЛИЗИРОВАННЫЙ скролл: в DOM лежат только видимые
-                    # карточки. Поэтому накапливаем инкрементально — парсим текущий HTML
-                    # после каждого скролла, дедуплицируем по external_id, и так до потолка.
-                    no_growth_iters = 0
-                    for _ in range(_SCROLL_MAX_ITERATIONS):
-                        page_html = await page.content()
-                        for company in _parse_search_cards_from_html(page_html):
-                            if company.external_id and company.external_id not in collected:
-                                collected[company.external_id] = company
-                        if len(collected) >= limit:
-                            break
-
-                        prev = len(collected)
-                        # Скроллим именно сайдбар выдачи, не window. Селектор контейнера
-                        # выдачи менялся за релизы — пробуем несколько fallback'ов.
-                        await page.evaluate(
-                            f"""() => {{
-                                const candidates = [
-                                    '.scroll__container',
-                                    '.search-list-view__list',
-                                    '[class*="search-list-view"]',
-                                    '.business-segments-list-view',
-                                ];
-                                for (const sel of candidates) {{
-                                    const el = document.querySelector(sel);
-                                    if (el && el.scrollHeight > el.clientHeight + 10) {{
-                                        el.scrollBy(0, {_SCROLL_STEP_PX});
-                                        return sel;
-                                    }}
+                        raise CaptchaWallError("Yandex Maps: SmartCaptcha на странице выдачи")
+                    # Собираем диагностику: URL, длина HTML, наличие типовых классов.
+                    markers = {
+                        "search_business_snippet_view": ".search-business-snippet-view" in html_check,
+                        "search_list_view": "search-list-view" in low,
+                        "business_segments_list_view": "business-segments-list-view" in low,
+                        "nothing_found": ("ничего не найдено" in low) or ("nothing found" in low),
+                        "generic_maps_home": "search-form-view__input" in html_check and ".search-business-snippet-view" not in html_check,
+                    }
+                    logger.warning(
+                        "yandex_maps: selector .search-business-snippet-view не появился за %dмс. "
+                        "url=%s final_url=%s query=%r html_len=%d markers=%s html_head=%r",
+                        _LIST_TIMEOUT_MS, url, page.url, query, len(html_check), markers,
+                        html_check[:400],
+                    )
+                    return
+
+                # Я.Карты используют ВИРТУАЛИЗИРОВАННЫЙ скролл: в DOM лежат только видимые
+                # карточки. Поэтому накапливаем инкрементально — парсим текущий HTML
+                # после каждого скролла, дедуплицируем по external_id, и так до потолка.
+                no_growth_iters = 0
+                for _ in range(_SCROLL_MAX_ITERATIONS):
+                    page_html = await page.content()
+                    for company in _parse_search_cards_from_html(page_html):
+                        if company.external_id and company.external_id not in collected:
+                            collected[company.external_id] = company
+                    if len(collected) >= limit:
+                        break
+
+                    prev = len(collected)
+                    # Скроллим именно сайдбар выдачи, не window. Селектор контейнера
+                    # выдачи менялся за релизы — пробуем несколько fallback'ов.
+                    await page.evaluate(
+                        f"""() => {{
+                            const candidates = [
+                                '.scroll__container',
+                                '.search-list-view__list',
+                                '[class*="search-list-view"]',
+                                '.business-segments-list-view',
+                            ];
+                            for (const sel of candidates) {{
+                                const el = document.querySelector(sel);
+                                if (el && el.scrollHeight > el.clientHeight + 10) {{
+                                    el.scrollBy(0, {_SCROLL_STEP_PX});
+                                    return sel;
                                 }}
-                                window.scrollBy(0, {_SCROLL_STEP_PX});
-                                return 'window';
-                            }}"""
-                        )
-                        await page.wait_for_timeout(_SCROLL_WAIT_MS)
-                        if len(collected) == prev:
-                            no_growth_iters += 1
-                            if no_growth_iters >= _SCROLL_NO_GROWTH_STOP:
-                                # Потолок: Я.Карты больше карточек не отдают.
-                                # (либо реально всё, либо capped серверной стороной).
-                                logger.info(
-                                    "yandex_maps: no growth for %d iters, stop at %d companies",
-                                    _SCROLL_NO_GROWTH_STOP, len(collected),
-                                )
-                                break
-                        else:
-                            no_growth_iters = 0
-                    logger.info(
-                        "yandex_maps: search '%s %s' — собрано %d компаний за %d скроллов",
-                        niche, city, len(collected), _ + 1,
+                            }}
+                            window.scrollBy(0, {_SCROLL_STEP_PX});
+                            return 'window';
+                        }}"""
                     )
-                finally:
-                    await browser.close()
+                    await page.wait_for_timeout(_SCROLL_WAIT_MS)
+                    if len(collected) == prev:
+                        no_growth_iters += 1
+                        if no_growth_iters >= _SCROLL_NO_GROWTH_STOP:
+                            # Потолок: Я.Карты больше карточек не отдают.
+                            # (либо реально всё, либо capped серверной стороной).
+                            logger.info(
+                                "yandex_maps: no growth for %d iters, stop at %d companies",
+                                _SCROLL_NO_GROWTH_STOP, len(collected),
+                            )
+                            break
+                    else:
+                        no_growth_iters = 0
+                logger.info(
+                    "yandex_maps: search '%s %s' — собрано %d компаний за %d скроллов",
+                    niche, city, len(collected), _ + 1,
+                )
         except CaptchaWallError:
             raise
         except Exception as e:
@@ -35,6 +35,8 @@ class MapProviderConfigUpdate(BaseModel):
     secondary_key: Optional[str] = None
     is_enabled: Optional[bool] = None
     notes: Optional[str] = None
+    # {"api": {"per_minute": 150, "burst": 3}, "card": {...}}; null — дефолты Settings.
+    rate_limits: Optional[dict[str, dict[str, float]]] = None
 
 
 class TestResult(BaseModel):
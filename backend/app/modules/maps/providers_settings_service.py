@@ -13,11 +13,15 @@ __init__ для чтения ключей. Логика:
 
 Это сохраняет обратную совместимость: если админ ничего не менял в UI,
 ключи продолжают работать из .env.
+
+load_provider_quota() — то же для квот распределённого лимитера
+(core.provider_limiter): rate_limits[scope] из БД поверх дефолтов Settings.
 """
 
 from __future__ import annotations
 
 import logging
+import time
 from datetime import datetime
 from typing import Any, Optional
 
@@ -25,6 +29,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings as app_settings
+from app.core.provider_limiter import Quota
 from app.models.map_provider_config import MapProviderConfig
 from app.modules.maps.providers_registry import (
     MAPS_PROVIDER_REGISTRY,
@@ -63,6 +68,56 @@ async def get_all_configs(db: AsyncSession) -> list[MapProviderConfig]:
     return [rows[pid] for pid in get_all_provider_ids()]
 
 
+def default_rate_limits(provider_id: str) -> dict[str, dict[str, float]]:
+    """Квоты по областям, если в map_provider_config.rate_limits пусто.
+
+    - api: поиск/отзывы через API провайдера (на API-ключ или прокси);
+    - card: обогащение по карточке (2gis.ru/firm, yandex.ru/maps/org).
+    """
+    if provider_id == "twogis":
+        return {
+            "api": {"per_minute": 60 / app_settings.TWOGIS_RATE_LIMIT_DELAY, "burst": app_settings.TWOGIS_RATE_LIMIT_BURST},
+            "card": {"per_minute": app_settings.TWOGIS_CARD_RATE_PER_MINUTE, "burst": 1},
+        }
+    if provider_id == "yandex_maps":
+        return {
+            "api": {"per_minute": 60 / app_settings.YANDEX_MAPS_RATE_LIMIT_DELAY, "burst": 1},
+            "card": {"per_minute": app_settings.YANDEX_MAPS_CARD_RATE_PER_MINUTE, "burst": 2},
+        }
+    return {"api": {"per_minute": 60.0, "burst": 1}}
+
+
+def effective_rate_limits(row: MapProviderConfig) -> dict[str, dict[str, float]]:
+    """Дефолты провайдера, перекрытые тем, что задано в строке конфига."""
+    limits = default_rate_limits(row.provider_id)
+    for scope, quota in (row.rate_limits or {}).items():
+        if scope in limits:
+            limits[scope] = {**limits[scope], **quota}
+    return limits
+
+
+def _clean_rate_limits(provider_id: str, data: Any) -> Optional[dict[str, dict[str, float]]]:
+    """Валидирует rate_limits из PUT. Неизвестная область / нечисловая квота → ValueError."""
+    if not data:
+        return None
+    if not isinstance(data, dict):
+        raise ValueError("rate_limits: ожидается объект {область: {per_minute, burst}}")
+    allowed = default_rate_limits(provider_id)
+    out: dict[str, dict[str, float]] = {}
+    for scope, quota in data.items():
+        if scope not in allowed:
+            raise ValueError(f"rate_limits: неизвестная область {scope!r} (есть: {', '.join(allowed)})")
+        try:
+            per_minute = float(quota["per_minute"])
+            burst = int(quota.get("burst", allowed[scope]["burst"]))
+        except (TypeError, KeyError, ValueError):
+            raise ValueError(f"rate_limits.{scope}: нужны числа per_minute и burst")
+        if per_minute <= 0 or burst < 1:
+            raise ValueError(f"rate_limits.{scope}: per_minute > 0, burst >= 1")
+        out[scope] = {"per_minute": per_minute, "burst": burst}
+    return out
+
+
 def mask_value(value: Optional[str]) -> Optional[str]:
     """Маскирует секрет. Пустой → None (UI видит «ключ не задан»), есть → '***'."""
     if value:
@@ -86,6 +141,7 @@ def row_to_dict(row: MapProviderConfig) -> dict[str, Any]:
         "last_test_at": row.last_test_at,
         "last_test_result": row.last_test_result,
         "last_test_error": row.last_test_error,
+        "rate_limits": effective_rate_limits(row),
     }
 
 
@@ -136,6 +192,9 @@ async def update_config(db: AsyncSession, provider_id: str, data: dict[str, Any]
         row.is_enabled = bool(data["is_enabled"])
     if "notes" in data and data["notes"] is not None:
         row.notes = data["notes"]
+    if "rate_limits" in data:
+        row.rate_limits = _clean_rate_limits(provider_id, data["rate_limits"])
+        _quota_cache.pop(provider_id, None)
 
     row.is_configured = _compute_is_configured(provider_id, row.api_key, row.secondary_key)
     row.updated_at = datetime.utcnow()
@@ -250,6 +309,35 @@ def load_provider_keys(provider_id: str) -> dict[str, str]:
     return fallback
 
 
+# provider_id → (monotonic-время чтения, rate_limits из БД). Квота нужна на
+# каждый запрос к провайдеру — БД читаем не чаще раза в _QUOTA_CACHE_TTL.
+_QUOTA_CACHE_TTL = 60.0
+_quota_cache: dict[str, tuple[float, dict]] = {}
+
+
+def load_provider_quota(provider_id: str, scope: str = "api") -> Quota:
+    """СИНХРОННОЕ чтение квоты лимитера: rate_limits[scope] из БД → дефолт Settings.
+
+    Как и load_provider_keys, БД недоступна — работаем на дефолтах.
+    """
+    cached = _quota_cache.get(provider_id)
+    if cached is None or time.monotonic() - cached[0] > _QUOTA_CACHE_TTL:
+        from app.core.database import get_sync_session_factory
+
+        overrides: dict = {}
+        try:
+            SyncSessionLocal = get_sync_session_factory()
+            with SyncSessionLocal() as db:
+                row = db.query(MapProviderConfig).filter(MapProviderConfig.provider_id == provider_id).first()
+                overrides = dict(row.rate_limits or {}) if row else {}
+        except Exception as e:
+            logger.warning("load_provider_quota(%s) DB-read failed, using defaults: %s", provider_id, e)
+        cached = _quota_cache[provider_id] = (time.monotonic(), overrides)
+
+    quota = {**default_rate_limits(provider_id).get(scope, {"per_minute": 60.0, "burst": 1}), **cached[1].get(scope, {})}
+    return Quota(per_minute=float(quota["per_minute"]), burst=int(quota["burst"]))
+
+
 # ────────────────────────────────────────────────────────────────────
 # Test connection
 # ────────────────────────────────────────────────────────────────────
@@ -210,26 +210,27 @@ async def create_map_search(
         # /app/pains показывал 0 везде — sentiment/embeddings не считались,
         # pain_tags не строились. Теперь для КАЖДОЙ компании поиска ставим
         # analyze_reviews_for_company (идемпотентно — no-op если отзывы
-        # уже AI-обработаны), а потом с countdown=180с — recluster всей
-        # ниши/города. Пилот от cache-hit-ниш получит те же pain_tags, что
-        # и от свежепарсенных.
+        # уже AI-обработаны), а потом с countdown=180с — инкрементальное
+        # назначение тегов ниши/города (полный recluster — только для новой
+        # ниши или при переполнении пула ничейных). Пилот от cache-hit-ниш
+        # получит те же pain_tags, что и от свежепарсенных.
         if search.niche and search.city:
             all_company_ids = await service.list_search_all_company_ids(db, search.id)
             if all_company_ids:
                 try:
                     from app.modules.reviews_ai.tasks import (
                         analyze_reviews_for_company,
-                        recluster_pains_for_niche_task,
+                        assign_pains_incremental_task,
                     )
 
                     for cid in all_company_ids:
                         analyze_reviews_for_company.delay(cid)
-                    recluster_pains_for_niche_task.apply_async(
+                    assign_pains_incremental_task.apply_async(
                         args=[search.niche, search.city],
                         countdown=180,
                     )
                     logger.info(
-                        "create_map_search #%d from_cache: enqueued analyze for %d companies + recluster (%r, %r) in 180s",
+                        "create_map_search #%d from_cache: enqueued analyze for %d companies + pain assign (%r, %r) in 180s",
                         search.id,
                         len(all_company_ids),
                         search.niche,
@@ -7,7 +7,8 @@
 - create_map_search    — создать запись MapSearch, проверить кэш
 - check_cache          — есть ли свежий кэш на (niche, city, source)
 - save_companies_batch — UPSERT партии CompanyRaw + привязка к поиску
-- save_reviews_batch   — дедуп-вставка отзывов с derived sentiment
+- insert_reviews_batch — bulk-вставка отзывов с дедупом, возвращает id новых
+- save_reviews_batch   — то же, но возвращает только количество вставленных
 - update_company_aggregates — пересчёт reviews_*_count + last_review_at
 - get_search_results   — список компаний поиска с фильтрами
 - publish_progress_event — stub (полная реализация в ШАГе 12, SSE)
@@ -395,6 +396,11 @@ async def attach_sources_for_companies(
 # ---------------------------------------------------------------------------
 
 
+# Строк на один multi-VALUES INSERT. asyncpg ограничивает запрос 32767
+# bind-параметрами; у companies/company_sources ~16 колонок на строку, так
+# что 1000 строк укладываются с запасом.
+_BULK_CHUNK_ROWS = 1000
+
 # Карта: ключ contacts_extra → type в company_contacts
 _CONTACTS_EXTRA_TYPE_MAP = (
     ("phones", "phone"),
@@ -408,54 +414,9 @@ _CONTACTS_EXTRA_TYPE_MAP = (
 )
 
 
-async def _sync_company_to_multisource(db: AsyncSession, company: Company) -> None:
-    """Зеркалит данные companies.* в company_sources / company_contacts.
-
-    Дёргается из save_companies_batch и enrich-тасков после изменения companies.
-    Идемпотентна — повторный вызов на той же company безопасен (ON CONFLICT).
-
-    Phase 3 минимальная: матчинг к existing мульти-компаниям НЕ делается, новая
-    company всегда получает свой company_sources с match_confidence=1.00.
-    Склейку с другим источником (если найдётся) делает периодический Celery-job
-    `cron_dedup_multisource` (запускает скрипт scripts/dedup_multisource_phase2.py).
-    """
-    # 1. company_sources — UPSERT по (source, external_id)
-    src_ins = pg_insert(CompanySource).values(
-        company_id=company.id,
-        source=company.source,
-        external_id=company.external_id,
-        rating=company.rating,
-        reviews_count=company.reviews_count or 0,
-        reviews_positive_count=company.reviews_positive_count or 0,
-        reviews_negative_count=company.reviews_negative_count or 0,
-        reviews_neutral_count=company.reviews_neutral_count or 0,
-        has_owner_replies=company.has_owner_replies or False,
-        owner_replies_count=company.owner_replies_count or 0,
-        last_review_at=company.last_review_at,
-        raw_data=company.raw_data,
-        match_confidence=1.00,
-        matched_by="parser_sync",
-        last_parsed_at=func.now(),
-    ).on_conflict_do_update(
-        index_elements=["source", "external_id"],
-        set_={
-            "rating": company.rating,
-            "reviews_count": company.reviews_count or 0,
-            "reviews_positive_count": company.reviews_positive_count or 0,
-            "reviews_negative_count": company.reviews_negative_count or 0,
-            "reviews_neutral_count": company.reviews_neutral_count or 0,
-            "has_owner_replies": company.has_owner_replies or False,
-            "owner_replies_count": company.owner_replies_count or 0,
-            "last_review_at": company.last_review_at,
-            "raw_data": company.raw_data,
-            "last_parsed_at": func.now(),
-            "updated_at": func.now(),
-        },
-    ).returning(CompanySource.id)
-    cs_id = (await db.execute(src_ins)).scalar_one()
-
-    # 2. company_contacts — собираем все контакты компании в плоский список
-    contacts: list[tuple[str, str, bool]] = []  # (type, value, is_primary)
+def _company_contacts_flat(company: Company) -> list[tuple[str, str, bool]]:
+    """Все контакты companies.* плоским списком (type, value, is_primary)."""
+    contacts: list[tuple[str, str, bool]] = []
     if company.phone:
         contacts.append(("phone", company.phone, True))
     if company.website:
@@ -469,43 +430,155 @@ async def _sync_company_to_multisource(db: AsyncSession, company: Company) -> No
             for v in (extra.get(key) or []):
                 if isinstance(v, str) and v:
                     contacts.append((ctype, v, False))
+    return contacts
 
-    # UPSERT каждого. ON CONFLICT DO NOTHING — если такой контакт уже есть.
-    # Параллельно — собираем найденный website для пост-апдейта Company.website
-    # (см. ниже): на 2GIS Catalog API website часто NULL, Я.Карты его отдаёт
-    # отдельным контактом, но из-за этого `companies.website` оставался пустым
-    # и фронт показывал «нет сайта» при реально известном домене.
-    found_website: str | None = None
-    for ctype, value, is_primary in contacts:
-        # value лимит 500 — обрезаем чтобы не упереться в столбец
-        v = value[:500]
-        if ctype == "website" and not found_website:
-            found_website = v
-        contact_ins = pg_insert(CompanyContact).values(
-            company_source_id=cs_id,
-            company_id=company.id,
-            source=company.source,
-            type=ctype,
-            value=v,
-            is_primary=is_primary,
-        ).on_conflict_do_nothing(
-            index_elements=["company_source_id", "type", "value"],
-        )
-        await db.execute(contact_ins)
-
-    # Если у компании website ещё не выставлен (агрегированное поле для
-    # фильтров «нет сайта» / website_lead_score), а в текущем источнике он
-    # нашёлся — подтягиваем. NULLIF + COALESCE гарантирует что мы НЕ
-    # перепишем уже непустой website (другой источник имеет приоритет
-    # «первый нашёл»).
-    if found_website:
-        await db.execute(
-            text(
-                "UPDATE companies SET website = :w "
-                "WHERE id = :id AND (website IS NULL OR website = '')"
-            ),
-            {"w": found_website, "id": company.id},
-        )
+
+async def _sync_company_to_multisource(db: AsyncSession, company: Company) -> None:
+    """Зеркалит данные companies.* в company_sources / company_contacts.
+
+    Дёргается из enrich-тасков после изменения companies. Тонкая обёртка над
+    _sync_companies_to_multisource — одна компания обходится в те же три
+    запроса, сколько бы контактов у неё ни было.
+    """
+    await _sync_companies_to_multisource(db, [company])
+
+
+# Все контакты партии одним INSERT … SELECT FROM unnest(...): шесть
+# параметров-массивов вместо 6×N bind-параметров multi-VALUES — текст
+# запроса не зависит от размера партии, лимит asyncpg в 32767 параметров
+# не достижим.
+_CONTACTS_UNNEST_INSERT = text(
+    """
+    INSERT INTO company_contacts
+        (company_source_id, company_id, source, type, value, is_primary, created_at)
+    SELECT v.company_source_id, v.company_id, v.source, v.type, v.value, v.is_primary, NOW()
+    FROM unnest(
+        CAST(:company_source_ids AS BIGINT[]),
+        CAST(:company_ids AS BIGINT[]),
+        CAST(:sources AS VARCHAR[]),
+        CAST(:types AS VARCHAR[]),
+        CAST(:contact_values AS VARCHAR[]),
+        CAST(:is_primary AS BOOLEAN[])
+    ) AS v(company_source_id, company_id, source, type, value, is_primary)
+    ON CONFLICT (company_source_id, type, value) DO NOTHING
+    """
+)
+
+# Если у компании website ещё не выставлен (агрегированное поле для
+# фильтров «нет сайта» / website_lead_score), а в текущем источнике он
+# нашёлся — подтягиваем. Условие на пустоту гарантирует что мы НЕ
+# перепишем уже непустой website (другой источник имеет приоритет
+# «первый нашёл»).
+_WEBSITE_BACKFILL_UPDATE = text(
+    """
+    UPDATE companies c
+    SET website = v.website
+    FROM unnest(CAST(:ids AS BIGINT[]), CAST(:websites AS VARCHAR[])) AS v(id, website)
+    WHERE c.id = v.id AND (c.website IS NULL OR c.website = '')
+    """
+)
+
+
+async def _sync_companies_to_multisource(db: AsyncSession, companies: list[Company]) -> None:
+    """Зеркалит companies.* партии компаний в company_sources / company_contacts.
+
+    Дёргается из save_companies_batch и (через _sync_company_to_multisource)
+    из enrich-тасков. Идемпотентна — повторный вызов безопасен (ON CONFLICT).
+    На партию уходит не больше трёх запросов: UPSERT company_sources, INSERT
+    контактов через unnest и UPDATE back-fill'а website.
+
+    Phase 3 минимальная: матчинг к existing мульти-компаниям НЕ делается, новая
+    company всегда получает свой company_sources с match_confidence=1.00.
+    Склейку с другим источником (если найдётся) делает периодический Celery-job
+    `cron_dedup_multisource` (запускает скрипт scripts/dedup_multisource_phase2.py).
+    """
+    if not companies:
+        return
+
+    # 1. company_sources — UPSERT по (source, external_id)
+    cs_id_by_key: dict[tuple[str, str], int] = {}
+    for i in range(0, len(companies), _BULK_CHUNK_ROWS):
+        chunk = companies[i : i + _BULK_CHUNK_ROWS]
+        src_ins = pg_insert(CompanySource).values([
+            {
+                "company_id": c.id,
+                "source": c.source,
+                "external_id": c.external_id,
+                "rating": c.rating,
+                "reviews_count": c.reviews_count or 0,
+                "reviews_positive_count": c.reviews_positive_count or 0,
+                "reviews_negative_count": c.reviews_negative_count or 0,
+                "reviews_neutral_count": c.reviews_neutral_count or 0,
+                "has_owner_replies": c.has_owner_replies or False,
+                "owner_replies_count": c.owner_replies_count or 0,
+                "last_review_at": c.last_review_at,
+                "raw_data": c.raw_data,
+                "match_confidence": 1.00,
+                "matched_by": "parser_sync",
+                "last_parsed_at": func.now(),
+            }
+            for c in chunk
+        ])
+        src_ins = src_ins.on_conflict_do_update(
+            index_elements=["source", "external_id"],
+            set_={
+                "rating": src_ins.excluded.rating,
+                "reviews_count": src_ins.excluded.reviews_count,
+                "reviews_positive_count": src_ins.excluded.reviews_positive_count,
+                "reviews_negative_count": src_ins.excluded.reviews_negative_count,
+                "reviews_neutral_count": src_ins.excluded.reviews_neutral_count,
+                "has_owner_replies": src_ins.excluded.has_owner_replies,
+                "owner_replies_count": src_ins.excluded.owner_replies_count,
+                "last_review_at": src_ins.excluded.last_review_at,
+                "raw_data": src_ins.excluded.raw_data,
+                "last_parsed_at": func.now(),
+                "updated_at": func.now(),
+            },
+        ).returning(CompanySource.id, CompanySource.source, CompanySource.external_id)
+        for cs_id, src, ext in (await db.execute(src_ins)).all():
+            cs_id_by_key[(src, ext)] = int(cs_id)
+
+    # 2. company_contacts — колонками-массивами под unnest. Параллельно
+    # собираем найденный website для back-fill'а Company.website: на 2GIS
+    # Catalog API website часто NULL, Я.Карты его отдаёт отдельным контактом,
+    # но из-за этого `companies.website` оставался пустым и фронт показывал
+    # «нет сайта» при реально известном домене.
+    cols: dict[str, list[Any]] = {
+        "company_source_ids": [], "company_ids": [], "sources": [],
+        "types": [], "contact_values": [], "is_primary": [],
+    }
+    seen: set[tuple[int, str, str]] = set()
+    website_ids: list[int] = []
+    website_values: list[str] = []
+    for c in companies:
+        cs_id = cs_id_by_key.get((c.source, c.external_id))
+        if cs_id is None:
+            continue
+        found_website: str | None = None
+        for ctype, value, is_primary in _company_contacts_flat(c):
+            # value лимит 500 — обрезаем чтобы не упереться в столбец
+            v = value[:500]
+            if ctype == "website" and not found_website:
+                found_website = v
+            if (cs_id, ctype, v) in seen:
+                continue
+            seen.add((cs_id, ctype, v))
+            cols["company_source_ids"].append(cs_id)
+            cols["company_ids"].append(c.id)
+            cols["sources"].append(c.source)
+            cols["types"].append(ctype)
+            cols["contact_values"].append(v)
+            cols["is_primary"].append(is_primary)
+        if found_website:
+            website_ids.append(c.id)
+            website_values.append(found_website)
+
+    if cols["company_source_ids"]:
+        await db.execute(_CONTACTS_UNNEST_INSERT, cols)
+
+    # 3. Back-fill companies.website — один UPDATE на всю партию.
+    if website_ids:
+        await db.execute(_WEBSITE_BACKFILL_UPDATE, {"ids": website_ids, "websites": website_values})
 
 
 # ---------------------------------------------------------------------------
@@ -554,15 +627,30 @@ async def save_companies_batch(
     start_position — позиция первой компании в текущей партии (для пагинации
     при стриминге; следующая партия должна передать start_position + len(prev_batch)).
 
-    Возвращает свежие ORM Company (уже с id).
+    Set-based: вся партия — один multi-VALUES INSERT … ON CONFLICT … RETURNING,
+    один INSERT в map_search_results, один SELECT свежих ORM-объектов и bulk-
+    зеркалирование в company_sources/company_contacts. Раньше на каждую
+    компанию уходило 5+ запросов (плюс по одному на каждый контакт) — на
+    поиске в 200 компаний это >1000 round trip'ов.
+
+    Возвращает свежие ORM Company (уже с id) в порядке партии.
     """
     if not companies_raw:
         return []
 
-    saved: list[Company] = []
+    # Дедуп внутри партии: ON CONFLICT DO UPDATE падает, если один и тот же
+    # (source, external_id) встречается в одном INSERT дважды. Побеждает
+    # последнее вхождение — так же вёл себя прежний построчный цикл
+    # (второй upsert перетирал первый, position — от последнего).
+    by_key: dict[tuple[str, str], tuple[int, dict[str, Any]]] = {}
     for offset, c in enumerate(companies_raw):
-        values = _company_row_from_raw(c)
-        ins = pg_insert(Company).values(**values)
+        by_key[(c.source, c.external_id)] = (start_position + offset, _company_row_from_raw(c))
+
+    items = list(by_key.items())
+    id_by_key: dict[tuple[str, str], int] = {}
+    for i in range(0, len(items), _BULK_CHUNK_ROWS):
+        chunk = items[i : i + _BULK_CHUNK_ROWS]
+        ins = pg_insert(Company).values([row for _, (_, row) in chunk])
         # On conflict — обновляем только то, что могло измениться (рейтинг, телефон, и т.п.).
         # external_id+source + name не трогаем.
         # emails/contacts_extra/contacts_enriched_at — COALESCE-merge: новое
@@ -590,35 +678,49 @@ async def save_companies_batch(
                 "raw_data": ins.excluded.raw_data,
                 "updated_at": func.now(),
             },
-        ).returning(Company.id)
-        result = await db.execute(ins)
-        company_id = result.scalar_one()
-
-        # Связь с поиском (на конфликт — обновляем position).
-        link = pg_insert(MapSearchResult).values(
-            map_search_id=search_id,
-            company_id=company_id,
-            position=start_position + offset,
-        ).on_conflict_do_update(
+        ).returning(Company.id, Company.source, Company.external_id)
+        # Порядок RETURNING не гарантирован — маппим обратно по ключу.
+        for cid, src, ext in (await db.execute(ins)).all():
+            id_by_key[(src, ext)] = int(cid)
+
+    # Связь с поиском одним INSERT (на конфликт — обновляем position).
+    link_rows = [
+        {"map_search_id": search_id, "company_id": id_by_key[key], "position": pos}
+        for key, (pos, _) in items
+    ]
+    for i in range(0, len(link_rows), _BULK_CHUNK_ROWS):
+        link = pg_insert(MapSearchResult).values(link_rows[i : i + _BULK_CHUNK_ROWS])
+        link = link.on_conflict_do_update(
             index_elements=["map_search_id", "company_id"],
-            set_={"position": start_position + offset},
+            set_={"position": link.excluded.position},
         )
         await db.execute(link)
 
-        # populate_existing=True — иначе при повторном вызове на ту же компанию
-        # identity map вернёт старую версию объекта (без свежего rating и т.п.)
-        company = await db.get(Company, company_id, populate_existing=True)
-        if company is not None:
-            saved.append(company)
-            # Phase 3 multi-source (миграция 028): зеркалим companies.* в новые
-            # company_sources / company_contacts таблицы, чтобы новые компании
-            # сразу попадали в multi-source структуру без отдельного backfill.
-            # Тихо проглатываем ошибки — старые поля companies.* остаются
-            # источником истины пока не пройдёт Phase 4 (API).
-            try:
-                await _sync_company_to_multisource(db, company)
-            except Exception:
-                logger.exception("multi-source sync failed for company=%d", company.id)
+    # populate_existing=True — иначе при повторном вызове на ту же компанию
+    # identity map вернёт старую версию объекта (без свежего rating и т.п.)
+    ordered_ids = [id_by_key[key] for key, _ in items]
+    loaded = (
+        await db.execute(
+            select(Company)
+            .where(Company.id.in_(ordered_ids))
+            .execution_options(populate_existing=True)
+        )
+    ).scalars().all()
+    by_id = {c.id: c for c in loaded}
+    saved: list[Company] = [by_id[cid] for cid in ordered_ids if cid in by_id]
+
+    # Phase 3 multi-source (миграция 028): зеркалим companies.* в новые
+    # company_sources / company_contacts таблицы, чтобы новые компании
+    # сразу попадали в multi-source структуру без отдельного backfill.
+    # Тихо проглатываем ошибки — старые поля companies.* остаются
+    # источником истины пока не пройдёт Phase 4 (API). SAVEPOINT нужен,
+    # чтобы упавший bulk-запрос не оставил всю транзакцию в aborted-состоянии.
+    if saved:
+        try:
+            async with db.begin_nested():
+                await _sync_companies_to_multisource(db, saved)
+        except Exception:
+            logger.exception("multi-source sync failed for batch of %d companies", len(saved))
 
     # Lead temperature (блок 3) + website_lead_score (блок 4). Пересчитываем
     # сразу после upsert — на этом этапе rating/reviews_count/контакты уже
@@ -670,28 +772,56 @@ def _review_row_from_raw(r: ReviewRaw, company_id: int) -> dict[str, Any]:
     }
 
 
-async def save_reviews_batch(
+async def insert_reviews_batch(
     db: AsyncSession,
     company_id: int,
     reviews_raw: list[ReviewRaw],
-) -> int:
-    """Вставляет отзывы с дедупом по (company_id, text_hash). Возвращает количество
-    действительно вставленных (без учёта тех, что уже были в БД)."""
-    if not reviews_raw:
-        return 0
+) -> list[int]:
+    """Вставляет партию отзывов с дедупом по (company_id, text_hash) одним
+    multi-row INSERT … ON CONFLICT DO NOTHING RETURNING id.
 
-    inserted = 0
+    text_hash считается в Python, дубли внутри партии схлопываются до запроса
+    (побеждает первое вхождение — как при прежней построчной вставке).
+    Возвращает id ДЕЙСТВИТЕЛЬНО вставленных отзывов — по ним parse_company_reviews
+    ставит reviews_ai-пайплайн ровно на новые строки.
+    """
+    rows: list[dict[str, Any]] = []
+    seen_hashes: set[str] = set()
     for r in reviews_raw:
         values = _review_row_from_raw(r, company_id)
-        if not values["text_hash"]:
+        h = values["text_hash"]
+        if not h or h in seen_hashes:
             continue
-        ins = pg_insert(Review).values(**values)
-        ins = ins.on_conflict_do_nothing(index_elements=["company_id", "text_hash"]).returning(Review.id)
-        row = (await db.execute(ins)).first()
-        if row is not None:
-            inserted += 1
+        seen_hashes.add(h)
+        rows.append(values)
+    if not rows:
+        return []
+
+    new_ids: list[int] = []
+    for i in range(0, len(rows), _BULK_CHUNK_ROWS):
+        ins = (
+            pg_insert(Review)
+            .values(rows[i : i + _BULK_CHUNK_ROWS])
+            .on_conflict_do_nothing(index_elements=["company_id", "text_hash"])
+            .returning(Review.id)
+        )
+        new_ids.extend(int(rid) for rid in (await db.execute(ins)).scalars().all())
     await db.commit()
-    return inserted
+    return new_ids
+
+
+async def save_reviews_batch(
+    db: AsyncSession,
+    company_id: int,
+    reviews_raw: list[ReviewRaw],
+) -> int:
+    """Вставляет отзывы с дедупом по (company_id, text_hash). Возвращает количество
+    действительно вставленных (без учёта тех, что уже были в БД).
+
+    Обёртка над insert_reviews_batch для вызывающих, которым нужен только счётчик."""
+    if not reviews_raw:
+        return 0
+    return len(await insert_reviews_batch(db, company_id, reviews_raw))
 
 
 # ---------------------------------------------------------------------------
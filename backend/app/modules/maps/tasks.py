@@ -1,6 +1,9 @@
 """Celery-задачи модуля maps.
 
-Sync-обёртки над async-кодом провайдеров и сервиса через asyncio.run.
+Sync-обёртки над async-кодом провайдеров и сервиса через redis_clients.run
+(asyncio.run + закрытие общих Redis-клиентов loop'а).
+Таски с Playwright — через browser_pool.run: Chromium общий на процесс
+воркера, в конце таски закрывается только драйвер её event loop'а.
 
 Очереди:
 - maps          — parse_map_search (главная оркестрация)
@@ -18,9 +21,10 @@ from datetime import datetime, timezone
 
 from sqlalchemy import select, text, update
 
+from app.core import redis_clients
 from app.core.database import AsyncSessionLocal
 from app.models.maps import Company, MapSearch
-from app.modules.maps import service
+from app.modules.maps import browser_pool, service
 from app.modules.maps.enrich import fetch_and_extract
 from app.modules.maps.providers.base import (
     CaptchaWallError,
@@ -46,7 +50,10 @@ PROVIDERS_REGISTRY = {
 # поисков, где 2GIS отвечает 5-10с на страницу). При 5 компаний flush —
 # первые карточки появляются в UI уже через 5-15 секунд после старта.
 COMPANIES_BATCH_SIZE = 5
-REVIEWS_BATCH_SIZE = 20
+# Отзывы пишутся одним multi-row INSERT на партию (service.insert_reviews_batch),
+# так что партия = MAPS_MAX_REVIEWS_PER_COMPANY по умолчанию: обычно вся
+# компания уходит одним запросом вместо 100 построчных.
+REVIEWS_BATCH_SIZE = 100
 
 
 # ---------------------------------------------------------------------------
@@ -447,23 +454,26 @@ async def _parse_map_search_async(search_id: int) -> None:
             # pain-pills с лейблами и счётчиками. countdown=180с — даём
             # analyze_reviews_for_company (sentiment + embeddings) сначала
             # отработать на парсенных отзывах, иначе кластеризовать нечего.
+            # Инкрементально: новые отзывы матчатся к существующим тегам,
+            # полный recluster (HDBSCAN + LLM-naming) — только для новой
+            # ниши или когда пул ничейных отзывов дорос до порога.
             if total_found > 0 and search.niche and search.city:
                 try:
-                    from app.modules.reviews_ai.tasks import recluster_pains_for_niche_task
+                    from app.modules.reviews_ai.tasks import assign_pains_incremental_task
 
-                    recluster_pains_for_niche_task.apply_async(
+                    assign_pains_incremental_task.apply_async(
                         args=[search.niche, search.city],
                         countdown=180,
                     )
                     logger.info(
-                        "parse_map_search #%d: scheduled recluster for (%r, %r) in 180s",
+                        "parse_map_search #%d: scheduled incremental pain assign for (%r, %r) in 180s",
                         search.id,
                         search.niche,
                         search.city,
                     )
                 except Exception as e:
                     logger.warning(
-                        "parse_map_search #%d: failed to schedule recluster for (%r, %r): %s",
+                        "parse_map_search #%d: failed to schedule pain assign for (%r, %r): %s",
                         search.id,
                         search.niche,
                         search.city,
@@ -483,7 +493,7 @@ async def _parse_map_search_async(search_id: int) -> None:
 def parse_map_search(self, search_id: int):
     """Главная задача парсинга поиска. См. _parse_map_search_async."""
     try:
-        asyncio.run(_parse_map_search_async(search_id))
+        browser_pool.run(_parse_map_search_async(search_id))
     except Exception as exc:
         logger.warning("parse_map_search retrying #%d: %s", search_id, exc)
         raise self.retry(exc=exc, countdown=30, max_retries=2)
@@ -514,24 +524,28 @@ async def _parse_company_reviews_async(company_id: int, source: str, limit: int)
             return 0
 
         batch: list[ReviewRaw] = []
-        total_inserted = 0
+        new_review_ids: list[int] = []
         try:
             async for review_raw in provider.fetch_reviews(company.external_id, limit=limit):
                 batch.append(review_raw)
                 if len(batch) >= REVIEWS_BATCH_SIZE:
-                    total_inserted += await service.save_reviews_batch(db, company.id, batch)
+                    new_review_ids += await service.insert_reviews_batch(db, company.id, batch)
                     batch = []
             if batch:
-                total_inserted += await service.save_reviews_batch(db, company.id, batch)
+                new_review_ids += await service.insert_reviews_batch(db, company.id, batch)
         except (CaptchaWallError, RateLimitError) as e:
             # ТРАНЗИЕНТНЫЕ — прокидываем наверх для Celery-retry (countdown=30с).
             # Раньше тихий return 0 терял отзывы при временной капче/rate-limit.
+            # Уже скачанную часть партии сохраняем до retry — дедуп по text_hash
+            # не даст ей задвоиться на повторном проходе.
             logger.warning(
                 "parse_company_reviews source=%s for company=%d транзиентная (будет retry): %s",
                 source,
                 company_id,
                 e,
             )
+            if batch:
+                await service.insert_reviews_batch(db, company.id, batch)
             raise
         except RuntimeError as e:
             # 2GIS reviews/list недоступен на free-плане (meta.code=404).
@@ -539,21 +553,25 @@ async def _parse_company_reviews_async(company_id: int, source: str, limit: int)
 
         await service.update_company_aggregates(db, company.id)
 
-    # AI-пайплайн ставим ВСЕГДА после успешного парсинга — даже когда
-    # total_inserted=0 (все отзывы уже были в БД с прошлого парсинга).
-    # Раньше тут было `if total_inserted > 0:` — но это значило, что компании,
-    # которые парсились ДО подключения reviews_ai, навсегда оставались без
-    # AI-анализа: повторный парсинг не вставляет новых отзывов, и таска не
-    # запускается. analyze_reviews_for_company сама проверяет какие отзывы
-    # имеют ai_processed_at IS NULL и no-op если всё обработано — поэтому
-    # ставить всегда безопасно и идемпотентно.
+    # AI-пайплайн ставим ВСЕГДА после успешного парсинга. Если вставились
+    # новые отзывы — цепляем analyze_reviews_batch на их id (без гонки с
+    # параллельным парсингом той же компании) и company_id: таска доберёт
+    # и старые отзывы компании с ai_processed_at IS NULL. Если новых нет
+    # (все отзывы уже были в БД с прошлого парсинга) —
+    # analyze_reviews_for_company: компании, которые парсились ДО
+    # подключения reviews_ai, иначе навсегда остались бы без AI-анализа.
+    # Она сама проверяет какие отзывы имеют ai_processed_at IS NULL и no-op,
+    # если всё обработано — поэтому ставить всегда безопасно и идемпотентно.
     try:
-        from app.modules.reviews_ai.tasks import analyze_reviews_for_company
+        from app.modules.reviews_ai.tasks import analyze_reviews_batch, analyze_reviews_for_company
 
-        analyze_reviews_for_company.delay(company_id)
+        if new_review_ids:
+            analyze_reviews_batch.delay(new_review_ids, company_id)
+        else:
+            analyze_reviews_for_company.delay(company_id)
     except Exception as e:
-        logger.warning("parse_company_reviews: не смог поставить analyze_reviews_for_company: %s", e)
-    return total_inserted
+        logger.warning("parse_company_reviews: не смог поставить reviews_ai-пайплайн: %s", e)
+    return len(new_review_ids)
 
 
 @celery_app.task(name="parse_company_reviews", queue="maps_reviews", bind=True, max_retries=2)
@@ -563,7 +581,7 @@ def parse_company_reviews(self, company_id: int, source: str, limit: int | None
 
     eff_limit = limit if limit is not None else settings.MAPS_MAX_REVIEWS_PER_COMPANY
     try:
-        return asyncio.run(_parse_company_reviews_async(company_id, source, eff_limit))
+        return redis_clients.run(_parse_company_reviews_async(company_id, source, eff_limit))
     except Exception as exc:
         logger.warning("parse_company_reviews retrying company=%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=30, max_retries=2)
@@ -587,9 +605,9 @@ def _maybe_enrich_contacts(company: Company, skip_yandex_html: bool = False) ->
         оно пропускало все компании, у которых Catalog API отдал хотя бы
         один телефон, и до мессенджеров/email/доп.телефонов мы не доходили.
 
-    Тихо проглатывает любые ошибки постановки тасков — само-rate-limit
-    у Celery, никакой массовой долбёжки 2GIS быть не должно (queue с
-    rate_limit=20/m + concurrency=1).
+    Тихо проглатывает любые ошибки постановки тасков — темп карточек 2GIS
+    держит общий на все воркеры provider_limiter ("twogis:card"), массовой
+    долбёжки 2GIS быть не должно.
     """
     try:
         if company.website and company.contacts_enriched_at is None:
@@ -855,7 +873,7 @@ def enrich_company_contacts(self, company_id: int):
     с пустым emails, чтобы не дёргать сайт повторно при каждом поиске.
     """
     try:
-        return asyncio.run(_enrich_company_contacts_async(company_id))
+        return redis_clients.run(_enrich_company_contacts_async(company_id))
     except Exception as exc:
         logger.warning("enrich_company_contacts retrying company=%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=20, max_retries=1)
@@ -1014,16 +1032,17 @@ async def _enrich_company_from_2gis_html_async(company_id: int) -> dict:
     queue="maps_2gis_html",
     bind=True,
     max_retries=1,
-    rate_limit="20/m",  # не агрессивим к 2GIS — 20 запросов/минуту максимум
 )
 def enrich_company_from_2gis_html(self, company_id: int):
-    """Качает 2gis.ru/firm/{external_id} и доливает контакты в БД.
+    """Контакты карточки 2gis.ru/firm/{external_id} → БД.
 
-    Отдельная очередь maps_2gis_html — чтобы можно было пускать worker с
-    --concurrency=1 и rate_limit, иначе 2GIS быстро отдаст 429/captcha.
+    Сначала items/byid по httpx, Chromium — только если API отказал
+    (enrich_2gis.fetch_and_extract_2gis_firm). Темп запросов — общий на все воркеры
+    лимит "twogis:card" (core.provider_limiter, квота из MapProviderConfig.rate_limits),
+    а не rate_limit Celery на процесс: иначе с ростом воркеров 2GIS отдаст 429/captcha.
     """
     try:
-        return asyncio.run(_enrich_company_from_2gis_html_async(company_id))
+        return browser_pool.run(_enrich_company_from_2gis_html_async(company_id))
     except Exception as exc:
         logger.warning("enrich_company_from_2gis_html retrying company=%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=60, max_retries=1)
@@ -1264,14 +1283,13 @@ async def _apply_yandex_enrich_to_company(db, company_id: int, result) -> dict:
     queue="maps_yandex_html",
     bind=True,
     max_retries=1,
-    rate_limit="6/m",  # 6 батчей/мин × 10 компаний = 60 компаний/мин (vs 20/m поштучно)
 )
 def enrich_companies_batch_yandex_html(self, company_ids: list[int]):
-    """Пакетный enrich: один Chromium на N компаний (в 6-8 раз быстрее).
+    """Пакетный enrich: N компаний в одной таске (одно прокси-окно).
 
     Заменяет поштучный enrich_company_from_yandex_html — вместо задачи на
-    каждую компанию, батч на 10 в одной Celery-таске. Chromium стартует
-    один раз и переиспользуется.
+    каждую компанию, батч на 10 в одной Celery-таске. Chromium берётся из
+    пула воркера (maps.browser_pool), на компанию — свой контекст.
 
     Жёсткий таймаут 8 минут на весь батч: 10 компаний × ~45с худший случай
     = 450с, +запас. Без него зависший батч (форк-бомба 15.08: 5759 chrome-
@@ -1279,7 +1297,7 @@ def enrich_companies_batch_yandex_html(self, company_ids: list[int]):
     жив — процессы плодились лавиной. TimeoutError = FAILED, не retry.
     """
     try:
-        return asyncio.run(
+        return browser_pool.run(
             asyncio.wait_for(
                 _enrich_companies_batch_yandex_html_async(company_ids),
                 timeout=480,
@@ -1364,16 +1382,16 @@ async def _enrich_companies_batch_yandex_html_async(company_ids: list[int]) -> d
     queue="maps_yandex_html",
     bind=True,
     max_retries=1,
-    rate_limit="20/m",  # тот же лимит что у 2GIS-енрича — Playwright + прокси, не агрессим
 )
 def enrich_company_from_yandex_html(self, company_id: int):
     """Качает yandex.ru/maps/org/{external_id}/ и доливает контакты в БД.
 
     Отдельная очередь maps_yandex_html — чтобы Playwright-таски не конкурировали
-    с легковесными httpx-задачами поиска. Concurrency=1 + rate_limit=20/m.
+    с легковесными httpx-задачами поиска. Темп карточек — общий на все воркеры
+    лимит "yandex_maps:card" на прокси (core.provider_limiter).
     """
     try:
-        return asyncio.run(_enrich_company_from_yandex_html_async(company_id))
+        return browser_pool.run(_enrich_company_from_yandex_html_async(company_id))
     except Exception as exc:
         logger.warning("enrich_company_from_yandex_html retrying company=%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=60, max_retries=1)
@@ -1412,7 +1430,7 @@ def generate_company_description(self, company_id: int):
     описания) и admin endpoint /maps/admin/queue-descriptions.
     """
     try:
-        return asyncio.run(_generate_company_description_async(company_id))
+        return redis_clients.run(_generate_company_description_async(company_id))
     except Exception as exc:
         logger.warning("generate_company_description retrying company=%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=30, max_retries=1)
@@ -1475,7 +1493,7 @@ async def _discover_company_website_async(company_id: int) -> dict:
 def discover_company_website(self, company_id: int):
     """Celery-обёртка для website discovery."""
     try:
-        return asyncio.run(_discover_company_website_async(company_id))
+        return redis_clients.run(_discover_company_website_async(company_id))
     except Exception as exc:
         logger.warning("discover_company_website retrying #%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=20, max_retries=1)
@@ -1504,7 +1522,7 @@ async def _enrich_company_legal_async(company_id: int) -> dict:
 def enrich_company_legal(self, company_id: int):
     """Обогащает компанию юр.данными из DaData. См. legal_enrich.py."""
     try:
-        return asyncio.run(_enrich_company_legal_async(company_id))
+        return redis_clients.run(_enrich_company_legal_async(company_id))
     except Exception as exc:
         logger.warning("enrich_company_legal retrying company=%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=30, max_retries=1)
@@ -1536,7 +1554,7 @@ async def _enrich_company_team_async(company_id: int) -> dict:
 def enrich_company_team(self, company_id: int):
     """Извлекает ЛПР со страниц сайта компании в company_decision_makers."""
     try:
-        return asyncio.run(_enrich_company_team_async(company_id))
+        return redis_clients.run(_enrich_company_team_async(company_id))
     except Exception as exc:
         logger.warning("enrich_company_team retrying company=%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=30, max_retries=1)
@@ -1567,7 +1585,7 @@ def enrich_company_hh(self, company_id: int):
     """Ищет активные маркетинговые вакансии компании на hh.ru.
     Сохраняет hiring_marketing флаг + контактное лицо вакансии."""
     try:
-        return asyncio.run(_enrich_company_hh_async(company_id))
+        return redis_clients.run(_enrich_company_hh_async(company_id))
     except Exception as exc:
         logger.warning("enrich_company_hh retrying company=%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=30, max_retries=1)
@@ -1592,7 +1610,7 @@ def enrich_company_vk(self, company_id: int):
     """Ищет группу ВКонтакте компании и извлекает публичные контакты
     сообщества. Без VK_SERVICE_TOKEN тихо возвращает skipped."""
     try:
-        return asyncio.run(_enrich_company_vk_async(company_id))
+        return redis_clients.run(_enrich_company_vk_async(company_id))
     except Exception as exc:
         logger.warning("enrich_company_vk retrying company=%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=30, max_retries=1)
@@ -1620,7 +1638,7 @@ def enrich_company_prodoctorov(self, company_id: int):
     """Ищет клинику на prodoctorov.ru и обогащает контактами + главврачом.
     Для не-медицинских компаний возвращает skipped."""
     try:
-        return asyncio.run(_enrich_company_prodoctorov_async(company_id))
+        return redis_clients.run(_enrich_company_prodoctorov_async(company_id))
     except Exception as exc:
         logger.warning("enrich_company_prodoctorov retrying company=%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=30, max_retries=1)
@@ -1649,7 +1667,7 @@ def enrich_website_email_playwright(self, company_id: int):
     """Playwright-парсер email/phone на сайте компании — добивает то,
     что httpx-парсер не увидел из-за JS-рендера."""
     try:
-        return asyncio.run(_enrich_website_email_playwright_async(company_id))
+        return browser_pool.run(_enrich_website_email_playwright_async(company_id))
     except Exception as exc:
         logger.warning(
             "enrich_website_email_playwright retrying #%d: %s",
@@ -1682,7 +1700,7 @@ async def _enrich_dm_from_serp_async(company_id: int) -> dict:
 def enrich_dm_from_serp(self, company_id: int):
     """Ищет ЛПР через Google-поиск (SerpAPI). Snippet+title → LLM."""
     try:
-        return asyncio.run(_enrich_dm_from_serp_async(company_id))
+        return redis_clients.run(_enrich_dm_from_serp_async(company_id))
     except Exception as exc:
         logger.warning("enrich_dm_from_serp retrying company=%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=30, max_retries=1)
@@ -1707,7 +1725,7 @@ async def _enrich_dm_from_telegram_bio_async(company_id: int) -> dict:
 def enrich_dm_from_telegram_bio(self, company_id: int):
     """Ищет ЛПР через bio Telegram-каналов компании (публичные preview)."""
     try:
-        return asyncio.run(_enrich_dm_from_telegram_bio_async(company_id))
+        return redis_clients.run(_enrich_dm_from_telegram_bio_async(company_id))
     except Exception as exc:
         logger.warning("enrich_dm_from_telegram_bio retrying company=%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=30, max_retries=1)
@@ -1731,7 +1749,7 @@ async def _enrich_dm_from_checko_async(company_id: int) -> dict:
 def enrich_dm_from_checko(self, company_id: int):
     """Ищет ЛПР через публичную страницу checko.ru/company/{inn}."""
     try:
-        return asyncio.run(_enrich_dm_from_checko_async(company_id))
+        return redis_clients.run(_enrich_dm_from_checko_async(company_id))
     except Exception as exc:
         logger.warning("enrich_dm_from_checko retrying company=%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=30, max_retries=1)
@@ -1754,7 +1772,7 @@ async def _enrich_dm_from_owner_replies_async(company_id: int) -> dict:
 def enrich_dm_from_owner_replies(self, company_id: int):
     """Ищет ЛПР в подписях ответов владельца на отзывы клиентов."""
     try:
-        return asyncio.run(_enrich_dm_from_owner_replies_async(company_id))
+        return redis_clients.run(_enrich_dm_from_owner_replies_async(company_id))
     except Exception as exc:
         logger.warning("enrich_dm_from_owner_replies retrying company=%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=30, max_retries=1)
@@ -1780,7 +1798,7 @@ def enrich_marketing_dm(self, company_id: int):
     """Оркестратор: подтягивает egrul-персон, сверяет ЕГРН, выбирает
     маркетинг-ЛПР и метит is_marketing_dm=True одной записи."""
     try:
-        return asyncio.run(_enrich_marketing_dm_async(company_id))
+        return redis_clients.run(_enrich_marketing_dm_async(company_id))
     except Exception as exc:
         logger.warning("enrich_marketing_dm retrying company=%d: %s", company_id, exc)
         raise self.retry(exc=exc, countdown=30, max_retries=1)
@@ -1852,7 +1870,7 @@ def bulk_enrich_contacts(
           "from app.queue.celery_app import celery_app; \\
            celery_app.send_task('bulk_enrich_contacts', kwargs={'limit': 100})"
     """
-    queued = asyncio.run(
+    queued = redis_clients.run(
         _bulk_enqueue_async(
             source_filter=source_filter,
             missing_phone=missing_phone,
@@ -1898,7 +1916,7 @@ async def _purge_review_raw_text_async() -> int:
 @celery_app.task(name="purge_review_raw_text", queue="maintenance")
 def purge_review_raw_text():
     """Cron: ежедневно в 3:30 (см. beat_schedule в celery_app.py)."""
-    count = asyncio.run(_purge_review_raw_text_async())
+    count = redis_clients.run(_purge_review_raw_text_async())
     logger.info("purge_review_raw_text: purged %d rows", count)
     return count
 
@@ -1915,5 +1933,5 @@ def dedup_multisource_phase2():
     """
     from scripts.dedup_multisource_phase2 import run as dedup_run
 
-    asyncio.run(dedup_run(dry_run=False, min_confidence=0.85))
+    redis_clients.run(dedup_run(dry_run=False, min_confidence=0.85))
     return {"status": "ok"}
@@ -58,6 +58,7 @@ from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.http_clients import shared_client
 from app.models.company_decision_maker import CompanyDecisionMaker
 from app.models.maps import Company, CompanyContact
 from app.modules.maps.contact_validation import is_valid_email, is_valid_phone_ru
@@ -98,7 +99,7 @@ async def _vk_call(
         "v": _VK_API_VERSION,
     }
     try:
-        r = await client.post(f"{_VK_API}/{method}", data=payload)
+        r = await client.post(f"{_VK_API}/{method}", data=payload, timeout=_TIMEOUT)
         if r.status_code != 200:
             logger.debug("vk %s: http %d", method, r.status_code)
             return None
@@ -209,7 +210,7 @@ async def enrich_from_vk(
     if not vk_slug:
         return {"status": "no_vk_link"}
 
-    async with httpx.AsyncClient(timeout=_TIMEOUT) as client:
+    async with shared_client("api") as client:
         details = await _get_group_details(client, vk_slug)
         if not details:
             return {"status": "no_details", "vk_slug": vk_slug}
@@ -31,6 +31,7 @@ from dataclasses import dataclass
 
 import httpx
 
+from app.core.http_clients import shared_client
 from app.models.maps import Company
 
 
@@ -171,16 +172,19 @@ def build_candidates(company: Company) -> list[WebsiteCandidate]:
     return candidates
 
 
+_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; ColabaBot/1.0)"}
+
+
 async def _is_alive(client: httpx.AsyncClient, url: str) -> bool:
     """HEAD-проверка. Если HEAD не отвечает 200/3xx — пробуем GET с
     ограничением размера (не качаем весь HTML)."""
     try:
-        r = await client.head(url, follow_redirects=True, timeout=8.0)
+        r = await client.head(url, headers=_HEADERS, follow_redirects=True, timeout=8.0)
         if 200 <= r.status_code < 400:
             return True
         # Некоторые серверы отвечают 405 на HEAD — фолбэк на GET.
         if r.status_code == 405:
-            r = await client.get(url, follow_redirects=True, timeout=8.0)
+            r = await client.get(url, headers=_HEADERS, follow_redirects=True, timeout=8.0)
             return 200 <= r.status_code < 400
         return False
     except Exception as e:
@@ -199,10 +203,7 @@ async def discover_website(company: Company) -> WebsiteCandidate | None:
     if not candidates:
         return None
 
-    async with httpx.AsyncClient(
-        headers={"User-Agent": "Mozilla/5.0 (compatible; ColabaBot/1.0)"},
-        timeout=8.0,
-    ) as client:
+    async with shared_client("sites") as client:
         for cand in candidates[:8]:  # лимит — не дёргаем больше 8 URL/компанию
             if await _is_alive(client, cand.url):
                 logger.info(
@@ -27,8 +27,9 @@ contact_value=None. Если у компании есть email на сайте
 
 Ограничения
 -----------
-- Playwright тяжёлый: ~2-3 сек на компанию + ~200MB RAM на chromium. Rate-limit
-  таска 20/m — прод-worker с 2GB RAM выдержит один parallel-инстанс.
+- Playwright тяжёлый: ~2-3 сек на компанию. Chromium (~200MB RAM) общий на
+  процесс воркера (maps.browser_pool), на компанию — только контекст.
+  Rate-limit таска 20/m.
 - Псевдо-сайты (vk.com, 2gis.ru, yandex.ru) пропускаем — там email не найти.
 - Прокси НЕ используем (сайт компании — не anti-bot таргет, httpx-парсер
   тоже без прокси работает).
@@ -46,6 +47,7 @@ from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.maps import Company
+from app.modules.maps import browser_pool
 from app.modules.maps.contact_validation import is_valid_email
 
 
@@ -199,7 +201,7 @@ async def enrich_from_website_playwright(
         return {"status": "skip_already_processed"}
 
     try:
-        from playwright.async_api import async_playwright, TimeoutError as PWTimeout
+        from playwright.async_api import TimeoutError as PWTimeout
     except ImportError:
         return {"status": "playwright_not_installed"}
 
@@ -212,56 +214,44 @@ async def enrich_from_website_playwright(
     pages_ok = 0
 
     try:
-        async with async_playwright() as pw:
-            browser = await pw.chromium.launch(
-                headless=True,
-                args=[
-                    "--disable-blink-features=AutomationControlled",
-                    "--no-sandbox",
-                    "--disable-dev-shm-usage",
-                ],
-            )
-            try:
-                ctx = await browser.new_context(
-                    user_agent=_UA,
-                    locale="ru-RU",
-                    viewport={"width": 1366, "height": 900},
-                    extra_http_headers={"Accept-Language": "ru-RU,ru;q=0.9"},
-                )
-                page = await ctx.new_page()
-                for path in _PATHS:
-                    if pages_tried >= 4:
-                        break
-                    url = urljoin(base, path)
-                    pages_tried += 1
-                    try:
-                        await page.goto(
-                            url, wait_until="domcontentloaded",
-                            timeout=_PAGE_TIMEOUT_MS,
-                        )
-                    except PWTimeout:
-                        continue
-                    except Exception as e:
-                        logger.debug("website_playwright goto %s failed: %s", url, e)
-                        continue
-                    # Ждём networkidle с ограничением — иначе таск подвиснет
-                    # на аналитиках/чат-виджетах.
-                    try:
-                        await page.wait_for_load_state(
-                            "networkidle", timeout=_NETWORK_IDLE_TIMEOUT_MS,
-                        )
-                    except PWTimeout:
-                        pass
-                    emails, phones = await _extract_from_page(page)
-                    all_emails.update(emails)
-                    all_phones.update(phones)
-                    pages_ok += 1
-                    # Если корень уже дал email — /contacts часто дубль, скипаем.
-                    if pages_ok == 1 and all_emails:
-                        break
-                    await asyncio.sleep(0.2)
-            finally:
-                await browser.close()
+        async with browser_pool.lease(
+            user_agent=_UA,
+            locale="ru-RU",
+            viewport={"width": 1366, "height": 900},
+            extra_http_headers={"Accept-Language": "ru-RU,ru;q=0.9"},
+        ) as ctx:
+            page = await ctx.new_page()
+            for path in _PATHS:
+                if pages_tried >= 4:
+                    break
+                url = urljoin(base, path)
+                pages_tried += 1
+                try:
+                    await page.goto(
+                        url, wait_until="domcontentloaded",
+                        timeout=_PAGE_TIMEOUT_MS,
+                    )
+                except PWTimeout:
+                    continue
+                except Exception as e:
+                    logger.debug("website_playwright goto %s failed: %s", url, e)
+                    continue
+                # Ждём networkidle с ограничением — иначе таск подвиснет
+                # на аналитиках/чат-виджетах.
+                try:
+                    await page.wait_for_load_state(
+                        "networkidle", timeout=_NETWORK_IDLE_TIMEOUT_MS,
+                    )
+                except PWTimeout:
+                    pass
+                emails, phones = await _extract_from_page(page)
+                all_emails.update(emails)
+                all_phones.update(phones)
+                pages_ok += 1
+                # Если корень уже дал email — /contacts часто дубль, скипаем.
+                if pages_ok == 1 and all_emails:
+                    break
+                await asyncio.sleep(0.2)
     except Exception as e:
         logger.warning("website_playwright failed for #%d: %s", company_id, e)
         return {"status": "error", "error": str(e)[:200]}
@@ -9,18 +9,25 @@ Monitor module router.
 {id, method, url, response_time_ms, ok, phone} (phone всегда null —
 это был mock-артефакт), добавлены новые {provider, cost_rub, model,
 prompt_tokens, completion_tokens, user_id, map_search_id, created_at}.
+
+/embedding-cache — hit/miss счётчики кэша embeddings reviews_ai.
+/crawl-cache — hit/miss/ревалидации кэша краулера (filters.cache).
+/rate-limits — квоты и очереди общих лимитов провайдеров (core.provider_limiter).
 """
 
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy import func, select
+from sqlalchemy import func, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import provider_limiter
 from app.core.database import get_db
 from app.core.dependencies import get_current_user_id
 from app.models.api_call_log import ApiCallLog
+from app.modules.filters import cache as crawl_cache
+from app.modules.reviews_ai import embedding_cache
 
 router = APIRouter(prefix="/monitor", tags=["monitor"])
 
@@ -218,3 +225,74 @@ async def get_monitor_by_search(
             for row in provider_rows
         ],
     }
+
+
+@router.get("/embedding-cache")
+async def get_monitor_embedding_cache(
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+) -> dict:
+    """Эффективность кэша embeddings (reviews_ai.embedding_cache).
+
+    Счётчики накопительные, суммарно по всем воркерам (Redis):
+    - lru_hits / db_hits — тексты, не ушедшие в OpenAI;
+    - misses — уникальные тексты, отправленные в OpenAI;
+    - saved_tokens — оценка сэкономленных prompt-токенов;
+    - rows_estimate — приблизительный размер таблицы (pg_class.reltuples).
+    """
+    stats = await embedding_cache.get_stats()
+    hits = stats["lru_hits"] + stats["db_hits"]
+    lookups = hits + stats["misses"]
+    rows_estimate = (
+        await db.execute(
+            text("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE relname = 'embedding_cache'")
+        )
+    ).scalar()
+    return {
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+        **stats,
+        "hits": hits,
+        "hit_rate": round(hits / lookups * 100, 1) if lookups else 0.0,
+        "rows_estimate": int(rows_estimate or 0),
+    }
+
+
+@router.get("/crawl-cache")
+async def get_monitor_crawl_cache(
+    user_id: int = Depends(get_current_user_id),
+) -> dict:
+    """Эффективность кэша краулера (filters.cache), сумма по всем воркерам:
+    - lru_hits / redis_hits — обходы, найденные в кэше (свежие или нет);
+    - misses — домена в кэше нет, полный обход;
+    - revalidated — устаревший кэш подтверждён 304 по всем страницам;
+    - changed — ревалидация нашла изменения, полный обход;
+    - stores — записей в кэш;
+    - shared — задач, дождавшихся чужого обхода того же домена (crawl_flight).
+    """
+    stats = await crawl_cache.get_stats()
+    lookups = stats["lru_hits"] + stats["redis_hits"] + stats["misses"]
+    checks = stats["revalidated"] + stats["changed"]
+    return {
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+        **stats,
+        "hit_rate": round((stats["lru_hits"] + stats["redis_hits"]) / lookups * 100, 1) if lookups else 0.0,
+        "not_modified_rate": round(stats["revalidated"] / checks * 100, 1) if checks else 0.0,
+    }
+
+
+@router.get("/rate-limits")
+async def get_monitor_rate_limits(
+    user_id: int = Depends(get_current_user_id),
+) -> dict:
+    """Общие на все воркеры лимиты провайдеров (core.provider_limiter).
+
+    По строке на пару (provider, key_id), key_id — отпечаток ключа/прокси:
+    - per_minute / burst — квота последнего запроса;
+    - acquired / delayed / waited_ms — занятые слоты, сколько из них ждали и сколько всего;
+    - rejected — отказы по max_wait; throttled — 429 от провайдера (penalize);
+    - backlog_seconds — через сколько рассосётся очередь (TAT − сейчас).
+    """
+    return {
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+        "limits": await provider_limiter.get_stats(),
+    }
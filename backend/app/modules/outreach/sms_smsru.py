@@ -33,8 +33,8 @@ logger = logging.getLogger(__name__)
 
 
 # SMS.ru рекомендует не более 30 msg/s без специального тарифа. Bulk-send
-# в kp tasks._send_kp_batch_async уже спит _PER_SEND_SLEEP_SEC=0.4 между
-# отправками (~2.5 msg/s) — с запасом.
+# в kp tasks._send_kp_batch_async идёт в темпе OUTREACH_SENDS_PER_MINUTE
+# на api_id (150/мин ≈ 2.5 msg/s на все воркеры) — с запасом.
 DEFAULT_TIMEOUT_SEC = 15
 
 
@@ -19,7 +19,10 @@ import logging
 
 from sqlalchemy import select
 
+from app.core import provider_limiter, redis_clients
+from app.core.config import settings
 from app.core.database import AsyncSessionLocal
+from app.core.provider_limiter import Quota
 from app.models.email_config import EmailConfig
 from app.models.kp_generation_job import KpGenerationJob
 from app.modules.email.service import EmailServiceError, email_service
@@ -143,10 +146,25 @@ async def _generate_kp_bulk_async(job_id: int) -> dict:
 # 20 за раз даёт ~8 прогонов и не блокирует SMTP'шный пул.
 _SEND_BATCH_SIZE = 20
 
-# Пауза между отправками внутри пачки. Hyvor сам rate-limit'ит на 10/sec,
-# SMTP-сервер юзера обычно ещё медленнее — 0.4 сек даёт ~150 писем/мин,
-# хватит для типовой партии в 75 шт.
-_PER_SEND_SLEEP_SEC = 0.4
+# Темп отправок на учётку отправителя — OUTREACH_SENDS_PER_MINUTE (150/мин ≈
+# раз в 0.4с) через core.provider_limiter: общий для всех воркеров и кампаний,
+# идущих через тот же аккаунт провайдера, а не пауза внутри одного прогона.
+# Hyvor сам rate-limit'ит на 10/sec, SMTP-сервер юзера обычно ещё медленнее.
+def _send_quota() -> Quota:
+    return Quota(per_minute=settings.OUTREACH_SENDS_PER_MINUTE)
+
+
+async def _sender_account(db, channel: str) -> str:
+    """Аккаунт, через который уходит отправка канала, — ключ лимитера."""
+    if channel == "email":
+        return await email_service.sender_account(db)
+    if channel == "whatsapp":
+        return f"greenapi:{settings.GREENAPI_INSTANCE_ID}"
+    if channel == "sms":
+        return f"smsru:{settings.SMSRU_API_KEY}"
+    if channel == "telegram":
+        return f"telegram:{settings.TELEGRAM_BOT_TOKEN}"
+    return channel
 
 
 async def _load_email_branding(db) -> tuple[str | None, str | None, str | None]:
@@ -402,9 +420,13 @@ async def _send_kp_batch_async(job_id: int) -> dict:
             if not claimed:
                 break
 
+            accounts: dict[str, str] = {}
             for send_row in claimed:
+                channel = send_row.channel
+                if channel not in accounts:
+                    accounts[channel] = await _sender_account(db, channel)
+                await provider_limiter.acquire(f"outreach:{channel}", accounts[channel], _send_quota())
                 await _send_one(db, send_row)
-                await asyncio.sleep(_PER_SEND_SLEEP_SEC)
                 if send_row.status == "sent":
                     total_sent += 1
                 elif send_row.status == "failed":
@@ -431,7 +453,7 @@ def send_kp_batch_task(self, job_id: int):
     их в строку (status=failed), снова дёргать смысла нет.
     """
     try:
-        return asyncio.run(_send_kp_batch_async(job_id))
+        return redis_clients.run(_send_kp_batch_async(job_id))
     except Exception as exc:
         logger.error("send_kp_batch_task job=%d crashed: %s", job_id, exc, exc_info=True)
         raise
@@ -447,7 +469,7 @@ def generate_kp_bulk_task(self, job_id: int):
     job в целом завершается с тем, что успело пройти.
     """
     try:
-        return asyncio.run(_generate_kp_bulk_async(job_id))
+        return redis_clients.run(_generate_kp_bulk_async(job_id))
     except Exception as exc:
         logger.error(
             "generate_kp_bulk_task job=%d crashed before iteration: %s",
@@ -465,7 +487,7 @@ def generate_kp_bulk_task(self, job_id: int):
                     await db.commit()
 
         try:
-            asyncio.run(_mark_failed())
+            redis_clients.run(_mark_failed())
         except Exception:
             logger.exception("generate_kp_bulk_task: failed to write failed-status")
         raise
@@ -25,8 +25,8 @@ logger = logging.getLogger(__name__)
 
 
 # GreenAPI заявленный rate limit на платных тарифах — 3 msg/sec на инстанс.
-# Bulk-send в kp tasks._send_kp_batch_async уже спит _PER_SEND_SLEEP_SEC=0.4
-# между отправками, что даёт ~2.5 msg/sec — укладывается в лимит.
+# Bulk-send в kp tasks._send_kp_batch_async идёт в темпе OUTREACH_SENDS_PER_MINUTE
+# на инстанс (150/мин ≈ 2.5 msg/sec на все воркеры) — укладывается в лимит.
 DEFAULT_TIMEOUT_SEC = 20
 
 
@@ -1,7 +1,12 @@
 """HDBSCAN-кластеризация embeddings отзывов.
 
 cluster_embeddings — основной интерфейс: получает массив векторов, возвращает
-массив меток (целые: 0..N для кластеров, -1 для «шума»).
+массив меток (целые: 0..N для кластеров, -1 для «шума»). Бэкенд выбирается
+на вызов:
+- 'hdbscan' — HDBSCAN (+ второй проход, + KMeans fallback) в float64;
+- 'minibatch' — для больших ниш: float32, понижение размерности
+  (PCA / random projection до ~128) и MiniBatchKMeans. Память и время
+  линейны по N; сравнение качества — scripts/bench_clustering.py.
 
 compute_centroid — среднее по embeddings кластера. Используется как «центр»
 PainTag в БД, по нему матчатся новые отзывы через cosine similarity.
@@ -15,6 +20,14 @@ import numpy as np
 
 logger = logging.getLogger(__name__)
 
+CLUSTER_BACKENDS = ("hdbscan", "minibatch")
+REDUCE_METHODS = ("pca", "random")
+# Размерность после понижения для 'minibatch' (reduce_dims=None).
+DEFAULT_REDUCE_DIMS = 128
+# PCA учим на подвыборке: компоненты на 10к строк практически те же, что
+# на 100к, а randomized SVD по всей матрице — основная статья времени и памяти.
+_PCA_FIT_SAMPLE = 10_000
+
 
 def _normalize_rows(arr: np.ndarray) -> np.ndarray:
     """L2-нормализация по строкам. На нулевую строку — нулевой выход."""
@@ -23,12 +36,94 @@ def _normalize_rows(arr: np.ndarray) -> np.ndarray:
     return arr / norms
 
 
+def _kmeans_k(n: int) -> int:
+    return max(3, min(15, n // 30))
+
+
+def reduce_dimensions(
+    arr: np.ndarray,
+    dims: int = DEFAULT_REDUCE_DIMS,
+    method: str = "pca",
+    random_state: int = 42,
+) -> np.ndarray:
+    """Понижает размерность L2-нормализованных векторов до dims (float32)
+    и нормализует результат заново — дальше снова работаем «по углу».
+
+    method='pca' — randomized PCA, обученная на подвыборке до _PCA_FIT_SAMPLE
+    строк; 'random' — гауссова random projection (без обучения, дешевле,
+    расстояния сохраняются грубее). dims ≥ D — возвращаем как есть.
+    """
+    if method not in REDUCE_METHODS:
+        raise ValueError(f"reduce_dimensions: invalid method={method!r}")
+    arr = np.asarray(arr, dtype=np.float32)
+    n, d = arr.shape
+    if dims <= 0 or dims >= d:
+        return arr
+    rng = np.random.default_rng(random_state)
+    if method == "random":
+        proj = rng.standard_normal((d, dims)).astype(np.float32) / np.float32(np.sqrt(dims))
+        reduced = arr @ proj
+    else:
+        from sklearn.decomposition import PCA
+
+        dims = min(dims, n)
+        fit_rows = arr if n <= _PCA_FIT_SAMPLE else arr[rng.choice(n, _PCA_FIT_SAMPLE, replace=False)]
+        pca = PCA(n_components=dims, svd_solver="randomized", random_state=random_state)
+        pca.fit(fit_rows)
+        # transform чанками: pca.transform центрирует копию входа, на всей
+        # матрице это ещё один N×D буфер.
+        reduced = np.empty((n, dims), dtype=np.float32)
+        for i in range(0, n, _PCA_FIT_SAMPLE):
+            reduced[i:i + _PCA_FIT_SAMPLE] = pca.transform(arr[i:i + _PCA_FIT_SAMPLE])
+    return _normalize_rows(reduced)
+
+
+def _cluster_minibatch(
+    normalized: np.ndarray,
+    min_cluster_size: int,
+    n_clusters: int | None,
+) -> np.ndarray:
+    """MiniBatchKMeans по нормализованным векторам. Шума у k-means нет —
+    кластеры меньше min_cluster_size помечаем -1, как сделал бы HDBSCAN,
+    остальные перенумеровываем подряд."""
+    from sklearn.cluster import MiniBatchKMeans
+
+    n = normalized.shape[0]
+    k = min(n_clusters or _kmeans_k(n), n)
+    km = MiniBatchKMeans(
+        n_clusters=k,
+        batch_size=min(n, 2048),
+        n_init=3,
+        random_state=42,
+    )
+    raw = km.fit_predict(normalized)
+    sizes = np.bincount(raw, minlength=k)
+    keep = np.flatnonzero(sizes >= min_cluster_size)
+    remap = np.full(k, -1, dtype=int)
+    remap[keep] = np.arange(len(keep))
+    return remap[raw]
+
+
 def cluster_embeddings(
     embeddings: np.ndarray,
     min_cluster_size: int = 8,
     min_samples: int = 4,
+    *,
+    backend: str = "hdbscan",
+    reduce_dims: int | None = None,
+    reduce_method: str = "pca",
+    n_clusters: int | None = None,
 ) -> np.ndarray:
-    """Кластеризует векторы. Robust pipeline:
+    """Кластеризует векторы.
+
+    backend='minibatch': float32 → reduce_dimensions (reduce_dims, по
+    умолчанию DEFAULT_REDUCE_DIMS; 0 — без понижения) → MiniBatchKMeans
+    с k = n_clusters или как у KMeans-fallback'а ниже. min_samples не
+    используется.
+
+    backend='hdbscan' (по умолчанию) — robust pipeline ниже; reduce_dims
+    здесь по умолчанию выключен, с ним получается «приближённый» HDBSCAN
+    по PCA-проекции (быстрее и легче на больших N).
 
       1. HDBSCAN с **cosine**-метрикой (на 1536-мерных нормализованных
          эмбеддингах cosine стабильнее, чем euclidean — euclidean страдает
@@ -43,25 +138,47 @@ def cluster_embeddings(
         embeddings: shape (N, D). Если N < min_cluster_size — возвращает массив -1.
         min_cluster_size: минимальный размер кластера на первом проходе.
         min_samples: насколько «плотным» должен быть кластер.
+        backend: 'hdbscan' | 'minibatch'.
+        reduce_dims / reduce_method: понижение размерности перед кластеризацией.
+        n_clusters: k для k-means (minibatch и fallback); None — по формуле.
 
     Returns:
         labels: shape (N,) — индексы кластеров (-1 для шумовых точек).
     """
+    if backend not in CLUSTER_BACKENDS:
+        raise ValueError(f"cluster_embeddings: invalid backend={backend!r}")
     if embeddings is None or len(embeddings) == 0:
         return np.array([], dtype=int)
 
-    arr = np.asarray(embeddings, dtype=np.float64)
+    if reduce_dims is None and backend == "minibatch":
+        reduce_dims = DEFAULT_REDUCE_DIMS
+    # float64 нужен только полноразмерному HDBSCAN; всё остальное — float32
+    # (вдвое меньше памяти на N×1536).
+    dtype = np.float64 if backend == "hdbscan" and not reduce_dims else np.float32
+    arr = np.asarray(embeddings, dtype=dtype)
     n = arr.shape[0]
     if n < min_cluster_size:
         return np.full(n, -1, dtype=int)
 
-    # импорт внутри функции: hdbscan тяжёлый, не нужен при каждом импорте модуля
-    import hdbscan
-
     # Нормализуем под cosine. HDBSCAN с metric='cosine' через precomputed
     # distance был бы тяжёлым (N×N), поэтому идём по углу через
     # нормализацию + Euclidean (для L2-норм векторов |u-v|² = 2(1-cos(u,v))).
     normalized = _normalize_rows(arr)
+    if reduce_dims:
+        normalized = reduce_dimensions(normalized, reduce_dims, reduce_method)
+        if backend == "hdbscan":
+            normalized = normalized.astype(np.float64)
+
+    if backend == "minibatch":
+        labels = _cluster_minibatch(normalized, min_cluster_size, n_clusters)
+        logger.info(
+            "cluster_embeddings: MiniBatchKMeans n=%d dims=%d → %d clusters, %d noise",
+            n, normalized.shape[1], len({int(l) for l in labels if l >= 0}), int(np.sum(labels < 0)),
+        )
+        return labels
+
+    # импорт внутри функции: hdbscan тяжёлый, не нужен при каждом импорте модуля
+    import hdbscan
 
     def _hdbscan(min_size: int) -> np.ndarray:
         clusterer = hdbscan.HDBSCAN(
@@ -113,7 +230,7 @@ def cluster_embeddings(
         logger.warning("cluster_embeddings: sklearn недоступен, fallback на k-means пропущен")
         return labels
 
-    k = max(3, min(15, n // 30))
+    k = n_clusters or _kmeans_k(n)
     try:
         km = KMeans(n_clusters=k, n_init=4, random_state=42)
         labels = km.fit_predict(normalized)
@@ -0,0 +1,209 @@
+"""Content-addressed кэш embeddings по (model, text_hash).
+
+Один и тот же текст отзыва приходит из 2gis- и yandex_maps-копий компании и
+ещё раз после dedup-merge. embed_texts_cached смотрит по порядку:
+1. in-process LRU (numpy float32, REVIEWS_AI_EMBEDDING_CACHE_LRU_SIZE штук);
+2. таблицу embedding_cache (одним SELECT на пачку хэшей);
+3. только промахи уходят в llm.embed_texts, результат пишется в таблицу
+   одним INSERT … ON CONFLICT DO NOTHING и в LRU.
+
+text_hash = maps.utils.hash_review_text от текста, который реально уходит в
+OpenAI (после обрезки caller'ом), — нормализация схлопывает регистр и пробелы.
+
+Счётчики hit/miss копятся в Redis-хэше (общие для всех воркеров) и читаются
+монитором: GET /monitor/embedding-cache. Redis недоступен — счётчики теряются,
+кэш работает. Ошибка таблицы (например, миграция 057 не накатана) — все
+тексты считаются промахами, транзакцию caller'а не ломаем (SAVEPOINT).
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import redis_clients
+from app.core.config import settings
+from app.models.embedding_cache import EmbeddingCache
+from app.modules.maps.utils import hash_review_text
+from app.modules.reviews_ai import llm
+from app.modules.reviews_ai.embeddings import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Размерность колонки embedding_cache.embedding; векторы другой длины
+# (другая модель) не кэшируем в БД.
+EMBEDDING_DIM = 1536
+# Хэшей на один SELECT / INSERT — держимся далеко от лимита bind-параметров.
+_CACHE_CHUNK = 1000
+
+STATS_KEY = "reviews_ai:embedding_cache:stats"
+_STAT_FIELDS = ("lru_hits", "db_hits", "misses", "saved_tokens")
+
+_CACHE_BULK_INSERT = text(
+    """
+    INSERT INTO embedding_cache (model, text_hash, embedding, created_at)
+    SELECT CAST(:model AS VARCHAR),
+           v.text_hash,
+           CAST((CAST(:flat AS REAL[]))[(v.ord - 1) * :dim + 1 : v.ord * :dim] AS vector),
+           NOW()
+    FROM unnest(CAST(:hashes AS VARCHAR[])) WITH ORDINALITY AS v(text_hash, ord)
+    ON CONFLICT (model, text_hash) DO NOTHING
+    """
+)
+
+
+class _LRU:
+    """Минимальный LRU на OrderedDict. Значения — float32, чтобы 5000
+    векторов по 1536 занимали ~30 МБ, а не ~250 МБ list[float]."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+
+    def get(self, key: tuple[str, str]) -> np.ndarray | None:
+        vec = self._data.get(key)
+        if vec is not None:
+            self._data.move_to_end(key)
+        return vec
+
+    def put(self, key: tuple[str, str], vec: np.ndarray) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = vec
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_lru = _LRU(settings.REVIEWS_AI_EMBEDDING_CACHE_LRU_SIZE)
+
+
+def clear_lru() -> None:
+    """Сбросить in-process LRU (тесты; смена модели на лету)."""
+    _lru.clear()
+
+
+async def _load_from_db(db: AsyncSession, model: str, hashes: list[str]) -> dict[str, np.ndarray]:
+    found: dict[str, np.ndarray] = {}
+    try:
+        async with db.begin_nested():
+            for i in range(0, len(hashes), _CACHE_CHUNK):
+                chunk = hashes[i:i + _CACHE_CHUNK]
+                rows = (await db.execute(
+                    select(EmbeddingCache.text_hash, EmbeddingCache.embedding).where(
+                        EmbeddingCache.model == model,
+                        EmbeddingCache.text_hash.in_(chunk),
+                    )
+                )).all()
+                for h, emb in rows:
+                    found[h] = np.asarray(emb, dtype=np.float32)
+    except Exception:
+        logger.exception("embedding_cache: чтение embedding_cache упало — считаем всё промахами")
+        return {}
+    return found
+
+
+async def _store_to_db(db: AsyncSession, model: str, items: list[tuple[str, np.ndarray]]) -> None:
+    items = [(h, v) for h, v in items if v.shape == (EMBEDDING_DIM,)]
+    if not items:
+        return
+    try:
+        async with db.begin_nested():
+            for i in range(0, len(items), _CACHE_CHUNK):
+                chunk = items[i:i + _CACHE_CHUNK]
+                await db.execute(_CACHE_BULK_INSERT, {
+                    "model": model,
+                    "hashes": [h for h, _ in chunk],
+                    "flat": np.concatenate([v for _, v in chunk]).tolist(),
+                    "dim": EMBEDDING_DIM,
+                })
+    except Exception:
+        logger.exception("embedding_cache: запись в embedding_cache упала (%d векторов)", len(items))
+
+
+async def _bump_stats(delta: dict[str, int]) -> None:
+    """HINCRBY счётчиков в Redis. Ошибки глушим — как publish_event."""
+    delta = {k: v for k, v in delta.items() if v}
+    if not delta:
+        return
+    try:
+        pipe = redis_clients.get_client(decode_responses=True).pipeline(transaction=False)
+        for field, value in delta.items():
+            pipe.hincrby(STATS_KEY, field, value)
+        await pipe.execute()
+    except Exception as e:
+        logger.warning("embedding_cache: счётчики в Redis не записаны: %s", e)
+
+
+async def get_stats() -> dict[str, int]:
+    """Текущие счётчики кэша (сумма по всем воркерам). Без Redis — нули."""
+    raw: dict[str, str] = {}
+    try:
+        raw = await redis_clients.get_client(decode_responses=True).hgetall(STATS_KEY) or {}
+    except Exception as e:
+        logger.warning("embedding_cache: счётчики из Redis не прочитаны: %s", e)
+    return {f: int(raw.get(f) or 0) for f in _STAT_FIELDS}
+
+
+async def embed_texts_cached(db: AsyncSession, texts: list[str]) -> list[list[float] | None]:
+    """Как llm.embed_texts, но сначала кэш. Результат выровнен по texts;
+    None — embedding не получен (нет ключа / батч упал), такие не кэшируются.
+
+    Пишет в embedding_cache через db, commit — на caller'е.
+    """
+    if not texts:
+        return []
+    model = settings.REVIEWS_AI_EMBEDDING_MODEL or "text-embedding-3-small"
+    hashes = [hash_review_text(t) for t in texts]
+    out: list[list[float] | None] = [None] * len(texts)
+    stats = dict.fromkeys(_STAT_FIELDS, 0)
+
+    # 1. LRU.
+    pending: dict[str, list[int]] = {}
+    for i, h in enumerate(hashes):
+        vec = _lru.get((model, h))
+        if vec is not None:
+            out[i] = vec.tolist()
+            stats["lru_hits"] += 1
+            stats["saved_tokens"] += estimate_tokens(texts[i])
+        else:
+            pending.setdefault(h, []).append(i)
+
+    # 2. Таблица.
+    if pending:
+        for h, vec in (await _load_from_db(db, model, list(pending))).items():
+            _lru.put((model, h), vec)
+            as_list = vec.tolist()
+            for i in pending.pop(h):
+                out[i] = as_list
+                stats["db_hits"] += 1
+                stats["saved_tokens"] += estimate_tokens(texts[i])
+
+    # 3. OpenAI — по одному тексту на хэш; дубли внутри пачки тоже экономия.
+    if pending:
+        miss_hashes = list(pending)
+        stats["misses"] += len(miss_hashes)
+        vectors = await llm.embed_texts([texts[pending[h][0]] for h in miss_hashes])
+        fresh: list[tuple[str, np.ndarray]] = []
+        for h, vec in zip(miss_hashes, vectors or []):
+            if not vec:
+                continue
+            arr = np.asarray(vec, dtype=np.float32)
+            fresh.append((h, arr))
+            _lru.put((model, h), arr)
+            for i in pending[h]:
+                out[i] = vec
+        await _store_to_db(db, model, fresh)
+
+    await _bump_stats(stats)
+    return out
@@ -0,0 +1,300 @@
+"""Конкурентный клиент OpenAI /embeddings с бюджетом TPM/RPM.
+
+Используется llm.embed_texts. Что делает поверх «цикла по батчам»:
+- батчи по EMBEDDING_BATCH_SIZE текстов уходят параллельно, не более
+  REVIEWS_AI_EMBEDDING_CONCURRENCY запросов одновременно;
+- общий httpx.AsyncClient "embeddings" из app.core.http_clients (пул
+  keep-alive соединений на event loop, HTTP/2 при наличии h2), а не новый
+  клиент на каждый вызов;
+- token bucket на запросы (RPM) и на токены (TPM): батч ждёт, пока в обоих
+  ведрах хватит бюджета, вместо того чтобы ловить 429 и спать вслепую.
+  Токены оцениваются по длине текста до запроса, разница с фактическим
+  usage.prompt_tokens возвращается в ведро после ответа;
+- 429/5xx ретраятся с учётом Retry-After; 429 ставит на паузу весь пул,
+  а не только свой батч;
+- результат выровнен по входу: упавший батч даёт None на своих позициях,
+  успешные батчи не теряются. 401/403 — ключ невалиден, оставшиеся батчи
+  не отправляются.
+
+Бюджет — на процесс и event loop (Celery-таска живёт в своём asyncio.run).
+Общий лимит на несколько воркеров этот модуль не держит.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import weakref
+from dataclasses import dataclass, field
+
+import httpx
+
+from app.core.config import settings
+from app.core.http_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BATCH_SIZE = 32
+
+# Ретраимся на 429/5xx — частая причина 33% сбоёв (батч 100 упирался в TPM).
+# 401/403 НЕ ретраим — ключ невалиден, повтор не поможет.
+_EMB_RETRY_STATUSES = {429, 500, 502, 503, 504, 408, 409}
+_EMB_FATAL_STATUSES = {401, 403}
+_EMB_MAX_RETRIES = 3
+# Потолок ожидания по Retry-After: дольше ждать в рамках таски нет смысла.
+_EMB_MAX_RETRY_AFTER = 60.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов без токенизатора.
+
+    На кириллице cl100k даёт ~1 токен на 2–3 символа, берём с запасом
+    len/2 — лучше недобрать бюджет, чем словить 429.
+    """
+    return len(text) // 2 + 1
+
+
+class TokenBucket:
+    """Token bucket с пополнением `per_minute` единиц в минуту.
+
+    Ёмкость — минутный бюджет. per_minute <= 0 — без ограничения.
+    Ожидающие обслуживаются по очереди (lock держится на время сна),
+    чтобы большой батч не голодал за потоком маленьких.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self._rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        if self.capacity <= 0:
+            return
+        # Батч больше минутного бюджета всё равно надо пропустить —
+        # ждём полное ведро, иначе зависнем навсегда.
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self._rate)
+
+    def refund(self, amount: float) -> None:
+        """Вернуть переоценённый бюджет (оценка > фактического usage)."""
+        if self.capacity <= 0 or amount <= 0:
+            return
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+
+@dataclass
+class _LoopPool:
+    """Состояние, привязанное к одному event loop: клиент и бюджеты."""
+
+    client: httpx.AsyncClient
+    requests: TokenBucket
+    tokens: TokenBucket
+    semaphore: asyncio.Semaphore
+    # Момент (monotonic), до которого весь пул стоит после 429.
+    paused_until: float = 0.0
+    stats: dict[str, int] = field(default_factory=lambda: {"requests": 0, "retries": 0, "failed_batches": 0})
+
+
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopPool]" = weakref.WeakKeyDictionary()
+
+
+def _build_client() -> httpx.AsyncClient:
+    return get_client("embeddings")
+
+
+def _get_pool() -> _LoopPool:
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None or pool.client.is_closed:
+        pool = _LoopPool(
+            client=_build_client(),
+            requests=TokenBucket(settings.REVIEWS_AI_EMBEDDING_RPM),
+            tokens=TokenBucket(settings.REVIEWS_AI_EMBEDDING_TPM),
+            semaphore=asyncio.Semaphore(max(1, settings.REVIEWS_AI_EMBEDDING_CONCURRENCY)),
+        )
+        _pools[loop] = pool
+    return pool
+
+
+async def aclose_pool() -> None:
+    """Закрыть пул текущего event loop (тесты, graceful shutdown)."""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.client.aclose()
+
+
+def _retry_delay(resp: httpx.Response | None, attempt: int) -> float:
+    """Retry-After (секунды) если сервер его прислал, иначе 1с, 2с, 4с…"""
+    if resp is not None:
+        raw = resp.headers.get("retry-after")
+        if raw:
+            try:
+                return min(max(float(raw), 0.0), _EMB_MAX_RETRY_AFTER)
+            except ValueError:
+                pass
+    return float(2**attempt)
+
+
+class _Aborted(Exception):
+    """Неретраимая ошибка авторизации — остальные батчи не отправляем."""
+
+
+async def _embed_batch(
+    pool: _LoopPool,
+    batch: list[str],
+    *,
+    url: str,
+    headers: dict[str, str],
+    model: str,
+    abort: asyncio.Event,
+) -> list[list[float]] | None:
+    from app.core.api_tracker import log_call
+
+    estimated = sum(estimate_tokens(t) for t in batch)
+    last_status: int | None = None
+    last_error: str | None = None
+    for attempt in range(_EMB_MAX_RETRIES):
+        async with pool.semaphore:
+            if abort.is_set():
+                return None
+            pause = pool.paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await pool.requests.acquire(1)
+            await pool.tokens.acquire(estimated)
+            pool.stats["requests"] += 1
+            t0 = time.monotonic()
+            try:
+                resp = await pool.client.post(url, headers=headers, json={"model": model, "input": batch})
+            except httpx.HTTPError as e:
+                resp = None
+                last_status, last_error = None, str(e) or e.__class__.__name__
+                logger.warning(
+                    "embed_texts: HTTP error (attempt %d/%d): %s", attempt + 1, _EMB_MAX_RETRIES, last_error
+                )
+            latency_ms = int((time.monotonic() - t0) * 1000)
+
+        if resp is not None and resp.status_code == 200:
+            try:
+                j = resp.json() or {}
+                items = sorted(j.get("data") or [], key=lambda it: it.get("index", 0))
+                vectors = [it.get("embedding") for it in items]
+            except (ValueError, AttributeError, TypeError) as e:
+                j, vectors = {}, []
+                last_error = f"bad json: {e}"
+            usage = j.get("usage") or {}
+            prompt_tokens = usage.get("prompt_tokens")
+            if isinstance(prompt_tokens, int):
+                pool.tokens.refund(estimated - prompt_tokens)
+            ok = len(vectors) == len(batch) and all(isinstance(v, list) and v for v in vectors)
+            await log_call(
+                "openai_emb",
+                model,
+                method="POST",
+                http_status=200,
+                latency_ms=latency_ms,
+                ok=ok,
+                error=None if ok else f"expected {len(batch)} vectors, got {len(vectors)}",
+                prompt_tokens=prompt_tokens,
+                model=model,
+            )
+            if ok:
+                return vectors
+            # Битый ответ — ретрай вряд ли поможет, батч помечаем упавшим.
+            logger.warning("embed_texts: 200 с %d векторами на %d текстов", len(vectors), len(batch))
+            pool.stats["failed_batches"] += 1
+            return None
+
+        if resp is not None:
+            last_status, last_error = resp.status_code, f"http {resp.status_code}"
+            if resp.status_code not in _EMB_RETRY_STATUSES:
+                logger.warning(
+                    "embed_texts: status %d (неретраимый) body=%s", resp.status_code, resp.text[:200]
+                )
+                await log_call(
+                    "openai_emb",
+                    model,
+                    method="POST",
+                    http_status=resp.status_code,
+                    latency_ms=latency_ms,
+                    ok=False,
+                    error=last_error,
+                    model=model,
+                )
+                pool.stats["failed_batches"] += 1
+                if resp.status_code in _EMB_FATAL_STATUSES:
+                    raise _Aborted(last_error)
+                return None
+
+        if attempt < _EMB_MAX_RETRIES - 1:
+            delay = _retry_delay(resp, attempt)
+            if resp is not None and resp.status_code == 429:
+                # TPM/RPM превышен на стороне OpenAI — тормозим весь пул.
+                pool.paused_until = max(pool.paused_until, time.monotonic() + delay)
+            logger.warning(
+                "embed_texts: %s (attempt %d/%d) — retry через %.1fс",
+                last_error, attempt + 1, _EMB_MAX_RETRIES, delay,
+            )
+            pool.stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    await log_call(
+        "openai_emb",
+        model,
+        method="POST",
+        http_status=last_status,
+        ok=False,
+        error=f"{last_error} after {_EMB_MAX_RETRIES} retries",
+        model=model,
+    )
+    pool.stats["failed_batches"] += 1
+    return None
+
+
+async def embed_batches(
+    texts: list[str],
+    *,
+    api_key: str,
+    model: str,
+    base_url: str,
+    batch_size: int | None = None,
+) -> list[list[float] | None]:
+    """Embeddings для texts, выровненные по индексу; None — батч не удался."""
+    pool = _get_pool()
+    url = f"{base_url.rstrip('/')}/embeddings"
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    abort = asyncio.Event()
+    batch_size = batch_size or EMBEDDING_BATCH_SIZE
+
+    async def _run(batch: list[str]) -> list[list[float]] | None:
+        try:
+            return await _embed_batch(pool, batch, url=url, headers=headers, model=model, abort=abort)
+        except _Aborted:
+            abort.set()
+            return None
+
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = await asyncio.gather(*(_run(b) for b in batches))
+
+    out: list[list[float] | None] = []
+    for batch, vectors in zip(batches, results):
+        if vectors is None:
+            out.extend([None] * len(batch))
+        else:
+            out.extend(vectors)
+    return out
@@ -4,7 +4,7 @@
 - pick_assistant_id(db, kind) — auto-pick подходящего ассистента из БД
 - call_llm_sentiment(db, reviews) — JSON-array sentiment-классификация
 - call_llm_cluster_naming(db, niche, sample) — {label, description}
-- embed_texts(texts) — embeddings через OpenAI (sync httpx)
+- embed_texts(texts) — embeddings через OpenAI (конкурентно, см. embeddings.py)
 
 Все возвращают `None` при отсутствии настроенного ассистента / ключа —
 не падают. Это позволяет AI-пайплайну gracefully отключиться, когда юзер
@@ -760,19 +760,13 @@ async def call_llm_company_description(
 # ---------------------------------------------------------------------------
 
 
-EMBEDDING_BATCH_SIZE = 32
-
-# Ретраимся на 429/5xx — частая причина 33% сбоёв (батч 100 упирался в TPM).
-# 401/403 НЕ ретраим — ключ невалиден, повтор не поможет.
-_EMB_RETRY_STATUSES = {429, 500, 502, 503, 504, 408, 409}
-_EMB_MAX_RETRIES = 3
-
-
-async def embed_texts(texts: list[str]) -> list[list[float]] | None:
+async def embed_texts(texts: list[str]) -> list[list[float] | None] | None:
     """OpenAI text-embedding-3-small (1536 dim). Без OPENAI_API_KEY → None.
 
-    Ретраится на 429/5xx с экспоненциальной задержкой (1с, 2с, 4с). Батч
-    уменьшен со 100 до 32, чтобы реже упираться в TPM-лимит OpenAI.
+    Батчи по 32 текста уходят параллельно через embeddings.embed_batches
+    (общий пул соединений, бюджет TPM/RPM, ретраи 429/5xx с Retry-After).
+    Результат выровнен по texts: вектор упавшего батча — None, остальные
+    сохраняются. Если не удался ни один батч — None целиком.
     """
     if not texts:
         return []
@@ -781,108 +775,20 @@ async def embed_texts(texts: list[str]) -> list[list[float]] | None:
         logger.info("embed_texts: OPENAI_API_KEY пуст — пайплайн без embeddings")
         return None
 
-    model = settings.REVIEWS_AI_EMBEDDING_MODEL or "text-embedding-3-small"
-    base_url = (settings.OPENAI_BASE_URL or "https://api.openai.com/v1").rstrip("/")
-
-    import asyncio
-
-    import httpx
-
-    from app.core.api_tracker import log_call
-
-    results: list[list[float]] = []
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        for i in range(0, len(texts), EMBEDDING_BATCH_SIZE):
-            batch = texts[i : i + EMBEDDING_BATCH_SIZE]
-            batch_vectors: list[list[float]] | None = None
-            last_status: int | None = None
-            for attempt in range(_EMB_MAX_RETRIES):
-                try:
-                    resp = await client.post(
-                        f"{base_url}/embeddings",
-                        headers={
-                            "Authorization": f"Bearer {api_key}",
-                            "Content-Type": "application/json",
-                        },
-                        json={"model": model, "input": batch},
-                    )
-                except httpx.HTTPError as e:
-                    last_status = None
-                    logger.warning(
-                        "embed_texts: HTTP error (attempt %d/%d): %s",
-                        attempt + 1,
-                        _EMB_MAX_RETRIES,
-                        e,
-                    )
-                    if attempt < _EMB_MAX_RETRIES - 1:
-                        await asyncio.sleep(2**attempt)
-                        continue
-                    await log_call(
-                        "openai_emb",
-                        model,
-                        method="POST",
-                        ok=False,
-                        error=str(e),
-                        model=model,
-                    )
-                    return None
-                if resp.status_code == 200:
-                    batch_vectors = []
-                    j = resp.json()
-                    u = (j or {}).get("usage") or {}
-                    await log_call(
-                        "openai_emb",
-                        model,
-                        method="POST",
-                        http_status=200,
-                        ok=True,
-                        prompt_tokens=u.get("prompt_tokens"),
-                        model=model,
-                    )
-                    for item in j.get("data") or []:
-                        vec = item.get("embedding")
-                        if isinstance(vec, list):
-                            batch_vectors.append(vec)
-                    break
-                if resp.status_code not in _EMB_RETRY_STATUSES:
-                    logger.warning(
-                        "embed_texts: status %d (неретраимый) body=%s",
-                        resp.status_code,
-                        resp.text[:200],
-                    )
-                    await log_call(
-                        "openai_emb",
-                        model,
-                        method="POST",
-                        http_status=resp.status_code,
-                        ok=False,
-                        error=f"http {resp.status_code}",
-                        model=model,
-                    )
-                    return None
-                last_status = resp.status_code
-                logger.warning(
-                    "embed_texts: status %d (attempt %d/%d) — retry через %ds",
-                    resp.status_code,
-                    attempt + 1,
-                    _EMB_MAX_RETRIES,
-                    2**attempt,
-                )
-                if attempt < _EMB_MAX_RETRIES - 1:
-                    await asyncio.sleep(2**attempt)
-            if batch_vectors is None:
-                await log_call(
-                    "openai_emb",
-                    model,
-                    method="POST",
-                    http_status=last_status,
-                    ok=False,
-                    error=f"http {last_status} after {_EMB_MAX_RETRIES} retries",
-                    model=model,
-                )
-                return None
-            results.extend(batch_vectors)
-    return results
+    from app.modules.reviews_ai.embeddings import embed_batches
+
+    vectors = await embed_batches(
+        texts,
+        api_key=api_key,
+        model=settings.REVIEWS_AI_EMBEDDING_MODEL or "text-embedding-3-small",
+        base_url=settings.OPENAI_BASE_URL or "https://api.openai.com/v1",
+    )
+    failed = sum(1 for v in vectors if v is None)
+    if failed == len(vectors):
+        return None
+    if failed:
+        logger.warning("embed_texts: %d/%d текстов без embedding (батчи упали)", failed, len(vectors))
+    return vectors
 
 
 # ---------------------------------------------------------------------------
@@ -1,4 +1,5 @@
-"""Сервис reviews_ai: sentiment, embeddings, match к pain_tags, recluster.
+"""Сервис reviews_ai: sentiment, embeddings, match к pain_tags, recluster,
+инкрементальное назначение тегов с пулом ничейных.
 
 Все функции gracefully отключаются при отсутствии нужных средств:
 - если call_llm_sentiment вернул None → reviews.sentiment остаётся как был (derived from rating)
@@ -8,6 +9,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import random
 from collections import defaultdict
@@ -15,15 +17,17 @@ from datetime import datetime, timezone
 from typing import Any
 
 import numpy as np
-from sqlalchemy import and_, case, func, or_, select, update, text
+from sqlalchemy import BigInteger, and_, any_, bindparam, case, delete, func, or_, select, update, text
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal
 from app.models.maps import Company, Review
-from app.models.pain_tag import CompanyPainScore, PainTag, ReviewPainTag
-from app.modules.reviews_ai import llm
-from app.modules.reviews_ai.clustering import cluster_embeddings, compute_centroid
+from app.models.pain_tag import CompanyPainScore, PainTag, PainUnassignedReview, ReviewPainTag
+from app.modules.reviews_ai import embedding_cache, llm
+from app.modules.reviews_ai.clustering import CLUSTER_BACKENDS, cluster_embeddings, compute_centroid
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +39,21 @@ logger = logging.getLogger(__name__)
 
 SENTIMENT_BATCH_SIZE = 20  # сколько отзывов отдаём в один LLM-вызов
 
+# Результат LLM-батча пишется одним UPDATE … FROM unnest(...) вместо
+# UPDATE на каждый отзыв.
+_SENTIMENT_BULK_UPDATE = text(
+    """
+    UPDATE reviews r
+    SET sentiment = v.sentiment, sentiment_score = v.score
+    FROM unnest(
+        CAST(:ids AS BIGINT[]),
+        CAST(:labels AS VARCHAR[]),
+        CAST(:scores AS NUMERIC[])
+    ) AS v(id, sentiment, score)
+    WHERE r.id = v.id
+    """
+)
+
 
 async def compute_sentiment(db: AsyncSession, review_ids: list[int]) -> int:
     """Гоняет батчи отзывов через LLM и обновляет reviews.sentiment/sentiment_score.
@@ -74,6 +93,9 @@ async def compute_sentiment(db: AsyncSession, review_ids: list[int]) -> int:
         result = await llm.call_llm_sentiment(db, batch)
         if not result:
             continue
+        # rid → (label, score); повтор id в ответе LLM — побеждает последний,
+        # как при прежних построчных UPDATE.
+        by_id: dict[int, tuple[str, float]] = {}
         for item in result:
             if not isinstance(item, dict):
                 continue
@@ -81,18 +103,24 @@ async def compute_sentiment(db: AsyncSession, review_ids: list[int]) -> int:
             label = (item.get("sentiment") or "").lower()
             if rid is None or label not in valid_labels:
                 continue
+            try:
+                rid = int(rid)
+            except (TypeError, ValueError):
+                continue
             try:
                 score = float(item.get("score", 0.5))
             except (TypeError, ValueError):
                 score = 0.5
-            score = max(0.0, min(1.0, score))
-            await db.execute(
-                update(Review)
-                .where(Review.id == int(rid))
-                .values(sentiment=label, sentiment_score=score)
-            )
-            updated += 1
+            by_id[rid] = (label, max(0.0, min(1.0, score)))
+        if not by_id:
+            continue
+        await db.execute(_SENTIMENT_BULK_UPDATE, {
+            "ids": list(by_id),
+            "labels": [label for label, _ in by_id.values()],
+            "scores": [score for _, score in by_id.values()],
+        })
         await db.commit()
+        updated += len(by_id)
     return updated
 
 
@@ -101,8 +129,32 @@ async def compute_sentiment(db: AsyncSession, review_ids: list[int]) -> int:
 # ---------------------------------------------------------------------------
 
 
+# Векторы партии уходят одним параметром REAL[] (asyncpg кодирует его в
+# бинарном формате — без текстовых литералов '[0.1,0.2,…]' по ~20 КБ на
+# отзыв), строка i получает срез [(i-1)*dim+1 : i*dim] с кастом real[] → vector.
+_EMBEDDINGS_BULK_UPDATE = text(
+    """
+    UPDATE reviews r
+    SET embedding = CAST(
+        (CAST(:flat AS REAL[]))[(v.ord - 1) * :dim + 1 : v.ord * :dim] AS vector
+    )
+    FROM unnest(CAST(:ids AS BIGINT[])) WITH ORDINALITY AS v(id, ord)
+    WHERE r.id = v.id
+    """
+)
+
+# Отзывов на один UPDATE: 500 × 1536 float4 ≈ 3 МБ параметра.
+EMBEDDING_UPDATE_CHUNK = 500
+
+
 async def compute_embeddings(db: AsyncSession, review_ids: list[int]) -> int:
-    """Вычисляет embeddings и проставляет reviews.embedding. Возвращает count."""
+    """Вычисляет embeddings и проставляет reviews.embedding. Возвращает count.
+
+    Векторы берутся через embedding_cache: в OpenAI уходят только тексты,
+    которых нет ни в LRU, ни в таблице embedding_cache.
+
+    Запись — UPDATE … FROM unnest(...) по EMBEDDING_UPDATE_CHUNK отзывов
+    за запрос вместо UPDATE на каждый отзыв."""
     if not review_ids:
         return 0
     rows = list((await db.execute(
@@ -111,18 +163,24 @@ async def compute_embeddings(db: AsyncSession, review_ids: list[int]) -> int:
     if not rows:
         return 0
     texts = [(r[1] or "")[:2000] for r in rows]
-    vectors = await llm.embed_texts(texts)
+    vectors = await embedding_cache.embed_texts_cached(db, texts)
     if not vectors:
         return 0
 
-    updated = 0
-    for (rid, _txt), vec in zip(rows, vectors):
-        await db.execute(
-            update(Review).where(Review.id == int(rid)).values(embedding=vec)
-        )
-        updated += 1
+    pairs = [(int(rid), vec) for (rid, _txt), vec in zip(rows, vectors) if vec]
+    for i in range(0, len(pairs), EMBEDDING_UPDATE_CHUNK):
+        chunk = pairs[i:i + EMBEDDING_UPDATE_CHUNK]
+        dim = len(chunk[0][1])
+        flat: list[float] = []
+        for _rid, vec in chunk:
+            flat.extend(float(x) for x in vec)
+        await db.execute(_EMBEDDINGS_BULK_UPDATE, {
+            "ids": [rid for rid, _ in chunk],
+            "flat": flat,
+            "dim": dim,
+        })
     await db.commit()
-    return updated
+    return len(pairs)
 
 
 # ---------------------------------------------------------------------------
@@ -157,6 +215,124 @@ async def _pain_tags_for_niche(
     return list((await db.execute(q)).scalars().all())
 
 
+PAIN_MATCH_MODES = ("sql", "numpy")
+
+# Строк company_pain_scores на один multi-row upsert (8 параметров на
+# строку, лимит asyncpg — 32767 bind-параметров).
+_MATCH_WRITE_CHUNK = 1000
+
+_RPT_UNNEST_UPSERT = text(
+    """
+    INSERT INTO review_pain_tags (review_id, pain_tag_id, similarity)
+    SELECT v.review_id, v.pain_tag_id, v.similarity
+    FROM unnest(
+        CAST(:review_ids AS BIGINT[]),
+        CAST(:tag_ids AS INTEGER[]),
+        CAST(:similarities AS NUMERIC[])
+    ) AS v(review_id, pain_tag_id, similarity)
+    ON CONFLICT (review_id, pain_tag_id) DO UPDATE SET similarity = EXCLUDED.similarity
+    """
+)
+
+
+def _id_in(column, ids: list[int]):
+    """column = ANY(:ids) одним массивом вместо IN с bind-параметром на id —
+    match гоняют по десяткам тысяч отзывов, IN упирается в лимит asyncpg."""
+    return column == any_(bindparam(None, list(ids), type_=ARRAY(BigInteger)))
+
+# Top-k ближайших центроидов на отзыв прямо в Postgres. LATERAL даёт «для
+# каждого отзыва — его k тегов» (LIMIT NULL = без ограничения), порог —
+# по cosine distance: sim >= threshold ⇔ (embedding <=> centroid) <= 1 - threshold.
+# Поиск точный: теги ниши выбираются по pain_tags_pkey и сортируются по <=>.
+# ANN-индекс тут не нужен (миграция 062) — тегов в нише десятки, а HNSW с
+# фильтром по id отдавал бы неполный top-k.
+# Embeddings отзывов не покидают БД — обратно уходят только тройки
+# (review_id, pain_tag_id, similarity).
+_MATCH_TOP_K_SQL = text(
+    """
+    SELECT r.id AS review_id, t.id AS pain_tag_id, 1 - t.distance AS similarity
+    FROM reviews r
+    CROSS JOIN LATERAL (
+        SELECT pt.id, pt.centroid <=> r.embedding AS distance
+        FROM pain_tags pt
+        WHERE pt.id = ANY(CAST(:tag_ids AS INTEGER[]))
+        ORDER BY pt.centroid <=> r.embedding
+        LIMIT CAST(:top_k AS INTEGER)
+    ) t
+    WHERE r.id = ANY(CAST(:review_ids AS BIGINT[]))
+      AND r.embedding IS NOT NULL
+      AND t.distance <= :max_distance
+    ORDER BY r.id, t.distance
+    """
+)
+
+
+async def _match_hits_sql(
+    db: AsyncSession,
+    review_ids: list[int],
+    tag_ids: list[int],
+    threshold: float,
+    top_k: int | None,
+) -> list[tuple[int, int, float]] | None:
+    """(review_id, pain_tag_id, similarity) выше threshold через pgvector.
+
+    None — SQL-путь не сработал (нет pgvector-оператора, битые данные);
+    caller уходит в NumPy. SAVEPOINT — чтобы ошибка не отравила транзакцию.
+    """
+    try:
+        async with db.begin_nested():
+            result = await db.execute(_MATCH_TOP_K_SQL, {
+                "review_ids": review_ids,
+                "tag_ids": tag_ids,
+                "top_k": top_k or None,
+                "max_distance": 1.0 - threshold,
+            })
+            return [(int(rid), int(tid), float(sim)) for rid, tid, sim in result.all()]
+    except Exception:
+        logger.exception("match: SQL-путь упал на %d отзывах — fallback на NumPy", len(review_ids))
+        return None
+
+
+async def _match_hits_numpy(
+    db: AsyncSession,
+    review_ids: list[int],
+    tags: list[PainTag],
+    threshold: float,
+    top_k: int | None,
+) -> list[tuple[int, int, float]]:
+    """То же, что _match_hits_sql, но cosine — матрицей R×T в NumPy."""
+    emb_rows = list((await db.execute(
+        select(Review.id, Review.embedding).where(_id_in(Review.id, review_ids), Review.embedding.isnot(None))
+    )).all())
+    if not emb_rows:
+        return []
+
+    # ---------- ВЕКТОРНЫЙ COSINE: R @ T.T за один matmul ----------
+    # До рефакторинга: Python-цикл считал N*M dot product'ов и делал
+    # N*M*2 DB-roundtrip'ов (по два upsert на (review, tag)). На 3к
+    # отзывов × 10 тегов это десятки секунд — отсюда жалоба «Готовы
+    # 1 из 73 · 6 минут». Теперь cosine — один numpy matmul (милисек).
+    review_matrix = np.asarray([list(r[1]) for r in emb_rows], dtype=np.float64)
+    tag_matrix = np.asarray([list(t.centroid) for t in tags], dtype=np.float64)
+    # Нормализация по строкам — потом cosine = dot product
+    r_norm = np.linalg.norm(review_matrix, axis=1, keepdims=True)
+    r_norm[r_norm == 0] = 1.0
+    t_norm = np.linalg.norm(tag_matrix, axis=1, keepdims=True)
+    t_norm[t_norm == 0] = 1.0
+    sim_matrix = (review_matrix / r_norm) @ (tag_matrix / t_norm).T
+    if top_k and top_k < sim_matrix.shape[1]:
+        # Ровно top_k лучших в строке (как LIMIT в SQL), остальное — до порога.
+        keep = np.zeros_like(sim_matrix, dtype=bool)
+        np.put_along_axis(keep, np.argpartition(-sim_matrix, top_k - 1, axis=1)[:, :top_k], True, axis=1)
+        sim_matrix = np.where(keep, sim_matrix, -np.inf)
+    # Маска: какие (review_idx, tag_idx) выше threshold
+    hit_indices = np.argwhere(sim_matrix >= threshold)
+    return [
+        (int(emb_rows[ridx][0]), int(tags[tidx].id), float(sim_matrix[ridx, tidx]))
+        for ridx, tidx in hit_indices
+    ]
+
+
 async def match_reviews_to_pain_tags(
     db: AsyncSession,
     review_ids: list[int],
@@ -164,6 +340,8 @@ async def match_reviews_to_pain_tags(
     force_niche: str | None = None,
     force_city: str | None = None,
     force_sentiment: str = "negative",
+    mode: str | None = None,
+    top_k: int | None = None,
 ) -> dict[int, list[int]]:
     """Для каждого review_id, для которого есть embedding, ищет ближайшие pain_tags
     той же ниши (и города компании или глобальные для ниши) через cosine similarity.
@@ -183,11 +361,21 @@ async def match_reviews_to_pain_tags(
     Для positive-режима reviews-фильтр инвертируется: пропускаем только
     Review.sentiment='positive' (без NULL/neutral), чтобы в positive
     company_pain_scores не лезли «4 звезды + жалоба в тексте».
+
+    mode ('sql' | 'numpy', по умолчанию REVIEWS_AI_PAIN_MATCH_MODE) — где
+    считать cosine: в Postgres через `<=>` (embeddings не выгружаются) или
+    матрицей в NumPy. При ошибке SQL-пути бакет пересчитывается в NumPy.
+    top_k — сколько ближайших тегов максимум на отзыв (None/0 — все выше
+    threshold; по умолчанию REVIEWS_AI_PAIN_MATCH_TOP_K).
     """
     if not review_ids:
         return {}
     if force_sentiment not in ("negative", "positive"):
         raise ValueError(f"match: invalid force_sentiment={force_sentiment!r}")
+    mode = mode or settings.REVIEWS_AI_PAIN_MATCH_MODE
+    if mode not in PAIN_MATCH_MODES:
+        raise ValueError(f"match: invalid mode={mode!r}")
+    top_k = top_k if top_k is not None else settings.REVIEWS_AI_PAIN_MATCH_TOP_K
     threshold = threshold if threshold is not None else settings.REVIEWS_AI_PAIN_MATCH_THRESHOLD
     is_positive = force_sentiment == "positive"
 
@@ -206,14 +394,16 @@ async def match_reviews_to_pain_tags(
         review_sentiment_filter = or_(
             Review.sentiment.is_(None), Review.sentiment != "positive"
         )
+    # Сами embeddings здесь не тянем: в 'sql'-режиме они не покидают
+    # Postgres, в 'numpy' их грузит _match_hits_numpy по бакету.
     rows = list((await db.execute(
         select(
-            Review.id, Review.company_id, Review.embedding, Review.raw_text,
+            Review.id, Review.company_id, Review.raw_text,
             Company.niche, Company.city,
         )
         .join(Company, Company.id == Review.company_id)
         .where(
-            Review.id.in_(review_ids),
+            _id_in(Review.id, review_ids),
             Review.embedding.isnot(None),
             review_sentiment_filter,
         )
@@ -226,7 +416,7 @@ async def match_reviews_to_pain_tags(
     # независимо от Company.niche/Company.city.
     by_niche_city: dict[tuple[str, str | None], list[tuple]] = defaultdict(list)
     for r in rows:
-        key = (force_niche, force_city) if force_niche else (r[4], r[5])
+        key = (force_niche, force_city) if force_niche else (r[3], r[4])
         by_niche_city[key].append(r)
 
     assigned: dict[int, list[int]] = {}
@@ -235,30 +425,18 @@ async def match_reviews_to_pain_tags(
     for (niche, city), bucket in by_niche_city.items():
         if not niche:
             continue
-        tags = await _pain_tags_for_niche(db, niche, city, sentiment=force_sentiment)
-        tags_with_c = [(t, np.asarray(list(t.centroid), dtype=np.float64))
-                       for t in tags if t.centroid is not None]
-        if not tags_with_c:
+        tags = [t for t in await _pain_tags_for_niche(db, niche, city, sentiment=force_sentiment)
+                if t.centroid is not None]
+        if not tags:
             continue
 
-        # ---------- ВЕКТОРНЫЙ COSINE: R @ T.T за один matmul ----------
-        # До рефакторинга: Python-цикл считал N*M dot product'ов и делал
-        # N*M*2 DB-roundtrip'ов (по два upsert на (review, tag)). На 3к
-        # отзывов × 10 тегов это десятки секунд — отсюда жалоба «Готовы
-        # 1 из 73 · 6 минут». Теперь cosine — один numpy matmul (милисек),
-        # DB-операции свёрнуты в bulk через executemany. Логика top_quote
-        # сохранена: побеждает отзыв с максимальным sim в (company, tag).
-        review_matrix = np.asarray([list(r[2]) for r in bucket], dtype=np.float64)
-        tag_matrix = np.asarray([c for _, c in tags_with_c], dtype=np.float64)
-        # Нормализация по строкам — потом cosine = dot product
-        r_norm = np.linalg.norm(review_matrix, axis=1, keepdims=True)
-        r_norm[r_norm == 0] = 1.0
-        t_norm = np.linalg.norm(tag_matrix, axis=1, keepdims=True)
-        t_norm[t_norm == 0] = 1.0
-        sim_matrix = (review_matrix / r_norm) @ (tag_matrix / t_norm).T
-        # Маска: какие (review_idx, tag_idx) выше threshold
-        hit_indices = np.argwhere(sim_matrix >= threshold)
-        if hit_indices.size == 0:
+        bucket_ids = [int(r[0]) for r in bucket]
+        hits: list[tuple[int, int, float]] | None = None
+        if mode == "sql":
+            hits = await _match_hits_sql(db, bucket_ids, [int(t.id) for t in tags], threshold, top_k)
+        if hits is None:
+            hits = await _match_hits_numpy(db, bucket_ids, tags, threshold, top_k)
+        if not hits:
             continue
 
         # ---------- Подготовка bulk-данных ----------
@@ -267,16 +445,11 @@ async def match_reviews_to_pain_tags(
         # CompanyPainScore: агрегация по (company_id, tag_id)
         # value = {"mention": int, "top_sim": float, "top_quote": str, "top_review_id": int}
         cps_agg: dict[tuple[int, int], dict] = {}
+        review_info = {int(r[0]): (int(r[1]), r[2]) for r in bucket}
 
-        for ridx, tidx in hit_indices:
-            ridx = int(ridx)
-            tidx = int(tidx)
-            sim = float(sim_matrix[ridx, tidx])
+        for rid, tag_id, sim in hits:
             sim_rounded = round(sim, 3)
-            rid = int(bucket[ridx][0])
-            company_id = int(bucket[ridx][1])
-            raw_text = bucket[ridx][3]
-            tag_id = int(tags_with_c[tidx][0].id)
+            company_id, raw_text = review_info[rid]
 
             rpt_rows.append({
                 "review_id": rid, "pain_tag_id": tag_id, "similarity": sim_rounded,
@@ -305,56 +478,57 @@ async def match_reviews_to_pain_tags(
             assigned.setdefault(rid, []).append(tag_id)
 
         # ---------- Bulk INSERT review_pain_tags ----------
+        # Одним unnest-upsert'ом: пар (review, tag) бывают десятки тысяч,
+        # multi-VALUES упёрся бы в лимит параметров и компилировался бы секунды.
         if rpt_rows:
-            rpt_ins = (
-                pg_insert(ReviewPainTag)
-                .values(rpt_rows)
-                .on_conflict_do_update(
-                    index_elements=["review_id", "pain_tag_id"],
-                    set_={"similarity": pg_insert(ReviewPainTag).excluded.similarity},
-                )
-            )
-            await db.execute(rpt_ins)
+            await db.execute(_RPT_UNNEST_UPSERT, {
+                "review_ids": [r["review_id"] for r in rpt_rows],
+                "tag_ids": [r["pain_tag_id"] for r in rpt_rows],
+                "similarities": [r["similarity"] for r in rpt_rows],
+            })
 
         # ---------- Bulk INSERT/UPDATE company_pain_scores ----------
-        # Для каждой агрегированной пары делаем один upsert. Это всё ещё
-        # M*N в худшем случае, но без cosine-loop'а — на порядок быстрее.
-        # (Полностью bulk-upsert с CASE-merge mention_count невозможен в
-        # одном SQL — Postgres ON CONFLICT не умеет агрегировать по
-        # одинаковым ключам в одном VALUES; так что цикл по агрегатам.)
-        table = CompanyPainScore.__table__
-        for (company_id, tag_id), agg in cps_agg.items():
-            cps_ins = pg_insert(CompanyPainScore).values(
-                company_id=company_id,
-                pain_tag_id=tag_id,
-                mention_count=agg["mention"],
-                first_mention_at=now,
-                last_mention_at=now,
-                top_quote=agg["top_quote"],
-                top_quote_review_id=agg["top_review_id"],
-                top_quote_similarity=agg["top_sim"] if agg["top_quote"] else None,
-            )
-            set_clause: dict = {
-                "mention_count": table.c.mention_count + agg["mention"],
+        # cps_agg уже свёрнут по (company_id, tag_id) — ключи в VALUES
+        # уникальны, поэтому хватает одного multi-row upsert'а на чанк:
+        # mention_count += excluded, top_quote — CASE по excluded.similarity
+        # (NULL у агрегатов без цитаты → сравнение NULL → остаётся текущая).
+        # Раньше здесь был upsert на каждый агрегат — ~10 мс компиляции
+        # SQLAlchemy на штуку, на 10к отзывов это больше самого матчинга.
+        cps_rows = [
+            {
+                "company_id": company_id,
+                "pain_tag_id": tag_id,
+                "mention_count": agg["mention"],
+                "first_mention_at": now,
                 "last_mention_at": now,
+                "top_quote": agg["top_quote"],
+                "top_quote_review_id": agg["top_review_id"],
+                "top_quote_similarity": agg["top_sim"] if agg["top_quote"] else None,
             }
-            if agg["top_quote"]:
-                cur_sim = func.coalesce(table.c.top_quote_similarity, 0)
-                is_better = cps_ins.excluded.top_quote_similarity > cur_sim
-                set_clause["top_quote"] = case(
-                    (is_better, cps_ins.excluded.top_quote),
-                    else_=table.c.top_quote,
-                )
-                set_clause["top_quote_review_id"] = case(
-                    (is_better, cps_ins.excluded.top_quote_review_id),
-                    else_=table.c.top_quote_review_id,
-                )
-                set_clause["top_quote_similarity"] = case(
-                    (is_better, cps_ins.excluded.top_quote_similarity),
-                    else_=table.c.top_quote_similarity,
-                )
+            for (company_id, tag_id), agg in cps_agg.items()
+        ]
+        table = CompanyPainScore.__table__
+        for i in range(0, len(cps_rows), _MATCH_WRITE_CHUNK):
+            cps_ins = pg_insert(CompanyPainScore).values(cps_rows[i:i + _MATCH_WRITE_CHUNK])
+            cur_sim = func.coalesce(table.c.top_quote_similarity, 0)
+            is_better = cps_ins.excluded.top_quote_similarity > cur_sim
             cps_ins = cps_ins.on_conflict_do_update(
-                index_elements=["company_id", "pain_tag_id"], set_=set_clause,
+                index_elements=["company_id", "pain_tag_id"],
+                set_={
+                    "mention_count": table.c.mention_count + cps_ins.excluded.mention_count,
+                    "last_mention_at": cps_ins.excluded.last_mention_at,
+                    "top_quote": case(
+                        (is_better, cps_ins.excluded.top_quote), else_=table.c.top_quote,
+                    ),
+                    "top_quote_review_id": case(
+                        (is_better, cps_ins.excluded.top_quote_review_id),
+                        else_=table.c.top_quote_review_id,
+                    ),
+                    "top_quote_similarity": case(
+                        (is_better, cps_ins.excluded.top_quote_similarity),
+                        else_=table.c.top_quote_similarity,
+                    ),
+                },
             )
             await db.execute(cps_ins)
 
@@ -362,7 +536,7 @@ async def match_reviews_to_pain_tags(
         matched_review_ids = list(assigned.keys())
         if matched_review_ids:
             await db.execute(
-                update(Review).where(Review.id.in_(matched_review_ids))
+                update(Review).where(_id_in(Review.id, matched_review_ids))
                 .values(ai_processed_at=now)
             )
 
@@ -375,6 +549,39 @@ async def match_reviews_to_pain_tags(
 # ---------------------------------------------------------------------------
 
 
+def _pain_review_filter(is_positive: bool):
+    """Какие отзывы идут в кластеризацию (и в пул ничейных) данного sentiment.
+
+    negative-режим: sentiment явно negative/neutral, либо sentiment ещё NULL
+    (AI-пайплайн не отработал), но rating ≤ 3 как fallback. Так мы не теряем
+    старые отзывы без AI-разметки, но и не пускаем явные «5 звёзд → positive»
+    в кластеризацию болей.
+
+    positive-режим: предпочитаем Review.sentiment='positive', но падаем
+    назад к rating>=5 если sentiment не размечен (NULL). Без fallback'а
+    positive recluster молча возвращал 0 для ниш, у которых отзывы
+    были обработаны до миграции 015 (embedding есть, sentiment IS NULL),
+    или для свежих отзывов между запуском embedding-таски и sentiment-таски.
+    Берём rating>=5 (не 4★) — на пятёрке вероятность скрытого негатива
+    внутри текста минимальна, тогда как «4★ с критикой» — частый
+    анти-паттерн, который мог бы засорить позитивный кластер.
+    """
+    if is_positive:
+        return or_(
+            Review.sentiment == "positive",
+            and_(Review.sentiment.is_(None), Review.rating >= 5),
+        )
+    return or_(
+        Review.sentiment.in_(["negative", "neutral"]),
+        and_(Review.sentiment.is_(None), Review.rating <= 3),
+    )
+
+
+def _city_eq(column, city: str | None):
+    """city=None — отдельный «глобальный» бакет ниши, а не «любой город»."""
+    return column.is_(None) if city is None else column == city
+
+
 async def _archive_unused_pain_tags(
     db: AsyncSession,
     niche: str,
@@ -408,6 +615,82 @@ async def _archive_unused_pain_tags(
     await db.execute(q)
 
 
+async def _reuse_labels_by_centroid(
+    db: AsyncSession,
+    niche: str,
+    city: str | None,
+    sentiment: str,
+    clusters: list[dict[str, Any]],
+) -> dict[int, tuple[str, str | None]]:
+    """{cidx: (label, description)} для кластеров, чей центроид ближе
+    REVIEWS_AI_LABEL_REUSE_EPSILON (1 − cosine) к активному тегу этой же
+    (niche, city, sentiment). Пары берутся жадно по убыванию similarity,
+    каждый тег отдаёт label максимум одному кластеру."""
+    eps = settings.REVIEWS_AI_LABEL_REUSE_EPSILON
+    if eps <= 0 or not clusters:
+        return {}
+    tags = list((await db.execute(
+        select(PainTag.label, PainTag.description, PainTag.centroid).where(
+            PainTag.niche == niche,
+            _city_eq(PainTag.city, city),
+            PainTag.sentiment == sentiment,
+            PainTag.status == "active",
+            PainTag.centroid.isnot(None),
+        )
+    )).all())
+    if not tags:
+        return {}
+
+    def _unit(m: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(m, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return m / norms
+
+    new = _unit(np.asarray([c["centroid"] for c in clusters], dtype=np.float32))
+    old = _unit(np.asarray([t[2] for t in tags], dtype=np.float32))
+    sims = new @ old.T
+    reused: dict[int, tuple[str, str | None]] = {}
+    taken: set[int] = set()
+    for flat in np.argsort(-sims, axis=None):
+        ci, ti = divmod(int(flat), len(tags))
+        if sims[ci, ti] < 1.0 - eps:
+            break
+        cidx = clusters[ci]["cidx"]
+        if cidx in reused or ti in taken:
+            continue
+        reused[cidx] = (tags[ti][0], tags[ti][1])
+        taken.add(ti)
+    return reused
+
+
+async def _name_clusters(
+    niche: str,
+    samples: list[list[str]],
+    is_positive: bool,
+) -> list[dict[str, str] | None]:
+    """LLM-naming кластеров параллельно, не больше
+    REVIEWS_AI_NAMING_CONCURRENCY вызовов разом. Результат выровнен по samples.
+
+    У каждого вызова своя сессия: pick_assistant_id / chat читают ai_assistants
+    через db, а одну AsyncSession нельзя гонять из нескольких корутин.
+    """
+    if not samples:
+        return []
+    naming = llm.call_llm_strength_naming if is_positive else llm.call_llm_cluster_naming
+    sem = asyncio.Semaphore(max(1, settings.REVIEWS_AI_NAMING_CONCURRENCY))
+
+    async def _one(sample: list[str]) -> dict[str, str] | None:
+        async with sem:
+            try:
+                async with AsyncSessionLocal() as naming_db:
+                    return await naming(naming_db, niche, sample)
+            except Exception as e:
+                logger.warning("recluster %r: naming упал, будет fallback label: %s", niche, e)
+                return None
+
+    return list(await asyncio.gather(*(_one(s) for s in samples)))
+
+
 async def recluster_pains_for_niche(
     db: AsyncSession,
     niche: str,
@@ -415,9 +698,10 @@ async def recluster_pains_for_niche(
     min_cluster_size: int | None = None,
     company_ids: list[int] | None = None,
     sentiment: str = "negative",
+    backend: str | None = None,
 ) -> int:
     """1. Берём все reviews этой ниши+города с embeddings (фильтр по sentiment).
-    2. HDBSCAN.
+    2. Кластеризация (HDBSCAN или minibatch — см. backend ниже).
     3. Для каждого кластера: centroid + sample + LLM-name → UPSERT pain_tags.
     4. Старые активные pain_tags этой ниши+sentiment (не в новом наборе) → archived.
     5. Сбрасываем review_pain_tags / company_pain_scores этой ниши+sentiment и матчим заново.
@@ -439,41 +723,26 @@ async def recluster_pains_for_niche(
     UI с toggle «Боли / Сильные стороны» (PR #69) сам подтянет нужный
     набор по query-param `sentiment` в /maps/pain-tags.
 
+    backend ('hdbscan' | 'minibatch' | 'auto', по умолчанию
+    REVIEWS_AI_CLUSTER_BACKEND) — чем кластеризовать. auto берёт minibatch
+    (float32 + PCA до REVIEWS_AI_CLUSTER_REDUCE_DIMS + MiniBatchKMeans) для
+    ниш от REVIEWS_AI_CLUSTER_AUTO_MIN_N отзывов: полный HDBSCAN по 1536
+    измерениям на таких N не укладывается в time_limit таски.
+
     Возвращает количество созданных/обновлённых тегов.
     """
     if sentiment not in ("negative", "positive"):
         raise ValueError(f"recluster: invalid sentiment={sentiment!r}")
+    backend = backend or settings.REVIEWS_AI_CLUSTER_BACKEND
+    if backend not in (*CLUSTER_BACKENDS, "auto"):
+        raise ValueError(f"recluster: invalid backend={backend!r}")
     is_positive = sentiment == "positive"
     min_cs = min_cluster_size if min_cluster_size is not None else settings.REVIEWS_AI_MIN_CLUSTER_SIZE
 
     # 1. Reviews этой ниши+города с embedding (либо по company_ids — см. docstring)
-    #
-    # negative-режим: sentiment явно negative/neutral, либо sentiment ещё NULL
-    # (AI-пайплайн не отработал), но rating ≤ 3 как fallback. Так мы не теряем
-    # старые отзывы без AI-разметки, но и не пускаем явные «5 звёзд → positive»
-    # в кластеризацию болей.
-    #
-    # positive-режим: предпочитаем Review.sentiment='positive', но падаем
-    # назад к rating>=5 если sentiment не размечен (NULL). Без fallback'а
-    # positive recluster молча возвращал 0 для ниш, у которых отзывы
-    # были обработаны до миграции 015 (embedding есть, sentiment IS NULL),
-    # или для свежих отзывов между запуском embedding-таски и sentiment-таски.
-    # Берём rating>=5 (не 4★) — на пятёрке вероятность скрытого негатива
-    # внутри текста минимальна, тогда как «4★ с критикой» — частый
-    # анти-паттерн, который мог бы засорить позитивный кластер.
-    if is_positive:
-        pain_filter = or_(
-            Review.sentiment == "positive",
-            and_(Review.sentiment.is_(None), Review.rating >= 5),
-        )
-    else:
-        pain_filter = or_(
-            Review.sentiment.in_(["negative", "neutral"]),
-            and_(Review.sentiment.is_(None), Review.rating <= 3),
-        )
     base = (
         select(Review.id, Review.raw_text, Review.embedding, Review.company_id)
-        .where(Review.embedding.isnot(None), pain_filter)
+        .where(Review.embedding.isnot(None), _pain_review_filter(is_positive))
     )
     if company_ids:
         # Явный список компаний: фильтруем без JOIN на Company.niche/city
@@ -498,8 +767,16 @@ async def recluster_pains_for_niche(
         )
         return 0
 
-    embeddings = np.asarray([list(r[2]) for r in rows], dtype=np.float64)
-    labels = cluster_embeddings(embeddings, min_cluster_size=min_cs)
+    if backend == "auto":
+        backend = "minibatch" if len(rows) >= settings.REVIEWS_AI_CLUSTER_AUTO_MIN_N else "hdbscan"
+    # pgvector отдаёт float32-массивы; без list() — иначе N×1536 Python float'ов.
+    embeddings = np.asarray([r[2] for r in rows], dtype=np.float32)
+    labels = cluster_embeddings(
+        embeddings,
+        min_cluster_size=min_cs,
+        backend=backend,
+        reduce_dims=settings.REVIEWS_AI_CLUSTER_REDUCE_DIMS if backend == "minibatch" else None,
+    )
 
     cluster_ids = sorted({int(l) for l in labels if l >= 0})
     if not cluster_ids:
@@ -513,81 +790,105 @@ async def recluster_pains_for_niche(
         await db.commit()
         return 0
     logger.info(
-        "recluster %r/%r [%s]: нашли %d кластеров (размеры: %s)",
-        niche, city, sentiment, len(cluster_ids),
+        "recluster %r/%r [%s]: %s нашёл %d кластеров (размеры: %s)",
+        niche, city, sentiment, backend, len(cluster_ids),
         ", ".join(str(int(np.sum(labels == cid))) for cid in cluster_ids[:10]),
     )
 
-    # 2-3. Для каждого кластера: centroid + label
+    # 2-3. Для каждого кластера: centroid + sample. Порядок rng-сэмплинга —
+    # по cluster_ids, как и раньше: sample не зависит от того, кто из
+    # кластеров получит label из кэша.
     rng = random.Random(42)
-    upserted_ids: set[int] = set()
     now = datetime.now(timezone.utc)
-
+    clusters: list[dict[str, Any]] = []
     for cidx in cluster_ids:
-        member_idx = [i for i, l in enumerate(labels) if int(l) == cidx]
-        member_emb = embeddings[member_idx]
-        centroid = compute_centroid(member_emb)
-
+        member_idx = np.flatnonzero(labels == cidx).tolist()
         # sample до 10 текстов кластера
         sample_indices = member_idx if len(member_idx) <= 10 else rng.sample(member_idx, 10)
-        sample_texts = [rows[i][1] for i in sample_indices if rows[i][1]]
-
-        if is_positive:
-            named = await llm.call_llm_strength_naming(db, niche, sample_texts)
-        else:
-            named = await llm.call_llm_cluster_naming(db, niche, sample_texts)
-        if named:
-            label = named["label"]
-            description = named.get("description") or None
+        clusters.append({
+            "cidx": cidx,
+            "size": len(member_idx),
+            "centroid": compute_centroid(embeddings[member_idx]),
+            "samples": [rows[i][1] for i in sample_indices if rows[i][1]],
+            "examples": [
+                {"text_hash": None, "text_preview": (rows[i][1] or "")[:100]}
+                for i in sample_indices[:5]
+            ],
+        })
+
+    # Label-кэш: кластер, чей центроид в пределах ε по cosine от активного
+    # тега той же (niche, city, sentiment), наследует его label/description
+    # без LLM. Ночной recluster_popular_niches на стабильной нише так не
+    # переименовывает (и не оплачивает) одни и те же кластеры каждую ночь.
+    reused = await _reuse_labels_by_centroid(db, niche, city, sentiment, clusters)
+    to_name = [c for c in clusters if c["cidx"] not in reused]
+    named = await _name_clusters(niche, [c["samples"] for c in to_name], is_positive)
+    for c, res in zip(to_name, named):
+        if res:
+            c["label"], c["description"] = res["label"], res.get("description") or None
         else:
             # Fallback label, если LLM недоступен
             prefix = "Сильная сторона" if is_positive else "Кластер"
-            label = f"{prefix} {cidx + 1}"
-            description = None
-
-        examples = [
-            {"text_hash": None, "text_preview": (rows[i][1] or "")[:100]}
-            for i in sample_indices[:5]
-        ]
+            c["label"], c["description"] = f"{prefix} {c['cidx'] + 1}", None
+    for c in clusters:
+        if c["cidx"] in reused:
+            c["label"], c["description"] = reused[c["cidx"]]
+    logger.info(
+        "recluster %r/%r [%s]: label-кэш %d/%d кластеров, LLM-naming %d",
+        niche, city, sentiment, len(reused), len(clusters), len(to_name),
+    )
 
-        ins = pg_insert(PainTag).values(
-            niche=niche, city=city, label=label,
-            description=description,
-            occurrences_count=len(member_idx),
-            cluster_size=len(member_idx),
-            examples=examples,
-            status="active",
-            sentiment=sentiment,
-            created_at=now, updated_at=now,
-        )
-        # ON CONFLICT по основному UNIQUE — если city не NULL
-        # NB: для (niche, city=NULL, label, sentiment) используется частичный индекс ux_pain_tags_global;
-        # SQLAlchemy/pg_insert с on_conflict не умеет красиво работать с частичными индексами по-разному
-        # для двух случаев, поэтому для упрощения — на конфликт основного UNIQUE.
-        # После миграции 035 (2026-06-16) основной UNIQUE расширен sentiment-колонкой,
-        # чтобы один и тот же label мог сосуществовать в negative- и positive-наборах.
-        ins = ins.on_conflict_do_update(
-            index_elements=["niche", "city", "label", "sentiment"],
-            set_={
-                "description": ins.excluded.description,
-                "centroid": centroid.tolist(),
-                "occurrences_count": ins.excluded.occurrences_count,
-                "cluster_size": ins.excluded.cluster_size,
-                "examples": ins.excluded.examples,
-                "status": "active",
-                "updated_at": now,
-            },
-        ).returning(PainTag.id)
-        # centroid отдельно через UPDATE (insert above values() не включал centroid из-за типа)
-        result = await db.execute(ins)
-        tag_id = result.scalar_one()
-        # Гарантируем centroid: ON CONFLICT-кейс выше уже его обновляет в excluded;
-        # для INSERT-кейса — ставим явным UPDATE (insert.values() не передал centroid).
-        await db.execute(
-            text("UPDATE pain_tags SET centroid = :v WHERE id = :id"),
-            {"v": str(centroid.tolist()), "id": int(tag_id)},
-        )
-        upserted_ids.add(int(tag_id))
+    # Один multi-row UPSERT на все кластеры (centroid — прямо в VALUES,
+    # pgvector-тип принимает list). ON CONFLICT DO UPDATE не может задеть
+    # строку дважды за statement, поэтому совпавшие label'ы схлопываем
+    # заранее: остаётся больший кластер (раньше последний upsert молча
+    # перетирал предыдущий).
+    by_label: dict[str, dict[str, Any]] = {}
+    for c in clusters:
+        cur = by_label.get(c["label"])
+        if cur is None or c["size"] > cur["size"]:
+            by_label[c["label"]] = c
+    ins = pg_insert(PainTag).values([
+        {
+            "niche": niche, "city": city, "label": c["label"],
+            "description": c["description"],
+            "centroid": c["centroid"].tolist(),
+            "occurrences_count": c["size"],
+            "cluster_size": c["size"],
+            "examples": c["examples"],
+            "status": "active",
+            "sentiment": sentiment,
+            "created_at": now, "updated_at": now,
+        }
+        for c in by_label.values()
+    ])
+    # ON CONFLICT — по тому UNIQUE, который реально ловит повтор label'а.
+    # Для city=NULL основной (niche, city, label, sentiment) не срабатывает
+    # (NULL != NULL), а дубль ловит частичный ux_pain_tags_global
+    # (niche, label, sentiment) WHERE city IS NULL — цель конфликта должна
+    # быть он, иначе повторный глобальный recluster с переиспользованными
+    # label'ами падает на UniqueViolation. sentiment в обоих ключах с
+    # миграции 035 (2026-06-16): один label живёт в negative- и positive-наборах.
+    if city is None:
+        conflict = {
+            "index_elements": ["niche", "label", "sentiment"],
+            "index_where": PainTag.city.is_(None),
+        }
+    else:
+        conflict = {"index_elements": ["niche", "city", "label", "sentiment"]}
+    ins = ins.on_conflict_do_update(
+        **conflict,
+        set_={
+            "description": ins.excluded.description,
+            "centroid": ins.excluded.centroid,
+            "occurrences_count": ins.excluded.occurrences_count,
+            "cluster_size": ins.excluded.cluster_size,
+            "examples": ins.excluded.examples,
+            "status": "active",
+            "updated_at": now,
+        },
+    ).returning(PainTag.id)
+    upserted_ids = {int(tag_id) for tag_id in (await db.execute(ins)).scalars().all()}
 
     # 4. Архивируем неиспользуемые теги этой (niche, city, sentiment).
     # negative-recluster не трогает positive-теги и наоборот — каждый
@@ -638,14 +939,180 @@ async def recluster_pains_for_niche(
         force_city=city if company_ids else None,
         force_sentiment=sentiment,
     )
+    # 6. Пул ничейных этой (niche, city, sentiment) пересобираем с нуля:
+    # всё, что не легло ни в один новый центроид, — «шум» этой кластеризации
+    # (pending=False), повторно порог им не набираем.
+    unmatched = [rid for rid in review_ids if rid not in assigned]
+    await _reset_unassigned_pool(db, niche, city, sentiment, review_ids, unmatched)
+    await db.commit()
     logger.info(
-        "recluster %r/%r [%s]: DONE — %d тегов upserted, %d reviews сматчено к тегам",
-        niche, city, sentiment, len(upserted_ids), len(assigned),
+        "recluster %r/%r [%s]: DONE — %d тегов upserted, %d reviews сматчено к тегам, %d в пуле ничейных",
+        niche, city, sentiment, len(upserted_ids), len(assigned), len(unmatched),
     )
 
     return len(upserted_ids)
 
 
+# ---------------------------------------------------------------------------
+# Incremental assign (пул ничейных)
+# ---------------------------------------------------------------------------
+
+
+_POOL_UNNEST_UPSERT = text(
+    """
+    INSERT INTO pain_unassigned_reviews (review_id, sentiment, niche, city, pending, created_at)
+    SELECT v.review_id, CAST(:sentiment AS VARCHAR), CAST(:niche AS VARCHAR),
+           CAST(:city AS VARCHAR), CAST(:pending AS BOOLEAN), NOW()
+    FROM unnest(CAST(:review_ids AS BIGINT[])) AS v(review_id)
+    ON CONFLICT (review_id, sentiment) DO UPDATE
+    SET niche = EXCLUDED.niche, city = EXCLUDED.city, pending = EXCLUDED.pending
+    """
+)
+
+
+async def _add_to_unassigned_pool(
+    db: AsyncSession,
+    niche: str,
+    city: str | None,
+    sentiment: str,
+    review_ids: list[int],
+    pending: bool,
+) -> None:
+    if not review_ids:
+        return
+    await db.execute(_POOL_UNNEST_UPSERT, {
+        "review_ids": review_ids, "sentiment": sentiment,
+        "niche": niche, "city": city, "pending": pending,
+    })
+
+
+async def _reset_unassigned_pool(
+    db: AsyncSession,
+    niche: str,
+    city: str | None,
+    sentiment: str,
+    clustered_ids: list[int],
+    unmatched_ids: list[int],
+) -> None:
+    """После полного recluster'а: пул бакета = ровно unmatched_ids, pending=False.
+
+    Чистим и сам бакет, и строки clustered_ids из других бакетов (recluster
+    по company_ids мог подобрать отзывы, которые пул числил за другой нишей).
+    """
+    await db.execute(
+        delete(PainUnassignedReview).where(
+            PainUnassignedReview.sentiment == sentiment,
+            or_(
+                and_(
+                    PainUnassignedReview.niche == niche,
+                    _city_eq(PainUnassignedReview.city, city),
+                ),
+                _id_in(PainUnassignedReview.review_id, clustered_ids),
+            ),
+        )
+    )
+    await _add_to_unassigned_pool(db, niche, city, sentiment, unmatched_ids, pending=False)
+
+
+async def assign_pains_incremental(
+    db: AsyncSession,
+    niche: str,
+    city: str | None = None,
+    sentiment: str = "negative",
+    pool_threshold: int | None = None,
+) -> dict[str, Any]:
+    """Назначает pain_tags новым отзывам ниши без полного recluster'а.
+
+    1. Если активных тегов (niche, city, sentiment) ещё нет — сразу полный
+       recluster_pains_for_niche (создавать теги больше нечем).
+    2. «Новые» — отзывы ниши+города с embedding (фильтр как у recluster'а),
+       у которых нет связки ни с одним тегом этой ниши+sentiment и которых
+       нет в пуле ничейных. Их матчим к существующим центроидам.
+    3. Не подошедшие ни к одному центроиду → пул (pending=True).
+    4. pending-пул бакета ≥ pool_threshold (по умолчанию
+       REVIEWS_AI_UNASSIGNED_POOL_THRESHOLD) → полный recluster: значит,
+       в нише появилась тема, которой нет среди тегов.
+
+    Так LLM-naming и пересборка review_pain_tags/company_pain_scores
+    случаются по мере накопления нового материала, а не после каждого поиска.
+    Возвращает статистику {new, matched, pooled, pool_size, reclustered}.
+    """
+    if sentiment not in ("negative", "positive"):
+        raise ValueError(f"assign_incremental: invalid sentiment={sentiment!r}")
+    threshold = pool_threshold if pool_threshold is not None else settings.REVIEWS_AI_UNASSIGNED_POOL_THRESHOLD
+    stats: dict[str, Any] = {"new": 0, "matched": 0, "pooled": 0, "pool_size": 0, "reclustered": False}
+
+    tags = await _pain_tags_for_niche(db, niche, city, sentiment=sentiment)
+    if not any(t.centroid is not None for t in tags):
+        logger.info("assign_incremental %r/%r [%s]: тегов нет — полный recluster", niche, city, sentiment)
+        await recluster_pains_for_niche(db, niche, city, sentiment=sentiment)
+        stats["reclustered"] = True
+        return stats
+
+    linked = (
+        select(ReviewPainTag.review_id)
+        .join(PainTag, PainTag.id == ReviewPainTag.pain_tag_id)
+        .where(
+            ReviewPainTag.review_id == Review.id,
+            PainTag.niche == niche,
+            PainTag.sentiment == sentiment,
+        )
+        .exists()
+    )
+    pooled = (
+        select(PainUnassignedReview.review_id)
+        .where(
+            PainUnassignedReview.review_id == Review.id,
+            PainUnassignedReview.sentiment == sentiment,
+        )
+        .exists()
+    )
+    q = (
+        select(Review.id)
+        .join(Company, Company.id == Review.company_id)
+        .where(
+            Company.niche == niche,
+            Review.embedding.isnot(None),
+            _pain_review_filter(sentiment == "positive"),
+            ~linked,
+            ~pooled,
+        )
+    )
+    if city is not None:
+        q = q.where(Company.city == city)
+    new_ids = [int(r) for r in (await db.execute(q)).scalars().all()]
+    stats["new"] = len(new_ids)
+
+    if new_ids:
+        assigned = await match_reviews_to_pain_tags(
+            db, new_ids, force_niche=niche, force_city=city, force_sentiment=sentiment,
+        )
+        unmatched = [rid for rid in new_ids if rid not in assigned]
+        await _add_to_unassigned_pool(db, niche, city, sentiment, unmatched, pending=True)
+        await db.commit()
+        stats["matched"] = len(assigned)
+        stats["pooled"] = len(unmatched)
+
+    stats["pool_size"] = int((await db.execute(
+        select(func.count()).select_from(PainUnassignedReview).where(
+            PainUnassignedReview.niche == niche,
+            _city_eq(PainUnassignedReview.city, city),
+            PainUnassignedReview.sentiment == sentiment,
+            PainUnassignedReview.pending.is_(True),
+        )
+    )).scalar_one())
+    if stats["pool_size"] >= threshold > 0:
+        logger.info(
+            "assign_incremental %r/%r [%s]: пул ничейных %d ≥ %d — полный recluster",
+            niche, city, sentiment, stats["pool_size"], threshold,
+        )
+        await recluster_pains_for_niche(db, niche, city, sentiment=sentiment)
+        stats["reclustered"] = True
+
+    logger.info("assign_incremental %r/%r [%s]: %s", niche, city, sentiment, stats)
+    return stats
+
+
 # ---------------------------------------------------------------------------
 # Full pipeline (used by Celery analyze_reviews_for_company)
 # ---------------------------------------------------------------------------
@@ -4,8 +4,12 @@
 
 - analyze_reviews_for_company(company_id) — пайплайн для одной компании, ставится
   из parse_company_reviews после сохранения отзывов
-- analyze_reviews_batch(review_ids) — для ручного запуска / переобработки
+- analyze_reviews_batch(review_ids, company_id) — ставится из parse_company_reviews
+  на id только что вставленных отзывов (+ хвост необработанных той же компании);
+  без company_id — ручной запуск / переобработка
 - recluster_pains_for_niche_task(niche, city) — обёртка над service.recluster_pains_for_niche
+- assign_pains_incremental_task(niche, city) — после поиска: матч новых отзывов
+  к существующим тегам, полный recluster только при переполнении пула ничейных
 - recluster_popular_niches() — cron: top-30 (niche, city) по reviews_count → recluster каждой
 """
 
@@ -54,20 +58,35 @@ def analyze_reviews_for_company(self, company_id: int):
 
 
 # ---------------------------------------------------------------------------
-# analyze_reviews_batch (manual / re-processing)
+# analyze_reviews_batch
 # ---------------------------------------------------------------------------
 
 
-async def _analyze_reviews_batch_async(review_ids: list[int]) -> dict[str, int]:
+async def _analyze_reviews_batch_async(review_ids: list[int], company_id: Optional[int] = None) -> dict[str, int]:
     async with AsyncSessionLocal() as db:
-        return await service.process_reviews_pipeline(db, review_ids)
+        ids = set(review_ids)
+        if company_id is not None:
+            # Хвост компании с прошлых парсингов (упавший AI-прогон и т.п.) —
+            # иначе он ждал бы парсинга без новых отзывов, которого может не быть.
+            ids.update((await db.execute(
+                select(Review.id)
+                .where(Review.company_id == company_id, Review.ai_processed_at.is_(None))
+            )).scalars().all())
+        if not ids:
+            return {"sentiment": 0, "embeddings": 0, "matched": 0}
+        return await service.process_reviews_pipeline(db, sorted(int(i) for i in ids))
 
 
-@celery_app.task(name="analyze_reviews_batch", queue="maps_ai")
-def analyze_reviews_batch(review_ids: list[int]):
-    if not review_ids:
+@celery_app.task(name="analyze_reviews_batch", queue="maps_ai", bind=True, max_retries=2)
+def analyze_reviews_batch(self, review_ids: list[int], company_id: Optional[int] = None):
+    """Пайплайн на явный список отзывов; с company_id — плюс необработанные отзывы компании."""
+    if not review_ids and company_id is None:
         return {"sentiment": 0, "embeddings": 0, "matched": 0}
-    return asyncio.run(_analyze_reviews_batch_async(review_ids))
+    try:
+        return asyncio.run(_analyze_reviews_batch_async(review_ids, company_id))
+    except Exception as exc:
+        logger.warning("analyze_reviews_batch retrying (%d ids, company=%s): %s", len(review_ids), company_id, exc)
+        raise self.retry(exc=exc, countdown=60, max_retries=2)
 
 
 # ---------------------------------------------------------------------------
@@ -117,6 +136,32 @@ def recluster_pains_for_niche_task(
         raise self.retry(exc=exc, countdown=300, max_retries=1)
 
 
+async def _assign_incremental_async(niche: str, city: Optional[str], sentiment: str) -> dict[str, Any]:
+    async with AsyncSessionLocal() as db:
+        return await service.assign_pains_incremental(db, niche, city, sentiment=sentiment)
+
+
+@celery_app.task(name="assign_pains_incremental_task", queue="maps_ai", bind=True, time_limit=900)
+def assign_pains_incremental_task(
+    self,
+    niche: str,
+    city: Optional[str] = None,
+    sentiment: str = "negative",
+):
+    """Обёртка над service.assign_pains_incremental. Ставится после каждого
+    поиска вместо полного recluster'а; time_limit как у recluster — при
+    переполнении пула ничейных он запускается внутри.
+    """
+    try:
+        return asyncio.run(_assign_incremental_async(niche, city, sentiment))
+    except Exception as exc:
+        logger.warning(
+            "assign_pains_incremental_task retrying %r/%r [%s]: %s",
+            niche, city, sentiment, exc,
+        )
+        raise self.retry(exc=exc, countdown=300, max_retries=1)
+
+
 async def _top_niches_by_reviews_async(top_n: int = 30) -> list[tuple[str, str]]:
     """Возвращает топ-N (niche, city) комбинаций по количеству отзывов."""
     async with AsyncSessionLocal() as db:
@@ -0,0 +1,143 @@
+"""
+Normalised storage of crawled pages for keyword filtering.
+
+The crawl is per domain: every search result of a domain gets the same
+pages. They used to be copied into search_result_pages once per result
+(5 results × 10 pages = 50 rows, 50 tsvector computations, 50 × 10 KB of
+text). Now a page is stored once in crawled_pages, keyed by
+(domain, url, content_hash), and results point at it through the thin
+search_result_crawled_pages table. A re-crawl with unchanged content
+inserts nothing: ON CONFLICT keeps the existing row and its tsvector.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import delete, select, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.search import CrawledPage, SearchResultCrawledPage
+
+# Page fields that make up the content hash (and the FTS document).
+_HASHED_FIELDS = ("title", "meta_description", "h1_text", "text_content")
+
+# Orphans (no result links to them any more) are purged in batches.
+# Rows a running crawl has share-locked for reuse are skipped: that crawl
+# is about to link them (see store_domain_pages).
+_PURGE_BATCH = 5000
+_PURGE_ORPHANS = text(
+    """
+    DELETE FROM crawled_pages
+    WHERE id IN (
+        SELECT p.id FROM crawled_pages p
+        WHERE p.created_at < :before
+          AND NOT EXISTS (
+              SELECT 1 FROM search_result_crawled_pages m WHERE m.crawled_page_id = p.id
+          )
+        LIMIT :batch
+        FOR UPDATE SKIP LOCKED
+    )
+    """
+)
+# Insert/reuse rounds before giving up on pages purged under our feet.
+_UPSERT_ATTEMPTS = 3
+
+
+def content_hash(page: Dict[str, Any]) -> str:
+    """md5 over the text fields of a crawled page (same input → same row)."""
+    raw = "\x1f".join(page.get(f) or "" for f in _HASHED_FIELDS)
+    return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+
+async def store_domain_pages(
+    db: AsyncSession,
+    *,
+    search_id: int,
+    domain: str,
+    result_ids: Iterable[int],
+    pages: List[Dict[str, Any]],
+) -> List[int]:
+    """Upsert a domain's crawled pages and link them to `result_ids`.
+
+    Previous links of these results are replaced, so a re-crawl doesn't pile
+    up. Returns crawled_pages ids in crawl order. Commit is on the caller.
+    """
+    result_ids = list(result_ids)
+    rows: Dict[tuple, Dict[str, Any]] = {}
+    for p in pages:
+        if not p.get("url"):
+            continue
+        key = (p["url"], content_hash(p))
+        rows.setdefault(key, {
+            "domain": domain,
+            "url": key[0],
+            "content_hash": key[1],
+            "status_code": p.get("status_code"),
+            "title": p.get("title"),
+            "meta_description": p.get("meta_description"),
+            "h1_text": p.get("h1_text"),
+            "text_content": p.get("text_content"),
+            "created_at": datetime.utcnow(),
+        })
+
+    # Reused rows are read FOR SHARE, so purge_orphan_pages can't delete an
+    # old orphan between here and the link insert below (FK violation).
+    # A row the purge already deleted is simply not found — insert it again.
+    ids: Dict[tuple, int] = {}
+    for _ in range(_UPSERT_ATTEMPTS):
+        pending = [v for k, v in rows.items() if k not in ids]
+        if not pending:
+            break
+        inserted = await db.execute(
+            pg_insert(CrawledPage)
+            .values(pending)
+            .on_conflict_do_nothing(constraint="uq_crawled_pages_domain_url_hash")
+            .returning(CrawledPage.id, CrawledPage.url, CrawledPage.content_hash)
+        )
+        ids.update({(url, h): pid for pid, url, h in inserted.all()})
+        missing = [k for k in rows if k not in ids]
+        if missing:
+            existing = await db.execute(
+                select(CrawledPage.id, CrawledPage.url, CrawledPage.content_hash)
+                .where(
+                    CrawledPage.domain == domain,
+                    tuple_(CrawledPage.url, CrawledPage.content_hash).in_(missing),
+                )
+                .with_for_update(read=True)
+            )
+            ids.update({(url, h): pid for pid, url, h in existing.all()})
+
+    page_ids = [ids[k] for k in rows if k in ids]
+    if result_ids:
+        await db.execute(
+            delete(SearchResultCrawledPage).where(SearchResultCrawledPage.search_result_id.in_(result_ids))
+        )
+        if page_ids:
+            await db.execute(
+                pg_insert(SearchResultCrawledPage)
+                .values([
+                    {"search_result_id": rid, "crawled_page_id": pid, "search_id": search_id, "position": pos}
+                    for rid in result_ids
+                    for pos, pid in enumerate(page_ids)
+                ])
+                .on_conflict_do_nothing()
+            )
+    return page_ids
+
+
+async def purge_orphan_pages(db: AsyncSession, *, older_than: timedelta = timedelta(days=1)) -> int:
+    """Delete crawled pages no result links to (content changed on re-crawl,
+    search deleted). Recent rows are kept: a parallel crawl of the same
+    domain may be about to link them."""
+    before = datetime.utcnow() - older_than
+    total = 0
+    while True:
+        res = await db.execute(_PURGE_ORPHANS, {"before": before, "batch": _PURGE_BATCH})
+        await db.commit()
+        total += res.rowcount or 0
+        if (res.rowcount or 0) < _PURGE_BATCH:
+            return total
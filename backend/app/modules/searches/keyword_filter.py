@@ -12,10 +12,10 @@ from __future__ import annotations
 import re
 from typing import Iterable, List, Tuple
 
-from sqlalchemy import func, select
+from sqlalchemy import String, column, distinct, func, select, true, values
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.search import SearchResultPage
+from app.models.search import CrawledPage, SearchResultCrawledPage
 
 
 # Anything that isn't a letter/digit is treated as a separator. Cyrillic and
@@ -67,6 +67,24 @@ def build_tsquery(keywords: List[str], mode: str = "or") -> str | None:
     return sep.join(f"{kw}:*" for kw in keywords)
 
 
+def _result_ids_matching(search_id: int, tsquery: str):
+    """SELECT of search_result IDs with at least one crawled page matching
+    the tsquery. Each distinct page of the search is tested once, then fanned
+    out to its results via search_result_crawled_pages."""
+    link = SearchResultCrawledPage
+    matching_pages = (
+        select(CrawledPage.id)
+        .where(CrawledPage.id.in_(select(link.crawled_page_id).where(link.search_id == search_id)))
+        .where(CrawledPage.search_vector.op("@@")(func.to_tsquery("russian", tsquery)))
+    )
+    return (
+        select(link.search_result_id)
+        .where(link.search_id == search_id)
+        .where(link.crawled_page_id.in_(matching_pages))
+        .distinct()
+    )
+
+
 async def find_matching_result_ids(
     db: AsyncSession,
     *,
@@ -75,16 +93,52 @@ async def find_matching_result_ids(
 ) -> set[int]:
     """Return the set of search_result IDs that have at least one crawled page
     matching the tsquery."""
-    stmt = (
-        select(SearchResultPage.search_result_id)
-        .where(SearchResultPage.search_id == search_id)
-        .where(SearchResultPage.search_vector.op("@@")(func.to_tsquery("russian", tsquery)))
-        .distinct()
-    )
-    rows = (await db.execute(stmt)).scalars().all()
+    rows = (await db.execute(_result_ids_matching(search_id, tsquery))).scalars().all()
     return set(rows)
 
 
+def _keyword_hits_query(search_id: int, keywords: List[str]):
+    """SELECT (search_result_id, [keywords]) computing every keyword's hits in
+    one pass.
+
+    The OR of all keywords picks the search's candidate pages once; each
+    candidate is then tested against every keyword and the matched words are
+    aggregated per result. Before, one full FTS query per keyword ran on top
+    of the filter query. scripts/bench_keyword_hits.py compares the two.
+    """
+    link = SearchResultCrawledPage
+    words = values(column("word", String), name="words").data([(k,) for k in keywords])
+    # to_tsquery runs the stemmer — once per keyword, not once per page × keyword.
+    kw = (
+        select(words.c.word, func.to_tsquery("russian", words.c.word + ":*").label("q"))
+        .cte("kw")
+        .prefix_with("MATERIALIZED")
+    )
+    # Pages of the search matching any keyword (one GIN lookup, one heap
+    # pass), each with the array of keywords it contains. The ARRAY()
+    # subquery is evaluated per page, so a page's tsvector is read once and
+    # tested against every keyword in memory. MATERIALIZED stops Postgres from
+    # inlining the CTE and evaluating ARRAY() after the fan-out to results.
+    words_on_page = func.array(
+        select(kw.c.word).where(CrawledPage.search_vector.op("@@")(kw.c.q)).scalar_subquery()
+    )
+    page_words = (
+        select(CrawledPage.id, words_on_page.label("words"))
+        .where(CrawledPage.id.in_(select(link.crawled_page_id).where(link.search_id == search_id)))
+        .where(CrawledPage.search_vector.op("@@")(func.to_tsquery("russian", build_tsquery(keywords, "or"))))
+        .cte("page_words")
+        .prefix_with("MATERIALIZED")
+    )
+    word = func.unnest(page_words.c.words).table_valued("word").render_derived()
+    return (
+        select(link.search_result_id, func.array_agg(distinct(word.c.word)))
+        .join(page_words, page_words.c.id == link.crawled_page_id)
+        .join(word, true())
+        .where(link.search_id == search_id)
+        .group_by(link.search_result_id)
+    )
+
+
 async def get_keyword_hits_per_result(
     db: AsyncSession,
     *,
@@ -96,24 +150,8 @@ async def get_keyword_hits_per_result(
     if not keywords:
         return {}
 
-    hits: dict[int, set[str]] = {}
-    for kw in keywords:
-        per_kw_query = f"{kw}:*"
-        stmt = (
-            select(SearchResultPage.search_result_id)
-            .where(SearchResultPage.search_id == search_id)
-            .where(
-                SearchResultPage.search_vector.op("@@")(
-                    func.to_tsquery("russian", per_kw_query)
-                )
-            )
-            .distinct()
-        )
-        rows = (await db.execute(stmt)).scalars().all()
-        for rid in rows:
-            hits.setdefault(rid, set()).add(kw)
-
-    return {rid: sorted(words) for rid, words in hits.items()}
+    rows = (await db.execute(_keyword_hits_query(search_id, keywords))).all()
+    return {rid: sorted(words) for rid, words in rows}
 
 
 def parse_keywords_and_query(
@@ -137,7 +175,7 @@ def parse_keywords_and_query(
 #     ] }
 #
 # We fan that out into:
-#   - per-result FTS hits via search_result_pages (text/title/meta/contains)
+#   - per-result FTS hits via crawled_pages (text/title/meta/contains)
 #   - SQL filters on search_results columns (domain, has_phone, has_email)
 #   - SQL filter on extra_data->'classification'->>'site_type'
 #
@@ -200,13 +238,7 @@ async def _ids_matching_fts_condition(
     body = _build_fts_query_for_condition(field, op, value)
     if not body:
         return set()
-    stmt = (
-        select(SearchResultPage.search_result_id)
-        .where(SearchResultPage.search_id == search_id)
-        .where(SearchResultPage.search_vector.op("@@")(func.to_tsquery("russian", body)))
-        .distinct()
-    )
-    return set((await db.execute(stmt)).scalars().all())
+    return set((await db.execute(_result_ids_matching(search_id, body))).scalars().all())
 
 
 async def _ids_matching_sql_condition(
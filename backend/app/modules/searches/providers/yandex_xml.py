@@ -1,16 +1,37 @@
 """
-Yandex Cloud Search API (web search) через yandex_cloud_ml_sdk.
+Yandex Cloud Search API (web search), XML-выдача.
 
 Дока: https://yandex.cloud/ru/docs/search-api/quickstart
 Нужны: folder_id (идентификатор каталога), api_key (API-ключ сервисного аккаунта).
+
+Раньше каждая страница шла через yandex_cloud_ml_sdk в `asyncio.to_thread`:
+синхронный HTTP + run_deferred с поллингом операции раз в секунду, по 3
+страницы за раз — поток пула на страницу и минимум секунда на батч. Теперь —
+нативный async:
+
+- синхронный метод REST API `POST /v2/web/search` (одна страница — один
+  запрос, без поллинга операции) через общий httpx-клиент "api";
+- страницы запрашиваются параллельно; параллелизм — AIMD: +1 за успешный
+  ответ, ×0.5 на 429/RESOURCE_EXHAUSTED и ×0.75, если латентность ушла
+  выше 2× базовой. Выученный лимит запоминается на процесс (по folder_id);
+- XML разбирается потоково (iterparse), группы очищаются по мере разбора,
+  разбор обрывается, как только набрано нужное число результатов;
+- `iter_result_pages` отдаёт страницы по порядку, как только они готовы,
+  и отменяет оставшиеся запросы, когда набрано num_results или пришла
+  неполная (последняя) страница.
 """
 
 import asyncio
+import base64
+import io
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 from xml.etree import ElementTree as ET
 
+from app.core.config import settings
+from app.core.http_clients import get_client
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +41,19 @@ USER_AGENT = (
     "(KHTML, like Gecko) Chrome/132.0.0.0 YaBrowser/25.2.0.0 Safari/537.36"
 )
 
+SEARCH_URL = "https://searchapi.api.cloud.yandex.net/v2/web/search"
+PAGE_SIZE = 10
+_REQUEST_TIMEOUT = 30.0
+_MAX_ATTEMPTS = 4
+
+_PERMISSION_DENIED_MESSAGE = (
+    "Yandex Cloud Search API: Permission denied. Часто: 1) Нужен «Создать API-ключ» у СА (не «Статический ключ доступа»), ключ AQVN...; "
+    "2) роли «Редактор» или «ai.editor» на каталог у этого СА; 3) folder_id = ID того же каталога. Подробно: docs/guides/YANDEX_XML_SETUP.md"
+)
+
+# folder_id -> выученный AIMD-лимит (переживает отдельные поиски воркера).
+_learned_limits: Dict[str, float] = {}
+
 
 def _is_permission_denied(err: BaseException) -> bool:
     s = str(err)
@@ -39,104 +73,227 @@ def _is_permission_denied(err: BaseException) -> bool:
     )
 
 
-def _fetch_page_sync(folder_id: str, api_key: str, query: str, page: int) -> bytes:
-    """Синхронный вызов SDK: одна страница в XML. Блокирует — вызывать из to_thread."""
-    from yandex_cloud_ml_sdk import YCloudML
-    # Public API (0.19+ moved away from private _auth module)
-    from yandex_cloud_ml_sdk.auth import APIKeyAuth
-
-    auth = APIKeyAuth(api_key=api_key)
-    sdk = YCloudML(folder_id=folder_id, auth=auth)
-    try:
-        sdk.setup_default_logging("error")
-    except Exception as e:
-        logger.debug("setup_default_logging failed: %s", e)
-    try:
-        search = sdk.search_api.web(search_type="ru", user_agent=USER_AGENT)
-        operation = search.run_deferred(query, format="xml", page=page)
-        return operation.wait(poll_interval=1)
-    except Exception as e:
-        if _is_permission_denied(e):
-            raise ValueError(
-                "Yandex Cloud Search API: Permission denied. Часто: 1) Нужен «Создать API-ключ» у СА (не «Статический ключ доступа»), ключ AQVN...; "
-                "2) роли «Редактор» или «ai.editor» на каталог у этого СА; 3) folder_id = ID того же каталога. Подробно: docs/guides/YANDEX_XML_SETUP.md"
-            ) from e
-        raise
+class YandexXMLAuthError(ValueError):
+    """Ключ/каталог не подходят — повторять и пропускать страницы бессмысленно."""
 
 
-def _parse_xml_results(xml_bytes: bytes, page: int) -> List[Dict[str, Any]]:
-    """Парсит XML из Search API в список {position, title, url, snippet, domain}."""
-    results = []
-    try:
-        root = ET.fromstring(xml_bytes.decode("utf-8"))
-    except Exception as e:
-        raise ValueError(f"Yandex Cloud Search API: не удалось разобрать XML: {e}") from e
+class _Throttled(Exception):
+    """429 / RESOURCE_EXHAUSTED — повторить после паузы с меньшим параллелизмом."""
 
-    error = root.find(".//error")
-    if error is not None:
-        code = error.get("code", "unknown")
-        text = error.text or "Unknown error"
-        raise ValueError(f"Yandex Cloud Search API error {code}: {text}")
-
-    response_elem = root.find(".//response")
-    if response_elem is None:
-        return results
-
-    groups = response_elem.findall(".//group")
-    for idx, group in enumerate(groups, start=page * 10 + 1):
-        doc = group.find(".//doc")
-        if doc is None:
-            continue
-        url_elem = doc.find(".//url")
-        title_elem = doc.find(".//title")
-        snippet_elem = doc.find(".//passages/passage") or doc.find(".//headline")
-        url = (url_elem.text or "").strip() if url_elem is not None else ""
-        title = (title_elem.text or "").strip() if title_elem is not None else ""
-        snippet = (snippet_elem.text or "").strip() if snippet_elem is not None and snippet_elem.text else ""
-        domain = urlparse(url).netloc if url else ""
-        results.append({"position": idx, "title": title, "url": url, "snippet": snippet, "domain": domain})
+    def __init__(self, retry_after: float):
+        super().__init__(f"throttled, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
 
-    return results
 
+class AIMDLimiter:
+    """Ограничитель параллелизма с AIMD-подстройкой лимита.
 
-async def fetch_search_results(
-    query: str,
-    num_results: int = 50,
-    region: int = 213,
-    page: int = 0,
-    provider_config: Optional[dict] = None,
-    **kwargs,
-) -> List[Dict[str, Any]]:
-    """
-    Результаты веб-поиска через Yandex Cloud Search API (yandex_cloud_ml_sdk).
-    Провайдер «Яндекс XML»: folder_id и api_key из provider_config или YANDEX_XML_FOLDER_ID, YANDEX_XML_KEY.
+    acquire/release — как у семафора, но ёмкость `int(limit)` меняется на
+    лету: on_success увеличивает её на 1 (или уменьшает ×0.75, если
+    латентность выше 2× базовой), on_throttle — делит пополам.
     """
-    from app.core.config import settings
 
+    def __init__(self, initial: float, *, min_limit: float = 1.0, max_limit: float = 10.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = max(min_limit, min(max_limit, initial))
+        self.in_flight = 0
+        self.base_latency: Optional[float] = None
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency: float) -> None:
+        if self.base_latency is None or latency < self.base_latency:
+            self.base_latency = latency
+        if latency > 2 * self.base_latency:
+            self.limit = max(self.min_limit, self.limit * 0.75)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1)
+
+    def on_throttle(self) -> None:
+        self.limit = max(self.min_limit, self.limit * 0.5)
+
+
+def _credentials(provider_config: Optional[dict]) -> Tuple[str, str]:
     cfg = provider_config or {}
     folder_id = (cfg.get("folder_id") or getattr(settings, "YANDEX_XML_FOLDER_ID", None) or "").strip()
     api_key = (cfg.get("api_key") or getattr(settings, "YANDEX_XML_KEY", None) or "").strip()
-
     if not folder_id or not api_key:
         raise ValueError(
             "Yandex Cloud Search API не настроен. Укажите в Провайдеры → Яндекс XML: "
             "«Идентификатор каталога» (folder_id) и «API-ключ» (сервисного аккаунта). "
             "Дока: https://yandex.cloud/ru/docs/search-api/quickstart"
         )
+    return folder_id, api_key
+
 
+async def fetch_page(folder_id: str, api_key: str, query: str, page: int, region: Optional[int] = None) -> bytes:
+    """Одна страница выдачи в XML (один запрос). 429 → _Throttled, 401/403 → YandexXMLAuthError."""
+    body: Dict[str, Any] = {
+        "query": {"searchType": "SEARCH_TYPE_RU", "queryText": query, "page": str(page)},
+        "folderId": folder_id,
+        "responseFormat": "FORMAT_XML",
+        "userAgent": USER_AGENT,
+    }
+    if region:
+        body["region"] = str(region)
+    resp = await get_client("api").post(
+        SEARCH_URL,
+        json=body,
+        headers={"Authorization": f"Api-Key {api_key}"},
+        timeout=_REQUEST_TIMEOUT,
+    )
+    if resp.status_code == 429 or (resp.status_code == 503 and "RESOURCE_EXHAUSTED" in resp.text):
+        try:
+            retry_after = float(resp.headers.get("Retry-After") or 1.0)
+        except ValueError:
+            retry_after = 1.0
+        raise _Throttled(retry_after)
+    if resp.status_code in (401, 403) or (resp.status_code >= 400 and _is_permission_denied(Exception(resp.text))):
+        raise YandexXMLAuthError(_PERMISSION_DENIED_MESSAGE)
+    resp.raise_for_status()
+    raw = resp.json().get("rawData")
+    if not raw:
+        raise ValueError("Yandex Cloud Search API: пустой ответ (нет rawData)")
+    return base64.b64decode(raw)
+
+
+async def _fetch_with_retries(
+    limiter: AIMDLimiter, folder_id: str, api_key: str, query: str, page: int, region: Optional[int],
+) -> bytes:
+    for attempt in range(1, _MAX_ATTEMPTS + 1):
+        await limiter.acquire()
+        t0 = time.monotonic()
+        try:
+            xml_bytes = await fetch_page(folder_id, api_key, query, page, region)
+        except _Throttled as e:
+            limiter.on_throttle()
+            delay = e.retry_after
+        except YandexXMLAuthError:
+            raise
+        except Exception as e:
+            if attempt == _MAX_ATTEMPTS:
+                raise
+            logger.warning("yandex_xml page %d attempt %d failed: %s", page, attempt, e)
+            delay = 0.5 * attempt
+        else:
+            limiter.on_success(time.monotonic() - t0)
+            return xml_bytes
+        finally:
+            await limiter.release()
+        await asyncio.sleep(delay)
+    raise ValueError(f"Yandex Cloud Search API: страница {page} — превышен лимит запросов (429)")
+
+
+def _parse_xml_results(xml_bytes: bytes, page: int, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Парсит XML из Search API в список {position, title, url, snippet, domain}.
+
+    Потоково (iterparse): каждая <group> разбирается и очищается по закрытию
+    тега; с `limit` разбор останавливается на limit-м результате.
+    """
+    results: List[Dict[str, Any]] = []
+    idx = page * PAGE_SIZE
+    in_response = False
+    try:
+        for event, elem in ET.iterparse(io.BytesIO(xml_bytes), events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                if tag == "response":
+                    in_response = True
+                continue
+            if tag == "error":
+                code = elem.get("code", "unknown")
+                text = elem.text or "Unknown error"
+                raise ValueError(f"Yandex Cloud Search API error {code}: {text}")
+            if tag != "group" or not in_response:
+                continue
+            idx += 1
+            doc = elem.find(".//doc")
+            if doc is not None:
+                url_elem = doc.find(".//url")
+                title_elem = doc.find(".//title")
+                snippet_elem = doc.find(".//passages/passage") or doc.find(".//headline")
+                url = (url_elem.text or "").strip() if url_elem is not None else ""
+                title = (title_elem.text or "").strip() if title_elem is not None else ""
+                snippet = (snippet_elem.text or "").strip() if snippet_elem is not None and snippet_elem.text else ""
+                domain = urlparse(url).netloc if url else ""
+                results.append({"position": idx, "title": title, "url": url, "snippet": snippet, "domain": domain})
+            elem.clear()
+            if limit is not None and len(results) >= limit:
+                break
+    except ET.ParseError as e:
+        raise ValueError(f"Yandex Cloud Search API: не удалось разобрать XML: {e}") from e
+    return results
+
+
+async def iter_result_pages(
+    query: str,
+    num_results: int,
+    provider_config: Optional[dict] = None,
+    region: Optional[int] = None,
+) -> AsyncIterator[Tuple[int, List[Dict[str, Any]]]]:
+    """(page, results) по порядку страниц, как только страница готова.
+
+    Все нужные страницы запрашиваются сразу (под AIMD-лимитом). Страница,
+    которая не загрузилась после повторов, логируется и пропускается, как и
+    раньше; ошибки доступа (YandexXMLAuthError) пробрасываются. Остаток запросов
+    отменяется, когда набрано num_results или страница неполная.
+    """
+    folder_id, api_key = _credentials(provider_config)
     num_results = min(num_results, 100)
-    all_results = []
-    pages_needed = (num_results + 9) // 10
+    pages_needed = (num_results + PAGE_SIZE - 1) // PAGE_SIZE
+    limiter = AIMDLimiter(
+        _learned_limits.get(folder_id, settings.YANDEX_XML_CONCURRENCY_INITIAL),
+        max_limit=settings.YANDEX_XML_CONCURRENCY_MAX,
+    )
+    tasks = [
+        asyncio.create_task(_fetch_with_retries(limiter, folder_id, api_key, query, p, region))
+        for p in range(pages_needed)
+    ]
+    collected = 0
+    try:
+        for page, task in enumerate(tasks):
+            try:
+                xml_bytes = await task
+                page_results = _parse_xml_results(xml_bytes, page, limit=num_results - collected)
+            except YandexXMLAuthError:
+                raise
+            except Exception as e:
+                logger.warning("yandex_xml: page %d for %r skipped: %s", page, query, e)
+                continue
+            collected += len(page_results)
+            yield page, page_results
+            if len(page_results) < PAGE_SIZE or collected >= num_results:
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        _learned_limits[folder_id] = limiter.limit
 
-    for page_num in range(pages_needed):
-        xml_bytes = await asyncio.to_thread(
-            _fetch_page_sync, folder_id, api_key, query, page_num
-        )
-        page_results = _parse_xml_results(xml_bytes, page_num)
-        all_results.extend(page_results)
-        if len(page_results) < 10:
-            break
-        if len(all_results) >= num_results:
-            break
 
-    return all_results[:num_results]
+async def fetch_search_results(
+    query: str,
+    num_results: int = 50,
+    region: int = 213,
+    page: int = 0,
+    provider_config: Optional[dict] = None,
+    **kwargs,
+) -> List[Dict[str, Any]]:
+    """
+    Результаты веб-поиска через Yandex Cloud Search API.
+    Провайдер «Яндекс XML»: folder_id и api_key из provider_config или YANDEX_XML_FOLDER_ID, YANDEX_XML_KEY.
+    """
+    all_results: List[Dict[str, Any]] = []
+    async for _page, page_results in iter_result_pages(query, num_results, provider_config, region):
+        all_results.extend(page_results)
+    return all_results[:min(num_results, 100)]
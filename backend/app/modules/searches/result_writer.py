@@ -0,0 +1,100 @@
+"""
+Buffered writer for SERP results of execute_search_task.
+
+Results used to be saved with `db.add(result)` + `commit()` per item, so
+every row cost a transaction (and an fsync) just to keep the UI live. The
+writer buffers rows and writes them with one multi-row INSERT ... RETURNING
+every SEARCH_RESULTS_FLUSH_ROWS items or once the oldest buffered row is
+SEARCH_RESULTS_FLUSH_MS milliseconds old, whichever comes first. After each commit it publishes the new
+rows to `search_stream:{search_id}` (Redis pub/sub, as the maps SSE does),
+and GET /searches/{id}/stream relays them to the browser.
+
+Events: `results` {"results": [...], "result_count": n} per flush and
+`done` {"status", "result_count", "error"} at the end of the search.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.redis_pubsub import publish_event, search_stream_channel
+from app.models.search import SearchResult
+
+_RETURNING = (
+    SearchResult.id, SearchResult.position, SearchResult.title,
+    SearchResult.url, SearchResult.snippet, SearchResult.domain,
+)
+
+
+class SearchResultWriter:
+    """Buffers SERP items of one search and flushes them in batches.
+
+    Usage:
+        writer = SearchResultWriter(db, search.id)
+        await writer.add(item)       # flushes by size / time
+        await writer.flush()         # e.g. at a page boundary
+        ...
+        await writer.flush()         # the tail, before finishing the search
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        search_id: int,
+        *,
+        flush_rows: Optional[int] = None,
+        flush_ms: Optional[int] = None,
+    ) -> None:
+        self.db = db
+        self.search_id = search_id
+        self.flush_rows = max(1, flush_rows or settings.SEARCH_RESULTS_FLUSH_ROWS)
+        self.flush_interval = (flush_ms if flush_ms is not None else settings.SEARCH_RESULTS_FLUSH_MS) / 1000.0
+        self.saved_count = 0
+        self._buffer: List[Dict[str, Any]] = []
+        # The clock starts with the first buffered row, not at construction:
+        # the writer is created before a provider fetch that may take minutes.
+        self._buffered_since = 0.0
+
+    async def add(self, item: Dict[str, Any]) -> None:
+        """Queue one SERP item (position, title, url, snippet, domain)."""
+        if not self._buffer:
+            self._buffered_since = time.monotonic()
+        self._buffer.append({
+            "search_id": self.search_id,
+            "position": item["position"],
+            "title": item["title"],
+            "url": item["url"],
+            "snippet": item.get("snippet"),
+            "domain": item.get("domain", ""),
+        })
+        if (
+            len(self._buffer) >= self.flush_rows
+            or time.monotonic() - self._buffered_since >= self.flush_interval
+        ):
+            await self.flush()
+
+    async def flush(self) -> int:
+        """INSERT the buffered rows in one statement, commit, publish. Returns rows written."""
+        if not self._buffer:
+            return 0
+        rows, self._buffer = self._buffer, []
+        inserted = (await self.db.execute(insert(SearchResult).values(rows).returning(*_RETURNING))).all()
+        await self.db.commit()
+        self.saved_count += len(inserted)
+        await publish_event(search_stream_channel(self.search_id), "results", {
+            "results": [dict(r._mapping) for r in inserted],
+            "result_count": self.saved_count,
+        })
+        return len(inserted)
+
+
+async def publish_search_done(search_id: int, status: str, result_count: int, error: Optional[str] = None) -> None:
+    """Final event for GET /searches/{id}/stream: the stream closes on it."""
+    await publish_event(search_stream_channel(search_id), "done", {
+        "status": status, "result_count": result_count, "error": error,
+    })
@@ -128,6 +128,35 @@ async def get_search_results(
     return results
 
 
+@router.get("/{search_id}/stream")
+async def stream_search(
+    search_id: int,
+    user_id: int = Depends(get_current_user_id),
+    organization_id: Optional[int] = Depends(get_current_organization_id),
+    db=Depends(get_db),
+):
+    """SSE stream of search progress: results saved so far, then each batch
+    written by the task (Redis channel search_stream:{search_id}). Closes on
+    event=done or when the client disconnects.
+    """
+    search = await service.get_search_model(
+        db=db, search_id=search_id, organization_id=organization_id
+    )
+    if not search:
+        raise HTTPException(status_code=404, detail="Search not found")
+    from app.modules.searches.sse import iter_search_events
+
+    return StreamingResponse(
+        iter_search_events(db, search),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # nginx: не буферить
+            "Connection": "keep-alive",
+        },
+    )
+
+
 @router.delete("/{search_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_search(
     search_id: int,
@@ -78,18 +78,27 @@ async def get_searches(
     return [schemas.SearchResponse.model_validate(s) for s in searches]
 
 
-async def get_search(
+async def get_search_model(
     db: AsyncSession,
     search_id: int,
-    user_id: int,
     organization_id: Optional[int],
-) -> Optional[schemas.SearchResponse]:
-    """Get a specific search. Superuser (org_id=None) can access any search."""
+) -> Optional[Search]:
+    """Search row visible to the organization. Superuser (org_id=None) sees any search."""
     query = select(Search).where(Search.id == search_id)
     if organization_id is not None:
         query = query.where(Search.organization_id == organization_id)
     result = await db.execute(query)
-    search = result.scalar_one_or_none()
+    return result.scalar_one_or_none()
+
+
+async def get_search(
+    db: AsyncSession,
+    search_id: int,
+    user_id: int,
+    organization_id: Optional[int],
+) -> Optional[schemas.SearchResponse]:
+    """Get a specific search. Superuser (org_id=None) can access any search."""
+    search = await get_search_model(db, search_id, organization_id)
     if not search:
         return None
     return schemas.SearchResponse.model_validate(search)
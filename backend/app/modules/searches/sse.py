@@ -0,0 +1,85 @@
+"""
+SSE progress stream of a search. Used by router.stream_search.
+
+1. bootstrap — results already in the DB as one `results` event; if the
+   search is finished, `done` right away.
+2. live — events of search_stream:{search_id} published by
+   result_writer.SearchResultWriter (`results` per flush, `done` at the end).
+3. heartbeat — an SSE comment every SSE_HEARTBEAT_INTERVAL seconds so that
+   proxies don't drop the idle connection.
+
+Same wire format and flow as maps.sse.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import AsyncIterator
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.redis_pubsub import Subscription, search_stream_channel
+from app.models.search import Search, SearchResult
+from app.modules.maps.sse import SSE_HEARTBEAT_INTERVAL, _format_event
+
+logger = logging.getLogger(__name__)
+
+_FINISHED = ("completed", "failed")
+
+
+async def iter_search_events(db: AsyncSession, search: Search) -> AsyncIterator[str]:
+    """Main async generator, ready for StreamingResponse."""
+    # Subscribe before the bootstrap read so that a flush in between isn't lost
+    # (the client dedups rows by id). The subscription is live once open()
+    # returns; an idle heartbeat interval doesn't close it.
+    sub = None
+    if search.status not in _FINISHED:
+        sub = Subscription(search_stream_channel(search.id))
+        try:
+            await sub.open()
+        except Exception as e:
+            logger.warning("search sse %d: subscribe error %s", search.id, e)
+            await sub.aclose()
+            sub = None
+
+    try:
+        rows = (await db.execute(
+            select(
+                SearchResult.id, SearchResult.position, SearchResult.title,
+                SearchResult.url, SearchResult.snippet, SearchResult.domain,
+            )
+            .where(SearchResult.search_id == search.id)
+            .order_by(SearchResult.position)
+        )).all()
+        yield _format_event("results", {
+            "results": [dict(r._mapping) for r in rows], "result_count": len(rows),
+        })
+
+        if search.status in _FINISHED:
+            yield _format_event("done", {
+                "status": search.status,
+                "result_count": search.result_count or len(rows),
+                "error": (search.config or {}).get("error") if isinstance(search.config, dict) else None,
+            })
+            return
+
+        while sub is not None:
+            try:
+                event = await sub.get_event(timeout=SSE_HEARTBEAT_INTERVAL)
+            except Exception as e:
+                logger.warning("search sse %d: subscribe error %s", search.id, e)
+                return
+            if event is None:
+                yield ": hb\n\n"
+                continue
+
+            ev_type = event.get("type")
+            if not isinstance(ev_type, str):
+                continue
+            yield _format_event(ev_type, event.get("data") or {})
+            if ev_type == "done":
+                return
+    finally:
+        if sub is not None:
+            await sub.aclose()
@@ -66,6 +66,11 @@ celery_app.conf.update(
             "task": "purge_review_raw_text",
             "schedule": crontab(hour=3, minute=30),
         },
+        # searches cron: страницы краулера, на которые больше не ссылается ни один результат
+        "purge-orphan-crawled-pages-daily": {
+            "task": "purge_orphan_crawled_pages",
+            "schedule": crontab(hour=3, minute=45),
+        },
         # reviews_ai cron: переcclusterизация top-30 ниш
         "recluster-popular-niches-daily": {
             "task": "recluster_popular_niches",
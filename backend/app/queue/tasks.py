@@ -129,6 +129,7 @@ async def _execute_search_async(search_id: int):
         search.started_at = datetime.utcnow()
         await db.commit()
 
+        writer = None
         try:
             # Fetch results using selected provider (без переключения на других провайдеров)
             from app.modules.providers import get_provider_config
@@ -142,94 +143,36 @@ async def _execute_search_async(search_id: int):
             search_config = search.config if isinstance(search.config, dict) else {}
             yandex_region_id: int = int(search_config.get("yandex_region_id", 213))
 
-            # Filter blacklisted domains
-            from app.modules.filters.blacklist import is_blacklisted, SEED_BLACKLIST
+            # Filter blacklisted domains: SEED_BLACKLIST + user's, compiled and cached per user
+            from app.modules.filters.blacklist import get_user_blacklist, is_blacklisted
 
-            # Get user's blacklist from DB
-            from app.models.filter import BlacklistDomain
+            all_blacklist = await get_user_blacklist(db, search.user_id)
 
-            blacklist_result = await db.execute(
-                select(BlacklistDomain.domain).where(BlacklistDomain.user_id == search.user_id)
-            )
-            user_blacklist = [row[0] for row in blacklist_result.all()]
-            all_blacklist = SEED_BLACKLIST + user_blacklist
+            # Results are written in batches (multi-row INSERT) and streamed to the UI via Redis
+            from app.modules.searches.result_writer import SearchResultWriter, publish_search_done
+
+            writer = SearchResultWriter(db, search.id)
 
             # For yandex_xml: save results page by page for real-time updates
             if provider_id == "yandex_xml":
-                from app.modules.searches.providers.yandex_xml import _fetch_page_sync, _parse_xml_results
-                from app.core.config import settings
-
-                cfg = provider_config or {}
-                folder_id = (cfg.get("folder_id") or getattr(settings, "YANDEX_XML_FOLDER_ID", None) or "").strip()
-                api_key = (cfg.get("api_key") or getattr(settings, "YANDEX_XML_KEY", None) or "").strip()
-
-                if not folder_id or not api_key:
-                    raise ValueError(
-                        "Yandex Cloud Search API не настроен. Укажите в Провайдеры → Яндекс XML: "
-                        "«Идентификатор каталога» (folder_id) и «API-ключ» (сервисного аккаунта)."
-                    )
+                from app.modules.searches.providers.yandex_xml import iter_result_pages
 
                 num_results = min(search.num_results, 100)
-                pages_needed = (num_results + 9) // 10
-                all_results_data = []
-                saved_count = 0
                 unique_domains = {}
-                # Параллельная загрузка страниц батчами по 3 для ускорения (без перегрузки API)
-                PAGE_BATCH_SIZE = 3
-                page_num = 0
-                while page_num < pages_needed:
-                    batch_pages = list(range(page_num, min(page_num + PAGE_BATCH_SIZE, pages_needed)))
-                    # Загружаем батч страниц параллельно
-                    fetch_tasks = [
-                        asyncio.to_thread(_fetch_page_sync, folder_id, api_key, search.query, p) for p in batch_pages
-                    ]
-                    try:
-                        xml_results_list = await asyncio.gather(*fetch_tasks, return_exceptions=True)
-                    except asyncio.TimeoutError:
-                        raise ValueError(
-                            "Поисковая система не ответила за 120 с. "
-                            "Яндекс/Google часто блокируют запросы с серверов. Включите прокси в настройках провайдера или попробуйте позже."
-                        )
-                    # Обрабатываем страницы батча, коммитим раз на батч (меньше round-trip в БД, UI обновляется каждые ~3 страницы)
-                    batch_done = False
-                    for i, (p, xml_or_err) in enumerate(zip(batch_pages, xml_results_list)):
-                        if isinstance(xml_or_err, BaseException):
-                            logger.warning("Error fetching page %d for search %d: %s", p, search.id, xml_or_err)
+                # Страницы запрашиваются параллельно (AIMD) и приходят по порядку;
+                # лишние запросы отменяются, как только набрано num_results
+                async for _page, page_results in iter_result_pages(
+                    search.query, num_results, provider_config, region=yandex_region_id,
+                ):
+                    for item in page_results:
+                        domain = item.get("domain", "")
+                        if domain and is_blacklisted(domain, all_blacklist):
                             continue
-                        try:
-                            page_results = _parse_xml_results(xml_or_err, p)
-                        except Exception as parse_err:
-                            logger.warning("Error parsing page %d for search %d: %s", p, search.id, parse_err)
-                            continue
-                        for item in page_results:
-                            domain = item.get("domain", "")
-                            if domain and is_blacklisted(domain, all_blacklist):
-                                continue
-                            result = SearchResult(
-                                search_id=search.id,
-                                position=item["position"],
-                                title=item["title"],
-                                url=item["url"],
-                                snippet=item.get("snippet"),
-                                domain=domain,
-                            )
-                            db.add(result)
-                            saved_count += 1
-                            all_results_data.append(item)
-                            if domain and domain not in unique_domains:
-                                unique_domains[domain] = item["url"]
-                        if len(page_results) < 10 or len(all_results_data) >= num_results:
-                            batch_done = True
-                            break
-                    await db.commit()
-                    if batch_done:
-                        page_num = pages_needed
-                    else:
-                        page_num += len(batch_pages)
-                    if len(all_results_data) >= num_results:
-                        break
-
-                results_data = all_results_data[:num_results]
+                        await writer.add(item)
+                        if domain and domain not in unique_domains:
+                            unique_domains[domain] = item["url"]
+                    await writer.flush()
+                saved_count = writer.saved_count
             else:
                 # For other providers: fetch all results at once (original behavior)
                 try:
@@ -251,29 +194,19 @@ async def _execute_search_async(search_id: int):
                         "Яндекс/Google часто блокируют запросы с серверов. Включите прокси в настройках провайдера или попробуйте позже."
                     )
 
-                # Save results immediately (excluding blacklisted) - commit after each for real-time updates
-                saved_count = 0
+                # Save results (excluding blacklisted) in batches; each flush is published for real-time updates
                 unique_domains = {}
                 for item in results_data:
                     domain = item.get("domain", "")
                     if domain and is_blacklisted(domain, all_blacklist):
                         continue  # Skip blacklisted domains
 
-                    result = SearchResult(
-                        search_id=search.id,
-                        position=item["position"],
-                        title=item["title"],
-                        url=item["url"],
-                        snippet=item.get("snippet"),
-                        domain=domain,
-                    )
-                    db.add(result)
-                    saved_count += 1
+                    await writer.add(item)
                     # Track unique domains
                     if domain and domain not in unique_domains:
                         unique_domains[domain] = item["url"]
-                    # Commit immediately for real-time updates
-                    await db.commit()
+                await writer.flush()
+                saved_count = writer.saved_count
 
                 # Update search status
                 search.status = "completed"
@@ -287,6 +220,7 @@ async def _execute_search_async(search_id: int):
                 search.result_count = saved_count
                 search.finished_at = datetime.utcnow()
                 await db.commit()
+            await publish_search_done(search_id, "completed", saved_count)
 
             # Trigger domain processing tasks for unique domains (group = один round-trip в Redis)
             if unique_domains:
@@ -314,6 +248,17 @@ async def _execute_search_async(search_id: int):
             error_message = str(e)
             logger.error("execute_search_task error for search_id=%d: %s", search_id, error_message, exc_info=True)
 
+            # Keep what was already fetched: write out the buffered tail (it was
+            # committed row by row before the batched writer) and report the real count.
+            if writer is not None:
+                try:
+                    await writer.flush()
+                except Exception:
+                    logger.warning("search_id=%d: could not flush buffered results", search_id, exc_info=True)
+                    await db.rollback()
+                    await db.refresh(search)
+                search.result_count = writer.saved_count
+
             search.status = "failed"
             search.finished_at = datetime.utcnow()
             # Сохраняем сообщение об ошибке в config
@@ -325,14 +270,22 @@ async def _execute_search_async(search_id: int):
             search.config = new_config  # Присваиваем новый объект
             await db.commit()
             await db.refresh(search)  # Обновляем объект из БД
+            from app.modules.searches.result_writer import publish_search_done
+
+            await publish_search_done(search_id, "failed", search.result_count or 0, error_message)
             return {"error": error_message}
 
 
 @celery_app.task(name="process_domain_task")
-def process_domain_task(search_id: int, domain: str, first_url: str):
+def process_domain_task(search_id: int, domain: str, first_url: str, recheck: bool = False):
     """
     Process domain: crawl, extract contacts. SEO audit only via button (POST .../results/{id}/audit).
     Sync wrapper for async.
+
+    Crawls of one domain are single-flight across workers (filters.crawl_flight):
+    if another task is already crawling it, this one is queued as a waiter and
+    returns; the leader fills its results. `recheck` is the waiter's delayed
+    follow-up in case the leader died: it crawls only if its rows are still empty.
     """
     import time
 
@@ -346,7 +299,7 @@ def process_domain_task(search_id: int, domain: str, first_url: str):
         asyncio.set_event_loop(loop)
 
     try:
-        result = loop.run_until_complete(_process_domain_async(search_id, domain, first_url))
+        result = loop.run_until_complete(_process_domain_async(search_id, domain, first_url, recheck=recheck))
         duration = time.monotonic() - start
         logger.info("process_domain_task finished domain=%r search_id=%d in %.2fs", domain, search_id, duration)
         return result
@@ -356,10 +309,98 @@ def process_domain_task(search_id: int, domain: str, first_url: str):
         raise
 
 
-async def _process_domain_async(search_id: int, domain: str, first_url: str):
+async def _process_domain_async(search_id: int, domain: str, first_url: str, recheck: bool = False):
     """Async function to process domain."""
+    from app.modules.filters.crawl_flight import join_flight, lock_ttl
+
     async with AsyncSessionLocal() as db:
         # Get all results for this domain in this search
+        query = select(SearchResult.id).where(SearchResult.search_id == search_id, SearchResult.domain == domain)
+        if recheck:
+            query = query.where(SearchResult.contact_status.is_(None))
+        if (await db.execute(query.limit(1))).first() is None:
+            if recheck:
+                return {"domain": domain, "status": "already_processed"}
+            return {"error": "No results found for domain"}
+
+    flight = await join_flight(domain, {"search_id": search_id, "domain": domain})
+    if flight is None:
+        # Another worker is crawling this domain and will fill our rows. The
+        # follow-up only does work if it died before that.
+        process_domain_task.apply_async(
+            (search_id, domain, first_url), {"recheck": True}, countdown=lock_ttl(), queue="celery",
+        )
+        return {"domain": domain, "status": "waiting_for_crawl"}
+
+    crawl_data = crawl_error = None
+    try:
+        try:
+            crawl_data = await _crawl_domain_bounded(domain, first_url)
+        except Exception as e:
+            crawl_error = e
+    finally:
+        waiters = await flight.release()
+
+    result = await _apply_domain_crawl(search_id, domain, crawl_data, crawl_error)
+
+    # Fan the crawl out to searches that queued up behind this one.
+    shared = {(search_id, domain)}
+    for waiter in waiters:
+        key = (waiter.get("search_id"), waiter.get("domain"))
+        if key in shared or not all(key):
+            continue
+        shared.add(key)
+        try:
+            await _apply_domain_crawl(key[0], key[1], crawl_data, crawl_error)
+        except Exception as e:
+            logger.warning("fan-out of crawl domain=%r to search_id=%s failed: %s", domain, key[0], e)
+    if len(shared) > 1:
+        logger.info("crawl domain=%r shared with %d waiting searches", domain, len(shared) - 1)
+        result["shared_with"] = len(shared) - 1
+    return result
+
+
+async def _crawl_domain_bounded(domain: str, first_url: str) -> dict:
+    """Mini-crawl domain with fallback (now includes SEO data).
+
+    crawl_domain itself stops at CRAWL_DEADLINE_SECONDS and returns partial
+    pages; wait_for is only a safety net for the main crawl + minimal fallback
+    crawl, each bounded by that deadline.
+    """
+    import time
+
+    crawl_start = time.monotonic()
+    from app.modules.filters.crawler import crawl_domain_with_fallback
+
+    hard_limit = settings.CRAWL_DEADLINE_SECONDS * 2 + 30
+    try:
+        crawl_data = await asyncio.wait_for(
+            crawl_domain_with_fallback(first_url, max_pages=10, timeout=20),
+            timeout=hard_limit,
+        )
+    except asyncio.TimeoutError:
+        logger.warning("crawl domain=%r exceeded %.0fs, saving partial result", domain, hard_limit)
+        crawl_data = {
+            "pages": [],
+            "total_pages": 0,
+            "contacts": {"phone": None, "email": None},
+            "seo": {
+                "score": 0,
+                "issues": ["crawl_timeout"],
+                "details": {"error": f"crawl timeout ({hard_limit:.0f}s)"},
+            },
+        }
+    crawl_duration = time.monotonic() - crawl_start
+    pages = crawl_data.get("total_pages", 0)
+    logger.info("crawl domain=%r in %.2fs, pages=%d", domain, crawl_duration, pages)
+    return crawl_data
+
+
+async def _apply_domain_crawl(search_id: int, domain: str, crawl_data, crawl_error=None) -> dict:
+    """Write a domain crawl into the search's result rows (contacts, SEO,
+    outreach, classification, crawled pages). With `crawl_error` the rows
+    are marked failed."""
+    async with AsyncSessionLocal() as db:
         result = await db.execute(
             select(SearchResult).where(SearchResult.search_id == search_id, SearchResult.domain == domain)
         )
@@ -369,32 +410,8 @@ async def _process_domain_async(search_id: int, domain: str, first_url: str):
             return {"error": "No results found for domain"}
 
         try:
-            # 1. Mini-crawl domain with fallback (now includes SEO data), max 5 min per domain
-            import time
-
-            crawl_start = time.monotonic()
-            from app.modules.filters.crawler import crawl_domain_with_fallback
-
-            try:
-                crawl_data = await asyncio.wait_for(
-                    crawl_domain_with_fallback(first_url, max_pages=10, timeout=20),
-                    timeout=300.0,
-                )
-            except asyncio.TimeoutError:
-                logger.warning("crawl domain=%r exceeded 5 min, saving partial result", domain)
-                crawl_data = {
-                    "pages": [],
-                    "total_pages": 0,
-                    "contacts": {"phone": None, "email": None},
-                    "seo": {
-                        "score": 0,
-                        "issues": ["crawl_timeout"],
-                        "details": {"error": "crawl timeout (5 min)"},
-                    },
-                }
-            crawl_duration = time.monotonic() - crawl_start
-            pages = crawl_data.get("total_pages", 0)
-            logger.info("crawl domain=%r in %.2fs, pages=%d", domain, crawl_duration, pages)
+            if crawl_error is not None:
+                raise crawl_error
 
             # 2. Extract contacts
             contacts = crawl_data.get("contacts", {})
@@ -463,7 +480,7 @@ async def _process_domain_async(search_id: int, domain: str, first_url: str):
                 )
 
                 # We keep `pages` in extra_data minimal (no text_content) — the full
-                # text lives in search_result_pages so it can be FTS-indexed.
+                # text lives in crawled_pages so it can be FTS-indexed.
                 pages_summary = [
                     {
                         "url": p.get("url"),
@@ -490,33 +507,18 @@ async def _process_domain_async(search_id: int, domain: str, first_url: str):
                     },
                 }
 
-            # Persist crawled pages for full-text keyword filtering. Replace any
-            # previous run's pages for these results so re-crawls don't pile up.
-            from app.models.search import SearchResultPage
-            from sqlalchemy import delete as sa_delete
-
-            result_ids = [r.id for r in domain_results]
-            if result_ids:
-                await db.execute(sa_delete(SearchResultPage).where(SearchResultPage.search_result_id.in_(result_ids)))
-                # Crawl is per-domain, so all results for this domain share the
-                # same pages — attach them to every result row to keep filtering
-                # per-result simple.
-                for res in domain_results:
-                    for p in pages_list:
-                        if not p.get("url"):
-                            continue
-                        db.add(
-                            SearchResultPage(
-                                search_result_id=res.id,
-                                search_id=search_id,
-                                url=p.get("url"),
-                                status_code=p.get("status_code"),
-                                title=p.get("title"),
-                                meta_description=p.get("meta_description"),
-                                h1_text=p.get("h1_text"),
-                                text_content=p.get("text_content"),
-                            )
-                        )
+            # Persist crawled pages for full-text keyword filtering: stored once
+            # per domain/content in crawled_pages, every result of the domain
+            # just links to them. Re-crawls replace the links.
+            from app.modules.searches.crawled_pages import store_domain_pages
+
+            await store_domain_pages(
+                db,
+                search_id=search_id,
+                domain=domain,
+                result_ids=[r.id for r in domain_results],
+                pages=pages_list,
+            )
 
             await db.commit()
 
@@ -537,3 +539,19 @@ async def _process_domain_async(search_id: int, domain: str, first_url: str):
                 result.extra_data = {"error": str(e)}
             await db.commit()
             return {"error": str(e), "domain": domain}
+
+
+@celery_app.task(name="purge_orphan_crawled_pages", queue="maintenance")
+def purge_orphan_crawled_pages():
+    """Cron: daily cleanup of crawled_pages no search result links to any more
+    (page content changed on re-crawl, search deleted)."""
+    from app.core.database import AsyncSessionLocal as CoreSessionLocal  # NullPool in Celery
+    from app.modules.searches.crawled_pages import purge_orphan_pages
+
+    async def _run() -> int:
+        async with CoreSessionLocal() as db:
+            return await purge_orphan_pages(db)
+
+    count = asyncio.run(_run())
+    logger.info("purge_orphan_crawled_pages: deleted %d pages", count)
+    return count
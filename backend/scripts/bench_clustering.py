@@ -0,0 +1,146 @@
+"""Бенчмарк reviews_ai.clustering: качество vs время/память по бэкендам.
+
+Генерирует синтетическую «нишу» без БД: --topics направлений в 1536-мерном
+пространстве, отзывы = направление + шум, доля --stray — случайные
+(«ничейные») векторы. Гоняет выбранные конфигурации cluster_embeddings на
+одних и тех же данных и печатает:
+
+- wall time и пиковую память Python (tracemalloc; numpy/sklearn репортят
+  туда свои буферы);
+- число кластеров и долю шума;
+- silhouette (cosine, по исходным 1536-мерным векторам, на подвыборке
+  до 5000 кластеризованных точек);
+- ARI с истинными темами (по нешумовым точкам) и ARI с эталонной
+  конфигурацией — первой в --configs (по умолчанию текущий HDBSCAN).
+
+Конфигурации:
+    hdbscan             — текущий пайплайн, float64, без понижения
+    hdbscan-pca128      — «приближённый» HDBSCAN по PCA-128
+    minibatch-pca128    — float32 + PCA-128 + MiniBatchKMeans
+    minibatch-rp128     — float32 + random projection-128 + MiniBatchKMeans
+    minibatch-full      — MiniBatchKMeans без понижения
+
+Запуск:
+    PYTHONPATH=. python scripts/bench_clustering.py --reviews 5000
+    PYTHONPATH=. python scripts/bench_clustering.py --reviews 50000 \\
+        --configs minibatch-pca128,minibatch-rp128,hdbscan-pca128
+
+Полный hdbscan на 1536 измерениях растёт сверхлинейно: на десятках тысяч
+отзывов он идёт десятки минут — для таких N начинайте --configs без него.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sklearn.metrics import adjusted_rand_score, silhouette_score
+
+from app.modules.reviews_ai.clustering import cluster_embeddings
+
+DIM = 1536
+SILHOUETTE_SAMPLE = 5000
+
+CONFIGS: dict[str, dict] = {
+    "hdbscan": {"backend": "hdbscan"},
+    "hdbscan-pca128": {"backend": "hdbscan", "reduce_dims": 128},
+    "minibatch-pca128": {"backend": "minibatch", "reduce_dims": 128, "reduce_method": "pca"},
+    "minibatch-rp128": {"backend": "minibatch", "reduce_dims": 128, "reduce_method": "random"},
+    "minibatch-full": {"backend": "minibatch", "reduce_dims": 0},
+}
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+def _make_niche(n: int, topics: int, stray: float, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """float32-векторы и истинные темы (-1 у «ничейных»). Шум подобран так,
+    чтобы cos(отзыв, тема) ≈ 0.7 — как у реальных отзывов одной боли."""
+    rng = np.random.default_rng(seed)
+    centers = _unit(rng.standard_normal((topics, DIM)).astype(np.float32))
+    truth = rng.integers(0, topics, size=n)
+    noise = rng.standard_normal((n, DIM)).astype(np.float32) / np.float32(np.sqrt(DIM))
+    vectors = _unit(centers[truth] + noise)
+    is_stray = rng.random(n) < stray
+    vectors[is_stray] = _unit(rng.standard_normal((int(is_stray.sum()), DIM)).astype(np.float32))
+    truth[is_stray] = -1
+    return vectors, truth
+
+
+def _run(vectors: np.ndarray, params: dict, min_cluster_size: int, n_clusters: int | None):
+    tracemalloc.start()
+    try:
+        t0 = time.perf_counter()
+        labels = cluster_embeddings(
+            vectors, min_cluster_size=min_cluster_size, n_clusters=n_clusters, **params,
+        )
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return labels, elapsed, peak
+
+
+def _silhouette(vectors: np.ndarray, labels: np.ndarray) -> float | None:
+    idx = np.flatnonzero(labels >= 0)
+    if len(set(labels[idx].tolist())) < 2:
+        return None
+    if len(idx) > SILHOUETTE_SAMPLE:
+        idx = np.random.default_rng(0).choice(idx, SILHOUETTE_SAMPLE, replace=False)
+    return float(silhouette_score(vectors[idx], labels[idx], metric="cosine"))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=5000, help="отзывов в нише (default: 5000)")
+    parser.add_argument("--topics", type=int, default=12, help="истинных тем (default: 12)")
+    parser.add_argument("--stray", type=float, default=0.15, help="доля случайных отзывов (default: 0.15)")
+    parser.add_argument("--min-cluster-size", type=int, default=8, help="min_cluster_size (default: 8)")
+    parser.add_argument("--k", type=int, default=None, help="k для k-means (default: формула модуля)")
+    parser.add_argument(
+        "--configs", default="hdbscan,hdbscan-pca128,minibatch-pca128,minibatch-rp128",
+        help=f"через запятую, первая — эталон для ARI; доступны: {', '.join(CONFIGS)}",
+    )
+    args = parser.parse_args()
+
+    names = [c.strip() for c in args.configs.split(",") if c.strip()]
+    unknown = [c for c in names if c not in CONFIGS]
+    if unknown:
+        parser.error(f"неизвестные конфигурации: {unknown}")
+
+    vectors, truth = _make_niche(args.reviews, args.topics, args.stray, seed=42)
+    print(f"reviews={args.reviews} topics={args.topics} stray={args.stray} min_cluster_size={args.min_cluster_size}")
+
+    reference: np.ndarray | None = None
+    print(
+        f"{'config':<18} {'time, s':>8} {'peak MB':>8} {'clusters':>8} {'noise %':>8} "
+        f"{'silhouette':>10} {'ARI truth':>9} {'ARI ref':>8}"
+    )
+    for name in names:
+        labels, elapsed, peak = _run(vectors, CONFIGS[name], args.min_cluster_size, args.k)
+        clustered = (labels >= 0) & (truth >= 0)
+        ari_truth = adjusted_rand_score(truth[clustered], labels[clustered]) if clustered.any() else 0.0
+        if reference is None:
+            reference = labels
+            ari_ref = "—"
+        else:
+            both = (labels >= 0) & (reference >= 0)
+            ari_ref = f"{adjusted_rand_score(reference[both], labels[both]):.3f}" if both.any() else "0"
+        sil = _silhouette(vectors, labels)
+        print(
+            f"{name:<18} {elapsed:>8.2f} {peak / 1e6:>8.1f} {len(set(labels[labels >= 0].tolist())):>8} "
+            f"{100 * float(np.mean(labels < 0)):>8.1f} {('%.3f' % sil) if sil is not None else '—':>10} "
+            f"{ari_truth:>9.3f} {ari_ref:>8}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Микро-бенчмарк разбора страниц краулера: старый двойной BeautifulSoup vs
+filters.html_extract.extract_page на доступных бэкендах.
+
+По умолчанию гоняет сохранённые страницы tests/fixtures/crawler/*.html
+(типичный сайт небольшой компании: меню, JSON-LD, скрипты, футер
+с контактами). Свои страницы — через --pages. Печатает среднее время на
+страницу и ускорение относительно legacy; заодно проверяет, что
+title/meta/h1/links/контакты у всех вариантов совпадают.
+
+    PYTHONPATH=. python scripts/bench_html_extract.py
+    PYTHONPATH=. python scripts/bench_html_extract.py --pages '/tmp/saved/*.html' --rounds 50
+
+Бэкенды: bs4 (на lxml, если он установлен, иначе html.parser) и
+selectolax — только если пакет установлен.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bs4 import BeautifulSoup
+
+from app.modules.filters import html_extract
+from app.modules.filters.html_extract import extract_email, extract_page, extract_phone, filter_internal_links
+
+BASE_URL = "https://ulybka-plus.example/"
+BASE_DOMAIN = "ulybka-plus.example"
+DEFAULT_PAGES = str(Path(__file__).parent.parent / "tests" / "fixtures" / "crawler" / "*.html")
+
+
+def legacy_extract(html: str) -> dict:
+    """Как crawl_domain разбирал страницу до single-pass: два дерева
+    html.parser + regex по сырому HTML."""
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.find("title")
+    meta_desc = soup.find("meta", attrs={"name": "description"})
+    h1_tags = soup.find_all("h1")
+    text_soup = BeautifulSoup(html, "html.parser")
+    for tag in text_soup(["script", "style", "noscript", "svg", "iframe", "template"]):
+        tag.decompose()
+    raw_text = text_soup.get_text(separator=" ", strip=True)
+    return {
+        "title": title.get_text().strip() if title else None,
+        "meta_description": meta_desc.get("content").strip() if meta_desc and meta_desc.get("content") else None,
+        "h1_count": len(h1_tags),
+        "h1_text": h1_tags[0].get_text().strip() if h1_tags else None,
+        "links": filter_internal_links((a["href"] for a in soup.find_all("a", href=True)), BASE_URL, BASE_DOMAIN),
+        "text_len": len(" ".join(raw_text.split())[:10000]) if raw_text else 0,
+        "phone": extract_phone(html),
+        "email": extract_email(html),
+    }
+
+
+def single_pass(backend: str):
+    def _run(html: str) -> dict:
+        page = extract_page(html, BASE_URL, BASE_DOMAIN, backend=backend)
+        return {
+            "title": page.title,
+            "meta_description": page.meta_description,
+            "h1_count": page.h1_count,
+            "h1_text": page.h1_text,
+            "links": page.links,
+            "text_len": len(page.text_content or ""),
+            "phone": page.phone,
+            "email": page.email,
+        }
+    return _run
+
+
+def _time_per_page(fn, pages: list[str], rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for html in pages:
+            fn(html)
+        samples.append((time.perf_counter() - t0) / len(pages))
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default=DEFAULT_PAGES, help="glob сохранённых HTML-страниц")
+    parser.add_argument("--rounds", type=int, default=20, help="повторов (default: 20)")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(args.pages))
+    if not paths:
+        parser.error(f"нет страниц по {args.pages!r}")
+    pages = [Path(p).read_text(encoding="utf-8", errors="replace") for p in paths]
+    total_kb = sum(len(p.encode()) for p in pages) / 1024
+
+    variants = {"legacy (2× html.parser)": legacy_extract}
+    variants[f"single-pass bs4 ({html_extract._BS4_PARSER})"] = single_pass("bs4")
+    if html_extract.HTMLParser is not None:
+        variants["single-pass selectolax"] = single_pass("selectolax")
+
+    reference = [legacy_extract(p) for p in pages]
+    print(f"pages={len(pages)} ({total_kb:.0f} KB) rounds={args.rounds}")
+    print(f"{'variant':<34} {'ms/page':>8} {'speedup':>8} {'same fields':>12}")
+    base = None
+    for name, fn in variants.items():
+        per_page = _time_per_page(fn, pages, args.rounds)
+        base = base or per_page
+        same = all(
+            {k: v for k, v in fn(p).items() if k != "text_len"} == {k: v for k, v in ref.items() if k != "text_len"}
+            for p, ref in zip(pages, reference)
+        )
+        print(f"{name:<34} {per_page * 1000:>8.2f} {base / per_page:>7.2f}x {str(same):>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Бенчмарк searches.keyword_filter.get_keyword_hits_per_result на
+синтетическом поиске: один запрос на все ключевые слова vs прежний цикл
+(отдельный FTS-запрос на каждое слово).
+
+Создаёт поиск со --pages страницами в crawled_pages (по --pages-per-domain
+на домен, один результат на домен), сравнивает время обеих реализаций и
+проверяет, что ответы совпадают. Пишет в ту БД, на которую смотрит
+DATABASE_URL; за собой всё удаляет (домены `bench-…`, служебный юзер и
+поиск).
+
+Запуск:
+    PYTHONPATH=. python scripts/bench_keyword_hits.py
+    PYTHONPATH=. python scripts/bench_keyword_hits.py --pages 20000 --keywords 5 --rounds 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import delete, insert, select, text
+
+from app.core.database import AsyncSessionLocal
+from app.core.security import hash_password
+from app.models.search import CrawledPage, Search, SearchResult, SearchResultCrawledPage
+from app.models.user import User
+from app.modules.searches.crawled_pages import content_hash
+from app.modules.searches.keyword_filter import _result_ids_matching, get_keyword_hits_per_result
+
+KEYWORDS = [
+    "протез", "имплант", "брекет", "отбелив", "виниры",
+    "пародонт", "ортодонт", "гигиен", "удален", "коронк",
+]
+FILLER = (
+    "клиника врач приём запись лечение зубов стоматология цены услуги отзывы "
+    "контакты москва адрес телефон режим работы консультация скидка акция "
+    "детская взрослая современное оборудование опыт гарантия качество"
+).split()
+_INSERT_CHUNK = 2000
+
+
+async def legacy_hits(db, search_id: int, keywords: list[str]) -> dict[int, list[str]]:
+    """Как было до одного запроса: FTS-запрос на каждое слово."""
+    hits: dict[int, set[str]] = {}
+    for kw in keywords:
+        rows = (await db.execute(_result_ids_matching(search_id, f"{kw}:*"))).scalars().all()
+        for rid in rows:
+            hits.setdefault(rid, set()).add(kw)
+    return {rid: sorted(words) for rid, words in hits.items()}
+
+
+def _page_text(rng: random.Random, words: int, topics: list[str]) -> str:
+    # темы домена (0–3 ключевых слова) встречаются на его страницах через раз
+    text = [rng.choice(FILLER) for _ in range(words)]
+    for kw in topics:
+        if rng.random() < 0.5:
+            text[rng.randrange(words)] = kw + "ирование"
+    return " ".join(text)
+
+
+async def seed(args, tag: str) -> tuple[int, int]:
+    rng = random.Random(args.seed)
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"{tag}@bench.example.com", hashed_password=hash_password("x"))
+        db.add(user)
+        await db.flush()
+        search = Search(user_id=user.id, query="bench keyword hits", status="completed")
+        db.add(search)
+        await db.flush()
+
+        domains = max(1, args.pages // args.pages_per_domain)
+        results = (await db.execute(
+            insert(SearchResult).returning(SearchResult.id, SearchResult.domain),
+            [
+                {"search_id": search.id, "position": i, "title": f"r{i}",
+                 "url": f"https://{tag}-{i}.test/", "domain": f"{tag}-{i}.test"}
+                for i in range(domains)
+            ],
+        )).all()
+
+        pages: list[dict] = []
+        links: list[dict] = []
+        for rid, domain in results:
+            topics = rng.sample(KEYWORDS, rng.randint(0, 3))
+            for n in range(args.pages_per_domain):
+                page = {
+                    "domain": domain, "url": f"https://{domain}/p{n}", "status_code": 200,
+                    "title": f"Стоматология {n}", "text_content": _page_text(rng, args.words, topics),
+                }
+                page["content_hash"] = content_hash(page)
+                pages.append(page)
+                links.append({"search_result_id": rid, "position": n})
+        for i in range(0, len(pages), _INSERT_CHUNK):
+            ids = (await db.execute(
+                insert(CrawledPage).returning(CrawledPage.id, sort_by_parameter_order=True),
+                pages[i:i + _INSERT_CHUNK],
+            )).scalars().all()
+            await db.execute(insert(SearchResultCrawledPage), [
+                {**link, "crawled_page_id": pid, "search_id": search.id}
+                for link, pid in zip(links[i:i + _INSERT_CHUNK], ids)
+            ])
+        await db.commit()
+        await db.execute(text("ANALYZE crawled_pages"))
+        await db.execute(text("ANALYZE search_result_crawled_pages"))
+        await db.commit()
+        return user.id, search.id
+
+
+async def cleanup(user_id: int, search_id: int, tag: str) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(SearchResultCrawledPage).where(SearchResultCrawledPage.search_id == search_id))
+        await db.execute(delete(CrawledPage).where(CrawledPage.domain.like(f"{tag}-%")))
+        await db.execute(delete(SearchResult).where(SearchResult.search_id == search_id))
+        await db.execute(delete(Search).where(Search.id == search_id))
+        await db.execute(delete(User).where(User.id == user_id))
+        await db.commit()
+
+
+async def timed(fn, search_id: int, keywords: list[str], rounds: int):
+    times, out = [], None
+    for _ in range(rounds):
+        async with AsyncSessionLocal() as db:
+            t0 = time.perf_counter()
+            out = await fn(db, search_id=search_id, keywords=keywords)
+            times.append(time.perf_counter() - t0)
+    return out, times
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100_000)
+    parser.add_argument("--pages-per-domain", type=int, default=10)
+    parser.add_argument("--words", type=int, default=120, help="слов текста на страницу")
+    parser.add_argument("--keywords", type=int, default=10, help=f"сколько слов из {len(KEYWORDS)}")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    tag = f"bench-{uuid.uuid4().hex[:8]}"
+    keywords = KEYWORDS[: args.keywords]
+    t0 = time.perf_counter()
+    user_id, search_id = await seed(args, tag)
+    print(f"seeded {args.pages} pages in {time.perf_counter() - t0:.1f}s; keywords: {len(keywords)}")
+    try:
+        async def legacy(db, *, search_id, keywords):
+            return await legacy_hits(db, search_id, keywords)
+
+        old, old_t = await timed(legacy, search_id, keywords, args.rounds)
+        new, new_t = await timed(get_keyword_hits_per_result, search_id, keywords, args.rounds)
+        assert old == new, "legacy and single-query hits differ"
+        async with AsyncSessionLocal() as db:
+            total = len((await db.execute(
+                select(SearchResult.id).where(SearchResult.search_id == search_id)
+            )).all())
+        print(f"results with hits: {len(new)} / {total}")
+        print(f"{'variant':<14}{'median':>10}{'min':>10}")
+        for name, ts in (("per-keyword", old_t), ("single-query", new_t)):
+            print(f"{name:<14}{statistics.median(ts) * 1000:>8.0f}ms{min(ts) * 1000:>8.0f}ms")
+        print(f"speedup: {statistics.median(old_t) / statistics.median(new_t):.1f}x")
+    finally:
+        await cleanup(user_id, search_id, tag)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
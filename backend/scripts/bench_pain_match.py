@@ -0,0 +1,177 @@
+"""Бенчмарк reviews_ai.match_reviews_to_pain_tags: режим 'sql' (pgvector) vs 'numpy'.
+
+Генерирует синтетическую нишу: --tags центроидов, вокруг них отзывы с шумом
+(часть — «ничейные», ниже порога), пишет embeddings в reviews и гоняет
+match в обоих режимах на одних и тех же данных. Между прогонами
+review_pain_tags / company_pain_scores ниши чистятся.
+
+Печатает wall time, пиковую память Python (tracemalloc, numpy туда тоже
+репортит) и число назначений — у режимов оно должно совпадать.
+
+Пишет в ту БД, на которую смотрит DATABASE_URL; за собой всё удаляет
+(ниша `bench-match-…`, служебный юзер). Миграция 058 (HNSW) должна быть
+накатана — иначе 'sql' всё равно работает, но seq scan'ом.
+
+Запуск:
+    PYTHONPATH=. python scripts/bench_pain_match.py --reviews 10000
+    PYTHONPATH=. python scripts/bench_pain_match.py --reviews 100000 --rounds 1 --modes sql
+
+NumPy-режим держит R×1536 float64 плюс промежуточные list'ы: ~0.7 ГБ на 10к
+отзывов, на 100к — ~7 ГБ; на маленькой машине гоняйте 100к только с sql.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from sqlalchemy import delete, select
+
+from app.core.database import AsyncSessionLocal
+from app.core.security import hash_password
+from app.models.maps import Company
+from app.models.pain_tag import CompanyPainScore, PainTag, ReviewPainTag
+from app.models.user import User
+from app.modules.maps import service as maps_service
+from app.modules.maps.schemas import CompanyRaw, ReviewRaw
+from app.modules.reviews_ai import service as ai_service
+
+DIM = 1536
+COMPANIES = 50
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    return v / np.linalg.norm(v, axis=-1, keepdims=True)
+
+
+async def _seed(niche: str, n_reviews: int, n_tags: int, seed: int) -> tuple[int, list[int]]:
+    rng = np.random.default_rng(seed)
+    centroids = _unit(rng.standard_normal((n_tags, DIM)).astype(np.float32))
+
+    async with AsyncSessionLocal() as db:
+        user = User(
+            email=f"bench_{uuid.uuid4().hex[:8]}@bench.example.com",
+            hashed_password=hash_password("bench"),
+            is_active=True,
+        )
+        db.add(user)
+        await db.commit()
+        search = await maps_service.create_map_search(
+            db, user_id=user.id, niche=niche, city="Bench", sources=["2gis"],
+        )
+        companies = await maps_service.save_companies_batch(db, [
+            CompanyRaw(source="2gis", external_id=f"{niche}-{i}", name=f"Bench {i}", niche=niche, city="Bench")
+            for i in range(COMPANIES)
+        ], search.id)
+
+        review_ids: list[int] = []
+        per_company = -(-n_reviews // COMPANIES)
+        for co in companies:
+            review_ids += await maps_service.insert_reviews_batch(db, co.id, [
+                ReviewRaw(source="2gis", rating=2, raw_text=f"{niche} review {co.id}-{k}")
+                for k in range(per_company)
+            ])
+        review_ids = review_ids[:n_reviews]
+
+        # 80% отзывов — центроид + шум (cos ≈ 0.7), 20% — случайные направления.
+        owner = rng.integers(0, n_tags, size=len(review_ids))
+        noise = rng.standard_normal((len(review_ids), DIM)).astype(np.float32) / np.sqrt(DIM)
+        vectors = _unit(centroids[owner] + noise)
+        stray = rng.random(len(review_ids)) < 0.2
+        vectors[stray] = _unit(rng.standard_normal((int(stray.sum()), DIM)).astype(np.float32))
+
+        chunk = ai_service.EMBEDDING_UPDATE_CHUNK
+        for i in range(0, len(review_ids), chunk):
+            await db.execute(ai_service._EMBEDDINGS_BULK_UPDATE, {
+                "ids": review_ids[i:i + chunk],
+                "flat": vectors[i:i + chunk].ravel().tolist(),
+                "dim": DIM,
+            })
+        db.add_all([
+            PainTag(niche=niche, city="Bench", label=f"bench tag {t}", centroid=centroids[t].tolist(), status="active")
+            for t in range(n_tags)
+        ])
+        await db.commit()
+        return user.id, review_ids
+
+
+async def _reset_matches(niche: str) -> None:
+    async with AsyncSessionLocal() as db:
+        tag_ids = select(PainTag.id).where(PainTag.niche == niche).scalar_subquery()
+        await db.execute(delete(ReviewPainTag).where(ReviewPainTag.pain_tag_id.in_(tag_ids)))
+        await db.execute(delete(CompanyPainScore).where(CompanyPainScore.pain_tag_id.in_(tag_ids)))
+        await db.commit()
+
+
+async def _run_once(mode: str, review_ids: list[int], threshold: float) -> tuple[float, int, int]:
+    tracemalloc.start()
+    try:
+        async with AsyncSessionLocal() as db:
+            t0 = time.perf_counter()
+            assigned = await ai_service.match_reviews_to_pain_tags(
+                db, review_ids, threshold=threshold, mode=mode,
+            )
+            elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak, sum(len(v) for v in assigned.values())
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=10_000, help="отзывов в нише (default: 10000)")
+    parser.add_argument("--tags", type=int, default=20, help="активных pain_tags (default: 20)")
+    parser.add_argument("--threshold", type=float, default=0.55, help="порог cosine (default: 0.55)")
+    parser.add_argument("--rounds", type=int, default=3, help="повторов на режим (default: 3)")
+    parser.add_argument(
+        "--modes", default="sql,numpy", help="режимы через запятую (default: sql,numpy)",
+    )
+    args = parser.parse_args()
+
+    niche = f"bench-match-{uuid.uuid4().hex[:8]}"
+    t0 = time.perf_counter()
+    user_id, review_ids = await _seed(niche, args.reviews, args.tags, seed=42)
+    print(f"seeded {len(review_ids)} reviews, {args.tags} tags in {time.perf_counter() - t0:.1f}s")
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    results: dict[str, list[tuple[float, int, int]]] = {m: [] for m in modes}
+    try:
+        for _ in range(args.rounds):
+            for mode in results:
+                await _reset_matches(niche)
+                results[mode].append(await _run_once(mode, review_ids, args.threshold))
+    finally:
+        await _reset_matches(niche)
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(PainTag).where(PainTag.niche == niche))
+            # reviews уходят каскадом (FK ON DELETE CASCADE).
+            await db.execute(delete(Company).where(Company.niche == niche))
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+
+    print(f"reviews={len(review_ids)} tags={args.tags} threshold={args.threshold} rounds={args.rounds}")
+    print(f"{'mode':<6} {'median, s':>10} {'min, s':>8} {'peak py MB':>11} {'matches':>8}")
+    for mode, runs in results.items():
+        times = [t for t, _, _ in runs]
+        peak_mb = max(p for _, p, _ in runs) / 1e6
+        print(f"{mode:<6} {statistics.median(times):>10.3f} {min(times):>8.3f} {peak_mb:>11.1f} {runs[0][2]:>8}")
+    if results.get("numpy") and results.get("sql"):
+        numpy_t = statistics.median(t for t, _, _ in results["numpy"])
+        sql_t = statistics.median(t for t, _, _ in results["sql"])
+        if sql_t > 0:
+            print(f"numpy/sql: x{numpy_t / sql_t:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
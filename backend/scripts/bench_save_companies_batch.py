@@ -0,0 +1,232 @@
+"""Бенчмарк maps.service.save_companies_batch: set-based путь vs прежний цикл.
+
+Сравнивает число SQL-запросов на партию и wall time двух реализаций на
+синтетических компаниях с контактами:
+  - bulk   — текущий service.save_companies_batch (multi-VALUES UPSERT);
+  - legacy — построчный цикл в том виде, в каком он был до перехода на
+             set-based (INSERT + link + db.get + multisource sync на каждую
+             компанию, по INSERT на каждый контакт). Скопирован сюда как
+             эталон с тем же набором запросов; в прод-коде его больше нет.
+
+Пишет в ту БД, на которую смотрит DATABASE_URL; за собой всё удаляет
+(компании с external_id `bench-…`, служебный юзер и поиск).
+
+Запуск:
+    PYTHONPATH=. python scripts/bench_save_companies_batch.py
+    PYTHONPATH=. python scripts/bench_save_companies_batch.py --companies 200 --contacts 20 --rounds 3
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import delete, event, func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.database import AsyncSessionLocal, engine
+from app.core.security import hash_password
+from app.models.maps import Company, CompanyContact, CompanySource, MapSearch, MapSearchResult
+from app.models.user import User
+from app.modules.maps import service
+from app.modules.maps.schemas import CompanyRaw
+
+
+# ---------------------------------------------------------------------------
+# Эталон: построчный цикл до set-based переписывания
+# ---------------------------------------------------------------------------
+
+
+async def _legacy_sync_company_to_multisource(db, company: Company) -> None:
+    src_ins = pg_insert(CompanySource).values(
+        company_id=company.id,
+        source=company.source,
+        external_id=company.external_id,
+        rating=company.rating,
+        reviews_count=company.reviews_count or 0,
+        reviews_positive_count=company.reviews_positive_count or 0,
+        reviews_negative_count=company.reviews_negative_count or 0,
+        reviews_neutral_count=company.reviews_neutral_count or 0,
+        has_owner_replies=company.has_owner_replies or False,
+        owner_replies_count=company.owner_replies_count or 0,
+        last_review_at=company.last_review_at,
+        raw_data=company.raw_data,
+        match_confidence=1.00,
+        matched_by="parser_sync",
+        last_parsed_at=func.now(),
+    ).on_conflict_do_update(
+        index_elements=["source", "external_id"],
+        set_={
+            "rating": company.rating,
+            "reviews_count": company.reviews_count or 0,
+            "raw_data": company.raw_data,
+            "last_parsed_at": func.now(),
+            "updated_at": func.now(),
+        },
+    ).returning(CompanySource.id)
+    cs_id = (await db.execute(src_ins)).scalar_one()
+
+    found_website: str | None = None
+    for ctype, value, is_primary in service._company_contacts_flat(company):
+        v = value[:500]
+        if ctype == "website" and not found_website:
+            found_website = v
+        await db.execute(
+            pg_insert(CompanyContact).values(
+                company_source_id=cs_id,
+                company_id=company.id,
+                source=company.source,
+                type=ctype,
+                value=v,
+                is_primary=is_primary,
+            ).on_conflict_do_nothing(index_elements=["company_source_id", "type", "value"])
+        )
+    if found_website:
+        await db.execute(
+            text("UPDATE companies SET website = :w WHERE id = :id AND (website IS NULL OR website = '')"),
+            {"w": found_website, "id": company.id},
+        )
+
+
+async def _legacy_save_companies_batch(db, companies_raw: list[CompanyRaw], search_id: int) -> list[Company]:
+    saved: list[Company] = []
+    for offset, c in enumerate(companies_raw):
+        ins = pg_insert(Company).values(**service._company_row_from_raw(c))
+        ins = ins.on_conflict_do_update(
+            index_elements=["source", "external_id"],
+            set_={
+                "address": ins.excluded.address,
+                "phone": ins.excluded.phone,
+                "website": ins.excluded.website,
+                "rating": ins.excluded.rating,
+                "reviews_count": ins.excluded.reviews_count,
+                "emails": func.coalesce(ins.excluded.emails, Company.__table__.c.emails),
+                "contacts_extra": func.coalesce(ins.excluded.contacts_extra, Company.__table__.c.contacts_extra),
+                "raw_data": ins.excluded.raw_data,
+                "updated_at": func.now(),
+            },
+        ).returning(Company.id)
+        company_id = (await db.execute(ins)).scalar_one()
+        await db.execute(
+            pg_insert(MapSearchResult).values(
+                map_search_id=search_id, company_id=company_id, position=offset,
+            ).on_conflict_do_update(
+                index_elements=["map_search_id", "company_id"], set_={"position": offset},
+            )
+        )
+        company = await db.get(Company, company_id, populate_existing=True)
+        if company is not None:
+            saved.append(company)
+            await _legacy_sync_company_to_multisource(db, company)
+    await db.commit()
+    return saved
+
+
+# ---------------------------------------------------------------------------
+# Прогон
+# ---------------------------------------------------------------------------
+
+
+def _make_batch(n: int, contacts: int) -> list[CompanyRaw]:
+    """n компаний, у каждой ~contacts контактов (email + мессенджеры + соцсети)."""
+    run = uuid.uuid4().hex[:8]
+    out: list[CompanyRaw] = []
+    per_kind = max(1, contacts // 4)
+    for i in range(n):
+        out.append(CompanyRaw(
+            source="2gis",
+            external_id=f"bench-{run}-{i}",
+            name=f"Bench Co {i}",
+            niche="bench",
+            city="Bench",
+            phone=f"+7900{i:07d}",
+            website=f"https://bench-{run}-{i}.example",
+            rating=4.5,
+            reviews_count=10,
+            emails=[f"info{k}@bench-{run}-{i}.example" for k in range(per_kind)],
+            contacts_extra={
+                "phones": [f"+7901{i:04d}{k:03d}" for k in range(per_kind)],
+                "telegrams": [f"@bench_{i}_{k}" for k in range(per_kind)],
+                "vks": [f"vk.com/bench_{i}_{k}" for k in range(per_kind)],
+            },
+        ))
+    return out
+
+
+async def _run_once(impl, raws: list[CompanyRaw], search_id: int) -> tuple[int, float]:
+    counter = {"n": 0}
+
+    def _count(*_args: Any, **_kwargs: Any) -> None:
+        counter["n"] += 1
+
+    async with AsyncSessionLocal() as db:
+        event.listen(engine.sync_engine, "before_cursor_execute", _count)
+        try:
+            t0 = time.perf_counter()
+            await impl(db, raws, search_id)
+            elapsed = time.perf_counter() - t0
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", _count)
+    return counter["n"], elapsed
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--companies", type=int, default=200, help="компаний в партии (default: 200)")
+    parser.add_argument("--contacts", type=int, default=8, help="контактов на компанию (default: 8)")
+    parser.add_argument("--rounds", type=int, default=3, help="повторов на реализацию (default: 3)")
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        user = User(
+            email=f"bench_{uuid.uuid4().hex[:8]}@bench.example.com",
+            hashed_password=hash_password("bench"),
+            is_active=True,
+        )
+        db.add(user)
+        await db.commit()
+        search = MapSearch(user_id=user.id, niche="bench", city="Bench", sources="2gis", status="running")
+        db.add(search)
+        await db.commit()
+        user_id, search_id = user.id, search.id
+
+    results: dict[str, list[tuple[int, float]]] = {"legacy": [], "bulk": []}
+    try:
+        for _ in range(args.rounds):
+            # Свежие external_id на каждый прогон — меряем INSERT-путь, а не
+            # только ON CONFLICT; обе реализации получают одинаковую нагрузку.
+            results["legacy"].append(
+                await _run_once(_legacy_save_companies_batch, _make_batch(args.companies, args.contacts), search_id)
+            )
+            results["bulk"].append(
+                await _run_once(service.save_companies_batch, _make_batch(args.companies, args.contacts), search_id)
+            )
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Company).where(Company.niche == "bench", Company.external_id.like("bench-%")))
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+
+    print(f"companies={args.companies} contacts/company≈{args.contacts} rounds={args.rounds}")
+    print(f"{'impl':<8} {'statements':>11} {'median, s':>10} {'min, s':>8}")
+    for name, runs in results.items():
+        stmts = runs[0][0]
+        times = [t for _, t in runs]
+        print(f"{name:<8} {stmts:>11} {statistics.median(times):>10.3f} {min(times):>8.3f}")
+    legacy_t = statistics.median(t for _, t in results["legacy"])
+    bulk_t = statistics.median(t for _, t in results["bulk"])
+    if bulk_t > 0:
+        print(f"speedup: x{legacy_t / bulk_t:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
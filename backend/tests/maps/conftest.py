@@ -27,3 +27,9 @@ def twogis_search_page2() -> dict:
 @pytest.fixture
 def twogis_reviews_response() -> dict:
     return _load("twogis_reviews_response.json")
+
+
+@pytest.fixture
+def twogis_firm_byid() -> dict:
+    """Ответ catalog.api.2gis.com/3.0/items/byid — как его получает SPA карточки."""
+    return _load("twogis_firm_byid.json")
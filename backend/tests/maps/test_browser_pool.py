@@ -0,0 +1,130 @@
+"""Тесты пула Chromium (maps.browser_pool): watchdog по /proc, перезапуск
+дерева процессов, аренда контекстов на настоящем браузере (если установлен)."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.modules.maps import browser_pool
+
+pytestmark = pytest.mark.skipif(not os.path.isdir("/proc"), reason="watchdog работает по /proc")
+
+# Родитель с двумя детьми; у детей в argv `--type=renderer`, как у renderer'ов
+# Chromium (строка склеена, чтобы её не было в argv самого родителя).
+_TREE = (
+    "import subprocess, sys, time\n"
+    "kids = [subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)', '--type=' + 'renderer'])"
+    " for _ in range(2)]\n"
+    "time.sleep(60)\n"
+)
+
+
+def _spawn_tree() -> subprocess.Popen:
+    proc = subprocess.Popen([sys.executable, "-c", _TREE], start_new_session=True)
+    deadline = time.monotonic() + 10
+    while browser_pool.process_tree_usage(proc.pid)[1] < 2:
+        assert time.monotonic() < deadline, "дети не стартовали"
+        time.sleep(0.05)
+    return proc
+
+
+def _alive(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[-1].split()[0] != "Z"
+    except OSError:
+        return False
+
+
+def test_process_tree_usage_counts_descendants_and_renderers():
+    proc = _spawn_tree()
+    try:
+        procs, renderers, rss = browser_pool.process_tree_usage(proc.pid)
+        assert (procs, renderers) == (3, 2)
+        assert rss > 0
+    finally:
+        os.killpg(proc.pid, 9)
+        proc.wait()
+    assert browser_pool.process_tree_usage(proc.pid) == (0, 0, 0)
+
+
+@pytest.mark.asyncio
+async def test_watchdog_recycles_whole_process_group(monkeypatch):
+    pb = browser_pool._PooledBrowser(slot=99)
+    pb.proc = _spawn_tree()
+    kids = [
+        int(p) for p in os.listdir("/proc")
+        if p.isdigit() and _alive(int(p)) and open(f"/proc/{p}/stat").read().rsplit(")", 1)[-1].split()[1]
+        == str(pb.proc.pid)
+    ]
+    assert len(kids) == 2
+
+    monkeypatch.setattr(settings, "BROWSER_POOL_MAX_RENDERERS", 4)
+    monkeypatch.setattr(settings, "BROWSER_POOL_MAX_RSS_MB", 10_000)
+    assert (await pb.recycle_reason()) is None
+    monkeypatch.setattr(settings, "BROWSER_POOL_MAX_RSS_MB", 0)
+    assert (await pb.recycle_reason()).startswith("rss=")
+    monkeypatch.setattr(settings, "BROWSER_POOL_MAX_RENDERERS", 1)
+    assert (await pb.recycle_reason()) == "renderers=2"
+    pb.leases = settings.BROWSER_POOL_MAX_PAGES
+    assert (await pb.recycle_reason()) == "max_pages"
+
+    pid = pb.proc.pid
+    pb.kill("test")
+    assert pb.proc is None and not pb.alive
+    # killpg: вместе с браузером умирают и его renderer'ы
+    deadline = time.monotonic() + 5
+    while any(_alive(k) for k in kids) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not any(_alive(k) for k in kids + [pid])
+
+
+@pytest.mark.asyncio
+async def test_periodic_watchdog_kills_runaway_browser_mid_lease(monkeypatch):
+    pb = browser_pool._PooledBrowser(slot=98)
+    pb.proc = _spawn_tree()
+    pid = pb.proc.pid
+    pb.active = 1  # аренда идёт, на её границах проверки не будет
+    monkeypatch.setattr(browser_pool, "_pool", lambda: [pb])
+    monkeypatch.setattr(settings, "BROWSER_POOL_WATCHDOG_INTERVAL_S", 0.05)
+    monkeypatch.setattr(settings, "BROWSER_POOL_MAX_RSS_MB", 10_000)
+    monkeypatch.setattr(settings, "BROWSER_POOL_MAX_RENDERERS", 1)
+    try:
+        task = asyncio.create_task(browser_pool._watchdog())
+        deadline = time.monotonic() + 5
+        while pb.proc is not None and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        assert pb.proc is None and not _alive(pid)
+        pb.active = 0  # аренда закончилась — watchdog выходит сам
+        await asyncio.wait_for(task, timeout=1)
+    finally:
+        pb.kill("test")
+
+
+@pytest.mark.skipif(browser_pool.find_executable() is None, reason="Chromium для Playwright не установлен")
+@pytest.mark.asyncio
+async def test_lease_reuses_browser_and_recycles_after_max_pages(monkeypatch):
+    pytest.importorskip("playwright")
+    monkeypatch.setattr(settings, "BROWSER_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "BROWSER_POOL_MAX_PAGES", 2)
+    try:
+        pids = []
+        for i in range(3):
+            async with browser_pool.lease(locale="ru-RU") as ctx:
+                page = await ctx.new_page()
+                await page.set_content(f"<p id=x>{i}</p>")
+                assert await page.inner_text("#x") == str(i)
+                pids.append(browser_pool._browsers[0].proc.pid)
+        # две аренды на одном Chromium, после лимита — новый процесс
+        assert pids[0] == pids[1] != pids[2]
+        assert browser_pool.stats()[0]["alive"]
+    finally:
+        await browser_pool.release_loop()
+        browser_pool.shutdown()
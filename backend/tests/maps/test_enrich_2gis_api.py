@@ -0,0 +1,137 @@
+"""Быстрый путь enrich_2gis: items/byid по httpx на replay-фикстурах
+(tests/maps/fixtures/twogis_firm_byid.json), fallback в Chromium при отказе."""
+
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from app.core import http_clients
+from app.core.config import settings
+from app.modules.maps import enrich_2gis
+
+FIRM_ID = "70000001046123456"
+
+
+class FakeCatalogAPI:
+    """Отдаёт заранее сохранённые ответы items/byid и пишет параметры запросов."""
+
+    def __init__(self, status: int = 200, body: dict | None = None):
+        self.status = status
+        self.body = body or {}
+        self.requests: list[httpx.Request] = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return httpx.Response(self.status, json=self.body)
+
+
+@pytest.fixture
+async def replay(monkeypatch):
+    """Подменяет общий httpx-клиент, аренду Chromium и лимитер; отдаёт состояние фейков."""
+    state: dict = {"api": FakeCatalogAPI(), "browser_calls": [], "slots": []}
+
+    async def _acquire(provider, key, quota, **kw):
+        state["slots"].append((provider, key))
+        return 0.0
+
+    def _client(purpose):
+        return httpx.AsyncClient(transport=httpx.MockTransport(lambda r: state["api"].handler(r)))
+
+    class _Lease:
+        async def __aenter__(self):
+            state["browser_calls"].append(1)
+            raise RuntimeError("browser")
+
+        async def __aexit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(http_clients, "_build_client", _client)
+    monkeypatch.setattr(enrich_2gis.browser_pool, "lease", lambda **kw: _Lease())
+    monkeypatch.setattr(enrich_2gis, "_learned_card_params", {})
+    monkeypatch.setattr(settings, "TWOGIS_CARD_API_ENABLED", True)
+    monkeypatch.setattr(settings, "TWOGIS_WEB_API_KEY", "web-key")
+    monkeypatch.setattr(enrich_2gis.provider_limiter, "acquire", _acquire)
+    await http_clients.aclose_clients()
+    yield state
+    await http_clients.aclose_clients()
+
+
+@pytest.mark.asyncio
+async def test_fast_path_parses_replayed_byid(replay, twogis_firm_byid):
+    replay["api"] = FakeCatalogAPI(body=twogis_firm_byid)
+
+    result = await enrich_2gis.fetch_and_extract_2gis_firm(FIRM_ID)
+
+    assert replay["browser_calls"] == []
+    # items/byid — в квоте API-ключа, слот Chromium-карточки не тратится
+    assert replay["slots"] == [("twogis", "web-key")]
+    assert result.error is None
+    assert result.fetched_url == f"https://2gis.ru/firm/{FIRM_ID}"
+    assert len(result.phones) == 2
+    assert result.emails == ["info@ulybka.ru"]  # служебный help@2gis.ru отброшен
+    assert result.website == "https://ulybka.ru"  # из `text`, трекер link.2gis.ru без url=
+    assert result.telegrams == ["ulybka_msk"]
+    assert result.vks == ["ulybka_dental"]
+    assert len(result.whatsapps) == 1
+
+    (request,) = replay["api"].requests
+    assert request.url.path == "/3.0/items/byid"
+    assert dict(request.url.params) == {
+        "locale": "ru_RU", "fields": "items.contact_groups", "key": "web-key", "id": FIRM_ID,
+    }
+    assert request.headers["Referer"] == "https://2gis.ru/"
+
+
+@pytest.mark.asyncio
+async def test_fast_path_uses_params_learned_from_chromium_xhr(replay, monkeypatch, twogis_firm_byid):
+    monkeypatch.setattr(settings, "TWOGIS_WEB_API_KEY", "")
+    replay["api"] = FakeCatalogAPI(body=twogis_firm_byid)
+
+    # ключа нет — быстрый путь даже не пытается, сразу браузер
+    assert (await enrich_2gis.fetch_and_extract_2gis_firm(FIRM_ID)).error.startswith("playwright")
+    assert replay["api"].requests == [] and len(replay["browser_calls"]) == 1
+    assert replay["slots"] == [("twogis:card", None)]
+
+    enrich_2gis._learn_card_params(
+        "https://catalog.api.2gis.com/3.0/items/byid?id=1&key=spa-key&locale=ru_RU"
+        "&fields=items.contact_groups%2Citems.schedule&stat%5Bsid%5D=abc"
+    )
+    result = await enrich_2gis.fetch_and_extract_2gis_firm(FIRM_ID)
+    assert result.phones and len(replay["browser_calls"]) == 1
+    params = dict(replay["api"].requests[0].url.params)
+    assert params["key"] == "spa-key" and params["id"] == FIRM_ID
+    assert params["fields"] == "items.contact_groups,items.schedule" and params["stat[sid]"] == "abc"
+
+
+@pytest.mark.parametrize(
+    "status, body, forgets_key",
+    [
+        (200, {"meta": {"code": 403, "error": {"message": "Access denied"}}}, True),
+        (403, {"message": "Forbidden"}, True),
+        (429, {"message": "Too Many Requests"}, False),
+        (200, {"meta": {"code": 404}, "result": {"items": []}}, False),
+        (200, {"meta": {"code": 200}, "result": {"items": [{"id": FIRM_ID, "name": "Без полей"}]}}, False),
+    ],
+)
+@pytest.mark.asyncio
+async def test_refused_fast_path_falls_back_to_chromium(replay, monkeypatch, status, body, forgets_key):
+    monkeypatch.setattr(settings, "TWOGIS_WEB_API_KEY", "")
+    enrich_2gis._learn_card_params("https://catalog.api.2gis.com/3.0/items/byid?id=1&key=spa-key")
+    replay["api"] = FakeCatalogAPI(status=status, body=body)
+
+    result = await enrich_2gis.fetch_and_extract_2gis_firm(FIRM_ID)
+
+    assert len(replay["api"].requests) == 1
+    assert len(replay["browser_calls"]) == 1
+    assert replay["slots"] == [("twogis", "spa-key"), ("twogis:card", None)]
+    assert result.error.startswith("playwright")
+    # отозванный ключ из XHR забываем — его заменит следующая Chromium-карточка
+    assert (enrich_2gis._learned_card_params == {}) is forgets_key
+
+
+def test_learn_card_params_ignores_other_endpoints(monkeypatch):
+    monkeypatch.setattr(enrich_2gis, "_learned_card_params", {})
+    enrich_2gis._learn_card_params("https://catalog.api.2gis.com/3.0/items?q=x&key=k")
+    enrich_2gis._learn_card_params("https://catalog.api.2gis.com/3.0/items/byid?id=1")
+    assert enrich_2gis._learned_card_params == {}
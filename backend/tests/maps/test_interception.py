@@ -0,0 +1,97 @@
+"""Тесты профилей перехвата запросов (maps.interception) и триггеров
+раннего выхода в enrich_2gis."""
+
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.modules.maps import interception
+from app.modules.maps.enrich_2gis import _has_key
+from app.modules.maps.interception import TWOGIS_CARD, YANDEX_MAPS
+
+
+@pytest.mark.parametrize(
+    "url, resource_type, expected",
+    [
+        ("https://2gis.ru/moscow/firm/70000001", "document", True),
+        ("https://d-assets.2gis.ru/app.js", "script", True),
+        ("https://catalog.api.2gis.com/3.0/items/byid?id=1", "fetch", True),
+        ("https://tile2.maps.2gis.com/tiles?x=1&y=2", "fetch", False),
+        ("https://stat.api.2gis.com/collect", "xhr", False),
+        ("https://link.2gis.ru/1.2/abc", "document", False),
+        ("https://2gis.ru/logo.png", "image", False),
+        ("https://2gis.ru/font.woff2", "font", False),
+        ("https://www.google-analytics.com/collect", "xhr", False),
+        ("data:image/png;base64,AAAA", "image", True),
+    ],
+)
+def test_twogis_card_profile(url, resource_type, expected):
+    assert TWOGIS_CARD.allows(url, resource_type) is expected
+
+
+@pytest.mark.parametrize(
+    "url, resource_type, expected",
+    [
+        ("https://yandex.ru/maps/org/123/", "document", True),
+        ("https://yandex.ru/maps/api/search/?text=x", "xhr", True),
+        ("https://yastatic.net/s3/front-maps-static/maps-front-maps/main.js", "script", True),
+        ("https://smartcaptcha.yandexcloud.net/captcha.js", "script", True),
+        ("https://core-renderer-tiles.maps.yandex.net/tiles?l=map", "fetch", False),
+        ("https://mc.yandex.ru/watch/1", "xhr", False),
+        ("https://an.yandex.ru/meta/1", "script", False),
+        ("https://avatars.mds.yandex.net/get-altay/1/orig", "image", False),
+        ("https://top-fwz1.mail.ru/counter", "script", False),
+    ],
+)
+def test_yandex_maps_profile(url, resource_type, expected):
+    assert YANDEX_MAPS.allows(url, resource_type) is expected
+
+
+class _Route:
+    def __init__(self, url: str, resource_type: str):
+        self.request = SimpleNamespace(url=url, resource_type=resource_type)
+        self.outcome = None
+
+    async def continue_(self):
+        self.outcome = "continue"
+
+    async def abort(self, error_code: str = "failed"):
+        self.outcome = error_code
+
+
+class _Context:
+    def __init__(self):
+        self.handlers = []
+
+    async def route(self, pattern, handler):
+        self.handlers.append((pattern, handler))
+
+
+@pytest.mark.asyncio
+async def test_apply_profile_routes_whole_context_and_counts():
+    ctx = _Context()
+    stats = await interception.apply_profile(ctx, TWOGIS_CARD)
+    assert [p for p, _ in ctx.handlers] == ["**/*"]
+    handler = ctx.handlers[0][1]
+
+    routes = [
+        _Route("https://2gis.ru/moscow/firm/1", "document"),
+        _Route("https://2gis.ru/a.png", "image"),
+        _Route("https://2gis.ru/b.jpg", "image"),
+        _Route("https://mc.yandex.ru/watch/1", "script"),
+    ]
+    for r in routes:
+        await handler(r)
+
+    assert [r.outcome for r in routes] == ["continue", "blockedbyclient", "blockedbyclient", "blockedbyclient"]
+    assert (stats.allowed, stats.blocked) == (1, 3)
+    assert stats.blocked_by_type == {"image": 2, "script": 1}
+
+
+def test_has_key_finds_non_empty_nested_field():
+    payload = {"result": {"items": [{"id": "1", "contact_groups": [{"contacts": []}]}]}}
+    assert _has_key(payload, "contact_groups")
+    assert not _has_key({"result": {"items": [{"contact_groups": []}]}}, "contact_groups")
+    assert not _has_key(payload, "contact_groups", depth=2)
@@ -5,16 +5,22 @@
 
 from __future__ import annotations
 
+import asyncio
 from typing import Any
 
+import httpx
 import pytest
 
-from app.modules.maps.providers import MissingAPIKeyError
+from app.core.config import settings
+from app.modules.maps.providers import MissingAPIKeyError, RateLimitError
+from app.modules.maps.providers import twogis
 from app.modules.maps.providers.twogis import (
     CITY_TO_REGION_ID,
+    PAGE_SIZE,
     TWOGIS_FALLBACK_REGION_ID,
     TwoGisProvider,
     _extract_emails_and_extra,
+    _retry_after_seconds,
     resolve_region_id,
 )
 
@@ -151,7 +157,8 @@ async def test_search_companies_happy_path(monkeypatch, twogis_search_page1):
 
 @pytest.mark.asyncio
 async def test_search_companies_pagination(monkeypatch):
-    """Если first page вернул ровно PAGE_SIZE и total больше — идём дальше."""
+    """Если first page вернул ровно PAGE_SIZE и total больше — идём дальше
+    (страниц ровно столько, сколько нужно на total)."""
     from app.modules.maps.providers.twogis import PAGE_SIZE
 
     page1_items = [
@@ -160,8 +167,8 @@ async def test_search_companies_pagination(monkeypatch):
     ]
     page2_items = [{"id": "id-50", "name": "Company 50", "point": {"lat": 55.0, "lon": 37.0}}]
     responses = [
-        {"result": {"items": page1_items, "total": 51}},
-        {"result": {"items": page2_items, "total": 51}},
+        {"result": {"items": page1_items, "total": PAGE_SIZE + 1}},
+        {"result": {"items": page2_items, "total": PAGE_SIZE + 1}},
     ]
     provider, rec = _make_provider_with_responses(monkeypatch, responses)
 
@@ -238,6 +245,117 @@ async def test_search_companies_radius_ignored_if_meters_zero(monkeypatch, twogi
     assert params["region_id"] == CITY_TO_REGION_ID["москва"]
 
 
+@pytest.mark.asyncio
+async def test_search_companies_fans_out_pages_after_total(monkeypatch):
+    """Страница 1 даёт total, страницы 2..N уходят параллельно окном в burst
+    квоты ключа; порядок выдачи — по страницам."""
+    in_flight = 0
+    max_in_flight = 0
+    pages: list[int] = []
+
+    async def fake_request(self, _client, url, params):
+        nonlocal in_flight, max_in_flight
+        page = params["page"]
+        pages.append(page)
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        # поздние страницы отвечают быстрее ранних
+        await asyncio.sleep(0.02 * (7 - page))
+        in_flight -= 1
+        n = PAGE_SIZE if page < 5 else 5
+        items = [
+            {"id": f"id-{page}-{i}", "name": f"C {page}-{i}", "point": {"lat": 55.0, "lon": 37.0}}
+            for i in range(n)
+        ]
+        return {"result": {"items": items, "total": 4 * PAGE_SIZE + 5}}
+
+    monkeypatch.setattr(TwoGisProvider, "_request", fake_request)
+    provider = TwoGisProvider(api_key="fanout", rate_limit_delay=0)
+    ids = [c.external_id async for c in provider.search_companies("clinic", "Москва", limit=100)]
+
+    assert pages[0] == 1 and sorted(pages[1:]) == [2, 3, 4, 5]
+    assert max_in_flight == provider._quota.burst == settings.TWOGIS_RATE_LIMIT_BURST
+    assert ids == [f"id-{p}-{i}" for p in range(1, 5) for i in range(PAGE_SIZE)] + [f"id-5-{i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_search_companies_fetches_only_pages_needed_for_limit(monkeypatch):
+    async def fake_request(self, _client, url, params):
+        items = [{"id": f"id-{params['page']}-{i}", "name": "C", "point": {"lat": 55.0, "lon": 37.0}}
+                 for i in range(PAGE_SIZE)]
+        return {"result": {"items": items, "total": 500}}
+
+    calls: list[int] = []
+
+    async def recording(self, client, url, params):
+        calls.append(params["page"])
+        return await fake_request(self, client, url, params)
+
+    monkeypatch.setattr(TwoGisProvider, "_request", recording)
+    provider = TwoGisProvider(api_key="limit", rate_limit_delay=0)
+    companies = [c async for c in provider.search_companies("clinic", "Москва", limit=25)]
+
+    assert len(companies) == 25
+    assert sorted(calls) == [1, 2, 3]
+
+
+def test_provider_quota_from_explicit_delay():
+    provider = TwoGisProvider(api_key="k1", rate_limit_delay=0.5)
+    assert provider._quota.per_minute == pytest.approx(120.0)
+    assert provider._quota.burst == settings.TWOGIS_RATE_LIMIT_BURST
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"Retry-After": "7"}, 7.0),
+        ({"RateLimit-Reset": "2.5"}, 2.5),
+        ({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}, 0.0),  # дата в прошлом
+        ({}, None),
+        ({"Retry-After": "soon"}, None),
+    ],
+)
+def test_retry_after_seconds(headers, expected):
+    assert _retry_after_seconds(httpx.Headers(headers)) == expected
+
+
+@pytest.mark.asyncio
+async def test_request_429_pauses_bucket_by_retry_after_then_succeeds(monkeypatch):
+    monkeypatch.setattr(settings, "EXTERNAL_API_TRACKING_ENABLED", False)
+    replies = [
+        httpx.Response(429, headers={"Retry-After": "0.2"}),
+        httpx.Response(200, json={"meta": {"code": 200}, "result": {"items": [], "total": 0}}),
+    ]
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda r: replies.pop(0)))
+    provider = TwoGisProvider(api_key="throttled", rate_limit_delay=0)
+
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    data = await provider._request(client, "https://catalog.api.2gis.com/3.0/items", {"q": "x"})
+    assert data["meta"]["code"] == 200
+    # вторая попытка ждала паузу лимита из Retry-After, а не фиксированные 30с
+    assert 0.15 <= loop.time() - t0 < 2
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_request_gives_up_with_rate_limit_error(monkeypatch):
+    monkeypatch.setattr(settings, "EXTERNAL_API_TRACKING_ENABLED", False)
+    monkeypatch.setattr(twogis, "_BACKOFF_BASE_SECONDS", 0.001)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(429)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    provider = TwoGisProvider(api_key="exhausted", rate_limit_delay=0)
+    with pytest.raises(RateLimitError):
+        await provider._request(client, "https://catalog.api.2gis.com/3.0/items", {"q": "x"})
+    assert len(calls) == twogis._MAX_ATTEMPTS
+    await client.aclose()
+
+
 # ---------------------------------------------------------------------------
 # fetch_reviews tests
 # ---------------------------------------------------------------------------
@@ -450,7 +450,7 @@ async def test_create_search_from_cache_enqueues_reviews_for_empty_companies(mon
     """При cache hit роутер должен:
     1. Перепоставить parse_company_reviews для компаний без отзывов.
     2. (2026-07-13) Поставить analyze_reviews_for_company на ВСЕ компании
-       поиска + запланировать recluster_pains_for_niche_task — иначе
+       поиска + запланировать assign_pains_incremental_task — иначе
        from_cache-ниши навсегда остаются без pain_tags (bug пилота 12.07)."""
     from datetime import datetime, timezone
     from app.modules.maps import tasks as maps_tasks
@@ -473,7 +473,14 @@ async def test_create_search_from_cache_enqueues_reviews_for_empty_companies(mon
         "delay",
         lambda cid: analyze_calls.append(cid),
     )
-    # recluster_pains_for_niche_task.apply_async — должен быть вызван с countdown=180
+    # assign_pains_incremental_task.apply_async — должен быть вызван с countdown=180
+    assign_calls: list[dict] = []
+    monkeypatch.setattr(
+        reviews_ai_tasks.assign_pains_incremental_task,
+        "apply_async",
+        lambda **kw: assign_calls.append(kw),
+    )
+    # полный recluster при cache hit больше не ставится
     recluster_calls: list[dict] = []
     monkeypatch.setattr(
         reviews_ai_tasks.recluster_pains_for_niche_task,
@@ -526,9 +533,10 @@ async def test_create_search_from_cache_enqueues_reviews_for_empty_companies(mon
     # для всех 3 компаний — analyze_reviews_for_company (даже если reviews_count=0
     # — analyze идемпотентна, no-op когда нечего анализировать)
     assert len(analyze_calls) == 3
-    # ровно один recluster с правильными args + countdown=180
-    assert len(recluster_calls) == 1
-    call = recluster_calls[0]
+    # ровно одно инкрементальное назначение с правильными args + countdown=180
+    assert recluster_calls == []
+    assert len(assign_calls) == 1
+    call = assign_calls[0]
     assert call.get("args") == [niche, city]
     assert call.get("countdown") == 180
 
@@ -114,6 +114,127 @@ async def test_save_companies_batch_upsert_and_link_to_search():
         assert link.position == 1  # из второго save
 
 
+@pytest.mark.asyncio
+async def test_save_companies_batch_bulk_dedups_keys_and_mirrors_contacts():
+    from app.models.maps import CompanyContact, CompanySource
+
+    async with AsyncSessionLocal() as db:
+        user_id = await _make_user_id(db)
+        search = await service.create_map_search(db, user_id=user_id, niche="x", city="y", sources=["2gis"])
+        ext_a, ext_b = _unique_id("a"), _unique_id("b")
+        raws = [
+            CompanyRaw(source="2gis", external_id=ext_a, name="A", phone="+70000000001"),
+            CompanyRaw(
+                source="2gis", external_id=ext_b, name="B",
+                website="https://b.example", emails=["b@b.example"],
+                contacts_extra={"telegrams": ["@b_tg"], "vks": ["vk.com/b"]},
+            ),
+            # тот же ключ, что и A — побеждает последнее вхождение
+            CompanyRaw(source="2gis", external_id=ext_a, name="A", phone="+70000000002", rating=4.9),
+        ]
+
+        saved = await service.save_companies_batch(db, raws, search.id, start_position=10)
+        assert [c.external_id for c in saved] == [ext_a, ext_b]
+        a, b = saved
+        assert a.phone == "+70000000002"
+        assert float(a.rating) == pytest.approx(4.9)
+
+        positions = dict((await db.execute(
+            select(MapSearchResult.company_id, MapSearchResult.position)
+            .where(MapSearchResult.map_search_id == search.id)
+        )).all())
+        assert positions == {a.id: 12, b.id: 11}
+
+        sources = (await db.execute(
+            select(CompanySource.company_id).where(CompanySource.company_id.in_([a.id, b.id]))
+        )).scalars().all()
+        assert sorted(sources) == sorted([a.id, b.id])
+
+        contacts = set((await db.execute(
+            select(CompanyContact.type, CompanyContact.value).where(CompanyContact.company_id == b.id)
+        )).all())
+        assert contacts == {
+            ("website", "https://b.example"),
+            ("email", "b@b.example"),
+            ("telegram", "@b_tg"),
+            ("vk", "vk.com/b"),
+        }
+
+
+@pytest.mark.asyncio
+async def test_save_companies_batch_statement_count_does_not_grow_with_batch():
+    """Set-based путь: число SQL-запросов на партию не зависит от её размера."""
+    from sqlalchemy import event
+
+    from app.core.database import engine
+
+    counter = {"n": 0}
+
+    def _count(*_args, **_kwargs):
+        counter["n"] += 1
+
+    async def _statements_for(n: int) -> int:
+        raws = [
+            CompanyRaw(
+                source="2gis", external_id=_unique_id("stmt"), name=f"C{i}",
+                phone=f"+7900{i:07d}", emails=[f"c{i}@example.com"],
+            )
+            for i in range(n)
+        ]
+        async with AsyncSessionLocal() as db:
+            user_id = await _make_user_id(db)
+            search = await service.create_map_search(db, user_id=user_id, niche="x", city="y", sources=["2gis"])
+            counter["n"] = 0
+            event.listen(engine.sync_engine, "before_cursor_execute", _count)
+            try:
+                await service.save_companies_batch(db, raws, search.id)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", _count)
+            return counter["n"]
+
+    assert await _statements_for(30) == await _statements_for(3)
+
+
+@pytest.mark.asyncio
+async def test_sync_company_to_multisource_is_idempotent_and_set_based():
+    """Контакты компании пишутся одним unnest-INSERT, сколько бы их ни было."""
+    from sqlalchemy import event, func as sa_func
+
+    from app.core.database import engine
+    from app.models.maps import CompanyContact
+
+    async with AsyncSessionLocal() as db:
+        user_id = await _make_user_id(db)
+        search = await service.create_map_search(db, user_id=user_id, niche="x", city="y", sources=["2gis"])
+        co = (await service.save_companies_batch(
+            db, [CompanyRaw(source="2gis", external_id=_unique_id("co"), name="X")], search.id,
+        ))[0]
+        co.phone = "+70000000000"
+        co.website = "https://x.example"
+        co.emails = [f"e{i}@x.example" for i in range(10)]
+        co.contacts_extra = {"telegrams": [f"@x{i}" for i in range(10)], "vks": ["vk.com/x", "vk.com/x"]}
+
+        counter = {"n": 0}
+
+        def _count(*_args, **_kwargs):
+            counter["n"] += 1
+
+        event.listen(engine.sync_engine, "before_cursor_execute", _count)
+        try:
+            await service._sync_company_to_multisource(db, co)
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", _count)
+        # company_sources UPSERT + контакты + back-fill website
+        assert counter["n"] == 3
+
+        await service._sync_company_to_multisource(db, co)
+        await db.commit()
+        total = (await db.execute(
+            select(sa_func.count()).select_from(CompanyContact).where(CompanyContact.company_id == co.id)
+        )).scalar_one()
+        assert total == 1 + 1 + 10 + 10 + 1  # phone, website, emails, telegrams, vk (дубль схлопнут)
+
+
 # ---------------------------------------------------------------------------
 # save_reviews_batch + dedup
 # ---------------------------------------------------------------------------
@@ -140,6 +261,32 @@ async def test_save_reviews_batch_dedup_by_text_hash():
         assert inserted2 == 0
 
 
+@pytest.mark.asyncio
+async def test_insert_reviews_batch_returns_only_new_ids():
+    async with AsyncSessionLocal() as db:
+        user_id = await _make_user_id(db)
+        search = await service.create_map_search(db, user_id=user_id, niche="x", city="y", sources=["2gis"])
+        co = (await service.save_companies_batch(
+            db, [CompanyRaw(source="2gis", external_id=_unique_id("co"), name="X")], search.id,
+        ))[0]
+
+        first = await service.insert_reviews_batch(db, co.id, [
+            ReviewRaw(source="2gis", rating=5, raw_text="Первый отзыв"),
+            ReviewRaw(source="2gis", rating=5, raw_text="первый ОТЗЫВ!"),  # дубль внутри партии
+        ])
+        assert len(first) == 1
+
+        second = await service.insert_reviews_batch(db, co.id, [
+            ReviewRaw(source="2gis", rating=5, raw_text="Первый отзыв"),
+            ReviewRaw(source="2gis", rating=2, raw_text="Второй отзыв"),
+        ])
+        assert len(second) == 1
+        assert set(second).isdisjoint(first)
+
+        stored = set((await db.execute(select(Review.id).where(Review.company_id == co.id))).scalars().all())
+        assert stored == set(first) | set(second)
+
+
 @pytest.mark.asyncio
 async def test_save_reviews_batch_derived_sentiment():
     async with AsyncSessionLocal() as db:
@@ -117,3 +117,98 @@ async def test_purge_review_raw_text_targets_only_old_rows():
         # старый — None (затёрт) и purged_at установлен
         purged_rows = [r for r in rows if r[1] is not None and r[0] is None]
         assert len(purged_rows) >= 1
+
+
+@pytest.mark.asyncio
+async def test_parse_company_reviews_chains_ai_pipeline_on_new_review_ids(monkeypatch):
+    from app.core.security import hash_password
+    from app.models.user import User
+    from app.modules.maps import tasks as maps_tasks
+    from app.modules.reviews_ai import tasks as ai_tasks
+
+    async with AsyncSessionLocal() as db:
+        user = User(
+            email=f"chain_{uuid.uuid4().hex[:8]}@t.example.com",
+            hashed_password=hash_password("x"),
+            is_active=True,
+        )
+        db.add(user)
+        await db.commit()
+        search = await service.create_map_search(db, user_id=user.id, niche="x", city="y", sources=["2gis"])
+        co = (
+            await service.save_companies_batch(
+                db, [CompanyRaw(source="2gis", external_id=_unique_id("co"), name="X")], search.id,
+            )
+        )[0]
+
+    texts = [f"review-{i}-{uuid.uuid4()}" for i in range(3)]
+
+    class _FakeProvider:
+        async def fetch_reviews(self, external_id, limit):
+            for t in texts:
+                yield ReviewRaw(source="2gis", rating=4, raw_text=t)
+
+    batch_calls: list[list[int]] = []
+    company_calls: list[int] = []
+    monkeypatch.setattr(maps_tasks, "_build_provider", lambda source, db: _FakeProvider())
+    monkeypatch.setattr(ai_tasks.analyze_reviews_batch, "delay", lambda ids, cid: batch_calls.append((ids, cid)))
+    monkeypatch.setattr(ai_tasks.analyze_reviews_for_company, "delay", lambda cid: company_calls.append(cid))
+
+    assert await maps_tasks._parse_company_reviews_async(co.id, "2gis", limit=10) == 3
+    async with AsyncSessionLocal() as db:
+        from sqlalchemy import select
+
+        ids = sorted((await db.execute(select(Review.id).where(Review.company_id == co.id))).scalars().all())
+    assert [(sorted(ids_), cid) for ids_, cid in batch_calls] == [(ids, co.id)]
+    assert company_calls == []
+
+    # Повторный парсинг: новых отзывов нет → догоняющий analyze_reviews_for_company
+    assert await maps_tasks._parse_company_reviews_async(co.id, "2gis", limit=10) == 0
+    assert len(batch_calls) == 1
+    assert company_calls == [co.id]
+
+
+@pytest.mark.asyncio
+async def test_analyze_reviews_batch_picks_up_company_backlog(monkeypatch):
+    """analyze_reviews_batch с company_id добирает старые отзывы компании без
+    ai_processed_at (упавший прошлый прогон), а обработанные не трогает."""
+    from sqlalchemy import update
+
+    from app.core.security import hash_password
+    from app.models.user import User
+    from app.modules.reviews_ai import service as ai_service
+    from app.modules.reviews_ai import tasks as ai_tasks
+
+    async with AsyncSessionLocal() as db:
+        user = User(
+            email=f"backlog_{uuid.uuid4().hex[:8]}@t.example.com",
+            hashed_password=hash_password("x"),
+            is_active=True,
+        )
+        db.add(user)
+        await db.commit()
+        search = await service.create_map_search(db, user_id=user.id, niche="x", city="y", sources=["2gis"])
+        co = (
+            await service.save_companies_batch(
+                db, [CompanyRaw(source="2gis", external_id=_unique_id("co"), name="X")], search.id,
+            )
+        )[0]
+        done, stale, fresh = await service.insert_reviews_batch(
+            db, co.id, [ReviewRaw(source="2gis", rating=3, raw_text=f"r{i}-{uuid.uuid4()}") for i in range(3)],
+        )
+        await db.execute(update(Review).where(Review.id == done).values(ai_processed_at=datetime.now(timezone.utc)))
+        await db.commit()
+
+    seen: list[list[int]] = []
+
+    async def _pipeline(db, review_ids):
+        seen.append(review_ids)
+        return {"sentiment": len(review_ids), "embeddings": 0, "matched": 0}
+
+    monkeypatch.setattr(ai_service, "process_reviews_pipeline", _pipeline)
+
+    await ai_tasks._analyze_reviews_batch_async([fresh], co.id)
+    assert seen == [sorted([stale, fresh])]
+    # без company_id — ровно переданный список
+    await ai_tasks._analyze_reviews_batch_async([fresh])
+    assert seen[-1] == [fresh]
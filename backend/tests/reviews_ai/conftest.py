@@ -0,0 +1,91 @@
+"""Общие фикстуры для тестов reviews_ai.
+
+fake_openai — локальный фейковый OpenAI /embeddings (ASGI-приложение за
+httpx.ASGITransport). Подменяет клиент пула reviews_ai.embeddings, так что
+embed_texts ходит в него настоящим HTTP-запросом через весь стек ретраев
+и лимитов.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from dataclasses import dataclass, field
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.core.config import settings
+from app.modules.reviews_ai import embeddings
+
+
+def text_vector(text: str, dim: int) -> list[float]:
+    """Детерминированный вектор по тексту: первая компонента — id текста."""
+    h = int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+    return [float(h % 100_000)] + [0.001 * (i + 1) for i in range(dim - 1)]
+
+
+@dataclass
+class FakeOpenAI:
+    dim: int = 8
+    # Задержка ответа — чтобы параллельные запросы реально пересекались.
+    latency: float = 0.02
+    # Сценарии сбоев: если любой текст батча содержит ключ — отдать статусы
+    # из списка по очереди (пустой список → нормальный ответ).
+    failures: dict[str, list[int]] = field(default_factory=dict)
+    retry_after: str | None = "0"
+    requests: list[list[str]] = field(default_factory=list)
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+    async def embeddings(self, request: Request) -> JSONResponse:
+        body = await request.json()
+        batch = list(body["input"])
+        self.requests.append(batch)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+        for marker, statuses in self.failures.items():
+            if statuses and any(marker in t for t in batch):
+                status = statuses.pop(0)
+                headers = {"retry-after": self.retry_after} if self.retry_after is not None else {}
+                return JSONResponse({"error": {"message": "fake"}}, status_code=status, headers=headers)
+
+        # OpenAI не обещает порядок data — отдаём задом наперёд, клиент
+        # обязан разложить по index.
+        data = [
+            {"object": "embedding", "index": i, "embedding": text_vector(t, self.dim)}
+            for i, t in enumerate(batch)
+        ][::-1]
+        return JSONResponse({
+            "object": "list",
+            "data": data,
+            "model": body["model"],
+            "usage": {"prompt_tokens": sum(len(t) // 4 + 1 for t in batch), "total_tokens": 0},
+        })
+
+
+@pytest.fixture
+async def fake_openai(monkeypatch):
+    server = FakeOpenAI()
+    app = Starlette(routes=[Route("/v1/embeddings", server.embeddings, methods=["POST"])])
+
+    def _build_client() -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), timeout=5.0)
+
+    monkeypatch.setattr(embeddings, "_build_client", _build_client)
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-fake")
+    monkeypatch.setattr(settings, "OPENAI_BASE_URL", "http://fake-openai/v1")
+    # Без api_tracker'а: запись в api_call_log здесь не проверяется.
+    monkeypatch.setattr(settings, "EXTERNAL_API_TRACKING_ENABLED", False)
+    await embeddings.aclose_pool()
+    yield server
+    await embeddings.aclose_pool()
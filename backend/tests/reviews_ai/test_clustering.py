@@ -3,7 +3,7 @@
 import numpy as np
 import pytest
 
-from app.modules.reviews_ai.clustering import cluster_embeddings, compute_centroid
+from app.modules.reviews_ai.clustering import cluster_embeddings, compute_centroid, reduce_dimensions
 
 
 def _make_three_clusters(rng_seed: int = 42, n_per: int = 10, dim: int = 8) -> np.ndarray:
@@ -35,6 +35,52 @@ def test_hdbscan_handles_empty_input():
     assert labels.shape == (0,)
 
 
+def _make_topics(n_per: int = 40, topics: int = 4, dim: int = 256, seed: int = 7):
+    """topics направлений в dim-мерном пространстве + шум (cos ≈ 0.9)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dim))
+    truth = np.repeat(np.arange(topics), n_per)
+    X = centers[truth] + rng.normal(0, 0.5 / np.sqrt(dim) * np.linalg.norm(centers, axis=1).mean(), (len(truth), dim))
+    return X, truth
+
+
+@pytest.mark.parametrize("method", ["pca", "random"])
+def test_minibatch_backend_recovers_topics(method):
+    X, truth = _make_topics()
+    labels = cluster_embeddings(
+        X, min_cluster_size=5, backend="minibatch", reduce_dims=32, reduce_method=method, n_clusters=4,
+    )
+    assert labels.shape == truth.shape
+    # каждая истинная тема целиком в одном кластере, темы не слиты
+    per_topic = [set(labels[truth == t].tolist()) for t in range(4)]
+    assert all(len(s) == 1 for s in per_topic)
+    assert len(set().union(*per_topic)) == 4
+
+
+def test_minibatch_marks_small_clusters_as_noise():
+    X, truth = _make_topics(n_per=20, topics=3)
+    outlier = np.zeros((1, X.shape[1]))
+    outlier[0, 0] = -1e3
+    labels = cluster_embeddings(
+        np.vstack([X, outlier]), min_cluster_size=5, backend="minibatch", reduce_dims=0, n_clusters=4,
+    )
+    assert labels[-1] == -1
+    assert sorted(set(labels[:-1].tolist())) == [0, 1, 2]
+
+
+def test_reduce_dimensions_returns_unit_float32():
+    X, _ = _make_topics(dim=64)
+    for method in ("pca", "random"):
+        out = reduce_dimensions(X, dims=16, method=method)
+        assert out.shape == (X.shape[0], 16) and out.dtype == np.float32
+        assert np.allclose(np.linalg.norm(out, axis=1), 1.0, atol=1e-4)
+
+
+def test_cluster_embeddings_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        cluster_embeddings(np.zeros((10, 4)), backend="dbscan")
+
+
 def test_centroid_computation():
     X = np.array([[1.0, 0.0], [3.0, 0.0], [2.0, 4.0]])
     c = compute_centroid(X)
@@ -0,0 +1,120 @@
+"""Тесты content-addressed кэша embeddings (reviews_ai.embedding_cache)."""
+
+from __future__ import annotations
+
+import uuid
+
+import numpy as np
+import pytest
+from sqlalchemy import delete, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core import redis_clients
+from app.models.embedding_cache import EmbeddingCache
+from app.modules.maps.utils import hash_review_text
+from app.modules.reviews_ai import embedding_cache
+
+
+def _vec(seed: float) -> list[float]:
+    return [seed] + [0.0] * (embedding_cache.EMBEDDING_DIM - 1)
+
+
+@pytest.fixture
+def fake_embed(monkeypatch):
+    """Подменяет llm.embed_texts; копит, какие тексты реально ушли в OpenAI."""
+    sent: list[list[str]] = []
+
+    async def _embed(texts):
+        sent.append(list(texts))
+        return [_vec(float(len(t))) for t in texts]
+
+    monkeypatch.setattr(embedding_cache.llm, "embed_texts", _embed)
+    embedding_cache.clear_lru()
+    yield sent
+    embedding_cache.clear_lru()
+
+
+async def _stats_delta(before: dict[str, int]) -> dict[str, int]:
+    after = await embedding_cache.get_stats()
+    return {k: after[k] - before[k] for k in after}
+
+
+@pytest.mark.asyncio
+async def test_cache_serves_lru_then_db_and_embeds_only_misses(fake_embed):
+    run = uuid.uuid4().hex[:8]
+    a, b = f"Отличная клиника {run}", f"Долго ждали {run}"
+    # Тот же текст после нормализации (регистр/пробелы) — тот же ключ.
+    a_variant = f"  отличная   КЛИНИКА {run} "
+
+    before = await embedding_cache.get_stats()
+    async with AsyncSessionLocal() as db:
+        first = await embedding_cache.embed_texts_cached(db, [a, b, a_variant])
+        await db.commit()
+    assert fake_embed == [[a, b]]
+    assert first[0] == first[2] == _vec(float(len(a)))
+    assert (await _stats_delta(before))["misses"] == 2
+
+    # Второй вызов — из LRU, в OpenAI ничего не уходит.
+    before = await embedding_cache.get_stats()
+    async with AsyncSessionLocal() as db:
+        assert await embedding_cache.embed_texts_cached(db, [b]) == [_vec(float(len(b)))]
+    assert len(fake_embed) == 1
+    assert (await _stats_delta(before))["lru_hits"] == 1
+
+    # Холодный LRU (другой воркер) — из таблицы.
+    embedding_cache.clear_lru()
+    before = await embedding_cache.get_stats()
+    async with AsyncSessionLocal() as db:
+        again = await embedding_cache.embed_texts_cached(db, [a, b])
+        rows = (await db.execute(
+            select(EmbeddingCache.text_hash, EmbeddingCache.embedding).where(
+                EmbeddingCache.model == settings.REVIEWS_AI_EMBEDDING_MODEL,
+                EmbeddingCache.text_hash.in_([hash_review_text(a), hash_review_text(b)]),
+            )
+        )).all()
+    assert len(fake_embed) == 1
+    assert again == [_vec(float(len(a))), _vec(float(len(b)))]
+    assert len(rows) == 2 and all(np.asarray(e).shape == (embedding_cache.EMBEDDING_DIM,) for _, e in rows)
+    delta = await _stats_delta(before)
+    assert delta["db_hits"] == 2 and delta["misses"] == 0 and delta["saved_tokens"] > 0
+
+
+@pytest.mark.asyncio
+async def test_cache_does_not_store_failed_embeddings(monkeypatch):
+    text = f"без ключа {uuid.uuid4().hex[:8]}"
+
+    async def _no_key(texts):
+        return None
+
+    monkeypatch.setattr(embedding_cache.llm, "embed_texts", _no_key)
+    embedding_cache.clear_lru()
+    async with AsyncSessionLocal() as db:
+        assert await embedding_cache.embed_texts_cached(db, [text]) == [None]
+        await db.commit()
+        stored = (await db.execute(
+            select(EmbeddingCache).where(EmbeddingCache.text_hash == hash_review_text(text))
+        )).scalars().all()
+    assert stored == []
+
+
+@pytest.mark.asyncio
+async def test_monitor_embedding_cache_endpoint(client, auth_headers, fake_embed):
+    await redis_clients.get_client().delete(embedding_cache.STATS_KEY)
+    run = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        await embedding_cache.embed_texts_cached(db, [f"x {run}", f"y {run}"])
+        await embedding_cache.embed_texts_cached(db, [f"x {run}"])
+        await db.commit()
+
+    resp = await client.get("/api/v1/monitor/embedding-cache", headers=auth_headers)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["misses"] == 2 and body["lru_hits"] == 1
+    assert body["hit_rate"] == pytest.approx(33.3)
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(EmbeddingCache).where(
+            EmbeddingCache.text_hash.in_([hash_review_text(f"x {run}"), hash_review_text(f"y {run}")])
+        ))
+        await db.commit()
@@ -0,0 +1,115 @@
+"""Тесты конкурентного клиента embeddings против фейкового OpenAI (fake_openai)."""
+
+from __future__ import annotations
+
+import time
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.maps import Review
+from app.modules.maps import service as maps_service
+from app.modules.maps.schemas import ReviewRaw
+from app.modules.reviews_ai import embeddings, llm
+from app.modules.reviews_ai import service as ai_service
+from tests.reviews_ai.conftest import text_vector
+from tests.reviews_ai.test_service import _setup_user_and_company, _u
+
+
+def _texts(n: int, prefix: str = "t") -> list[str]:
+    return [f"{prefix}-{i}" for i in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_embed_texts_runs_batches_concurrently_and_keeps_order(fake_openai, monkeypatch):
+    monkeypatch.setattr(settings, "REVIEWS_AI_EMBEDDING_CONCURRENCY", 3)
+    texts = _texts(embeddings.EMBEDDING_BATCH_SIZE * 5 + 7)
+
+    vectors = await llm.embed_texts(texts)
+
+    assert len(fake_openai.requests) == 6
+    assert fake_openai.max_in_flight == 3
+    assert vectors == [text_vector(t, fake_openai.dim) for t in texts]
+
+
+@pytest.mark.asyncio
+async def test_embed_texts_keeps_partial_results_when_batch_fails(fake_openai):
+    size = embeddings.EMBEDDING_BATCH_SIZE
+    texts = _texts(size, "ok") + _texts(size, "bad") + _texts(size, "flaky")
+    fake_openai.failures = {
+        "bad": [400],          # неретраимый — батч теряется
+        "flaky": [429, 503],   # ретраи с Retry-After: 0 — батч доезжает
+    }
+
+    vectors = await llm.embed_texts(texts)
+
+    assert vectors[:size] == [text_vector(t, fake_openai.dim) for t in texts[:size]]
+    assert vectors[size:2 * size] == [None] * size
+    assert vectors[2 * size:] == [text_vector(t, fake_openai.dim) for t in texts[2 * size:]]
+    # ok: 1 запрос, bad: 1 (без ретраев), flaky: 3.
+    assert len(fake_openai.requests) == 5
+
+
+@pytest.mark.asyncio
+async def test_embed_texts_auth_error_stops_remaining_batches(fake_openai, monkeypatch):
+    monkeypatch.setattr(settings, "REVIEWS_AI_EMBEDDING_CONCURRENCY", 1)
+    fake_openai.failures = {"t-": [401] * 10}
+
+    assert await llm.embed_texts(_texts(embeddings.EMBEDDING_BATCH_SIZE * 4)) is None
+    assert len(fake_openai.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_for_refill():
+    bucket = embeddings.TokenBucket(per_minute=6000)  # 100 единиц/с
+    await bucket.acquire(6000)
+    t0 = time.monotonic()
+    await bucket.acquire(30)
+    assert 0.2 <= time.monotonic() - t0 < 1.0
+
+    bucket.refund(6000)
+    t0 = time.monotonic()
+    await bucket.acquire(6000)
+    assert time.monotonic() - t0 < 0.05
+
+
+@pytest.mark.asyncio
+async def test_embed_texts_respects_rpm_budget(fake_openai, monkeypatch):
+    # 1200 RPM = 20 запросов/с, ведро на старте полное — выбираем его
+    # заранее, дальше 4 батча идут не быстрее 20/с.
+    monkeypatch.setattr(settings, "REVIEWS_AI_EMBEDDING_RPM", 1200)
+    monkeypatch.setattr(settings, "REVIEWS_AI_EMBEDDING_CONCURRENCY", 8)
+    fake_openai.latency = 0
+    await llm.embed_texts(["warmup"])
+    pool = embeddings._get_pool()
+    await pool.requests.acquire(pool.requests.capacity)
+
+    t0 = time.monotonic()
+    await llm.embed_texts(_texts(embeddings.EMBEDDING_BATCH_SIZE * 4))
+    assert time.monotonic() - t0 >= 0.15
+
+
+@pytest.mark.asyncio
+async def test_compute_embeddings_stores_vectors_of_successful_batches(fake_openai, monkeypatch):
+    fake_openai.dim = 1536
+    fake_openai.failures = {"lost": [400]}
+    monkeypatch.setattr(embeddings, "EMBEDDING_BATCH_SIZE", 1)
+    async with AsyncSessionLocal() as db:
+        co = await _setup_user_and_company(db)
+        ids = await maps_service.insert_reviews_batch(db, co.id, [
+            ReviewRaw(source="2gis", rating=2, raw_text=_u(prefix)) for prefix in ("kept", "kept", "lost")
+        ])
+
+        assert await ai_service.compute_embeddings(db, ids) == 2
+        db.expire_all()
+        stored = (await db.execute(
+            select(Review.raw_text, Review.embedding).where(Review.id.in_(ids))
+        )).all()
+        for txt, emb in stored:
+            if txt.startswith("lost"):
+                assert emb is None
+            else:
+                assert np.allclose(np.asarray(emb), text_vector(txt, 1536))
@@ -8,9 +8,10 @@ import numpy as np
 import pytest
 from sqlalchemy import select
 
+from app.core.config import settings
 from app.core.database import AsyncSessionLocal
 from app.models.maps import Company, Review
-from app.models.pain_tag import CompanyPainScore, PainTag, ReviewPainTag
+from app.models.pain_tag import CompanyPainScore, PainTag, PainUnassignedReview, ReviewPainTag
 from app.modules.maps import service as maps_service
 from app.modules.maps.schemas import CompanyRaw, ReviewRaw
 from app.modules.reviews_ai import service as ai_service
@@ -50,6 +51,65 @@ async def _setup_user_and_company(db, niche="стоматология", city="М
     return co
 
 
+# ---------------------------------------------------------------------------
+# compute_sentiment / compute_embeddings — bulk UPDATE
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.asyncio
+async def test_compute_embeddings_writes_all_vectors_in_bulk(monkeypatch):
+    async with AsyncSessionLocal() as db:
+        co = await _setup_user_and_company(db)
+        ids = await maps_service.insert_reviews_batch(db, co.id, [
+            ReviewRaw(source="2gis", rating=2, raw_text=_u(f"emb{i}")) for i in range(3)
+        ])
+        rows = (await db.execute(
+            select(Review.id, Review.raw_text).where(Review.id.in_(ids))
+        )).all()
+        vec_by_text = {txt: _vec([float(i + 1), 0.5, -0.25]) for i, (_rid, txt) in enumerate(rows)}
+
+        async def fake_embed(texts):
+            return [vec_by_text[t] for t in texts]
+
+        monkeypatch.setattr(ai_service.llm, "embed_texts", fake_embed)
+        monkeypatch.setattr(ai_service, "EMBEDDING_UPDATE_CHUNK", 2)  # два UPDATE'а на три отзыва
+
+        assert await ai_service.compute_embeddings(db, ids) == 3
+        db.expire_all()
+        stored = (await db.execute(
+            select(Review.raw_text, Review.embedding).where(Review.id.in_(ids))
+        )).all()
+        for txt, emb in stored:
+            assert np.allclose(np.asarray(emb), vec_by_text[txt])
+
+
+@pytest.mark.asyncio
+async def test_compute_sentiment_bulk_updates_only_valid_items(monkeypatch):
+    async with AsyncSessionLocal() as db:
+        co = await _setup_user_and_company(db)
+        a, b = await maps_service.insert_reviews_batch(db, co.id, [
+            ReviewRaw(source="2gis", rating=3, raw_text=_u("sent-a")),
+            ReviewRaw(source="2gis", rating=3, raw_text=_u("sent-b")),
+        ])
+
+        async def fake_sentiment(_db, batch):
+            return [
+                {"id": a, "sentiment": "Negative", "score": 1.7},
+                {"id": b, "sentiment": "bogus", "score": 0.1},
+                "garbage",
+            ]
+
+        monkeypatch.setattr(ai_service.llm, "call_llm_sentiment", fake_sentiment)
+        assert await ai_service.compute_sentiment(db, [a, b]) == 1
+        db.expire_all()
+        got = dict((await db.execute(
+            select(Review.id, Review.sentiment).where(Review.id.in_([a, b]))
+        )).all())
+        assert got == {a: "negative", b: "neutral"}
+        score = (await db.execute(select(Review.sentiment_score).where(Review.id == a))).scalar_one()
+        assert float(score) == pytest.approx(1.0)
+
+
 # ---------------------------------------------------------------------------
 # match_reviews_to_pain_tags
 # ---------------------------------------------------------------------------
@@ -144,6 +204,140 @@ async def test_match_below_threshold_does_not_save():
         assert rpt_rows == []
 
 
+async def _setup_match_fixture(db):
+    """Компания с 6 отзывами и 3 тегами в уникальной нише; векторы в первых 3 осях."""
+    co = await _setup_user_and_company(db, niche=_u("niche-match"))
+    directions = [[1, 0, 0], [0.9, 0.3, 0], [0.6, 0.6, 0], [0, 1, 0], [0, 0.7, 0.7], [-1, 0, 0]]
+    ids = await maps_service.insert_reviews_batch(db, co.id, [
+        ReviewRaw(source="2gis", rating=2, raw_text=_u(f"m{i}")) for i in range(len(directions))
+    ])
+    for rid, d in zip(ids, directions):
+        await db.execute(
+            __import__("sqlalchemy").text("UPDATE reviews SET embedding = :v WHERE id = :id"),
+            {"v": str(_vec([float(x) for x in d])), "id": rid},
+        )
+    tags = [
+        PainTag(niche=co.niche, city=co.city, label=_u(f"t{i}"), centroid=_vec(c), status="active")
+        for i, c in enumerate([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    ]
+    db.add_all(tags)
+    await db.commit()
+    return ids
+
+
+async def _match_snapshot(db, ids) -> dict[int, dict[int, float]]:
+    rows = (await db.execute(
+        select(ReviewPainTag.review_id, ReviewPainTag.pain_tag_id, ReviewPainTag.similarity)
+        .where(ReviewPainTag.review_id.in_(ids))
+    )).all()
+    out: dict[int, dict[int, float]] = {}
+    for rid, tid, sim in rows:
+        out.setdefault(ids.index(rid), {})[tid] = float(sim)
+    return out
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("top_k", [0, 1])
+async def test_match_sql_and_numpy_modes_agree(top_k):
+    snapshots = []
+    for mode in ("sql", "numpy"):
+        async with AsyncSessionLocal() as db:
+            ids = await _setup_match_fixture(db)
+            assigned = await ai_service.match_reviews_to_pain_tags(
+                db, ids, threshold=0.5, mode=mode, top_k=top_k,
+            )
+            snap = await _match_snapshot(db, ids)
+        assert set(assigned) == {ids[i] for i in snap}
+        # Теги разные (свежая ниша на каждый режим) — сравниваем по
+        # упорядоченным similarity каждого отзыва.
+        snapshots.append({i: sorted(v.values(), reverse=True) for i, v in snap.items()})
+
+    sql_snap, numpy_snap = snapshots
+    assert sql_snap == numpy_snap
+    # Отзыв [-1,0,0] не матчится ни с чем; [0.6,0.6,0] при top_k=0 — с двумя тегами.
+    assert 5 not in sql_snap
+    assert len(sql_snap[2]) == (1 if top_k == 1 else 2)
+
+
+@pytest.mark.asyncio
+async def test_match_sql_failure_falls_back_to_numpy(monkeypatch):
+    monkeypatch.setattr(
+        ai_service, "_MATCH_TOP_K_SQL",
+        __import__("sqlalchemy").text("SELECT * FROM no_such_table_for_match"),
+    )
+    async with AsyncSessionLocal() as db:
+        ids = await _setup_match_fixture(db)
+        assigned = await ai_service.match_reviews_to_pain_tags(db, ids, threshold=0.5, mode="sql")
+        snap = await _match_snapshot(db, ids)
+    assert set(assigned) == {ids[i] for i in snap} == {ids[i] for i in range(5)}
+
+
+async def _pool_rows(db, niche) -> dict[int, bool]:
+    rows = (await db.execute(
+        select(PainUnassignedReview.review_id, PainUnassignedReview.pending)
+        .where(PainUnassignedReview.niche == niche)
+    )).all()
+    return {int(rid): bool(pending) for rid, pending in rows}
+
+
+@pytest.mark.asyncio
+async def test_assign_incremental_matches_new_reviews_and_pools_the_rest(monkeypatch):
+    monkeypatch.setattr(settings, "REVIEWS_AI_PAIN_MATCH_THRESHOLD", 0.5)
+    recluster_calls: list[tuple] = []
+
+    async def fake_recluster(_db, niche, city=None, **kw):
+        recluster_calls.append((niche, city, kw.get("sentiment")))
+        return 0
+
+    monkeypatch.setattr(ai_service, "recluster_pains_for_niche", fake_recluster)
+
+    async with AsyncSessionLocal() as db:
+        ids = await _setup_match_fixture(db)
+        co = (await db.execute(
+            select(Company).join(Review, Review.company_id == Company.id).where(Review.id == ids[0])
+        )).scalar_one()
+
+        stats = await ai_service.assign_pains_incremental(db, co.niche, co.city, pool_threshold=2)
+        assert stats == {"new": 6, "matched": 5, "pooled": 1, "pool_size": 1, "reclustered": False}
+        assert await _pool_rows(db, co.niche) == {ids[5]: True}
+        assert set((await _match_snapshot(db, ids))) == {0, 1, 2, 3, 4}
+
+        # Повторный запуск без новых отзывов — ничего не матчит и не пишет.
+        stats = await ai_service.assign_pains_incremental(db, co.niche, co.city, pool_threshold=2)
+        assert stats["new"] == 0 and stats["pool_size"] == 1
+        assert recluster_calls == []
+
+        # Ещё один «ничейный» отзыв — пул дорос до порога → полный recluster.
+        stray = await maps_service.insert_reviews_batch(db, co.id, [
+            ReviewRaw(source="2gis", rating=1, raw_text=_u("stray")),
+        ])
+        await db.execute(
+            __import__("sqlalchemy").text("UPDATE reviews SET embedding = :v WHERE id = :id"),
+            {"v": str(_vec([0.0, -1.0, 0.0])), "id": stray[0]},
+        )
+        await db.commit()
+        stats = await ai_service.assign_pains_incremental(db, co.niche, co.city, pool_threshold=2)
+        assert stats["new"] == 1 and stats["pooled"] == 1 and stats["pool_size"] == 2
+        assert stats["reclustered"] is True
+        assert recluster_calls == [(co.niche, co.city, "negative")]
+
+
+@pytest.mark.asyncio
+async def test_assign_incremental_without_tags_runs_full_recluster(monkeypatch):
+    recluster_calls: list[str] = []
+
+    async def fake_recluster(_db, niche, city=None, **kw):
+        recluster_calls.append(niche)
+        return 0
+
+    monkeypatch.setattr(ai_service, "recluster_pains_for_niche", fake_recluster)
+    niche = _u("niche-empty")
+    async with AsyncSessionLocal() as db:
+        stats = await ai_service.assign_pains_incremental(db, niche, "Москва")
+    assert stats["reclustered"] is True and stats["new"] == 0
+    assert recluster_calls == [niche]
+
+
 # ---------------------------------------------------------------------------
 # recluster
 # ---------------------------------------------------------------------------
@@ -217,6 +411,75 @@ async def test_recluster_creates_tags_and_archives_unused(monkeypatch):
         assert len(new_tags) == n_tags
         assert all(t.label.startswith("label-") for t in new_tags)
 
+        # Пул ничейных пересобран: только не сматченные отзывы, pending=False.
+        linked = set((await db.execute(
+            select(ReviewPainTag.review_id).join(Review, Review.id == ReviewPainTag.review_id)
+            .where(Review.company_id == co.id)
+        )).scalars().all())
+        pool = await _pool_rows(db, niche)
+        assert not (set(pool) & linked)
+        assert not any(pool.values())
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("global_tags", [False, True], ids=["city", "global"])
+async def test_recluster_names_in_parallel_and_reuses_labels_of_stable_clusters(monkeypatch, global_tags):
+    import asyncio
+
+    from sqlalchemy import text as sa_text
+
+    monkeypatch.setattr(ai_service.settings, "REVIEWS_AI_NAMING_CONCURRENCY", 2)
+    state = {"calls": 0, "in_flight": 0, "max_in_flight": 0}
+
+    async def fake_naming(_db, _niche, _samples):
+        state["calls"] += 1
+        n = state["calls"]
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0.05)
+        state["in_flight"] -= 1
+        return {"label": f"label-{n}", "description": "desc"}
+
+    monkeypatch.setattr(ai_service.llm, "call_llm_cluster_naming", fake_naming)
+    niche, company_city = _u("niche-cache"), _u("city-cache")
+    # city=None — глобальные теги ниши: повтор label'а ловит частичный
+    # ux_pain_tags_global, и на него же должен целиться upsert.
+    city = None if global_tags else company_city
+
+    async with AsyncSessionLocal() as db:
+        co = await _setup_user_and_company(db, niche=niche, city=company_city)
+        directions = ([[1.0, 0.0, 0.0]] * 8) + ([[0.0, 1.0, 0.0]] * 8) + ([[0.0, 0.0, 1.0]] * 8)
+        ids = await maps_service.insert_reviews_batch(db, co.id, [
+            ReviewRaw(source="2gis", rating=2, raw_text=_u(f"cache-{i}")) for i in range(len(directions))
+        ])
+        for i, (rid, d) in enumerate(zip(ids, directions)):
+            await db.execute(
+                sa_text("UPDATE reviews SET embedding = :v WHERE id = :id"),
+                {"v": str(_vec([v + ((-1) ** i) * 0.001 for v in d])), "id": rid},
+            )
+        await db.commit()
+
+        async def active_tags() -> dict[int, str]:
+            return dict((await db.execute(
+                select(PainTag.id, PainTag.label).where(
+                    PainTag.niche == niche, PainTag.city.is_not_distinct_from(city),
+                    PainTag.status == "active",
+                )
+            )).all())
+
+        n_tags = await ai_service.recluster_pains_for_niche(db, niche, city, min_cluster_size=8)
+        first = await active_tags()
+        assert n_tags == len(first) >= 2
+        assert state["calls"] == n_tags
+        assert state["max_in_flight"] == 2
+
+        # Те же данные — центроиды совпадают, LLM не вызывается, теги те же.
+        state["calls"] = 0
+        assert await ai_service.recluster_pains_for_niche(db, niche, city, min_cluster_size=8) == n_tags
+        assert state["calls"] == 0
+        db.expire_all()
+        assert await active_tags() == first
+
 
 @pytest.mark.asyncio
 async def test_recluster_excludes_positive_reviews(monkeypatch):
@@ -3,6 +3,7 @@
 from app.modules.reviews_ai.tasks import (
     analyze_reviews_batch,
     analyze_reviews_for_company,
+    assign_pains_incremental_task,
     recluster_pains_for_niche_task,
     recluster_popular_niches,
 )
@@ -18,6 +19,9 @@ def test_celery_ai_tasks_registered_with_correct_queues():
     assert recluster_pains_for_niche_task.name == "recluster_pains_for_niche_task"
     assert recluster_pains_for_niche_task.queue == "maps_ai"
 
+    assert assign_pains_incremental_task.name == "assign_pains_incremental_task"
+    assert assign_pains_incremental_task.queue == "maps_ai"
+
     assert recluster_popular_niches.name == "recluster_popular_niches"
     assert recluster_popular_niches.queue == "maps_ai"
 
@@ -0,0 +1,104 @@
+"""
+Tests for single-flight domain crawls (filters.crawl_flight) and the fan-out
+of one crawl to every waiting search in queue.tasks._process_domain_async.
+"""
+
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from app.core import database
+from app.core.security import hash_password
+from app.models.search import Search, SearchResult
+from app.models.user import User
+from app.modules.filters import crawl_flight
+from app.queue import tasks
+
+CRAWL = {
+    "pages": [{"url": "https://flight.test/", "status_code": 200, "title": "Стоматология", "text_content": "Зубы"}],
+    "total_pages": 1,
+    "contacts": {"phone": "+7 (495) 111-22-33", "email": None},
+    "seo": {"score": 80, "issues": [], "details": {}},
+}
+
+
+async def _search_with_results(domain: str, n: int) -> int:
+    async with database.AsyncSessionLocal() as db:
+        user = User(email=f"flight_{uuid.uuid4().hex[:8]}@test.example.com", hashed_password=hash_password("x"))
+        db.add(user)
+        await db.flush()
+        search = Search(user_id=user.id, query="стоматология", status="completed")
+        db.add(search)
+        await db.flush()
+        db.add_all([
+            SearchResult(search_id=search.id, position=i, title=f"r{i}", url=f"https://{domain}/{i}", domain=domain)
+            for i in range(n)
+        ])
+        await db.commit()
+        return search.id
+
+
+@pytest.mark.asyncio
+async def test_join_flight_leader_then_waiters_then_release():
+    domain = f"{uuid.uuid4().hex[:8]}.test"
+    leader = await crawl_flight.join_flight(domain, {"search_id": 1, "domain": domain})
+    assert leader is not None and leader.token
+    # тот же домен после нормализации — ждёт, а не обходит
+    assert await crawl_flight.join_flight(f"https://www.{domain}/", {"search_id": 2, "domain": f"www.{domain}"}) is None
+    assert await crawl_flight.join_flight(domain, {"search_id": 3, "domain": domain}) is None
+
+    waiters = await leader.release()
+    assert waiters == [{"search_id": 2, "domain": f"www.{domain}"}, {"search_id": 3, "domain": domain}]
+    # лок снят, список разобран
+    assert await leader.release() == []
+    again = await crawl_flight.join_flight(domain, {"search_id": 4, "domain": domain})
+    assert again is not None
+    assert await again.release() == []
+
+
+@pytest.mark.asyncio
+async def test_concurrent_domain_tasks_share_one_crawl(monkeypatch):
+    domain = f"{uuid.uuid4().hex[:8]}.test"
+    searches = [await _search_with_results(domain, n) for n in (2, 1, 3)]
+    crawls = []
+    rechecks = []
+
+    async def fake_crawl(d, first_url):
+        crawls.append(d)
+        await asyncio.sleep(0.3)
+        return CRAWL
+
+    monkeypatch.setattr(tasks, "AsyncSessionLocal", database.AsyncSessionLocal)
+    monkeypatch.setattr(tasks, "_crawl_domain_bounded", fake_crawl)
+    monkeypatch.setattr(
+        tasks.process_domain_task, "apply_async", lambda args, kwargs, **opts: rechecks.append((args, kwargs, opts)),
+    )
+
+    first = asyncio.create_task(tasks._process_domain_async(searches[0], domain, f"https://{domain}/"))
+    await asyncio.sleep(0.05)
+    waiting = await asyncio.gather(*(
+        tasks._process_domain_async(sid, domain, f"https://{domain}/") for sid in searches[1:]
+    ))
+    result = await first
+
+    assert crawls == [domain]
+    assert [w["status"] for w in waiting] == ["waiting_for_crawl"] * 2
+    assert result["results_updated"] == 2 and result["shared_with"] == 2
+    assert sorted(args[0] for args, kwargs, _ in rechecks) == searches[1:]
+    assert all(kwargs == {"recheck": True} and opts["countdown"] == crawl_flight.lock_ttl()
+               for _, kwargs, opts in rechecks)
+
+    async with database.AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(SearchResult.search_id, SearchResult.phone, SearchResult.contact_status)
+            .where(SearchResult.search_id.in_(searches))
+        )).all()
+    assert len(rows) == 6
+    assert {(phone, status) for _, phone, status in rows} == {("+7 (495) 111-22-33", "found")}
+
+    # отложенная перепроверка ожидающего: строки уже заполнены лидером
+    recheck = await tasks._process_domain_async(searches[1], domain, f"https://{domain}/", recheck=True)
+    assert recheck == {"domain": domain, "status": "already_processed"}
+    assert crawls == [domain]
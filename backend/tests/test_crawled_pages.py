@@ -0,0 +1,170 @@
+"""
+Tests for normalised crawled-page storage (searches.crawled_pages) and the
+keyword filter on top of it. Hits the test Postgres.
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.core.database import AsyncSessionLocal
+from app.core.security import hash_password
+from app.models.search import CrawledPage, Search, SearchResult, SearchResultCrawledPage
+from app.models.user import User
+from app.modules.searches import crawled_pages
+from app.modules.searches.keyword_filter import find_matching_result_ids, get_keyword_hits_per_result
+
+PAGES = [
+    {"url": "https://dent.test/", "status_code": 200, "title": "Стоматология", "text_content": "Протезирование зубов"},
+    {"url": "https://dent.test/price", "status_code": 200, "title": "Цены", "text_content": "Имплантация под ключ"},
+    {"url": "https://dent.test/contacts", "status_code": 200, "title": "Контакты", "text_content": "Москва"},
+]
+
+
+async def _search_with_results(db, domain: str, n: int) -> tuple[int, list[int]]:
+    user = User(email=f"pages_{uuid.uuid4().hex[:8]}@test.example.com", hashed_password=hash_password("x"))
+    db.add(user)
+    await db.flush()
+    search = Search(user_id=user.id, query="стоматология", status="processing")
+    db.add(search)
+    await db.flush()
+    results = [
+        SearchResult(search_id=search.id, position=i, title=f"r{i}", url=f"https://{domain}/{i}", domain=domain)
+        for i in range(n)
+    ]
+    db.add_all(results)
+    await db.flush()
+    return search.id, [r.id for r in results]
+
+
+async def _count(db, model, *where) -> int:
+    return (await db.execute(select(func.count()).select_from(model).where(*where))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_pages_of_a_domain_are_stored_once_and_shared_by_results():
+    domain = f"dent-{uuid.uuid4().hex[:8]}.test"
+    async with AsyncSessionLocal() as db:
+        search_id, result_ids = await _search_with_results(db, domain, 4)
+        page_ids = await crawled_pages.store_domain_pages(
+            db, search_id=search_id, domain=domain, result_ids=result_ids, pages=PAGES,
+        )
+        await db.commit()
+
+        assert len(page_ids) == 3
+        assert await _count(db, CrawledPage, CrawledPage.domain == domain) == 3
+        assert await _count(db, SearchResultCrawledPage, SearchResultCrawledPage.search_id == search_id) == 12
+
+        # повторный обход с тем же содержимым — новых страниц нет, ссылки не дублируются
+        again = await crawled_pages.store_domain_pages(
+            db, search_id=search_id, domain=domain, result_ids=result_ids, pages=PAGES,
+        )
+        await db.commit()
+        assert again == page_ids
+        assert await _count(db, CrawledPage, CrawledPage.domain == domain) == 3
+        assert await _count(db, SearchResultCrawledPage, SearchResultCrawledPage.search_id == search_id) == 12
+
+        # FTS-фильтр и бейджи работают поверх общих страниц
+        assert await find_matching_result_ids(db, search_id=search_id, tsquery="имплант:*") == set(result_ids)
+        assert await find_matching_result_ids(db, search_id=search_id, tsquery="ортодонт:*") == set()
+        hits = await get_keyword_hits_per_result(db, search_id=search_id, keywords=["протез", "ортодонт"])
+        assert hits == {rid: ["протез"] for rid in result_ids}
+
+        loaded = (await db.execute(
+            select(SearchResult).where(SearchResult.id == result_ids[0])
+        )).scalar_one()
+        await db.refresh(loaded, ["pages"])
+        assert [p.url for p in loaded.pages] == [p["url"] for p in PAGES]
+
+
+@pytest.mark.asyncio
+async def test_keyword_hits_are_attributed_per_result_in_one_query():
+    domain_a, domain_b = (f"{n}-{uuid.uuid4().hex[:8]}.test" for n in ("a", "b"))
+    async with AsyncSessionLocal() as db:
+        search_id, a_ids = await _search_with_results(db, domain_a, 2)
+        b = SearchResult(search_id=search_id, position=9, title="b", url=f"https://{domain_b}/", domain=domain_b)
+        db.add(b)
+        await db.flush()
+        await crawled_pages.store_domain_pages(
+            db, search_id=search_id, domain=domain_a, result_ids=a_ids, pages=PAGES,
+        )
+        await crawled_pages.store_domain_pages(
+            db, search_id=search_id, domain=domain_b, result_ids=[b.id], pages=PAGES[1:],
+        )
+        await db.commit()
+
+        keywords = ["протез", "имплант", "москв", "ортодонт"]
+        hits = await get_keyword_hits_per_result(db, search_id=search_id, keywords=keywords)
+        assert hits == {
+            **{rid: ["имплант", "москв", "протез"] for rid in a_ids},
+            b.id: ["имплант", "москв"],
+        }
+        # то же, что по запросу на каждое слово
+        for kw in keywords:
+            per_kw = await find_matching_result_ids(db, search_id=search_id, tsquery=f"{kw}:*")
+            assert per_kw == {rid for rid, words in hits.items() if kw in words}
+
+
+@pytest.mark.asyncio
+async def test_changed_page_gets_new_row_and_old_one_is_purged_when_orphaned():
+    domain = f"dent-{uuid.uuid4().hex[:8]}.test"
+    async with AsyncSessionLocal() as db:
+        search_id, result_ids = await _search_with_results(db, domain, 2)
+        first = await crawled_pages.store_domain_pages(
+            db, search_id=search_id, domain=domain, result_ids=result_ids, pages=PAGES,
+        )
+        changed = [dict(PAGES[0], text_content="Протезирование и отбеливание")] + PAGES[1:]
+        second = await crawled_pages.store_domain_pages(
+            db, search_id=search_id, domain=domain, result_ids=result_ids, pages=changed,
+        )
+        await db.commit()
+
+        assert second[1:] == first[1:] and second[0] != first[0]
+        assert await _count(db, CrawledPage, CrawledPage.domain == domain) == 4
+
+        # свежие сироты не трогаем — параллельный обход может как раз их связывать
+        await crawled_pages.purge_orphan_pages(db)
+        assert await _count(db, CrawledPage, CrawledPage.id == first[0]) == 1
+
+        await db.execute(
+            update(CrawledPage).where(CrawledPage.domain == domain)
+            .values(created_at=datetime.utcnow() - timedelta(days=2))
+        )
+        await db.commit()
+        assert await crawled_pages.purge_orphan_pages(db) >= 1
+        assert await _count(db, CrawledPage, CrawledPage.id == first[0]) == 0
+        assert await _count(db, CrawledPage, CrawledPage.domain == domain) == 3
+
+
+@pytest.mark.asyncio
+async def test_purge_skips_orphans_a_running_crawl_is_reusing():
+    domain = f"dent-{uuid.uuid4().hex[:8]}.test"
+    async with AsyncSessionLocal() as db:
+        search_id, result_ids = await _search_with_results(db, domain, 2)
+        first = await crawled_pages.store_domain_pages(
+            db, search_id=search_id, domain=domain, result_ids=result_ids, pages=PAGES,
+        )
+        # старые сироты: ссылок нет, строки старше порога очистки
+        await crawled_pages.store_domain_pages(
+            db, search_id=search_id, domain=domain, result_ids=result_ids, pages=[],
+        )
+        await db.execute(
+            update(CrawledPage).where(CrawledPage.domain == domain)
+            .values(created_at=datetime.utcnow() - timedelta(days=2))
+        )
+        await db.commit()
+
+    async with AsyncSessionLocal() as crawl, AsyncSessionLocal() as purge:
+        # обход переиспользует сирот и ещё не закоммитил ссылки на них
+        reused = await crawled_pages.store_domain_pages(
+            crawl, search_id=search_id, domain=domain, result_ids=result_ids, pages=PAGES,
+        )
+        assert reused == first
+        await asyncio.wait_for(crawled_pages.purge_orphan_pages(purge), timeout=5)
+        await crawl.commit()
+
+        assert await _count(crawl, CrawledPage, CrawledPage.domain == domain) == 3
+        assert await _count(crawl, SearchResultCrawledPage, SearchResultCrawledPage.search_id == search_id) == 6
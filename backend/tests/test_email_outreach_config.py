@@ -52,3 +52,31 @@ async def test_get_outreach_config_summary_hyvor():
     assert out["provider_type"] == "hyvor"
     assert out["configured"] is True
     assert out["hyvor_api_url"] == "http://relay:8000"
+
+
+@pytest.mark.asyncio
+async def test_sender_account_follows_send_email_choice(monkeypatch):
+    from app.modules.email import providers_service
+
+    svc = EmailService()
+    row = MagicMock()
+    row.id = 1
+    row.provider_type = "smtp"
+    row.smtp_host = "smtp.example.com"
+    row.smtp_port = 465
+    row.smtp_user = "sales@example.com"
+    row.smtp_password = "p"
+    row.smtp_use_ssl = True
+
+    result = MagicMock()
+    result.scalar_one_or_none = MagicMock(return_value=row)
+    db = AsyncMock()
+    db.execute = AsyncMock(return_value=result)
+
+    monkeypatch.setattr(providers_service, "get_active_chain", AsyncMock(return_value=[]))
+    assert await svc.sender_account(db) == "smtp:sales@example.com@smtp.example.com:465"
+
+    head = MagicMock()
+    head.provider_id = "postbox"
+    monkeypatch.setattr(providers_service, "get_active_chain", AsyncMock(return_value=[head, MagicMock()]))
+    assert await svc.sender_account(db) == "postbox"
@@ -0,0 +1,62 @@
+"""
+Tests for the compiled domain blacklist (filters.blacklist).
+"""
+
+import uuid
+
+import pytest
+
+from app.core.database import AsyncSessionLocal
+from app.core.security import hash_password
+from app.models.user import User
+from app.modules.filters import blacklist, schemas, service
+from app.modules.filters.blacklist import SEED_BLACKLIST, DomainMatcher, is_blacklisted
+
+
+def _legacy_is_blacklisted(domain: str, entries: list[str]) -> bool:
+    """Линейный скан до DomainMatcher — эталон семантики."""
+    d = blacklist.normalize_domain(domain)
+    for entry in entries:
+        e = blacklist.normalize_domain(entry)
+        if d == e or d.endswith(f".{e}") or e.endswith(f".{d}"):
+            return True
+    return False
+
+
+@pytest.mark.parametrize("domain", [
+    "vk.com", "m.vk.com", "WWW.Avito.RU", "spb.avito.ru", "notavito.ru", "avito.ru.evil.test",
+    "clinic.example", "m.clinic.example", "shop.m.clinic.example", "example", "ru", "com",
+    "dental-clinic.ru", "", "www.",
+])
+def test_domain_matcher_matches_legacy_scan(domain):
+    entries = SEED_BLACKLIST + ["m.clinic.example", "WWW.Spam.Test"]
+    assert is_blacklisted(domain, DomainMatcher(entries)) == _legacy_is_blacklisted(domain, entries)
+    assert is_blacklisted(domain, entries) == _legacy_is_blacklisted(domain, entries)
+
+
+def test_domain_matcher_without_parents_is_suffix_only():
+    matcher = DomainMatcher(["m.vk.com"], match_parents=False)
+    assert "m.vk.com" in matcher and "a.m.vk.com" in matcher
+    assert "vk.com" not in matcher and "xm.vk.com" not in matcher
+
+
+@pytest.mark.asyncio
+async def test_user_blacklist_is_cached_and_invalidated_on_change():
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"bl_{uuid.uuid4().hex[:8]}@test.example.com", hashed_password=hash_password("x"))
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+
+        first = await blacklist.get_user_blacklist(db, user.id)
+        assert "avito.ru" in first
+        assert await blacklist.get_user_blacklist(db, user.id) is first
+        stale = blacklist._user_matchers[user.id]
+
+        domain = f"spam-{uuid.uuid4().hex[:8]}.test"
+        await service.create_blacklist_domain(db, user.id, schemas.BlacklistDomainCreate(domain=domain))
+        # другой воркер со старой копией: версия в Redis сменилась — пересборка
+        blacklist._user_matchers[user.id] = stale
+        updated = await blacklist.get_user_blacklist(db, user.id)
+        assert updated is not first
+        assert f"www.{domain}" in updated and f"shop.{domain}" in updated
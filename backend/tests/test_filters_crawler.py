@@ -0,0 +1,241 @@
+"""
+Tests for the concurrent BFS crawler (filters.crawler.crawl_domain),
+single-pass page extraction (filters.html_extract) and the crawl cache
+(filters.cache).
+"""
+
+import asyncio
+import time
+import zlib
+from pathlib import Path
+
+import httpx
+import pytest
+
+from app.core import http_clients, redis_clients
+from app.core.config import settings
+from app.modules.filters import cache as crawl_cache
+from app.modules.filters import crawler, html_extract
+
+SITE = {
+    "/": '<title>Home</title><a href="/a">a</a><a href="/b">b</a><a href="/c">c</a>'
+         '<p>Звоните +7 (495) 123-45-67</p>',
+    "/a": '<title>A</title><a href="/a1">a1</a><p>mail: a@example.com</p>',
+    "/b": '<title>B</title><a href="/">home</a>',
+    "/c": '<title>C</title><a href="/a">a</a>',
+    "/a1": '<title>A1</title><p>b@example.com</p>',
+}
+
+
+class FakeSite:
+    def __init__(self, latency: float = 0.1, slow: dict | None = None):
+        self.latency = latency
+        self.slow = slow or {}
+        self.requests: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.not_modified = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.requests.append(path)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.slow.get(path, self.latency))
+        finally:
+            self.in_flight -= 1
+        if path == "/robots.txt":
+            return httpx.Response(200, text="User-agent: *\nSitemap: https://site.test/sitemap.xml")
+        if path not in SITE:
+            return httpx.Response(404)
+        etag = '"%x"' % zlib.crc32(SITE[path].encode())
+        if request.headers.get("if-none-match") == etag:
+            self.not_modified += 1
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, html=SITE[path], headers={"ETag": etag})
+
+
+@pytest.fixture
+async def fake_site(monkeypatch):
+    site = FakeSite()
+
+    def _client(purpose):
+        return httpx.AsyncClient(transport=httpx.MockTransport(site.handler), follow_redirects=True)
+
+    monkeypatch.setattr(http_clients, "_build_client", _client)
+    await http_clients.aclose_clients()
+    yield site
+    await http_clients.aclose_clients()
+
+
+@pytest.mark.asyncio
+async def test_crawl_domain_fetches_concurrently_in_bfs_order(fake_site):
+    t0 = time.monotonic()
+    result = await crawler.crawl_domain("https://site.test/", max_pages=10, use_cache=False, concurrency=4)
+    elapsed = time.monotonic() - t0
+
+    assert [p["url"] for p in result["pages"]] == [
+        "https://site.test/", "https://site.test/a", "https://site.test/b",
+        "https://site.test/c", "https://site.test/a1",
+    ]
+    # home + robots параллельно, потом a/b/c разом, потом a1: ~3 «волны», не 6.
+    assert elapsed < 0.5
+    assert fake_site.max_in_flight >= 3
+    assert set(fake_site.requests[:2]) == {"/robots.txt", "/"}
+    # каждая страница запрошена один раз, несмотря на повторные ссылки
+    assert sorted(fake_site.requests) == sorted(["/robots.txt", "/", "/a", "/b", "/c", "/a1"])
+    assert result["contacts"] == {"phone": "+7 (495) 123-45-67", "email": "a@example.com"}
+    assert result["seo"]["robots_txt"] == "exists"
+    assert "deadline_exceeded" not in result
+
+
+@pytest.mark.asyncio
+async def test_crawl_domain_respects_per_host_concurrency_and_max_pages(fake_site):
+    result = await crawler.crawl_domain("https://site.test/", max_pages=3, use_cache=False, concurrency=1)
+    assert result["total_pages"] == 3
+    # robots.txt идёт отдельно от страниц; страниц одновременно — не больше 1
+    assert fake_site.max_in_flight <= 2
+    assert [p["url"] for p in result["pages"]][0] == "https://site.test/"
+
+
+@pytest.mark.asyncio
+async def test_crawl_domain_returns_partial_result_on_deadline(fake_site):
+    fake_site.slow = {"/c": 5.0}
+    t0 = time.monotonic()
+    result = await crawler.crawl_domain(
+        "https://site.test/", max_pages=10, use_cache=False, concurrency=4, deadline=0.6,
+    )
+    assert time.monotonic() - t0 < 1.5
+    assert result["deadline_exceeded"] is True
+    urls = [p["url"] for p in result["pages"]]
+    assert "https://site.test/" in urls and "https://site.test/c" not in urls
+    assert {"url": "https://site.test/c", "error": "Crawl deadline exceeded"} in result["errors"]
+
+
+FIXTURES = Path(__file__).parent / "fixtures" / "crawler"
+_AVAILABLE_BACKENDS = ["bs4"] + (["selectolax"] if html_extract.HTMLParser is not None else [])
+
+
+@pytest.mark.parametrize("backend", _AVAILABLE_BACKENDS)
+def test_extract_page_single_pass_on_fixture_pages(backend):
+    html = (FIXTURES / "home.html").read_text(encoding="utf-8")
+    page = html_extract.extract_page(html, "https://ulybka-plus.example/", "ulybka-plus.example", backend=backend)
+
+    assert page.title == "Стоматология «Улыбка Плюс» в Москве — лечение и имплантация зубов"
+    assert page.meta_description.startswith("Стоматология в Москве")
+    assert (page.h1_count, page.h1_text) == (1, "Стоматология «Улыбка Плюс»")
+    # pdf / tel: / mailto: / # / javascript: и внешние ссылки отброшены, query срезан
+    assert "https://ulybka-plus.example/contacts" in page.links
+    assert "https://ulybka-plus.example/otzyvy" in page.links
+    assert not any(link.endswith(".pdf") or "vk.com" in link for link in page.links)
+    assert len(page.links) == len(set(page.links))
+    # текст без скриптов/стилей/svg/iframe/template
+    assert "Мы лечим зубы без боли" in page.text_content
+    assert "gtag" not in page.text_content and "font-family" not in page.text_content
+    assert "Запись онлайн" not in page.text_content
+    assert len(page.text_content) <= html_extract.TEXT_LIMIT
+    # контакты ищутся по сырому HTML — JSON-LD идёт первым
+    assert page.phone == "+7 (495) 765-43-21"
+    assert page.email == "info@ulybka-plus.example"
+
+    page = html_extract.extract_page(
+        (FIXTURES / "contacts.html").read_text(encoding="utf-8"),
+        "https://ulybka-plus.example/", "ulybka-plus.example", backend=backend,
+    )
+    assert page.meta_description is None
+    assert "zapis@ulybka-plus.example" in page.text_content
+
+
+def test_extract_page_backends_agree():
+    if html_extract.HTMLParser is None:
+        pytest.skip("selectolax is not installed")
+    for path in sorted(FIXTURES.glob("*.html")):
+        html = path.read_text(encoding="utf-8")
+        a = html_extract.extract_page(html, "https://ulybka-plus.example/", "ulybka-plus.example", backend="bs4")
+        b = html_extract.extract_page(html, "https://ulybka-plus.example/", "ulybka-plus.example", backend="selectolax")
+        assert a == b, path.name
+
+
+def test_crawl_cache_entry_codec_roundtrip_and_legacy_json():
+    entry = crawl_cache.CrawlCacheEntry(
+        data={"pages": [{"url": "https://a.test/", "title": "Стоматология"}], "total_pages": 1},
+        validators={"https://a.test/": ['"abc"', None]},
+        checked_at=123.5,
+    )
+    blob = crawl_cache.encode_entry(entry)
+    assert blob[:1] in (b"j", b"m") and blob[1:2] in (b"z", b"s")
+    assert crawl_cache.decode_entry(blob) == entry
+    # записи старого формата (голый JSON) читаются как свежие без валидаторов
+    legacy = crawl_cache.decode_entry(b'{"pages": [], "total_pages": 0}')
+    assert legacy.data == {"pages": [], "total_pages": 0} and legacy.validators == {} and legacy.fresh
+
+
+async def _drop_cached_crawl(domain: str) -> None:
+    crawl_cache.clear_lru()
+    await redis_clients.get_client().delete(crawl_cache.get_cache_key(domain, "crawl"))
+
+
+@pytest.mark.asyncio
+async def test_stale_crawl_cache_is_revalidated_with_conditional_gets(fake_site, monkeypatch):
+    await _drop_cached_crawl("site.test")
+    before = await crawl_cache.get_stats()
+
+    first = await crawler.crawl_domain("https://site.test/", max_pages=10, concurrency=4)
+    assert first["total_pages"] == 5
+    # свежий кэш — без единого запроса, из LRU
+    fake_site.requests.clear()
+    assert (await crawler.crawl_domain("https://site.test/", max_pages=10))["pages"] == first["pages"]
+    assert fake_site.requests == []
+
+    # устарел: все страницы отвечают 304 — отдаём кэш, полного обхода нет
+    monkeypatch.setattr(settings, "CRAWL_CACHE_FRESH_SECONDS", 0)
+    crawl_cache.clear_lru()  # второй уровень — Redis
+    again = await crawler.crawl_domain("https://site.test/", max_pages=10, concurrency=4)
+    assert again["pages"] == first["pages"]
+    assert fake_site.not_modified == 5
+    assert sorted(fake_site.requests) == sorted(["/", "/a", "/b", "/c", "/a1"])
+
+    # страница изменилась — полный обход
+    monkeypatch.setitem(SITE, "/b", '<title>B2</title><a href="/">home</a>')
+    fake_site.requests.clear()
+    changed = await crawler.crawl_domain("https://site.test/", max_pages=10, concurrency=4)
+    assert "B2" in [p["title"] for p in changed["pages"]]
+    assert "/robots.txt" in fake_site.requests
+
+    after = await crawl_cache.get_stats()
+    assert after["lru_hits"] - before["lru_hits"] >= 1
+    assert after["redis_hits"] - before["redis_hits"] >= 1
+    assert after["revalidated"] - before["revalidated"] == 1
+    assert after["changed"] - before["changed"] == 1
+    await _drop_cached_crawl("site.test")
+
+
+@pytest.mark.asyncio
+async def test_lru_hits_are_flushed_to_redis_in_batches(monkeypatch):
+    monkeypatch.setattr(crawl_cache, "_LRU_HITS_FLUSH_EVERY", 3)
+    monkeypatch.setattr(crawl_cache, "_LRU_HITS_FLUSH_SECONDS", 3600)
+    await crawl_cache.set_cached_crawl("lru-hits.test", {"pages": [], "total_pages": 0})
+    before = await crawl_cache.get_stats()
+
+    for _ in range(2):
+        assert await crawl_cache.get_crawl_entry("lru-hits.test") is not None
+    assert crawl_cache._pending_lru_hits == 2  # ещё не в Redis
+    await crawl_cache.get_crawl_entry("lru-hits.test")
+    assert crawl_cache._pending_lru_hits == 0
+
+    await crawl_cache.get_crawl_entry("lru-hits.test")
+    after = await crawl_cache.get_stats()  # досылает и локальный хвост
+    assert after["lru_hits"] - before["lru_hits"] == 4
+    await _drop_cached_crawl("lru-hits.test")
+
+
+@pytest.mark.asyncio
+async def test_monitor_crawl_cache_endpoint(client, auth_headers):
+    await crawl_cache.record_stats(misses=1, revalidated=3, changed=1)
+    resp = await client.get("/api/v1/monitor/crawl-cache", headers=auth_headers)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert set(crawl_cache._STAT_FIELDS) <= set(body)
+    assert body["misses"] >= 1 and body["revalidated"] >= 3
+    assert 0 < body["not_modified_rate"] < 100
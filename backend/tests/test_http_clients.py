@@ -0,0 +1,108 @@
+"""
+Тесты app.core.http_clients: реестр общих клиентов и DNS-кэш.
+"""
+
+import asyncio
+
+import httpcore
+import pytest
+
+from app.core import http_clients
+from app.core.config import settings
+
+
+@pytest.mark.asyncio
+async def test_get_client_is_shared_per_loop_and_purpose():
+    await http_clients.aclose_clients()
+    try:
+        api = http_clients.get_client("api")
+        assert http_clients.get_client("api") is api
+        assert http_clients.get_client("crawler") is not api
+        async with http_clients.shared_client("api") as client:
+            assert client is api
+        # shared_client не закрывает клиент
+        assert not api.is_closed
+        assert api.timeout.read == 15.0
+
+        # закрытый клиент пересоздаётся
+        await api.aclose()
+        assert http_clients.get_client("api") is not api
+
+        # другой event loop (Celery-таска в asyncio.run) — свой клиент
+        async def _other_loop():
+            return id(http_clients.get_client("api"))
+
+        other = await asyncio.to_thread(asyncio.run, _other_loop())
+        assert other != id(http_clients.get_client("api"))
+
+        with pytest.raises(ValueError):
+            http_clients.get_client("nope")
+    finally:
+        await http_clients.aclose_clients()
+
+
+class _FakeStream(httpcore.AsyncNetworkStream):
+    def __init__(self, addr):
+        self.addr = addr
+
+
+class _FakeBackend(httpcore.AsyncNetworkBackend):
+    def __init__(self, dead=()):
+        self.dead = set(dead)
+        self.connects = []
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        self.connects.append(host)
+        if host in self.dead:
+            raise httpcore.ConnectError(f"{host} refused")
+        return _FakeStream(host)
+
+
+@pytest.mark.asyncio
+async def test_dns_cache_resolves_once_and_falls_back_to_next_address(monkeypatch):
+    lookups = []
+
+    async def _getaddrinfo(host, port):
+        lookups.append(host)
+        return ["10.0.0.1", "10.0.0.2"]
+
+    monkeypatch.setattr(http_clients, "_getaddrinfo", _getaddrinfo)
+    monkeypatch.setattr(settings, "HTTP_DNS_CACHE_TTL", 60.0)
+    http_clients.clear_dns_cache()
+    inner = _FakeBackend(dead={"10.0.0.1"})
+    backend = http_clients._CachingResolverBackend(inner)
+
+    first = await backend.connect_tcp("API.example.ru", 443)
+    second = await backend.connect_tcp("api.example.ru", 443)
+    assert (first.addr, second.addr) == ("10.0.0.2", "10.0.0.2")
+    assert lookups == ["API.example.ru"]
+    # IP-литерал не резолвится и в кэш не попадает
+    await backend.connect_tcp("127.0.0.1", 80)
+    assert inner.connects[-1] == "127.0.0.1" and len(lookups) == 1
+
+    # все адреса мертвы — запись выкидывается, следующий connect резолвит заново
+    inner.dead = {"10.0.0.1", "10.0.0.2"}
+    with pytest.raises(httpcore.ConnectError):
+        await backend.connect_tcp("api.example.ru", 443)
+    inner.dead = set()
+    await backend.connect_tcp("api.example.ru", 443)
+    assert len(lookups) == 2
+
+    # TTL истёк — тоже перерезолв
+    monkeypatch.setattr(settings, "HTTP_DNS_CACHE_TTL", 0.0)
+    http_clients.clear_dns_cache()
+    await backend.connect_tcp("api.example.ru", 443)
+    await backend.connect_tcp("api.example.ru", 443)
+    assert len(lookups) == 4
+    http_clients.clear_dns_cache()
+
+
+@pytest.mark.asyncio
+async def test_shared_transport_uses_caching_resolver(monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_DNS_CACHE_TTL", 300.0)
+    client = http_clients._build_client("sites")
+    try:
+        assert isinstance(client._transport._pool._network_backend, http_clients._CachingResolverBackend)
+        assert client.max_redirects == 3 and client.follow_redirects
+    finally:
+        await client.aclose()
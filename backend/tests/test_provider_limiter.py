@@ -0,0 +1,152 @@
+"""
+Тесты app.core.provider_limiter: общий на воркеры GCRA-лимит в Redis,
+паузы после 429, отказ по max_wait, fallback без Redis и /monitor/rate-limits.
+"""
+
+import asyncio
+import time
+import uuid
+
+import pytest
+
+from app.core import provider_limiter, redis_clients
+from app.core.provider_limiter import INDEX_KEY, ProviderRateLimited, Quota
+
+
+@pytest.fixture
+async def provider():
+    """Уникальное имя провайдера; его ключи в Redis удаляются после теста."""
+    name = f"test-{uuid.uuid4().hex[:8]}"
+    yield name
+    client = redis_clients.get_client(decode_responses=True)
+    keys = [k async for k in client.scan_iter(match=f"ratelimit:*:{name}:*")]
+    if keys:
+        await client.delete(*keys)
+    members = [m for m in await client.zrange(INDEX_KEY, 0, -1) if m.startswith(f"{name}:")]
+    if members:
+        await client.zrem(INDEX_KEY, *members)
+
+
+def _row(stats: list[dict], provider: str, key: str | None = None) -> dict:
+    (row,) = [r for r in stats if r["provider"] == provider and r["key_id"] == provider_limiter.key_id(key)]
+    return row
+
+
+@pytest.mark.asyncio
+async def test_burst_then_paced_slots(provider):
+    quota = Quota(per_minute=600, burst=3)  # слот раз в 100мс
+
+    waits = [await provider_limiter.reserve(provider, "key", quota) for _ in range(5)]
+
+    assert waits[:3] == [0, 0, 0]
+    assert 0.05 <= waits[3] <= 0.1
+    assert 0.15 <= waits[4] <= 0.2
+    # другой ключ — свой лимит
+    assert await provider_limiter.reserve(provider, "other-key", quota) == 0
+
+    row = _row(await provider_limiter.get_stats(), provider, "key")
+    assert row["key_id"] != "key"
+    assert (row["acquired"], row["delayed"]) == (5, 2)
+    assert row["per_minute"] == 600 and row["burst"] == 3
+    assert 0.3 < row["backlog_seconds"] <= 0.5  # TAT: пять слотов по 100мс
+
+
+@pytest.mark.asyncio
+async def test_acquire_sleeps_for_its_slot(provider):
+    quota = Quota(per_minute=1200)  # раз в 50мс
+
+    started = time.monotonic()
+    for _ in range(3):
+        await provider_limiter.acquire(provider, None, quota)
+    assert time.monotonic() - started >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_cancelled_acquire_refunds_its_slot(provider):
+    quota = Quota(per_minute=60)  # раз в секунду
+    assert await provider_limiter.acquire(provider, "key", quota) == 0
+
+    waiters = [asyncio.create_task(provider_limiter.acquire(provider, "key", quota)) for _ in range(3)]
+    await asyncio.sleep(0.05)
+    for task in waiters:
+        task.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+
+    # отменённые ожидания не держат очередь: следующий ждёт один интервал, а не четыре
+    assert 0.8 < await provider_limiter.reserve(provider, "key", quota) <= 1
+    row = _row(await provider_limiter.get_stats(), provider, "key")
+    assert (row["acquired"], row["delayed"]) == (2, 1)
+
+
+@pytest.mark.asyncio
+async def test_max_wait_rejects_without_taking_slot(provider):
+    quota = Quota(per_minute=6)  # раз в 10с
+
+    assert await provider_limiter.reserve(provider, None, quota, max_wait=1) == 0
+    with pytest.raises(ProviderRateLimited) as exc:
+        await provider_limiter.reserve(provider, None, quota, max_wait=1)
+    assert exc.value.provider == provider and exc.value.wait > 9
+
+    row = _row(await provider_limiter.get_stats(), provider)
+    assert (row["acquired"], row["rejected"]) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_penalize_pauses_even_unlimited_quota(provider):
+
+    await provider_limiter.penalize(provider, "key", 5)
+
+    wait = await provider_limiter.reserve(provider, "key", Quota(per_minute=0))
+    assert 4 < wait <= 5
+    assert _row(await provider_limiter.get_stats(), provider, "key")["throttled"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stats_expire_and_index_is_trimmed(provider):
+    client = redis_clients.get_client(decode_responses=True)
+    await provider_limiter.reserve(provider, "key", Quota(per_minute=60))
+    member = f"{provider}:{provider_limiter.key_id('key')}"
+
+    ttl = await client.ttl(f"ratelimit:stats:{member}")
+    assert 0 < ttl <= provider_limiter.STATS_TTL_SECONDS
+    assert await client.zscore(INDEX_KEY, member) is not None
+
+    # давно не виденный лимит вычищается из индекса при чтении статистики
+    stale = f"{provider}:{provider_limiter.key_id('stale')}"
+    await client.zadd(INDEX_KEY, {stale: 1})
+    stats = await provider_limiter.get_stats()
+    assert await client.zscore(INDEX_KEY, stale) is None
+    assert [r["key_id"] for r in stats if r["provider"] == provider] == [provider_limiter.key_id("key")]
+
+
+@pytest.mark.asyncio
+async def test_local_fallback_without_redis(monkeypatch, provider):
+    def _down():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(provider_limiter, "_redis", _down)
+    monkeypatch.setattr(provider_limiter, "_local_tat", {})
+    quota = Quota(per_minute=6, burst=2)
+
+    assert await provider_limiter.reserve(provider, None, quota) == 0
+    assert await provider_limiter.reserve(provider, None, quota) == 0
+    assert 9 < await provider_limiter.reserve(provider, None, quota) <= 10
+    with pytest.raises(ProviderRateLimited):
+        await provider_limiter.reserve(provider, None, quota, max_wait=1)
+
+    await provider_limiter.penalize(provider, "key", 3)
+    assert 2 < await provider_limiter.reserve(provider, "key", Quota(per_minute=0)) <= 3
+    assert await provider_limiter.get_stats() == []
+
+
+@pytest.mark.asyncio
+async def test_monitor_rate_limits_endpoint(client, auth_headers, provider):
+    await provider_limiter.acquire(provider, "secret-key", Quota(per_minute=60, burst=2))
+
+    resp = await client.get("/api/v1/monitor/rate-limits", headers=auth_headers)
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["updated_at"]
+    row = _row(body["limits"], provider, "secret-key")
+    assert row["acquired"] == 1 and row["burst"] == 2
+    assert "secret-key" not in resp.text
@@ -0,0 +1,39 @@
+"""
+Тесты app.core.redis_clients: общий Redis-клиент на event loop и его закрытие.
+"""
+
+import asyncio
+
+import pytest
+
+from app.core import redis_clients
+
+
+@pytest.mark.asyncio
+async def test_get_client_is_shared_per_loop_and_decode_mode():
+    await redis_clients.aclose_clients()
+    try:
+        raw = redis_clients.get_client()
+        assert redis_clients.get_client() is raw
+        text = redis_clients.get_client(decode_responses=True)
+        assert text is not raw
+        await text.set("redis_clients:test", "x", ex=10)
+        assert await text.get("redis_clients:test") == "x"
+        assert await raw.get("redis_clients:test") == b"x"
+
+        # другой event loop (Celery-таска) — свой клиент, закрытый в конце run()
+        def _other() -> tuple:
+            async def _use():
+                client = redis_clients.get_client()
+                await client.ping()
+                return client, asyncio.get_running_loop()
+
+            return redis_clients.run(_use())
+
+        other, other_loop = await asyncio.to_thread(_other)
+        assert other is not raw
+        assert other_loop not in redis_clients._clients
+    finally:
+        await redis_clients.aclose_clients()
+    assert redis_clients.get_client() is not raw
+    await redis_clients.aclose_clients()
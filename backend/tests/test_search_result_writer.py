@@ -0,0 +1,173 @@
+"""
+Tests for batched SERP result writes (searches.result_writer) and the
+search progress SSE stream.
+"""
+
+import asyncio
+import json
+import uuid
+
+import pytest
+from sqlalchemy import func, select
+
+from app.core.database import AsyncSessionLocal
+from app.core.redis_pubsub import publish_event, search_stream_channel
+from app.core.security import hash_password
+from app.models.search import Search, SearchResult
+from app.models.user import User
+from app.modules.searches import result_writer, sse
+from app.modules.searches.result_writer import SearchResultWriter
+
+
+def _items(n: int) -> list[dict]:
+    return [
+        {"position": i + 1, "title": f"Клиника {i}", "url": f"https://c{i}.test/", "domain": f"c{i}.test"}
+        for i in range(n)
+    ]
+
+
+async def _new_search(db, status: str = "processing") -> Search:
+    user = User(email=f"writer_{uuid.uuid4().hex[:8]}@test.example.com", hashed_password=hash_password("x"))
+    db.add(user)
+    await db.flush()
+    search = Search(user_id=user.id, query="стоматология", status=status)
+    db.add(search)
+    await db.commit()
+    return search
+
+
+@pytest.fixture
+def events(monkeypatch):
+    published = []
+
+    async def _publish(channel, event_type, data):
+        published.append((channel, event_type, data))
+
+    monkeypatch.setattr(result_writer, "publish_event", _publish)
+    return published
+
+
+async def _saved(db, search_id: int) -> int:
+    return (await db.execute(
+        select(func.count()).select_from(SearchResult).where(SearchResult.search_id == search_id)
+    )).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_writer_flushes_every_n_rows_and_publishes_each_batch(events):
+    async with AsyncSessionLocal() as db:
+        search = await _new_search(db)
+        writer = SearchResultWriter(db, search.id, flush_rows=3, flush_ms=60_000)
+        for item in _items(7):
+            await writer.add(item)
+        assert await _saved(db, search.id) == 6  # две полные пачки, хвост в буфере
+        assert await writer.flush() == 1
+        assert await writer.flush() == 0
+
+        assert writer.saved_count == await _saved(db, search.id) == 7
+        assert [(ch, t) for ch, t, _ in events] == [(f"search_stream:{search.id}", "results")] * 3
+        assert [len(d["results"]) for _, _, d in events] == [3, 3, 1]
+        assert [d["result_count"] for _, _, d in events] == [3, 6, 7]
+        first = events[0][2]["results"][0]
+        assert first["position"] == 1 and first["domain"] == "c0.test" and first["id"]
+
+
+@pytest.mark.asyncio
+async def test_writer_flushes_on_interval(events):
+    async with AsyncSessionLocal() as db:
+        search = await _new_search(db)
+        writer = SearchResultWriter(db, search.id, flush_rows=100, flush_ms=0)
+        for item in _items(2):
+            await writer.add(item)
+        assert await _saved(db, search.id) == 2
+        assert len(events) == 2
+
+
+@pytest.mark.asyncio
+async def test_writer_interval_starts_with_first_buffered_row(events):
+    async with AsyncSessionLocal() as db:
+        search = await _new_search(db)
+        writer = SearchResultWriter(db, search.id, flush_rows=100, flush_ms=50)
+        await asyncio.sleep(0.08)  # e.g. a slow provider fetch after the writer was created
+        items = _items(2)
+        await writer.add(items[0])
+        assert await _saved(db, search.id) == 0  # a lone fresh row is not flushed
+        await asyncio.sleep(0.06)
+        await writer.add(items[1])
+        assert await _saved(db, search.id) == 2
+        assert [len(d["results"]) for _, _, d in events] == [2]
+
+
+@pytest.mark.asyncio
+async def test_failed_search_keeps_buffered_results(events, monkeypatch):
+    from app.modules.filters import blacklist
+    from app.modules.searches import providers
+    from app.queue import tasks
+
+    async with AsyncSessionLocal() as db:
+        search = await _new_search(db)
+        search.search_provider = "serpapi"
+        await db.commit()
+
+    async def _fetch(**kwargs):
+        return _items(5)
+
+    def _is_blacklisted(domain, _blacklist):
+        if domain == "c3.test":
+            raise RuntimeError("boom")
+        return False
+
+    monkeypatch.setattr(providers, "fetch_search_results", _fetch)
+    monkeypatch.setattr(blacklist, "is_blacklisted", _is_blacklisted)
+    monkeypatch.setattr(result_writer.settings, "SEARCH_RESULTS_FLUSH_ROWS", 100)
+
+    assert await tasks._execute_search_async(search.id) == {"error": "boom"}
+
+    async with AsyncSessionLocal() as db:
+        failed = await db.get(Search, search.id)
+        assert failed.status == "failed"
+        assert failed.result_count == await _saved(db, search.id) == 3
+    assert [(t, d["result_count"]) for _, t, d in events] == [("results", 3), ("done", 3)]
+
+
+@pytest.mark.asyncio
+async def test_stream_of_finished_search_sends_results_then_done(client, auth_headers):
+    async with AsyncSessionLocal() as db:
+        search = await _new_search(db, status="completed")
+        writer = SearchResultWriter(db, search.id, flush_rows=10)
+        for item in _items(2):
+            await writer.add(item)
+        await writer.flush()
+
+    resp = await client.get(f"/api/v1/searches/{search.id}/stream", headers=auth_headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    blocks = [b for b in resp.text.split("\n\n") if b]
+    parsed = [(b.split("\n")[0][len("event: "):], json.loads(b.split("\n")[1][len("data: "):])) for b in blocks]
+    assert [t for t, _ in parsed] == ["results", "done"]
+    assert [r["url"] for r in parsed[0][1]["results"]] == ["https://c0.test/", "https://c1.test/"]
+    assert parsed[1][1]["status"] == "completed"
+
+    missing = await client.get("/api/v1/searches/999999999/stream", headers=auth_headers)
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_live_stream_survives_heartbeats_until_done(monkeypatch):
+    monkeypatch.setattr(sse, "SSE_HEARTBEAT_INTERVAL", 0.2)
+    async with AsyncSessionLocal() as db:
+        search = await _new_search(db)
+        stream = sse.iter_search_events(db, search)
+        channel = search_stream_channel(search.id)
+
+        # subscribed before the bootstrap event: publishing right after it is not lost
+        assert (await anext(stream)).startswith("event: results")
+        await publish_event(channel, "results", {"results": _items(1), "result_count": 1})
+        assert '"result_count": 1' in await anext(stream)
+
+        # idle intervals only produce heartbeats, the subscription stays open
+        assert [await anext(stream) for _ in range(2)] == [": hb\n\n"] * 2
+        await publish_event(channel, "done", {"status": "completed", "result_count": 1})
+        assert (await anext(stream)).startswith("event: done")
+        with pytest.raises(StopAsyncIteration):
+            await anext(stream)
@@ -0,0 +1,140 @@
+"""
+Tests for the async Yandex Cloud Search API fetcher (searches.providers.yandex_xml).
+"""
+
+import asyncio
+import base64
+import json
+
+import httpx
+import pytest
+
+from app.core import http_clients
+from app.modules.searches.providers import yandex_xml
+
+
+def _page_xml(page: int, n: int = 10) -> bytes:
+    groups = "".join(
+        f"<group><doc><url>https://site{page}-{i}.test/</url><title>Клиника {page}-{i}</title>"
+        f"<headline>Сниппет</headline></doc></group>"
+        for i in range(n)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?><yandexsearch version="1.0"><response>'
+        f"<results><grouping>{groups}</grouping></results></response></yandexsearch>"
+    ).encode()
+
+
+class FakeSearchAPI:
+    def __init__(self, last_page: int = 99, latency: float = 0.05, throttle_first: int = 0, status: int = 200):
+        self.last_page = last_page
+        self.latency = latency
+        self.throttle_left = throttle_first
+        self.status = status
+        self.pages: list[int] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        assert request.headers["authorization"] == "Api-Key key"
+        body = json.loads(request.content)
+        page = int(body["query"]["page"])
+        self.pages.append(page)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        if self.status != 200:
+            return httpx.Response(self.status, json={"message": "Permission denied"})
+        if self.throttle_left > 0:
+            self.throttle_left -= 1
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        n = 10 if page < self.last_page else 4 if page == self.last_page else 0
+        return httpx.Response(200, json={"rawData": base64.b64encode(_page_xml(page, n)).decode()})
+
+
+@pytest.fixture
+async def fake_api(monkeypatch):
+    api = FakeSearchAPI()
+
+    def _client(purpose):
+        return httpx.AsyncClient(transport=httpx.MockTransport(api.handler))
+
+    monkeypatch.setattr(http_clients, "_build_client", _client)
+    monkeypatch.setattr(yandex_xml, "_learned_limits", {})
+    await http_clients.aclose_clients()
+    yield api
+    await http_clients.aclose_clients()
+
+
+CFG = {"folder_id": "folder", "api_key": "key"}
+
+
+def test_parse_xml_results_streams_and_stops_at_limit():
+    items = yandex_xml._parse_xml_results(_page_xml(2), 2)
+    assert [r["position"] for r in items] == list(range(21, 31))
+    assert items[0] == {
+        "position": 21, "title": "Клиника 2-0", "url": "https://site2-0.test/",
+        "snippet": "Сниппет", "domain": "site2-0.test",
+    }
+    assert len(yandex_xml._parse_xml_results(_page_xml(0), 0, limit=3)) == 3
+
+    err = b'<yandexsearch><response><error code="15">nothing found</error></response></yandexsearch>'
+    with pytest.raises(ValueError, match="error 15"):
+        yandex_xml._parse_xml_results(err, 0)
+    with pytest.raises(ValueError, match="XML"):
+        yandex_xml._parse_xml_results(b"<yandexsearch><resp", 0)
+
+
+@pytest.mark.asyncio
+async def test_pages_are_fetched_concurrently_and_yielded_in_order(fake_api):
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    pages = [p async for p, _ in yandex_xml.iter_result_pages("стоматология", 100, CFG)]
+    elapsed = loop.time() - t0
+
+    assert pages == list(range(10))
+    assert fake_api.max_in_flight >= 4
+    assert elapsed < 10 * fake_api.latency  # не 10 последовательных запросов
+    results = await yandex_xml.fetch_search_results("стоматология", 25, provider_config=CFG)
+    assert [r["position"] for r in results] == list(range(1, 26))
+
+
+@pytest.mark.asyncio
+async def test_short_page_stops_and_cancels_the_rest(fake_api):
+    fake_api.last_page = 2
+    fake_api.latency = 0.01
+    got = [(p, len(items)) async for p, items in yandex_xml.iter_result_pages("q", 100, CFG)]
+    assert got == [(0, 10), (1, 10), (2, 4)]
+
+
+@pytest.mark.asyncio
+async def test_throttling_halves_concurrency_and_retries(fake_api):
+    fake_api.throttle_left = 3
+    results = await yandex_xml.fetch_search_results("q", 50, provider_config=CFG)
+    assert len(results) == 50
+    assert sorted(set(fake_api.pages)) == [0, 1, 2, 3, 4]
+    assert len(fake_api.pages) == 5 + 3
+
+
+def test_aimd_limiter_adjusts_limit():
+    limiter = yandex_xml.AIMDLimiter(4, max_limit=6)
+    limiter.on_success(0.1)
+    limiter.on_success(0.1)
+    assert limiter.limit == 6
+    limiter.on_throttle()
+    assert limiter.limit == 3
+    limiter.on_success(0.5)  # > 2× базовой латентности
+    assert limiter.limit == 2.25
+    for _ in range(5):
+        limiter.on_throttle()
+    assert limiter.limit == 1
+
+
+@pytest.mark.asyncio
+async def test_auth_error_is_raised_not_skipped(fake_api):
+    fake_api.status = 403
+    with pytest.raises(yandex_xml.YandexXMLAuthError, match="Permission denied"):
+        await yandex_xml.fetch_search_results("q", 30, provider_config=CFG)